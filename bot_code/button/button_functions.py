@@ -12,8 +12,9 @@ import weakref
 
 # Local imports
 from utils.utils import logger, lock, COLOR_STATES, paused_games, get_color_name, get_color_emoji, get_color_state, generate_timer_image
-from game.game_cache import game_cache, button_message_cache
-from database.database import execute_query, get_game_session_by_id, game_sessions_dict, update_local_game_sessions
+from game.game_cache import button_message_cache
+from database.database import execute_query_async, run_db_call, get_game_session_by_id, update_local_game_sessions
+from database.session_registry import session_registry
 from text.full_text import generate_explaination_text
 from game.end_game import get_end_game_embed
 from button.button_utils import get_button_message, Failed_Interactions
@@ -43,11 +44,8 @@ async def create_button_message(game_id, bot, force_new=False):
         game_session_config = await get_game_session_by_id(game_id)
         if game_session_config is None:
             logger.error(f'No game session found for game {game_id}')
-            game_session = update_local_game_sessions()
-            logger.info(f'Updated game sessions: {game_session}')
-            game_sessions = game_sessions_dict(game_session)
-            logger.info(f'Game sessions dict: {game_sessions}')
-            game_session_config = game_sessions.get(game_id)
+            await run_db_call(update_local_game_sessions)
+            game_session_config = session_registry.get_by_game_id(game_id)
             if game_session_config is None:
                 logger.error(f'No game session found for game {game_id} after update')
                 return
@@ -209,50 +207,11 @@ class MenuTimer(nextcord.ui.View):
         """Remove a game from tracking"""
         if game_id in self.active_game_ids:
             self.active_game_ids.remove(game_id)
-        if game_id in self._game_sessions_cache:
-            del self._game_sessions_cache[game_id]
-
-    def _should_update_sessions_dict(self):
-        """Check if sessions dict cache needs updating"""
-        if not self._last_dict_update:
-            return True
-        return (datetime.datetime.now(timezone.utc) - self._last_dict_update) > datetime.timedelta(seconds=30)
 
     async def get_game_session(self, game_id):
-        """Get game session with improved caching"""
+        """Get game session from the session registry (database only for ended games)"""
         try:
-            game_id = str(game_id)
-            now = datetime.datetime.now(timezone.utc)
-            
-            # Check memory cache first
-            cache_entry = self._game_sessions_cache.get(game_id)
-            if cache_entry and (now - cache_entry['timestamp']) < datetime.timedelta(minutes=5):
-                return cache_entry['session']
-            
-            # Use cached sessions dict if available and recent
-            if not self._should_update_sessions_dict() and self._sessions_dict_cache:
-                game_session = self._sessions_dict_cache.get(game_id)
-                if game_session:
-                    self._game_sessions_cache[game_id] = {
-                        'session': game_session,
-                        'timestamp': now
-                    }
-                    return game_session
-
-            # Add small delay before database query
-            await asyncio.sleep(0.25)
-            
-            # Get from database and update cache
-            game_session = await get_game_session_by_id(game_id)
-            if game_session:
-                self._game_sessions_cache[game_id] = {
-                    'session': game_session,
-                    'timestamp': now
-                }
-                return game_session
-            
-            return None
-            
+            return await get_game_session_by_id(game_id)
         except Exception as e:
             logger.error(f'Error getting game session for game {game_id}: {e}')
             return None
@@ -304,17 +263,16 @@ class MenuTimer(nextcord.ui.View):
             try:
                 game_id = str(game_id)
                 
-                # Try Redis cache first for better performance
+                # Served from the in-process near-cache, then Redis, then MySQL
                 redis_state = await game_state_cache.get_game_state(int(game_id))
                 
                 if redis_state:
-                    logger.debug(f'Redis cache hit for game {game_id}')
+                    logger.debug(f'Game state cache hit for game {game_id}')
                     latest_click_time_overall = redis_state.get('last_click_time')
                     total_clicks = redis_state.get('total_clicks', 0)
                     total_players = redis_state.get('total_players', 0)
                     user_name = redis_state.get('latest_player_name', 'Unknown')
                     last_timer_value = redis_state.get('timer_value', game_session['timer_duration'])
-                    last_update_time = datetime.datetime.now(timezone.utc)
                     
                     # Ensure timezone awareness
                     if latest_click_time_overall and hasattr(latest_click_time_overall, 'tzinfo'):
@@ -324,67 +282,48 @@ class MenuTimer(nextcord.ui.View):
                         latest_click_time_overall = game_session['start_time']
                         
                 else:
-                    logger.info(f'Redis cache miss for game {game_id}, checking local cache')
-                    # Fallback to local cache
-                    cache_data = game_cache.get_game_cache(game_id)
+                    logger.info(f'Game state cache miss for game {game_id}, querying database')
+                    # Final fallback to database
+                    query = f'''
+                        SELECT users.user_name, button_clicks.click_time, button_clicks.timer_value,
+                            (SELECT COUNT(*) FROM button_clicks WHERE game_id = {game_id}) AS total_clicks,
+                            (SELECT COUNT(DISTINCT user_id) FROM button_clicks WHERE game_id = {game_id}) AS total_players
+                        FROM button_clicks
+                        INNER JOIN users ON button_clicks.user_id = users.user_id
+                        WHERE button_clicks.game_id = {game_id}
+                        ORDER BY button_clicks.id DESC
+                        LIMIT 1
+                    '''
+                    params = ()
+                    result = await execute_query_async(query, params, is_timer=True)
                     
-                    if cache_data:
-                        latest_click_time_overall = cache_data['latest_click_time']
-                        total_clicks = cache_data['total_clicks']
-                        last_update_time = cache_data['last_update_time']
-                        total_players = cache_data['total_players']
-                        user_name = cache_data['latest_player_name']
-                        last_timer_value = cache_data['last_timer_value']
+                    # Handle case when no clicks exist yet
+                    if not result or len(result) == 0: 
+                        logger.info(f'No clicks found for game {game_id}, using initial state')
+                        # Use initial state based on game session
+                        user_name = "Game Initialized"
+                        latest_click_time_overall = game_session['start_time']
+                        last_timer_value = game_session['timer_duration']
+                        total_clicks = 0
+                        total_players = 0
+                        # Update Redis cache
+                        try:
+                            await game_state_cache.update_game_state(
+                                game_id=int(game_id),
+                                last_click_time=latest_click_time_overall,
+                                timer_value=last_timer_value,
+                                total_clicks=total_clicks,
+                                total_players=total_players,
+                                latest_player_name=user_name,
+                                is_active=True
+                            )
+                        except Exception as cache_error:
+                            logger.error(f"Failed to update Redis cache for game {game_id}: {cache_error}")
                     else:
-                        logger.info(f'Local cache miss for game {game_id}, querying database')
-                        # Final fallback to database
-                        query = f'''
-                            SELECT users.user_name, button_clicks.click_time, button_clicks.timer_value,
-                                (SELECT COUNT(*) FROM button_clicks WHERE game_id = {game_id}) AS total_clicks,
-                                (SELECT COUNT(DISTINCT user_id) FROM button_clicks WHERE game_id = {game_id}) AS total_players
-                            FROM button_clicks
-                            INNER JOIN users ON button_clicks.user_id = users.user_id
-                            WHERE button_clicks.game_id = {game_id}
-                            ORDER BY button_clicks.id DESC
-                            LIMIT 1
-                        '''
-                        params = ()
-                        result = execute_query(query, params, is_timer=True)
-                        
-                        # Handle case when no clicks exist yet
-                        if not result or len(result) == 0: 
-                            logger.info(f'No clicks found for game {game_id}, using initial state')
-                            # Use initial state based on game session
-                            user_name = "Game Initialized"
-                            latest_click_time_overall = game_session['start_time']
-                            last_timer_value = game_session['timer_duration']
-                            total_clicks = 0
-                            total_players = 0
-                            last_update_time = datetime.datetime.now(timezone.utc)
-                            # Update both caches with initial values
-                            game_cache.update_game_cache(game_id, latest_click_time_overall, 
-                                                        total_clicks, total_players, 
-                                                        user_name, last_timer_value)
-                            # Update Redis cache
-                            try:
-                                await game_state_cache.update_game_state(
-                                    game_id=int(game_id),
-                                    last_click_time=latest_click_time_overall,
-                                    timer_value=last_timer_value,
-                                    total_clicks=total_clicks,
-                                    total_players=total_players,
-                                    latest_player_name=user_name,
-                                    is_active=True
-                                )
-                            except Exception as cache_error:
-                                logger.error(f"Failed to update Redis cache for game {game_id}: {cache_error}")
-                        else:
-                            # Process normal result with existing clicks
-                            result = result[0]
-                            user_name, latest_click_time_overall, last_timer_value, total_clicks, total_players = result
-                            latest_click_time_overall = latest_click_time_overall.replace(tzinfo=timezone.utc) if latest_click_time_overall.tzinfo is None else latest_click_time_overall
-                        last_update_time = datetime.datetime.now(timezone.utc)
-                        game_cache.update_game_cache(game_id, latest_click_time_overall, total_clicks, total_players, user_name, last_timer_value)
+                        # Process normal result with existing clicks
+                        result = result[0]
+                        user_name, latest_click_time_overall, last_timer_value, total_clicks, total_players = result
+                        latest_click_time_overall = latest_click_time_overall.replace(tzinfo=timezone.utc) if latest_click_time_overall.tzinfo is None else latest_click_time_overall
                 
                 # Calculate elapsed time and current timer value using Redis cache method
                 try:
@@ -401,13 +340,6 @@ class MenuTimer(nextcord.ui.View):
                     elapsed_time = (now - latest_click_time_overall).total_seconds()
                     timer_value = max(game_session['timer_duration'] - elapsed_time, 0)
                 
-                # Clear cache if last update was too long ago
-                if last_update_time is None or not last_update_time: 
-                    last_update_time = datetime.datetime.now(timezone.utc)
-                if datetime.datetime.now(timezone.utc) - last_update_time > datetime.timedelta(hours=0.25):
-                    logger.info(f'Clearing cache for game {game_id}, since last update was more than 15 minutes ago...')
-                    game_cache.clear_game_cache(game_id)
-                
                 # Only update if embed content actually changed
                 total_clicks = total_clicks if total_clicks is not None else 0
                 total_players = total_players if total_players is not None else 0
@@ -447,14 +379,15 @@ class MenuTimer(nextcord.ui.View):
                         WHERE gs.id = %s
                     """
                     try:
-                        execute_query(update_query, (game_id, game_id), commit=True)
+                        await execute_query_async(update_query, (game_id, game_id), commit=True)
+                        session_registry.remove(game_id)
                         logger.info(f'Updated end_time for game {game_id}')
                     except Exception as e:
                         logger.error(f'Error updating end_time for game {game_id}: {e}')
                     
                     guild_id = game_session['guild_id']
                     guild = self.bot.get_guild(guild_id)
-                    embed, file = get_end_game_embed(game_id, guild)
+                    embed, file = await run_db_call(get_end_game_embed, game_id, guild)
 
                     try:
                         await button_message.edit(embed=embed, file=file)
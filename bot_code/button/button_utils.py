@@ -7,7 +7,7 @@ import nextcord
 # Local imports
 from utils.utils import logger
 from game.game_cache import button_message_cache
-from database.database import update_local_game_sessions, game_sessions_dict
+from database.database import update_local_game_sessions, get_game_session_by_id, run_db_call
 
 # Get button message
 # This function is used to get the button message for the timer button.
@@ -26,8 +26,7 @@ async def get_button_message(game_id, bot):
             try:
                 message_id = await button_message_cache.get_message_cache(game_id)
                 if message_id:
-                    sessions_dict = await game_sessions_dict()
-                    game_session = sessions_dict.get(str(game_id))
+                    game_session = await get_game_session_by_id(game_id)
                     if game_session:
                         channel_id = game_session['button_channel_id']
                         channel = bot.get_channel(int(channel_id))
@@ -45,14 +44,12 @@ async def get_button_message(game_id, bot):
 
         # If we get here, either no cached message or failed to fetch it
         # Get the game session config to get the button channel id
-        sessions_dict = await game_sessions_dict()
-        game_session = sessions_dict.get(str(game_id))
+        game_session = await get_game_session_by_id(game_id)
         
         if not game_session:
             logger.error(f'No game session found for game {game_id}, updating sessions...')
-            game_sessions = update_local_game_sessions()
-            sessions_dict = await game_sessions_dict(game_sessions)
-            game_session = sessions_dict.get(str(game_id))
+            await run_db_call(update_local_game_sessions)
+            game_session = await get_game_session_by_id(game_id)
             if not game_session:
                 logger.error(f'Still no game session found for game {game_id} after update')
                 return None
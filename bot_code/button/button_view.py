@@ -7,7 +7,7 @@ from datetime import timezone
 # Local imports
 from utils.utils import get_color_state, get_button_style, logger
 from utils.timer_button import TimerButton
-from database.database import game_sessions_dict
+from database.database import get_game_session_by_id
 
 class ButtonView(nextcord.ui.View):
     def __init__(self, timer_value, bot, game_id=None):
@@ -23,8 +23,7 @@ class ButtonView(nextcord.ui.View):
             game_id = int(self.game_id) if self.game_id else None
             if not game_id:
                 return None
-            sessions_dict = await game_sessions_dict()
-            return sessions_dict.get(str(game_id))
+            return await get_game_session_by_id(game_id)
         except Exception as e:
             logger.error(f"Error getting game session: {e}")
             return None
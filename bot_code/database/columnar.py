@@ -0,0 +1,72 @@
+# Columnar.py
+import numpy as np
+
+# Columnar result mode for analytics queries.
+# Rows are fetched in chunks and packed straight into one typed NumPy array per column,
+# so stats code can run vectorized instead of looping over per-row tuples and datetimes.
+
+# Pseudo-dtype for DATETIME/TIMESTAMP columns: stored as int64 seconds since the epoch.
+# MySQL returns naive datetimes, so the epoch is taken as if the stored wall-clock time were UTC
+# (which it is for button_clicks.click_time).
+EPOCH = 'epoch'
+
+COLUMNAR_CHUNK_SIZE = 5000
+
+def _to_array(values, dtype):
+    if dtype == EPOCH:
+        return np.array(values, dtype='datetime64[s]').astype(np.int64)
+    if dtype in (object, 'object', str, 'str'):
+        return np.array(values, dtype=object)
+    return np.array(values, dtype=dtype)
+
+def _empty_array(dtype):
+    if dtype == EPOCH:
+        return np.empty(0, dtype=np.int64)
+    if dtype in (object, 'object', str, 'str'):
+        return np.empty(0, dtype=object)
+    return np.empty(0, dtype=dtype)
+
+def empty_columns(columns):
+    """
+    Build the empty result for a columnar query (used when a query returns nothing or fails).
+    Args:
+        columns (dict): {column name: dtype} in SELECT order
+    Returns:
+        dict: {column name: zero-length array}
+    """
+    return {name: _empty_array(dtype) for name, dtype in columns.items()}
+
+def fetch_columns(cursor, columns, chunk_size=COLUMNAR_CHUNK_SIZE):
+    """
+    Fetch the remaining rows of an executed cursor as typed NumPy arrays.
+    Only one chunk of row tuples is alive at a time; each chunk is transposed
+    and converted, then the per-chunk arrays are concatenated once at the end.
+    Args:
+        cursor: Executed mysql.connector cursor
+        columns (dict): {column name: dtype} in SELECT order, e.g.
+            {'timer_value': 'float32', 'click_time': EPOCH, 'user_id': 'int64', 'user_name': object}
+        chunk_size (int): Rows fetched per round trip (default: COLUMNAR_CHUNK_SIZE)
+    Returns:
+        dict: {column name: np.ndarray}, NULLs become NaN for float columns
+    Raises:
+        ValueError: If the SELECT returns a different number of columns than requested
+    """
+    names = list(columns)
+    if cursor.description is not None and len(cursor.description) != len(names):
+        raise ValueError(f"Columnar query returned {len(cursor.description)} columns, expected {len(names)}")
+
+    parts = {name: [] for name in names}
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for name, values in zip(names, zip(*rows)):
+            dtype = columns[name]
+            if np.issubdtype(np.dtype(dtype) if dtype != EPOCH else np.int64, np.floating):
+                values = [np.nan if value is None else value for value in values]
+            parts[name].append(_to_array(values, dtype))
+
+    return {
+        name: (np.concatenate(chunks) if len(chunks) > 1 else chunks[0]) if chunks else _empty_array(columns[name])
+        for name, chunks in parts.items()
+    }
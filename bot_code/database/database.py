@@ -2,7 +2,6 @@
 print("Starting database file...")
 
 import mysql.connector
-from mysql.connector.pooling import MySQLConnectionPool
 import traceback
 import time
 import asyncio
@@ -10,10 +9,17 @@ from datetime import timezone
 import datetime
 import socket
 import sys
+import functools
+from concurrent.futures import ThreadPoolExecutor
 print("Imports completed...")
 
 try:
-    from utils.utils import config, logger, lock
+    from utils.utils import config, logger, lock, get_color_name
+    from database.migrations import apply_migrations, check_hot_query_plans
+    from database.session_registry import session_registry, session_from_row, SESSION_COLUMNS
+    from database.player_stats import CLICK_COLUMNS, PLAYER_STATS_COLUMNS, PLAYER_STATS_UPDATE, build_player_stats_rows
+    from database.columnar import fetch_columns, empty_columns
+    from database.pool_metrics import InstrumentedConnectionPool, pool_metrics
     print("Utils imports completed...")
     print(f"Database config: host={config.get('sql_host')}, user={config.get('sql_user')}, database={config.get('sql_database')}, port={config.get('sql_port')}")
 except Exception as e:
@@ -145,37 +151,6 @@ def test_database_connection():
     print("\nAll connection attempts failed")
     return False
 
-print("Testing basic MySQL connection...")
-try:
-    # Most basic possible connection
-    print("Attempting basic connection...")
-    db = mysql.connector.connect(
-        host=config['sql_host'],
-        user=config['sql_user'],
-        password=config['sql_password'],
-        database=config['sql_database'],
-        port=config['sql_port'],
-        connect_timeout=5  # Short timeout
-    )
-    print("Connection successful!")
-    db.close()
-except mysql.connector.Error as err:
-    print(f"MySQL Connection Error: {err}")
-    if hasattr(err, 'errno'):
-        print(f"Error code: {err.errno}")
-    sys.exit(1)
-except Exception as e:
-    print(f"Unexpected error: {e}")
-    print(traceback.format_exc())
-    sys.exit(1)
-
-# If we get here, basic connection worked, now try pools
-print("Basic connection successful, setting up pools...")
-
-# Test connection before proceeding
-if not test_database_connection():
-    sys.exit(1)
-
 # Global variables
 db = None
 cursor = None
@@ -183,16 +158,23 @@ timer_db = None
 cursor_tb = None
 db_pool = None
 db_pool_timer = None
-_sessions_dict_cache = None
-_last_dict_update = None
-_sessions_dict_lock = asyncio.Lock()
+db_pool_stream = None
+_db_executor = None
+_db_semaphores = {}
+_init_lock = None
+_initialized = False
+_background_repairs_task = None
+game_sessions = []
 
 # Constants
 MAIN_POOL_SIZE = 5
 TIMER_POOL_SIZE = 3
+STREAM_POOL_SIZE = 2  # long-lived unbuffered reads, kept off the main pool
+STREAM_CHUNK_SIZE = 1000  # rows per fetchmany() when streaming
 CONNECTION_TIMEOUT = 120
 RETRY_DELAY = 5  # seconds
 MAX_RETRIES = 3
+BATCH_CHUNK_SIZE = 500  # rows per multi-row INSERT
 
 GAME_CHANNELS = []
 
@@ -241,13 +223,16 @@ def get_current_new_cursor():
 
 # Function to get the current database connection and cursor for the timer pool
 # In database.py, replace the setup_pool and execute_query functions:
-def setup_pool(config=config):
+def setup_pool(config=config, pools=("main", "timer")):
     """
     Sets up MySQL connection pools with robust error handling.
+    Args:
+        config (dict): Configuration with the sql_* connection settings
+        pools (tuple): Which pools to set up, "main", "timer" and/or "stream" (default: main and timer)
     Returns:
         bool: True if pools were successfully set up, False otherwise
     """
-    global db_pool, db_pool_timer
+    global db_pool, db_pool_timer, db_pool_stream
     
     for attempt in range(MAX_RETRIES):
         try:
@@ -262,8 +247,8 @@ def setup_pool(config=config):
             }
             
             # Create main pool
-            if db_pool is None:
-                db_pool = MySQLConnectionPool(
+            if "main" in pools and db_pool is None:
+                db_pool = InstrumentedConnectionPool(
                     pool_name="button_pool",
                     pool_size=MAIN_POOL_SIZE,
                     **pool_config
@@ -271,19 +256,30 @@ def setup_pool(config=config):
                 logger.info("Main connection pool created successfully")
 
             # Create timer pool
-            if db_pool_timer is None:
-                db_pool_timer = MySQLConnectionPool(
+            if "timer" in pools and db_pool_timer is None:
+                db_pool_timer = InstrumentedConnectionPool(
                     pool_name="button_pool_timer",
                     pool_size=TIMER_POOL_SIZE,
                     **pool_config
                 )
                 logger.info("Timer connection pool created successfully")
 
-            # Test both pools
-            test_conn1 = db_pool.get_connection()
-            test_conn1.close()
-            test_conn2 = db_pool_timer.get_connection()
-            test_conn2.close()
+            # Create stream pool (only on demand, see stream_query)
+            if "stream" in pools and db_pool_stream is None:
+                db_pool_stream = InstrumentedConnectionPool(
+                    pool_name="button_pool_stream",
+                    pool_size=STREAM_POOL_SIZE,
+                    **pool_config
+                )
+                logger.info("Stream connection pool created successfully")
+
+            # Test the pools we were asked for
+            if "main" in pools:
+                test_conn1 = db_pool.get_connection()
+                test_conn1.close()
+            if "timer" in pools:
+                test_conn2 = db_pool_timer.get_connection()
+                test_conn2.close()
             
             return True
 
@@ -305,57 +301,101 @@ def setup_pool(config=config):
             print(f"Critical unexpected error in database setup: {e}")
             return False
 
-def execute_query(query, params=None, is_timer=False, retry_attempts=3, commit=False):
+def _get_query_pool(is_timer=False):
+    """
+    Returns the pool a query should run on, setting the pools up if needed.
+    Returns:
+        MySQLConnectionPool: The timer or main pool, or None if setup failed
+    """
+    if db_pool is None or db_pool_timer is None:
+        if not setup_pool():
+            logger.error("Failed to setup database pools")
+            return None
+    return db_pool_timer if is_timer else db_pool
+
+def _execute_query_once(pool, query, params, commit, is_select_query, columns=None):
+    """
+    Runs a single query attempt on a pooled connection.
+    Raises mysql.connector.Error so callers can decide whether to retry.
+    With columns set, a SELECT result is returned as {column name: np.ndarray}.
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = pool.get_connection()
+        query_start = time.perf_counter()
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        
+        if commit:
+            connection.commit()
+        
+        # For SELECT queries, always fetch results
+        if is_select_query and columns:
+            result = fetch_columns(cursor, columns)
+        elif is_select_query:
+            result = cursor.fetchall()
+            # Debug info to help diagnose
+            if not result:
+                logger.debug(f"SELECT query returned no rows: {query[:100]}")
+        else:
+            # For non-SELECT queries, return success indicator
+            result = True
+            if cursor.rowcount > 0:
+                logger.debug(f"Non-SELECT query affected {cursor.rowcount} rows")
+        
+        pool_metrics.record_query(query, time.perf_counter() - query_start)
+        return result
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except:
+                pass
+        if connection:
+            try:
+                connection.close()
+            except:
+                pass
+
+# Passed as execute_query(failure_result=QUERY_FAILED) to tell a failed SELECT from one with no rows
+QUERY_FAILED = object()
+
+def _empty_result(is_select_query, columns=None):
+    """Failure/empty value for a query: [] (or empty columns) for SELECT, None otherwise."""
+    if not is_select_query:
+        return None
+    return empty_columns(columns) if columns else []
+
+def execute_query(query, params=None, is_timer=False, retry_attempts=3, commit=False, columns=None, failure_result=None):
     """
     Executes a database query using the appropriate connection pool with retry logic.
+    This blocks the calling thread - async code should use execute_query_async().
     Args:
         query (str): SQL query to execute
         params (tuple, optional): Parameters for the query
         is_timer (bool): Whether to use the timer pool (default: False)
         retry_attempts (int): Number of retry attempts for failed queries (default: 3)
         commit (bool): Whether to commit the transaction (default: False)
+        columns (dict, optional): {column name: dtype} in SELECT order to fetch a SELECT in
+            columnar mode, e.g. {'timer_value': 'float32', 'click_time': EPOCH} (see database.columnar)
+        failure_result (optional): Returned instead of the empty result if the query fails (e.g. QUERY_FAILED)
     Returns:
-        list/bool: Query results if SELECT, True if successful INSERT/UPDATE/DELETE, None if failed
+        list/dict/bool: Query results if SELECT ({column name: np.ndarray} in columnar mode),
+            True if successful INSERT/UPDATE/DELETE, None if failed
     """
-    global db_pool, db_pool_timer
-    
     # Determine if this is a SELECT query
     is_select_query = query.strip().upper().startswith("SELECT")
     
-    # Ensure pools are set up
-    if db_pool is None or db_pool_timer is None:
-        if not setup_pool():
-            logger.error("Failed to setup database pools")
-            return [] if is_select_query else None
+    pool = _get_query_pool(is_timer)
+    if pool is None:
+        return failure_result if failure_result is not None else _empty_result(is_select_query, columns)
     
-    pool = db_pool_timer if is_timer else db_pool
     last_error = None
     
     for attempt in range(retry_attempts):
-        connection = None
-        cursor = None
         try:
-            connection = pool.get_connection()
-            cursor = connection.cursor()
-            cursor.execute(query, params)
-            
-            if commit:
-                connection.commit()
-            
-            # For SELECT queries, always fetch results
-            if is_select_query:
-                result = cursor.fetchall()
-                # Debug info to help diagnose
-                if not result:
-                    logger.debug(f"SELECT query returned no rows: {query[:100]}")
-            else:
-                # For non-SELECT queries, return success indicator
-                result = True
-                if cursor.rowcount > 0:
-                    logger.debug(f"Non-SELECT query affected {cursor.rowcount} rows")
-            
-            return result
-            
+            return _execute_query_once(pool, query, params, commit, is_select_query, columns)
         except mysql.connector.Error as error:
             last_error = error
             logger.warning(
@@ -363,31 +403,703 @@ def execute_query(query, params=None, is_timer=False, retry_attempts=3, commit=F
                 f"Query: {query[:100]}, Params: {params}"
             )
             if attempt < retry_attempts - 1:  # Don't sleep on last attempt
+                pool_metrics.record_retry(query)
                 time.sleep(min(2 ** attempt, 10))  # Exponential backoff
         except Exception as e:
             logger.error(f"Unexpected error executing query: {e}")
             logger.error(traceback.format_exc())
             raise
-        finally:
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-            if connection:
-                try:
-                    connection.close()
-                except:
-                    pass
     
     # If we get here, all attempts failed
+    pool_metrics.record_failure(query)
     logger.error(
         f"Query failed after {retry_attempts} attempts. Last error: {last_error}\n"
         f"Query: {query[:100]}, Params: {params}"
     )
     
     # Return appropriate failure value based on query type
-    return [] if is_select_query else None
+    if failure_result is not None:
+        return failure_result
+    return _empty_result(is_select_query, columns)
+
+def get_pool_metrics():
+    """
+    Get connection pool and query instrumentation.
+    Returns:
+        dict: Snapshot of pool utilisation, checkout waits, per-query latency and retries (see PoolMetrics.snapshot)
+    """
+    return pool_metrics.snapshot()
+
+def _get_db_executor():
+    """
+    Gets the thread pool used to run blocking database work off the event loop.
+    Sized to the combined connection pools so every worker can hold a connection.
+    """
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=MAIN_POOL_SIZE + TIMER_POOL_SIZE + STREAM_POOL_SIZE,
+            thread_name_prefix="button_db"
+        )
+    return _db_executor
+
+def _get_db_semaphore(is_timer=False):
+    """
+    Gets the semaphore bounding concurrent async queries for a pool.
+    MySQLConnectionPool raises instead of waiting when exhausted, so callers
+    queue here (without blocking the event loop) until a connection is free.
+    """
+    name = "timer" if is_timer else "main"
+    if name not in _db_semaphores:
+        _db_semaphores[name] = asyncio.Semaphore(TIMER_POOL_SIZE if is_timer else MAIN_POOL_SIZE)
+    return _db_semaphores[name]
+
+async def run_db_call(func, *args, is_timer=False, **kwargs):
+    """
+    Runs a blocking database helper in the database thread pool.
+    Args:
+        func (callable): Synchronous function that talks to the database
+        is_timer (bool): Whether the work should count against the timer pool (default: False)
+    Returns:
+        Whatever func returns
+    """
+    loop = asyncio.get_running_loop()
+    queue_start = time.perf_counter()
+    async with _get_db_semaphore(is_timer):
+        pool_metrics.record_queue_wait("timer" if is_timer else "main", time.perf_counter() - queue_start)
+        return await loop.run_in_executor(_get_db_executor(), functools.partial(func, *args, **kwargs))
+
+async def execute_query_async(query, params=None, is_timer=False, retry_attempts=3, commit=False, columns=None, failure_result=None):
+    """
+    Async version of execute_query(). The query runs in the database thread pool,
+    concurrency is bounded by the pool size and retries back off with asyncio.sleep,
+    so a slow query or a MySQL hiccup never stalls the event loop.
+    Args:
+        query (str): SQL query to execute
+        params (tuple, optional): Parameters for the query
+        is_timer (bool): Whether to use the timer pool (default: False)
+        retry_attempts (int): Number of retry attempts for failed queries (default: 3)
+        commit (bool): Whether to commit the transaction (default: False)
+        columns (dict, optional): {column name: dtype} to fetch a SELECT in columnar mode
+        failure_result (optional): Returned instead of the empty result if the query fails (e.g. QUERY_FAILED)
+    Returns:
+        list/dict/bool: Query results if SELECT ({column name: np.ndarray} in columnar mode),
+            True if successful INSERT/UPDATE/DELETE, None if failed
+    """
+    is_select_query = query.strip().upper().startswith("SELECT")
+    
+    pool = db_pool_timer if is_timer else db_pool
+    if pool is None:
+        pool = await run_db_call(_get_query_pool, is_timer)
+        if pool is None:
+            return failure_result if failure_result is not None else _empty_result(is_select_query, columns)
+    
+    last_error = None
+    
+    for attempt in range(retry_attempts):
+        try:
+            return await run_db_call(_execute_query_once, pool, query, params, commit, is_select_query, columns, is_timer=is_timer)
+        except mysql.connector.Error as error:
+            last_error = error
+            logger.warning(
+                f"Database error (attempt {attempt + 1}/{retry_attempts}): {error}\n"
+                f"Query: {query[:100]}, Params: {params}"
+            )
+            if attempt < retry_attempts - 1:  # Don't sleep on last attempt
+                pool_metrics.record_retry(query)
+                await asyncio.sleep(min(2 ** attempt, 10))  # Exponential backoff
+        except Exception as e:
+            logger.error(f"Unexpected error executing query: {e}")
+            logger.error(traceback.format_exc())
+            raise
+    
+    logger.error(
+        f"Query failed after {retry_attempts} attempts. Last error: {last_error}\n"
+        f"Query: {query[:100]}, Params: {params}"
+    )
+    pool_metrics.record_failure(query)
+    
+    if failure_result is not None:
+        return failure_result
+    return _empty_result(is_select_query, columns)
+
+def _get_stream_pool():
+    """Returns the stream pool, setting it up on first use."""
+    if db_pool_stream is None:
+        if not setup_pool(pools=("stream",)):
+            logger.error("Failed to setup stream connection pool")
+            return None
+    return db_pool_stream
+
+def _open_stream(query, params):
+    """
+    Runs query on an unbuffered cursor from the stream pool.
+    Rows stay on the server until fetched, so memory is bounded by the fetch size.
+    Returns:
+        tuple: (connection, cursor), or None if the stream pool is unavailable
+    """
+    pool = _get_stream_pool()
+    if pool is None:
+        return None
+    connection = pool.get_connection()
+    try:
+        cursor = connection.cursor(buffered=False)
+        cursor.execute(query, params)
+        return connection, cursor
+    except Exception:
+        connection.close()
+        raise
+
+def _close_stream(connection, cursor):
+    """Drains any unread rows (required before an unbuffered connection can be reused) and closes."""
+    try:
+        if connection.unread_result:
+            connection.consume_results()
+    except Exception as e:
+        logger.debug(f"Error draining stream: {e}")
+    try:
+        cursor.close()
+    except:
+        pass
+    try:
+        connection.close()
+    except:
+        pass
+
+def _get_stream_semaphore():
+    if "stream" not in _db_semaphores:
+        _db_semaphores["stream"] = asyncio.Semaphore(STREAM_POOL_SIZE)
+    return _db_semaphores["stream"]
+
+async def stream_query(query, params=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Async generator over a large SELECT, yielding lists of up to chunk_size rows.
+    Backed by an unbuffered cursor on the dedicated stream pool, so only one chunk
+    is held in memory at a time and long reads never take connections from the click path.
+    Consume promptly: the connection is held until the generator finishes or is closed,
+    and MySQL drops unbuffered reads that stall longer than net_write_timeout.
+    Args:
+        query (str): SELECT query to execute
+        params (tuple, optional): Parameters for the query
+        chunk_size (int): Rows per chunk (default: STREAM_CHUNK_SIZE)
+    Yields:
+        list: Row tuples
+    Raises:
+        mysql.connector.Error: If the query fails (rows already yielded are not retried)
+    """
+    loop = asyncio.get_running_loop()
+    executor = _get_db_executor()
+    queue_start = time.perf_counter()
+    async with _get_stream_semaphore():
+        pool_metrics.record_queue_wait("stream", time.perf_counter() - queue_start)
+        stream_start = time.perf_counter()
+        opened = await loop.run_in_executor(executor, _open_stream, query, params)
+        if opened is None:
+            return
+        connection, cursor = opened
+        try:
+            while True:
+                rows = await loop.run_in_executor(executor, cursor.fetchmany, chunk_size)
+                if not rows:
+                    break
+                yield rows
+        except mysql.connector.Error as error:
+            logger.error(f"Streaming query failed: {error}\nQuery: {query[:100]}, Params: {params}")
+            pool_metrics.record_failure(query)
+            raise
+        finally:
+            await loop.run_in_executor(executor, _close_stream, connection, cursor)
+            pool_metrics.record_query(query, time.perf_counter() - stream_start)
+
+async def stream_rows(query, params=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Async generator yielding rows one at a time from stream_query().
+    Args:
+        query (str): SELECT query to execute
+        params (tuple, optional): Parameters for the query
+        chunk_size (int): Rows fetched from the server per round trip (default: STREAM_CHUNK_SIZE)
+    Yields:
+        tuple: One row
+    """
+    async for chunk in stream_query(query, params, chunk_size):
+        for row in chunk:
+            yield row
+
+def _build_batch_insert(table, columns, row_count, update_columns=None, ignore=False):
+    """
+    Builds a multi-row INSERT for row_count rows.
+    update_columns turns it into an upsert: a list of column names copied from VALUES(),
+    or a dict of {column: SQL expression} for custom updates (e.g. counters).
+    """
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    query = (
+        f"INSERT {'IGNORE ' if ignore else ''}INTO {table} ({', '.join(columns)}) "
+        f"VALUES {', '.join([placeholders] * row_count)}"
+    )
+    if update_columns:
+        if isinstance(update_columns, dict):
+            updates = [f"{column} = {expression}" for column, expression in update_columns.items()]
+        else:
+            updates = [f"{column} = VALUES({column})" for column in update_columns]
+        query += " ON DUPLICATE KEY UPDATE " + ", ".join(updates)
+    return query
+
+def _chunk_rows(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(tuple(row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _execute_batch_write_once(pool, writes):
+    """
+    Writes every chunk of every write on one connection in a single transaction.
+    writes is a list of (table, columns, chunks, update_columns, ignore).
+    Returns per-chunk stats; raises mysql.connector.Error after rolling back.
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = pool.get_connection()
+        connection.start_transaction()
+        cursor = connection.cursor()
+        chunk_stats = []
+        for table, columns, chunks, update_columns, ignore in writes:
+            for chunk in chunks:
+                chunk_start = time.perf_counter()
+                query = _build_batch_insert(table, columns, len(chunk), update_columns, ignore)
+                cursor.execute(query, [value for row in chunk for value in row])
+                pool_metrics.record_query(query, time.perf_counter() - chunk_start)
+                chunk_stats.append({
+                    'table': table,
+                    'rows': len(chunk),
+                    'affected': cursor.rowcount,
+                    'seconds': time.perf_counter() - chunk_start
+                })
+        connection.commit()
+        return chunk_stats
+    except Exception:
+        if connection:
+            try:
+                connection.rollback()
+            except:
+                pass
+        raise
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except:
+                pass
+        if connection:
+            try:
+                connection.close()
+            except:
+                pass
+
+def execute_batch_transaction(writes, chunk_size=BATCH_CHUNK_SIZE, is_timer=False, retry_attempts=3):
+    """
+    Runs several batched INSERT/UPSERTs (possibly on different tables) in a single transaction.
+    Either every row of every write is committed, or none is.
+    Args:
+        writes (list): Dicts with 'table', 'columns', 'rows' and optional 'update_columns' / 'ignore'
+            (same meaning as the execute_batch_write() arguments)
+        chunk_size (int): Rows per INSERT statement (default: BATCH_CHUNK_SIZE)
+        is_timer (bool): Whether to use the timer pool (default: False)
+        retry_attempts (int): Number of attempts for the whole transaction (default: 3)
+    Returns:
+        dict: {'rows': int, 'chunks': [{'table', 'rows', 'affected', 'seconds'}, ...]} if successful, None if failed
+    """
+    prepared = []
+    for write in writes:
+        chunks = list(_chunk_rows(write['rows'], max(1, int(chunk_size))))
+        if chunks:
+            prepared.append((write['table'], write['columns'], chunks, write.get('update_columns'), write.get('ignore', False)))
+    if not prepared:
+        return {'rows': 0, 'chunks': []}
+
+    pool = _get_query_pool(is_timer)
+    if pool is None:
+        return None
+
+    tables = ", ".join(table for table, _, _, _, _ in prepared)
+    total_rows = sum(len(chunk) for _, _, chunks, _, _ in prepared for chunk in chunks)
+    last_error = None
+    for attempt in range(retry_attempts):
+        try:
+            chunk_stats = _execute_batch_write_once(pool, prepared)
+            latencies = ", ".join(f"{stat['seconds'] * 1000:.1f}ms" for stat in chunk_stats)
+            logger.info(f"Batch write to {tables}: {total_rows} rows in {len(chunk_stats)} chunks ({latencies})")
+            return {'rows': total_rows, 'chunks': chunk_stats}
+        except mysql.connector.Error as error:
+            last_error = error
+            logger.warning(
+                f"Batch write error (attempt {attempt + 1}/{retry_attempts}): {error}\n"
+                f"Tables: {tables}, Rows: {total_rows}"
+            )
+            if attempt < retry_attempts - 1:
+                pool_metrics.record_retry(f"BATCH WRITE {tables}")
+                time.sleep(min(2 ** attempt, 10))
+        except Exception as e:
+            logger.error(f"Unexpected error in batch write to {tables}: {e}")
+            logger.error(traceback.format_exc())
+            raise
+
+    pool_metrics.record_failure(f"BATCH WRITE {tables}")
+    logger.error(f"Batch write to {tables} failed after {retry_attempts} attempts. Last error: {last_error}")
+    return None
+
+def execute_batch_write(table, columns, rows, update_columns=None, ignore=False, chunk_size=BATCH_CHUNK_SIZE, is_timer=False, retry_attempts=3):
+    """
+    Writes many rows with one multi-row INSERT/UPSERT per chunk, all chunks in a single transaction.
+    Args:
+        table (str): Table to write to
+        columns (list): Column names, in the order values appear in each row
+        rows (iterable): Row tuples/lists
+        update_columns (list/dict, optional): Makes it an upsert - columns to take from VALUES(),
+            or {column: SQL expression} for custom ON DUPLICATE KEY UPDATE clauses
+        ignore (bool): Use INSERT IGNORE (default: False)
+        chunk_size (int): Rows per INSERT statement (default: BATCH_CHUNK_SIZE)
+        is_timer (bool): Whether to use the timer pool (default: False)
+        retry_attempts (int): Number of attempts for the whole transaction (default: 3)
+    Returns:
+        dict: {'rows': int, 'chunks': [{'table', 'rows', 'affected', 'seconds'}, ...]} if successful, None if failed
+    """
+    return execute_batch_transaction(
+        [{'table': table, 'columns': columns, 'rows': rows, 'update_columns': update_columns, 'ignore': ignore}],
+        chunk_size, is_timer, retry_attempts
+    )
+
+async def execute_batch_write_async(table, columns, rows, update_columns=None, ignore=False, chunk_size=BATCH_CHUNK_SIZE, is_timer=False, retry_attempts=3):
+    """Async version of execute_batch_write(), run in the database thread pool."""
+    # Materialise the rows here so generators are not consumed from another thread
+    rows = [tuple(row) for row in rows]
+    # Passed positionally: run_db_call() consumes is_timer itself to pick the pool semaphore
+    return await run_db_call(
+        execute_batch_write, table, columns, rows,
+        update_columns, ignore, chunk_size, is_timer, retry_attempts,
+        is_timer=is_timer
+    )
+
+def _get_timer_durations(game_ids):
+    """
+    Resolve timer_duration for each game, from the session registry where possible.
+    Returns:
+        dict: {game_id: timer_duration}
+    """
+    timer_durations = {}
+    missing = []
+    for game_id in set(int(game_id) for game_id in game_ids):
+        session = session_registry.get_by_game_id(game_id)
+        if session:
+            timer_durations[game_id] = session['timer_duration']
+        else:
+            missing.append(game_id)
+    if missing:
+        query = f"SELECT id, timer_duration FROM game_sessions WHERE id IN ({', '.join(['%s'] * len(missing))})"
+        result = execute_query(query, tuple(missing))
+        for game_id, timer_duration in result or []:
+            timer_durations[int(game_id)] = timer_duration
+    return timer_durations
+
+def record_clicks(clicks, retry_attempts=3):
+    """
+    Inserts clicks into button_clicks and folds them into the game_player_stats rollup
+    in the same transaction, so the rollup never drifts from the click log.
+    Args:
+        clicks (list): (game_id, user_id, click_time, timer_value) tuples, oldest first
+        retry_attempts (int): Number of attempts for the whole transaction (default: 3)
+    Returns:
+        dict: Batch write stats (see execute_batch_transaction) if successful, None if failed
+    """
+    clicks = [tuple(click) for click in clicks]
+    if not clicks:
+        return {'rows': 0, 'chunks': []}
+    timer_durations = _get_timer_durations(click[0] for click in clicks)
+    return execute_batch_transaction([
+        {'table': 'button_clicks', 'columns': CLICK_COLUMNS, 'rows': clicks},
+        {'table': 'game_player_stats', 'columns': PLAYER_STATS_COLUMNS,
+         'rows': build_player_stats_rows(clicks, timer_durations), 'update_columns': PLAYER_STATS_UPDATE},
+    ], retry_attempts=retry_attempts)
+
+async def record_clicks_async(clicks, retry_attempts=3):
+    """Async version of record_clicks(), run in the database thread pool."""
+    clicks = [tuple(click) for click in clicks]
+    return await run_db_call(record_clicks, clicks, retry_attempts)
+
+QUEUED_CLICK_COLUMNS = CLICK_COLUMNS + ['click_key']
+
+# A user's click count across games, recomputed from the game_player_stats rollup: setting
+# users.total_clicks to it (rather than adding to it) is idempotent under redelivery
+USER_TOTAL_CLICKS = '(SELECT COALESCE(SUM(gps.clicks), 0) FROM game_player_stats gps WHERE gps.user_id = users.user_id)'
+
+def _record_queued_clicks_once(pool, clicks, timer_durations):
+    """
+    Inserts the clicks whose click_key is not in button_clicks yet, plus their rollup and
+    the clicking users' recomputed total_clicks, in one transaction. Raises mysql.connector.Error after rolling back - including the
+    duplicate-key error if another worker commits the same key concurrently, so the retry
+    sees that row and skips it.
+    Returns:
+        tuple: (click_keys inserted, duplicates skipped)
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = pool.get_connection()
+        transaction_start = time.perf_counter()
+        connection.start_transaction()
+        cursor = connection.cursor()
+        keys = [click[4] for click in clicks]
+        cursor.execute(
+            f"SELECT click_key FROM button_clicks WHERE click_key IN ({', '.join(['%s'] * len(keys))})",
+            keys
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        new_clicks = [click for click in clicks if click[4] not in existing]
+        for chunk in _chunk_rows(new_clicks, BATCH_CHUNK_SIZE):
+            cursor.execute(
+                _build_batch_insert('button_clicks', QUEUED_CLICK_COLUMNS, len(chunk)),
+                [value for row in chunk for value in row]
+            )
+        if new_clicks:
+            stats_rows = build_player_stats_rows([click[:4] for click in new_clicks], timer_durations)
+            cursor.execute(
+                _build_batch_insert('game_player_stats', PLAYER_STATS_COLUMNS, len(stats_rows), PLAYER_STATS_UPDATE),
+                [value for row in stats_rows for value in row]
+            )
+            user_ids = sorted({click[1] for click in new_clicks})
+            cursor.execute(
+                f"UPDATE users SET total_clicks = {USER_TOTAL_CLICKS} WHERE user_id IN ({', '.join(['%s'] * len(user_ids))})",
+                user_ids
+            )
+        connection.commit()
+        pool_metrics.record_query("TRANSACTION record_queued_clicks", time.perf_counter() - transaction_start)
+        return [click[4] for click in new_clicks], len(clicks) - len(new_clicks)
+    except Exception:
+        if connection:
+            try:
+                connection.rollback()
+            except:
+                pass
+        raise
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except:
+                pass
+        if connection:
+            try:
+                connection.close()
+            except:
+                pass
+
+def record_queued_clicks(clicks, retry_attempts=3):
+    """
+    Idempotent version of record_clicks() for clicks delivered by the Redis click queue.
+    Each click carries a unique click_key (its stream entry ID or spool key); clicks already
+    in button_clicks are skipped, and so is their rollup, so a redelivered or reclaimed
+    entry never double counts.
+    Args:
+        clicks (list): (game_id, user_id, click_time, timer_value, click_key) tuples, oldest first
+        retry_attempts (int): Number of attempts for the whole transaction (default: 3)
+    Returns:
+        dict: {'rows': inserted, 'duplicates': skipped, 'inserted': click_keys inserted} if successful, None if failed
+    """
+    clicks = [tuple(click) for click in clicks]
+    if not clicks:
+        return {'rows': 0, 'duplicates': 0, 'inserted': []}
+    pool = _get_query_pool()
+    if pool is None:
+        return None
+    timer_durations = _get_timer_durations(click[0] for click in clicks)
+
+    last_error = None
+    for attempt in range(retry_attempts):
+        try:
+            inserted, duplicates = _record_queued_clicks_once(pool, clicks, timer_durations)
+            if duplicates:
+                logger.info(f"Skipped {duplicates} already recorded queued clicks")
+            return {'rows': len(inserted), 'duplicates': duplicates, 'inserted': inserted}
+        except mysql.connector.Error as error:
+            last_error = error
+            logger.warning(f"Queued click write error (attempt {attempt + 1}/{retry_attempts}): {error}\nRows: {len(clicks)}")
+            if attempt < retry_attempts - 1:
+                pool_metrics.record_retry("TRANSACTION record_queued_clicks")
+                time.sleep(min(2 ** attempt, 10))
+        except Exception as e:
+            logger.error(f"Unexpected error writing queued clicks: {e}")
+            logger.error(traceback.format_exc())
+            raise
+
+    pool_metrics.record_failure("TRANSACTION record_queued_clicks")
+    logger.error(f"Queued click write failed after {retry_attempts} attempts. Last error: {last_error}")
+    return None
+
+async def record_queued_clicks_async(clicks, retry_attempts=3):
+    """Async version of record_queued_clicks(), run in the database thread pool."""
+    clicks = [tuple(click) for click in clicks]
+    return await run_db_call(record_queued_clicks, clicks, retry_attempts)
+
+# Upsert applied to the clicking user's row on every accepted click
+USER_CLICK_UPSERT = '''
+    INSERT INTO users (user_id, cooldown_expiration, color_rank, total_clicks, lowest_click_time, last_click_time, user_name, game_session)
+    VALUES (%s, %s, %s, 1, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        cooldown_expiration = VALUES(cooldown_expiration),
+        color_rank = VALUES(color_rank),
+        total_clicks = total_clicks + 1,
+        lowest_click_time = LEAST(lowest_click_time, VALUES(lowest_click_time)),
+        last_click_time = VALUES(last_click_time)
+'''
+
+# Coalesced user updates from the user_update_queue stream (see redis_lib.user_update_worker):
+# each row stands for total_clicks clicks, and may arrive after a newer one for the same user.
+# Stream delivery is at least once, so an existing user's total_clicks is recomputed from the
+# rollup instead of incremented; record_queued_clicks() refreshes it again once the clicks sync.
+USER_UPDATE_COLUMNS = ['user_id', 'cooldown_expiration', 'color_rank', 'total_clicks', 'lowest_click_time',
+                       'last_click_time', 'user_name', 'game_session']
+_NEWER_CLICK = 'last_click_time IS NULL OR VALUES(last_click_time) >= last_click_time'
+USER_UPDATE_BATCH = {
+    'cooldown_expiration': f'IF({_NEWER_CLICK}, VALUES(cooldown_expiration), cooldown_expiration)',
+    'color_rank': f'IF({_NEWER_CLICK}, VALUES(color_rank), color_rank)',
+    'total_clicks': USER_TOTAL_CLICKS,
+    'lowest_click_time': 'LEAST(COALESCE(lowest_click_time, VALUES(lowest_click_time)), VALUES(lowest_click_time))',
+    # Last, so the conditions above still compare against the stored value
+    'last_click_time': 'GREATEST(COALESCE(last_click_time, VALUES(last_click_time)), VALUES(last_click_time))',
+}
+
+async def record_user_updates_async(rows, retry_attempts=3):
+    """
+    Upserts coalesced user updates in one transaction.
+    Args:
+        rows (list): Tuples in USER_UPDATE_COLUMNS order, at most one per user
+        retry_attempts (int): Number of attempts for the whole transaction (default: 3)
+    Returns:
+        dict: Batch write stats (see execute_batch_transaction) if successful, None if failed
+    """
+    return await execute_batch_write_async('users', USER_UPDATE_COLUMNS, rows, USER_UPDATE_BATCH,
+                                           retry_attempts=retry_attempts)
+
+CLICK_AGGREGATES_SELECT = '''
+    SELECT u.total_clicks, u.lowest_click_time, u.color_rank, gps.clicks, gps.best_timer
+    FROM users u
+    LEFT JOIN game_player_stats gps ON gps.user_id = u.user_id AND gps.game_id = %s
+    WHERE u.user_id = %s
+'''
+
+def _commit_click_once(pool, user_params, click, stats_rows, game_id, user_id):
+    """
+    Runs the click transaction on one connection: user upsert, optional click insert
+    and rollup upsert, then the aggregates read back before commit.
+    Raises mysql.connector.Error after rolling back.
+    """
+    connection = None
+    cursor = None
+    try:
+        connection = pool.get_connection()
+        transaction_start = time.perf_counter()
+        connection.start_transaction()
+        cursor = connection.cursor()
+        cursor.execute(USER_CLICK_UPSERT, user_params)
+        if click:
+            cursor.execute(_build_batch_insert('button_clicks', CLICK_COLUMNS, 1), click)
+            cursor.execute(
+                _build_batch_insert('game_player_stats', PLAYER_STATS_COLUMNS, len(stats_rows), PLAYER_STATS_UPDATE),
+                [value for row in stats_rows for value in row]
+            )
+        cursor.execute(CLICK_AGGREGATES_SELECT, (game_id, user_id))
+        row = cursor.fetchone()
+        connection.commit()
+        pool_metrics.record_query("TRANSACTION commit_click", time.perf_counter() - transaction_start)
+        return row
+    except Exception:
+        if connection:
+            try:
+                connection.rollback()
+            except:
+                pass
+        raise
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except:
+                pass
+        if connection:
+            try:
+                connection.close()
+            except:
+                pass
+
+def commit_click(game_id, user_id, user_name, click_time, timer_value, cooldown_expiration, color_rank, record_click=True, retry_attempts=3):
+    """
+    Commits an accepted click in a single transaction on one connection: the user upsert,
+    the button_clicks row and its game_player_stats rollup, and returns the user's updated aggregates
+    so the click path needs no follow-up stats query.
+    Args:
+        game_id (int): Game session ID
+        user_id (int): Discord user ID
+        user_name (str): Display name
+        click_time (datetime): Time of the click
+        timer_value (float): Timer value when clicked
+        cooldown_expiration (datetime): When the user's cooldown ends
+        color_rank (str): Color earned by the click
+        record_click (bool): Also insert the click row. False when the click is persisted
+            elsewhere (e.g. the Redis click queue); the aggregates then still count it (default: True)
+        retry_attempts (int): Number of attempts for the whole transaction (default: 3)
+    Returns:
+        dict: {'total_clicks', 'lowest_click_time', 'color_rank', 'game_clicks', 'game_best_timer'} if successful, None if failed
+    """
+    pool = _get_query_pool()
+    if pool is None:
+        return None
+
+    game_id, user_id = int(game_id), int(user_id)
+    user_params = (user_id, cooldown_expiration, color_rank, timer_value, click_time, user_name, game_id)
+    click = None
+    stats_rows = None
+    if record_click:
+        click = (game_id, user_id, click_time, timer_value)
+        stats_rows = build_player_stats_rows([click], _get_timer_durations([game_id]))
+
+    last_error = None
+    for attempt in range(retry_attempts):
+        try:
+            row = _commit_click_once(pool, user_params, click, stats_rows, game_id, user_id)
+            break
+        except mysql.connector.Error as error:
+            last_error = error
+            logger.warning(f"Click commit error (attempt {attempt + 1}/{retry_attempts}): {error}\nGame: {game_id}, User: {user_id}")
+            if attempt < retry_attempts - 1:
+                pool_metrics.record_retry("TRANSACTION commit_click")
+                time.sleep(min(2 ** attempt, 10))
+        except Exception as e:
+            logger.error(f"Unexpected error committing click: {e}")
+            logger.error(traceback.format_exc())
+            raise
+    else:
+        pool_metrics.record_failure("TRANSACTION commit_click")
+        logger.error(f"Click commit failed after {retry_attempts} attempts. Last error: {last_error}")
+        return None
+
+    total_clicks, lowest_click_time, committed_color_rank, game_clicks, game_best_timer = row
+    game_clicks = int(game_clicks or 0)
+    if not record_click:
+        # The click is still in flight to button_clicks, count it here
+        timer_value = int(round(float(timer_value)))
+        game_clicks += 1
+        game_best_timer = timer_value if game_best_timer is None else min(game_best_timer, timer_value)
+    return {
+        'total_clicks': total_clicks,
+        'lowest_click_time': lowest_click_time,
+        'color_rank': committed_color_rank,
+        'game_clicks': game_clicks,
+        'game_best_timer': game_best_timer
+    }
 
 def check_button_clicks(game_id):
     """
@@ -428,7 +1140,7 @@ def close_disconnect_database():
     Closes and disconnects all database connections, cursors, and resets pool references.
     Handles each connection component separately to ensure proper cleanup.
     """
-    global db_pool, db_pool_timer, db, cursor, timer_db, cursor_tb
+    global db_pool, db_pool_timer, db_pool_stream, db, cursor, timer_db, cursor_tb, _db_executor, _initialized
 
     try:
         # Close the cursor if it exists
@@ -473,6 +1185,10 @@ def close_disconnect_database():
             logger.info("Resetting timer connection pool reference.")
             db_pool_timer = None
 
+        if db_pool_stream:
+            logger.info("Resetting stream connection pool reference.")
+            db_pool_stream = None
+
     except Exception as e:
         logger.error(f"Error during database cleanup: {e}")
         logger.error(traceback.format_exc())
@@ -484,84 +1200,51 @@ def close_disconnect_database():
         cursor_tb = None
         db_pool = None
         db_pool_timer = None
+        db_pool_stream = None
+        _initialized = False
+        if _db_executor is not None:
+            _db_executor.shutdown(wait=False)
+            _db_executor = None
 
-# # Global variables for game sessions as a dictionary
-game_sessions_as_dict = {}
-
+SESSION_SELECT = f"SELECT {', '.join(SESSION_COLUMNS)} FROM game_sessions"
 
-async def game_sessions_dict(game_sessions_arg=None):
-    """Convert game sessions into a dictionary format with intelligent caching"""
-    global _sessions_dict_cache, _last_dict_update, _sessions_dict_lock
-    async with _sessions_dict_lock:
-        now = datetime.datetime.now(timezone.utc)
-        # Return cached result if fresh (within 5 seconds)
-        if (_sessions_dict_cache and _last_dict_update and 
-            (now - _last_dict_update).total_seconds() < 5):
-            return _sessions_dict_cache.copy()
-        output = {}
-        sessions_to_process = game_sessions_arg or update_local_game_sessions()
-        # Handle case where sessions_to_process is boolean or None
-        if not isinstance(sessions_to_process, list):
-            logger.warning(f"Invalid sessions_to_process type: {type(sessions_to_process)}")
-            return output
-        if not sessions_to_process:
-            logger.warning("No game sessions to process")
-            return output
-        for game in sessions_to_process:
-            if game[6] is not None:  # Skip ended games
-                continue
-            try:
-                game_id = str(game[0])
-                formatted_output = {
-                    "game_id": int(game[0]),
-                    "admin_role_id": int(game[1]) if game[1] else 0,
-                    "guild_id": int(game[2]),
-                    "button_channel_id": int(game[3]),
-                    "game_chat_channel_id": int(game[4]),
-                    "start_time": game[5],
-                    "end_time": game[6],
-                    "timer_duration": int(game[7]),
-                    "cooldown_duration": int(game[8])
-                }
-                output[game_id] = formatted_output
-                output[int(game_id)] = formatted_output
-            except (ValueError, TypeError) as e:
-                logger.error(f'Error formatting game session {game[0]}: {e}')
-                continue
-        # Update cache
-        _sessions_dict_cache = output.copy()
-        _last_dict_update = now
-        return output
+def _load_session_registry(rows):
+    """
+    Format raw game_sessions rows and load them into the session registry.
+    Args:
+        rows (list): Rows selected with SESSION_SELECT
+    """
+    sessions = []
+    for game in rows:
+        try:
+            sessions.append(session_from_row(game))
+        except (ValueError, TypeError) as e:
+            logger.error(f'Error formatting game session {game[0]}: {e}')
+    session_registry.load(sessions)
 
 def update_local_game_sessions():
     """
-    Updates the local cache of game sessions from the database.
-    Only returns active (non-ended) sessions.
+    Updates the local cache of game sessions from the database and reloads the session registry.
+    Only returns active (non-ended) sessions. If the query fails the registry and the
+    local list are left as they were.
     Returns:
         list: Updated list of game sessions
     """
     #logger.info('Updating local game sessions')
-    query = """
-        SELECT 
-            id,
-            admin_role_id,
-            guild_id,
-            button_channel_id,
-            game_chat_channel_id,
-            start_time,
-            end_time,
-            timer_duration,
-            cooldown_duration
-        FROM game_sessions
+    query = SESSION_SELECT + """
         WHERE end_time IS NULL
         ORDER BY start_time DESC
     """
     try:
-        result = execute_query(query)
+        result = execute_query(query, failure_result=QUERY_FAILED)
         global game_sessions
+        if result is QUERY_FAILED:
+            logger.error('Failed to load active game sessions, keeping the current session registry')
+            return game_sessions
         if not result:
             logger.warning('No active game sessions found in database')
             game_sessions = []
+            session_registry.load([])
             return []
         # Handle case where result is boolean instead of a list
         if isinstance(result, bool):
@@ -569,6 +1252,7 @@ def update_local_game_sessions():
             game_sessions = []
             return []
         game_sessions = result
+        _load_session_registry(result)
         #logger.info(f'Game sessions updated: {len(game_sessions)}')
         return game_sessions
     except Exception as e:
@@ -577,45 +1261,28 @@ def update_local_game_sessions():
         return []
     
 async def get_game_session_by_id(game_id):
-    """Get a game session directly from database by ID, including ended games."""
+    """
+    Get a game session by ID, including ended games.
+    Active sessions are served from the session registry; ended ones are read from the database.
+    """
     try:
-        # Query the database directly, including ended games
-        query = """
-            SELECT 
-                id,
-                admin_role_id,
-                guild_id,
-                button_channel_id,
-                game_chat_channel_id,
-                start_time,
-                end_time,
-                timer_duration,
-                cooldown_duration
-            FROM game_sessions
-            WHERE id = %s
-        """
+        if not session_registry.loaded:
+            await run_db_call(update_local_game_sessions)
+        session = session_registry.get_by_game_id(game_id)
+        if session:
+            return session
+
+        # Not active (or unknown): query the database directly, including ended games
+        query = SESSION_SELECT + " WHERE id = %s"
         params = (game_id,)
-        result = execute_query(query, params)
+        result = await execute_query_async(query, params)
         
         if not result or len(result) == 0:
             logger.warning(f"Game with ID {game_id} not found in database")
             return None
             
         # Format results into dictionary
-        game = result[0]
-        formatted_output = {
-            "game_id": int(game[0]),
-            "admin_role_id": int(game[1]) if game[1] else 0,
-            "guild_id": int(game[2]),
-            "button_channel_id": int(game[3]),
-            "game_chat_channel_id": int(game[4]),
-            "start_time": game[5],
-            "end_time": game[6],
-            "timer_duration": int(game[7]),
-            "cooldown_duration": int(game[8])
-        }
-        
-        return formatted_output
+        return session_from_row(result[0])
         
     except Exception as e:
         logger.error(f'Error in get_game_session_by_id_direct for {game_id}: {e}')
@@ -623,36 +1290,36 @@ async def get_game_session_by_id(game_id):
         return None
 
 async def get_game_session_by_guild_id(guild_id):
-    """Get game session by guild ID with improved caching."""
-    # Check if we have a cached dictionary first
-    global _sessions_dict_cache
-    if _sessions_dict_cache:
-        # Look for a session with this guild ID
-        for game_id, session in _sessions_dict_cache.items():
-            if isinstance(session, dict) and session.get('guild_id') == guild_id:
-                return session
-    
-    # If not in cache, get all game sessions at once
-    global game_sessions
-    if not game_sessions:
-        game_sessions = update_local_game_sessions()
-    
-    # Look for the guild ID in the sessions
-    for game in game_sessions:
-        if game[2] == guild_id:  # guild_id is at index 2
-            # Get complete game session data
-            return await get_game_session_by_id(game[0])
-    
-    return None
+    """Get the active game session for a guild from the session registry."""
+    if not session_registry.loaded:
+        await run_db_call(update_local_game_sessions)
+    return session_registry.get_by_guild_id(guild_id)
+
+async def get_game_session_by_channel_id(channel_id):
+    """Get the active game session whose button or chat channel is channel_id."""
+    if not session_registry.loaded:
+        await run_db_call(update_local_game_sessions)
+    return session_registry.get_by_button_channel_id(channel_id) or session_registry.get_by_chat_channel_id(channel_id)
 
 def get_game_session_count():
     global game_sessions
     return len(game_sessions)
 
 def create_tables():
-    global db, cursor
-    if not cursor: db, cursor = get_current_new_cursor()
-        
+    """
+    Creates the base tables on a main pool connection, returned to the pool afterwards
+    so every connection stays available to the query semaphore.
+    """
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    try:
+        _create_tables(cursor)
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+
+def _create_tables(cursor):
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS game_sessions (
             id INT AUTO_INCREMENT PRIMARY KEY,
@@ -702,28 +1369,69 @@ def create_tables():
         )
     ''')
 
-    db.commit()
+def run_migrations():
+    """
+    Applies pending schema migrations, then EXPLAINs the registered hot queries
+    and logs any that still do a full table scan.
+    Returns:
+        bool: True if migrations applied cleanly, False otherwise
+    """
+    connection = None
+    try:
+        connection = get_db_connection()
+        apply_migrations(connection)
+        check_hot_query_plans(connection)
+        return True
+    except mysql.connector.Error as error:
+        logger.error(f"Error running database migrations: {error}")
+        return False
+    finally:
+        if connection:
+            try:
+                connection.close()
+            except:
+                pass
     
 # Function to create a game session in the database
 def create_game_session(admin_role_id, guild_id, button_channel_id, game_chat_channel_id, start_time, timer_duration, cooldown_duration):
-    global cursor, lock
+    """
+    Inserts a new game session and registers it in the session registry.
+    Returns:
+        int: The new game session ID, or None on failure
+    """
     query = """
         INSERT INTO game_sessions (admin_role_id, guild_id, button_channel_id, game_chat_channel_id, start_time, timer_duration, cooldown_duration)
         VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
     params = (admin_role_id, guild_id, button_channel_id, game_chat_channel_id, start_time, timer_duration, cooldown_duration)
-    game_session_id = execute_query(query, params, commit=True)
-    if not cursor:
-        db, cursor = get_current_new_cursor()
-    game_session_id = cursor.lastrowid
-
-    # If there is no game_session_id, retry until we get one or timeout
-    retry_count = 0
-    while not game_session_id and retry_count < 5:
-        time.sleep(1)  # Wait a bit before retrying
+    connection = None
+    cursor = None
+    try:
+        # lastrowid is per connection, so the insert runs on its own pooled connection
+        connection = get_db_connection()
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        connection.commit()
         game_session_id = cursor.lastrowid
-        retry_count += 1
-
+    except mysql.connector.Error as error:
+        logger.error(f'Error creating game session for guild {guild_id}: {error}')
+        return None
+    finally:
+        if cursor:
+            try:
+                cursor.close()
+            except:
+                pass
+        if connection:
+            try:
+                connection.close()
+            except:
+                pass
+
+    session_registry.register(session_from_row((
+        game_session_id, admin_role_id, guild_id, button_channel_id, game_chat_channel_id,
+        start_time, None, timer_duration, cooldown_duration, 0
+    )))
     return game_session_id
 
 # Function to get the game channels from the database
@@ -805,69 +1513,56 @@ def get_missing_users():
 async def fix_missing_users(bot):
     global lock
     try:
-        missing_user_ids = get_missing_users()
+        missing_user_ids = await run_db_call(get_missing_users)
         if not missing_user_ids:
             logger.info("No missing users found.")
             return
 
         logger.info(f"Found {len(missing_user_ids)} missing users. Fixing...")
 
-        for user_id in missing_user_ids:
+        # Click totals, lowest timer and latest click of every missing user in one grouped query
+        query = f'''
+            SELECT agg.user_id, agg.total_clicks, agg.lowest_click_time, bc.click_time, bc.timer_value, bc.game_id
+            FROM (
+                SELECT user_id, COUNT(*) AS total_clicks, MIN(timer_value) AS lowest_click_time, MAX(id) AS latest_id
+                FROM button_clicks
+                WHERE user_id IN ({', '.join(['%s'] * len(missing_user_ids))})
+                GROUP BY user_id
+            ) agg
+            JOIN button_clicks bc ON bc.id = agg.latest_id
+        '''
+        result = await execute_query_async(query, tuple(missing_user_ids))
+
+        user_rows = []
+        for user_id, total_clicks, lowest_click_time, last_click_time, latest_timer_value, game_id in result:
             try:
-                # Get the latest click data for the user
-                query = '''
-                    SELECT bc.user_id, bc.click_time, bc.timer_value, bc.game_id
-                    FROM button_clicks bc
-                    WHERE bc.user_id = %s
-                    ORDER BY bc.click_time DESC
-                    LIMIT 1
-                '''
-                params = (user_id,)
-                
-                result = execute_query(query, params)
-                if not result: logger.warning(f"No click data found for user {user_id}. Skipping..."); continue
-
-                _, latest_click_time, lowest_click_time, game_id = result[0]
-
-                # Get the total clicks for the user
-                query = '''
-                    SELECT COUNT(*) AS total_clicks
-                    FROM button_clicks
-                    WHERE user_id = %s
-                '''
-                
-                params = (user_id,)
-                result = execute_query(query, params)
-                total_clicks = result[0][0] if result else 0
-
                 # Get the Discord user data
                 user = await bot.fetch_user(user_id)
                 if not user: logger.warning(f"Discord user {user_id} not found. Skipping..."); continue
 
-                user_name = user.name
-                color_rank = get_color_name(lowest_click_time)
-
-                # Insert the user data into the users table
-                query = '''
-                    INSERT INTO users (user_id, user_name, cooldown_expiration, color_rank, total_clicks, lowest_click_time, latest_click_time, game_id)
-                    VALUES (%s, %s, NULL, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        user_name = VALUES(user_name),
-                        color_rank = VALUES(color_rank),
-                        total_clicks = VALUES(total_clicks),
-                        lowest_click_time = LEAST(lowest_click_time, VALUES(lowest_click_time)),
-                        latest_click_time = GREATEST(latest_click_time, VALUES(latest_click_time)),
-                        game_id = VALUES(game_id)
-                '''
-                params = (user_id, user_name, color_rank, total_clicks, lowest_click_time, latest_click_time, game_id)
-                success = execute_query(query, params, commit=True)
-
-                if success: logger.info(f"Fixed missing user {user_id} ({user_name})")
-                else: logger.error(f"Failed to fix missing user {user_id} ({user_name})")
+                color_rank = get_color_name(latest_timer_value)
+                user_rows.append((user_id, user.name, None, color_rank, total_clicks, lowest_click_time, last_click_time, game_id))
 
             except Exception as e:
                 logger.error(f"Error fixing missing user {user_id}: {e}")
                 traceback.print_exc()
+
+        # Insert all recovered users in one batched upsert
+        result = await execute_batch_write_async(
+            'users',
+            ['user_id', 'user_name', 'cooldown_expiration', 'color_rank', 'total_clicks', 'lowest_click_time', 'last_click_time', 'game_session'],
+            user_rows,
+            update_columns={
+                'user_name': 'VALUES(user_name)',
+                'color_rank': 'VALUES(color_rank)',
+                'total_clicks': 'VALUES(total_clicks)',
+                'lowest_click_time': 'LEAST(COALESCE(lowest_click_time, VALUES(lowest_click_time)), VALUES(lowest_click_time))',
+                'last_click_time': 'GREATEST(COALESCE(last_click_time, VALUES(last_click_time)), VALUES(last_click_time))',
+                'game_session': 'VALUES(game_session)'
+            }
+        )
+        if result: logger.info(f"Fixed {result['rows']} missing users")
+        else: logger.error(f"Failed to fix {len(user_rows)} missing users")
                 
         logger.info("Finished fixing missing users.")
 
@@ -931,6 +1626,7 @@ def end_game_session(game_id):
 
         if result and result is not None and result != [(None,)]:
             logger.info(f"Game session {game_id} already ended at {result}.")
+            session_registry.remove(game_id)
             return True # Already ended, so consider it a success.
 
         # If it hasn't ended, update it.
@@ -946,6 +1642,7 @@ def end_game_session(game_id):
 
         if rows_affected > 0: # Check if a row was actually updated
             logger.info(f"Game session {game_id} ended successfully.")
+            session_registry.remove(game_id)
             update_local_game_sessions()  # Refresh game session cache
             return True
         else:
@@ -957,39 +1654,79 @@ def end_game_session(game_id):
         logger.error(traceback.format_exc())
         return False
 
-# Initialize database on first run
-first_run = True
-print("Starting database initialization...")
+async def _timed_phase(name, timings, func, *args):
+    """Runs a blocking startup phase in the database thread pool and records how long it took."""
+    phase_start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_db_executor(), functools.partial(func, *args))
+    finally:
+        timings[name] = time.perf_counter() - phase_start
+        logger.info(f"Database startup phase '{name}' took {timings[name]:.2f}s")
+
+async def _run_background_repairs():
+    """Slow consistency scans that used to run at import time. Nothing waits on these."""
+    timings = {}
+    try:
+        await _timed_phase("fix_ended_game_sessions", timings, fix_ended_game_sessions)
+        await _timed_phase("game_channels", timings, get_all_game_channels)
+    except Exception as e:
+        logger.error(f"Background database repairs failed: {e}")
+        logger.error(traceback.format_exc())
+
+async def init(background_repairs=True):
+    """
+    Initialises the database layer: both pools, schema and migrations,
+    and the active session list. Importing this module no longer touches the database;
+    call this once at startup instead. Safe to call repeatedly and concurrently - later
+    calls wait for the first one and return its result.
+    The two pools are set up concurrently (a failed pool setup fails initialisation), and the
+    slow repair scans (ended sessions, game channels) are started as background tasks. Users
+    missing from the users table are repaired by fix_missing_users(), which needs the bot.
+    Args:
+        background_repairs (bool): Start the repair scans (default: True; helper processes
+            such as the standalone sync worker skip them)
+    Returns:
+        bool: True if the database is ready to use, False otherwise
+    """
+    global _init_lock, _initialized, _background_repairs_task, game_sessions
+    if _initialized:
+        return True
+    if _init_lock is None:
+        _init_lock = asyncio.Lock()
+
+    async with _init_lock:
+        if _initialized:
+            return True
 
-if first_run:
-    print("First run detected, setting up pools...")
-    if setup_pool():
+        timings = {}
+        init_start = time.perf_counter()
         try:
-            print("Pool setup successful, proceeding with initialization...")
-            first_run = False
-            print("Getting database cursor...")
-            db, cursor = get_current_new_cursor()
-            print("Creating tables...")
-            create_tables()
-            print("Checking for missing users...")
-            missing_users = get_missing_users()
-            print(f"Found {len(missing_users) if missing_users else 0} missing users")
-            print("Checking for ended game sessions...")
-            fix_ended_game_sessions()
-            print("Getting game channels...")
-            GAME_CHANNELS = get_all_game_channels()
-            print("Updating game sessions...")
-            game_sessions = update_local_game_sessions()
-            print("Database initialization completed successfully")
+            main_ok, timer_ok = await asyncio.gather(
+                _timed_phase("main_pool", timings, setup_pool, config, ("main",)),
+                _timed_phase("timer_pool", timings, setup_pool, config, ("timer",)),
+            )
+            if not (main_ok and timer_ok):
+                logger.critical("Database initialisation failed: could not set up connection pools")
+                return False
+
+            await _timed_phase("create_tables", timings, create_tables)
+            await _timed_phase("migrations", timings, run_migrations)
+            game_sessions = await _timed_phase("game_sessions", timings, update_local_game_sessions)
+
+            _initialized = True
+            if background_repairs:
+                _background_repairs_task = asyncio.create_task(_run_background_repairs())
+
+            total = time.perf_counter() - init_start
+            phases = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in timings.items())
+            logger.info(f"Database initialised in {total:.2f}s ({phases})")
+            return True
         except Exception as e:
-            print(f'Database initialization failed: {e}')
-            print(traceback.format_exc())
-            sys.exit(1)
-    else:
-        print("Failed to set up database pools")
-        sys.exit(1)
+            logger.critical(f"Database initialisation failed: {e}")
+            logger.critical(traceback.format_exc())
+            return False
 
-print("Database setup complete")
 
 def insert_first_click(game_id, user_id, user_name, timer_value):
     """
@@ -1013,13 +1750,8 @@ def insert_first_click(game_id, user_id, user_name, timer_value):
         """
         execute_query(user_query, (user_id, user_name), commit=True)
         
-        # Then insert the first click
-        click_query = """
-            INSERT INTO button_clicks 
-            (game_id, user_id, click_time, timer_value) 
-            VALUES (%s, %s, UTC_TIMESTAMP(), %s)
-        """
-        execute_query(click_query, (game_id, user_id, timer_value), commit=True)
+        # Then insert the first click (and its player stats)
+        record_clicks([(game_id, user_id, datetime.datetime.now(timezone.utc), timer_value)])
         
         # Return the inserted data
         get_click_query = """
@@ -1177,50 +1909,23 @@ def update_or_create_game_session(admin_role_id, guild_id, button_channel_id, ga
         return None
     
 async def game_sessions_dict(game_sessions_arg=None):
-    """Convert game sessions into a dictionary format with intelligent caching"""
-    global _sessions_dict_cache, _last_dict_update, _sessions_dict_lock
-    async with _sessions_dict_lock:
-        now = datetime.datetime.now(timezone.utc)
-        # Return cached result if fresh (within 5 seconds)
-        if (_sessions_dict_cache and _last_dict_update and 
-            (now - _last_dict_update).total_seconds() < 5):
-            return _sessions_dict_cache.copy()
-        output = {}
-        sessions_to_process = game_sessions_arg or update_local_game_sessions()
-        
-        # Handle case where sessions_to_process is boolean or None
-        if not isinstance(sessions_to_process, list):
-            logger.warning(f"Invalid sessions_to_process type: {type(sessions_to_process)}")
-            return output
-            
-        if not sessions_to_process:
-            logger.warning("No game sessions to process")
-            return output
-            
-        for game in sessions_to_process:
-            if game[6] is not None:  # Skip ended games
-                continue
-            try:
-                game_id = str(game[0])
-                formatted_output = {
-                    "game_id": int(game[0]),
-                    "admin_role_id": int(game[1]) if game[1] else 0,
-                    "guild_id": int(game[2]),
-                    "button_channel_id": int(game[3]),
-                    "game_chat_channel_id": int(game[4]),
-                    "start_time": game[5],
-                    "end_time": game[6],
-                    "timer_duration": int(game[7]),
-                    "cooldown_duration": int(game[8])
-                }
-                output[game_id] = formatted_output
-                output[int(game_id)] = formatted_output
-            except (ValueError, TypeError) as e:
-                logger.error(f'Error formatting game session {game[0]}: {e}')
-                continue
-        # Update cache
-        _sessions_dict_cache = output.copy()
-        _last_dict_update = now
-        return output
+    """
+    Get active game sessions as a dictionary keyed by game ID (both str and int keys).
+    Backed by the session registry; only hits the database if the registry is not loaded.
+    Args:
+        game_sessions_arg (list): Optional raw game_sessions rows to load into the registry first
+    Returns:
+        dict: Game sessions keyed by game ID
+    """
+    if game_sessions_arg and isinstance(game_sessions_arg, list):
+        _load_session_registry(game_sessions_arg)
+    elif not session_registry.loaded:
+        await run_db_call(update_local_game_sessions)
+
+    output = {}
+    for session in session_registry.all():
+        output[str(session['game_id'])] = session
+        output[session['game_id']] = session
+    return output
     
 print('Database setup complete')
\ No newline at end of file
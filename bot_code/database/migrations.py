@@ -0,0 +1,286 @@
+# Migrations.py
+import traceback
+import mysql.connector
+
+from utils.utils import logger
+
+# MySQL error codes that mean a migration step has already been applied by hand
+ER_DUP_FIELDNAME = 1060
+ER_DUP_KEYNAME = 1061
+ER_TABLE_EXISTS = 1050
+ALREADY_APPLIED_ERRORS = (ER_DUP_FIELDNAME, ER_DUP_KEYNAME, ER_TABLE_EXISTS)
+
+# Numbered schema migrations, applied in order and recorded in schema_migrations.
+# Never edit or renumber a migration once it has shipped - add a new one instead.
+# Each entry is (version, description, [statements]).
+MIGRATIONS = [
+    (1, 'button_clicks indexes for per-game timelines and latest click lookups', [
+        # Latest click / timeline / time window scans: WHERE game_id ORDER BY click_time
+        # Covering user_id and timer_value so leaderboards and charts never touch the rows
+        'CREATE INDEX idx_bc_game_time ON button_clicks (game_id, click_time, user_id, timer_value)',
+        # Latest click by insertion order: WHERE game_id ORDER BY id DESC LIMIT 1.
+        # Explicit because InnoDB drops the implicit FK index on game_id once another
+        # index starting with game_id exists.
+        'CREATE INDEX idx_bc_game_id ON button_clicks (game_id, id)',
+    ]),
+    (2, 'button_clicks indexes for per-player lookups', [
+        # Cooldown check: MAX(click_time) WHERE user_id AND game_id, plus myrank history
+        'CREATE INDEX idx_bc_user_game_time ON button_clicks (user_id, game_id, click_time, timer_value)',
+        # Per-player aggregates inside a game: GROUP BY user_id with COUNT/MIN/SUM(timer_value)
+        'CREATE INDEX idx_bc_game_user_timer ON button_clicks (game_id, user_id, timer_value)',
+    ]),
+    (3, 'game_sessions indexes for guild and active session lookups', [
+        # Active session for a guild: WHERE guild_id AND end_time IS NULL ORDER BY start_time DESC
+        'CREATE INDEX idx_gs_guild_end_start ON game_sessions (guild_id, end_time, start_time)',
+        # All active sessions: WHERE end_time IS NULL
+        'CREATE INDEX idx_gs_end_time ON game_sessions (end_time)',
+    ]),
+    (4, 'game_sessions per-game sequential click requirement', [
+        # Loaded into the session registry so the click path never reads game_sessions
+        'ALTER TABLE game_sessions ADD COLUMN sequential_click_requirement INT DEFAULT 0',
+    ]),
+    (5, 'game_player_stats rollup of per-game player aggregates', [
+        # Maintained by record_clicks() in the same transaction as each click insert
+        '''
+        CREATE TABLE game_player_stats (
+            game_id INT NOT NULL,
+            user_id BIGINT NOT NULL,
+            clicks INT NOT NULL DEFAULT 0,
+            best_timer INT,
+            time_claimed BIGINT NOT NULL DEFAULT 0,
+            red_clicks INT NOT NULL DEFAULT 0,
+            orange_clicks INT NOT NULL DEFAULT 0,
+            yellow_clicks INT NOT NULL DEFAULT 0,
+            green_clicks INT NOT NULL DEFAULT 0,
+            blue_clicks INT NOT NULL DEFAULT 0,
+            purple_clicks INT NOT NULL DEFAULT 0,
+            red_claimed BIGINT NOT NULL DEFAULT 0,
+            orange_claimed BIGINT NOT NULL DEFAULT 0,
+            yellow_claimed BIGINT NOT NULL DEFAULT 0,
+            green_claimed BIGINT NOT NULL DEFAULT 0,
+            blue_claimed BIGINT NOT NULL DEFAULT 0,
+            purple_claimed BIGINT NOT NULL DEFAULT 0,
+            mmr DOUBLE NOT NULL DEFAULT 0,
+            last_click_time DATETIME,
+            PRIMARY KEY (game_id, user_id),
+            INDEX idx_gps_game_clicks (game_id, clicks),
+            INDEX idx_gps_game_mmr (game_id, mmr),
+            INDEX idx_gps_game_claimed (game_id, time_claimed),
+            INDEX idx_gps_game_best (game_id, best_timer)
+        )
+        ''',
+        # Swiftest individual clicks: WHERE game_id ORDER BY timer_value LIMIT n
+        'CREATE INDEX idx_bc_game_timer ON button_clicks (game_id, timer_value)',
+        # Rebuild from the click log. Colors follow get_color_name(), MMR follows calculate_click_mmr()
+        # in DOUBLE arithmetic, so rebuilt rows match the ones the click path adds to.
+        'DELETE FROM game_player_stats',
+        '''
+        INSERT INTO game_player_stats (
+            game_id, user_id, clicks, best_timer, time_claimed,
+            red_clicks, orange_clicks, yellow_clicks, green_clicks, blue_clicks, purple_clicks,
+            red_claimed, orange_claimed, yellow_claimed, green_claimed, blue_claimed, purple_claimed,
+            mmr, last_click_time
+        )
+        SELECT
+            game_id, user_id, COUNT(*), MIN(timer_value), SUM(claimed),
+            SUM(color = 0), SUM(color = 1), SUM(color = 2), SUM(color = 3), SUM(color = 4), SUM(color = 5),
+            SUM(IF(color = 0, claimed, 0)), SUM(IF(color = 1, claimed, 0)), SUM(IF(color = 2, claimed, 0)),
+            SUM(IF(color = 3, claimed, 0)), SUM(IF(color = 4, claimed, 0)), SUM(IF(color = 5, claimed, 0)),
+            SUM(POWER(2, 5 - bracket) * (1 + IF(bracket <= 1, 1 - position, 1 - ABS(0.5 - position))) * timer_duration / 43200),
+            MAX(click_time)
+        FROM (
+            SELECT
+                bc.game_id, bc.user_id, bc.click_time, bc.timer_value, gs.timer_duration,
+                GREATEST(0, gs.timer_duration - bc.timer_value) AS claimed,
+                CASE
+                    WHEN LEAST(GREATEST(bc.timer_value, 0), gs.timer_duration) / gs.timer_duration * 100 >= 83.33 THEN 5
+                    WHEN LEAST(GREATEST(bc.timer_value, 0), gs.timer_duration) / gs.timer_duration * 100 >= 66.67 THEN 4
+                    WHEN LEAST(GREATEST(bc.timer_value, 0), gs.timer_duration) / gs.timer_duration * 100 >= 50 THEN 3
+                    WHEN LEAST(GREATEST(bc.timer_value, 0), gs.timer_duration) / gs.timer_duration * 100 >= 33.33 THEN 2
+                    WHEN LEAST(GREATEST(bc.timer_value, 0), gs.timer_duration) / gs.timer_duration * 100 >= 16.67 THEN 1
+                    ELSE 0
+                END AS color,
+                LEAST(5, FLOOR(CAST(bc.timer_value AS DOUBLE) / gs.timer_duration * 100 / 16.66667)) AS bracket,
+                MOD(CAST(bc.timer_value AS DOUBLE) / gs.timer_duration * 100, 16.66667) / 16.66667 AS position
+            FROM button_clicks bc
+            JOIN game_sessions gs ON gs.id = bc.game_id
+            WHERE gs.timer_duration > 0
+        ) AS scored_clicks
+        GROUP BY game_id, user_id
+        ''',
+    ]),
+    (6, 'button_clicks idempotency key for queued clicks', [
+        # Set by record_queued_clicks() to the click's stream entry ID (or spool key), so clicks
+        # redelivered to another sync worker are skipped. NULL for clicks written directly.
+        'ALTER TABLE button_clicks ADD COLUMN click_key VARCHAR(64) NULL',
+        'CREATE UNIQUE INDEX idx_bc_click_key ON button_clicks (click_key)',
+    ]),
+]
+
+# Hot queries checked with EXPLAIN on startup. Each entry is (name, query, sample params).
+# Anything here that ends up doing a full table scan is logged as a warning.
+HOT_QUERIES = [
+    ('latest_click', '''
+        SELECT users.user_name, button_clicks.click_time, button_clicks.timer_value
+        FROM button_clicks
+        INNER JOIN users ON button_clicks.user_id = users.user_id
+        WHERE button_clicks.game_id = %s
+        ORDER BY button_clicks.id DESC
+        LIMIT 1
+    ''', (1,)),
+    ('latest_click_by_time', '''
+        SELECT click_time, timer_value
+        FROM button_clicks
+        WHERE game_id = %s
+        ORDER BY click_time DESC
+        LIMIT 1
+    ''', (1,)),
+    ('game_click_count', 'SELECT COUNT(*) FROM button_clicks WHERE game_id = %s', (1,)),
+    ('game_player_count', 'SELECT COUNT(DISTINCT user_id) FROM button_clicks WHERE game_id = %s', (1,)),
+    ('user_cooldown', '''
+        SELECT MAX(click_time)
+        FROM button_clicks
+        WHERE user_id = %s
+        AND game_id = %s
+    ''', (1, 1)),
+    ('player_leaderboard', '''
+        SELECT user_id, COUNT(*), MIN(timer_value)
+        FROM button_clicks
+        WHERE game_id = %s
+        GROUP BY user_id
+    ''', (1,)),
+    ('guild_active_session', '''
+        SELECT id
+        FROM game_sessions
+        WHERE guild_id = %s AND end_time IS NULL
+        ORDER BY start_time DESC
+        LIMIT 1
+    ''', (1,)),
+    ('active_sessions', 'SELECT id FROM game_sessions WHERE end_time IS NULL', ()),
+    ('player_stats_leaderboard', '''
+        SELECT user_id, clicks, mmr
+        FROM game_player_stats
+        WHERE game_id = %s
+        ORDER BY mmr DESC
+        LIMIT 10
+    ''', (1,)),
+    ('swiftest_clicks', '''
+        SELECT user_id, timer_value
+        FROM button_clicks
+        WHERE game_id = %s
+        ORDER BY timer_value
+        LIMIT 10
+    ''', (1,)),
+]
+
+def _ensure_migrations_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255),
+            applied_at DATETIME
+        )
+    ''')
+
+def get_applied_versions(connection):
+    """
+    Get the set of migration versions already applied to the database.
+    Args:
+        connection: An open MySQL connection
+    Returns:
+        set: Applied migration version numbers
+    """
+    cursor = connection.cursor()
+    try:
+        _ensure_migrations_table(cursor)
+        cursor.execute('SELECT version FROM schema_migrations')
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+def apply_migrations(connection, migrations=MIGRATIONS):
+    """
+    Apply every migration that has not been recorded in schema_migrations yet.
+    Steps that fail because the index/column/table already exists are treated as applied,
+    so databases that had indexes added by hand migrate cleanly.
+    Args:
+        connection: An open MySQL connection
+        migrations (list): Migrations to apply (default: MIGRATIONS)
+    Returns:
+        list: Versions applied by this call
+    Raises:
+        mysql.connector.Error: If a migration step fails, leaving that version unrecorded
+    """
+    applied = get_applied_versions(connection)
+    newly_applied = []
+    cursor = connection.cursor()
+    try:
+        for version, description, statements in sorted(migrations, key=lambda m: m[0]):
+            if version in applied:
+                continue
+
+            logger.info(f'Applying migration {version}: {description}')
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except mysql.connector.Error as error:
+                    if getattr(error, 'errno', None) in ALREADY_APPLIED_ERRORS:
+                        logger.info(f'Migration {version} step already applied: {error}')
+                        continue
+                    logger.error(f'Migration {version} failed: {error}\nStatement: {statement.strip()[:200]}')
+                    raise
+
+            cursor.execute(
+                'INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, UTC_TIMESTAMP())',
+                (version, description)
+            )
+            connection.commit()
+            newly_applied.append(version)
+
+        if newly_applied:
+            logger.info(f'Applied migrations: {newly_applied}')
+        else:
+            logger.info('Database schema is up to date')
+        return newly_applied
+    finally:
+        cursor.close()
+
+def check_hot_query_plans(connection, hot_queries=HOT_QUERIES):
+    """
+    Run EXPLAIN on the registered hot queries and flag any that do a full table scan.
+    Args:
+        connection: An open MySQL connection
+        hot_queries (list): Queries to check (default: HOT_QUERIES)
+    Returns:
+        list: (query_name, table) pairs that use a full table scan
+    """
+    full_scans = []
+    cursor = connection.cursor(dictionary=True)
+    try:
+        for name, query, params in hot_queries:
+            try:
+                cursor.execute('EXPLAIN ' + query, params)
+                plan = cursor.fetchall()
+            except mysql.connector.Error as error:
+                logger.warning(f'Could not EXPLAIN hot query {name}: {error}')
+                continue
+
+            for row in plan:
+                access_type = row.get('type')
+                if access_type is not None and str(access_type).upper() == 'ALL':
+                    table = row.get('table')
+                    full_scans.append((name, table))
+                    logger.warning(
+                        f'Hot query {name} does a full scan of {table} '
+                        f'(rows={row.get("rows")}, possible_keys={row.get("possible_keys")})'
+                    )
+
+        if not full_scans:
+            logger.info(f'All {len(hot_queries)} hot queries use indexes')
+        return full_scans
+    except Exception as e:
+        logger.error(f'Error checking hot query plans: {e}')
+        logger.error(traceback.format_exc())
+        return full_scans
+    finally:
+        cursor.close()
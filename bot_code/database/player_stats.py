@@ -0,0 +1,102 @@
+# Player_stats.py
+from utils.utils import get_color_name
+
+# Per-game player rollup maintained alongside button_clicks.
+# One row per (game_id, user_id); every click adds to it in the same transaction as its insert,
+# so leaderboards read O(players) rows instead of aggregating O(clicks) rows.
+
+COLORS = ('Red', 'Orange', 'Yellow', 'Green', 'Blue', 'Purple')
+COLOR_EMOJIS = {'Red': '🔴', 'Orange': '🟠', 'Yellow': '🟡', 'Green': '🟢', 'Blue': '🔵', 'Purple': '🟣'}
+
+CLICK_COLUMNS = ['game_id', 'user_id', 'click_time', 'timer_value']
+
+COLOR_CLICK_COLUMNS = [f'{color.lower()}_clicks' for color in COLORS]
+COLOR_CLAIMED_COLUMNS = [f'{color.lower()}_claimed' for color in COLORS]
+
+PLAYER_STATS_COLUMNS = (
+    ['game_id', 'user_id', 'clicks', 'best_timer', 'time_claimed']
+    + COLOR_CLICK_COLUMNS + COLOR_CLAIMED_COLUMNS
+    + ['mmr', 'last_click_time']
+)
+
+# ON DUPLICATE KEY UPDATE clauses that fold a batch's partial aggregates into the existing row
+PLAYER_STATS_UPDATE = {
+    'clicks': 'clicks + VALUES(clicks)',
+    'best_timer': 'LEAST(COALESCE(best_timer, VALUES(best_timer)), VALUES(best_timer))',
+    'time_claimed': 'time_claimed + VALUES(time_claimed)',
+    **{column: f'{column} + VALUES({column})' for column in COLOR_CLICK_COLUMNS + COLOR_CLAIMED_COLUMNS},
+    'mmr': 'mmr + VALUES(mmr)',
+    'last_click_time': 'GREATEST(COALESCE(last_click_time, VALUES(last_click_time)), VALUES(last_click_time))',
+}
+
+DEFAULT_TIMER_DURATION = 43200
+
+def calculate_click_mmr(timer_value, timer_duration):
+    """
+    Calculate the MMR earned by a single click, based on:
+    1. Color bracket (16.66% intervals)
+    2. Precise timing within bracket
+    3. Scaled against timer_duration
+    The rollup, the leaderboard commands and the Redis admission script (a Lua port) all use it.
+    Args:
+        timer_value (int): Time remaining when the button was clicked
+        timer_duration (int): Total duration of the timer
+    Returns:
+        float: MMR for the click
+    """
+    percentage = (timer_value / timer_duration) * 100
+    bracket_size = 16.66667  # Each color represents 16.66667% of the timer
+    # Bracket 0-5 (red to purple) and the position within it (0.0 to 1.0)
+    bracket = min(5, int(percentage / bracket_size))
+    bracket_position = (percentage % bracket_size) / bracket_size
+    # Red (0) = 32, Orange (1) = 16, Yellow (2) = 8, Green (3) = 4, Blue (4) = 2, Purple (5) = 1
+    base_points = 2 ** (5 - bracket)
+    # Red/orange reward getting closer to zero, other colors reward hitting the middle of the bracket
+    if bracket <= 1:  # Red or Orange
+        position_multiplier = 1 - bracket_position
+    else:
+        position_multiplier = 1 - abs(0.5 - bracket_position)
+    # Scaled to the 12-hour standard timer
+    return base_points * (1 + position_multiplier) * (timer_duration / 43200)
+
+def build_player_stats_rows(clicks, timer_durations):
+    """
+    Aggregate a batch of clicks into game_player_stats rows for an additive upsert.
+    Args:
+        clicks (list): (game_id, user_id, click_time, timer_value) tuples, oldest first
+        timer_durations (dict): {game_id: timer_duration}
+    Returns:
+        list: Rows in PLAYER_STATS_COLUMNS order, sorted by (game_id, user_id) to keep lock order stable
+    """
+    totals = {}
+    for game_id, user_id, click_time, timer_value in clicks:
+        game_id, user_id = int(game_id), int(user_id)
+        timer_duration = max(1, int(timer_durations.get(game_id) or DEFAULT_TIMER_DURATION))
+        # button_clicks.timer_value is an INT column, so aggregate what is actually stored
+        timer_value = int(round(float(timer_value)))
+        claimed = max(0, timer_duration - timer_value)
+        color_index = COLORS.index(get_color_name(timer_value, timer_duration))
+
+        entry = totals.get((game_id, user_id))
+        if entry is None:
+            entry = totals[(game_id, user_id)] = {
+                'clicks': 0, 'best_timer': timer_value, 'time_claimed': 0,
+                'color_clicks': [0] * len(COLORS), 'color_claimed': [0] * len(COLORS),
+                'mmr': 0.0, 'last_click_time': click_time
+            }
+        entry['clicks'] += 1
+        entry['best_timer'] = min(entry['best_timer'], timer_value)
+        entry['time_claimed'] += claimed
+        entry['color_clicks'][color_index] += 1
+        entry['color_claimed'][color_index] += claimed
+        entry['mmr'] += calculate_click_mmr(timer_value, timer_duration)
+        entry['last_click_time'] = click_time
+
+    rows = []
+    for (game_id, user_id), entry in sorted(totals.items()):
+        rows.append(
+            (game_id, user_id, entry['clicks'], entry['best_timer'], entry['time_claimed'])
+            + tuple(entry['color_clicks']) + tuple(entry['color_claimed'])
+            + (entry['mmr'], entry['last_click_time'])
+        )
+    return rows
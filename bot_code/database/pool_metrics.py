@@ -0,0 +1,246 @@
+# Pool_metrics.py
+import re
+import threading
+import time
+from mysql.connector import errors
+from mysql.connector.pooling import MySQLConnectionPool
+
+# Connection pool and query instrumentation.
+# Records how long callers wait for a connection, how many connections are in use,
+# per-query latency histograms keyed by a normalized query fingerprint, and retry counts,
+# so the pool sizes can be chosen from data. Dumped by the admin 'dbstats' command.
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is everything above)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+MAX_FINGERPRINTS = 200
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))+\s*\)")
+_COMMENT = re.compile(r"--[^\n]*")
+_WHITESPACE = re.compile(r"\s+")
+
+def fingerprint(query):
+    """
+    Normalize a query so that executions differing only in literals, IN-list or
+    VALUES-list length and whitespace share one fingerprint.
+    Args:
+        query (str): SQL query
+    Returns:
+        str: Normalized query text
+    """
+    query = _COMMENT.sub(" ", query)
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    query = _PLACEHOLDER_LIST.sub("(...)", query)
+    query = re.sub(r"(\(\.\.\.\)\s*,\s*)+\(\.\.\.\)", "(...)", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds); not thread-safe, callers hold their own lock."""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, milliseconds):
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if milliseconds <= bound:
+                self.buckets[index] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations (capped at the max seen)."""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                return min(float(LATENCY_BUCKETS_MS[index]), self.max) if index < len(LATENCY_BUCKETS_MS) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'avg_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.max,
+            'buckets': dict(zip([f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + ["inf"], self.buckets))
+        }
+
+# PoolMetrics class
+# Thread-safe collector shared by every pool; database work runs in the executor threads.
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear every counter and histogram; registered pools stay registered."""
+        with self._lock:
+            registered = getattr(self, '_pools', {})
+            self.started = time.time()
+            self._pools = {}
+            for name, entry in registered.items():
+                self._pool(name).update(size=entry['size'], pool=entry['pool'])
+            self._queries = {}
+            self._queue_waits = {}
+
+    def _pool(self, name):
+        pool = self._pools.get(name)
+        if pool is None:
+            pool = self._pools[name] = {
+                'size': 0, 'pool': None, 'checkouts': 0, 'exhausted': 0,
+                'peak_in_use': 0, 'checkout_wait': LatencyHistogram()
+            }
+        return pool
+
+    def register_pool(self, name, pool):
+        with self._lock:
+            entry = self._pool(name)
+            entry['size'] = pool.pool_size
+            entry['pool'] = pool
+
+    def record_checkout(self, name, wait_seconds, in_use):
+        with self._lock:
+            entry = self._pool(name)
+            entry['checkouts'] += 1
+            entry['peak_in_use'] = max(entry['peak_in_use'], in_use)
+            entry['checkout_wait'].observe(wait_seconds * 1000)
+
+    def record_exhausted(self, name):
+        with self._lock:
+            self._pool(name)['exhausted'] += 1
+
+    def record_queue_wait(self, name, wait_seconds):
+        """Time an async caller waited on the pool semaphore before reaching the executor."""
+        with self._lock:
+            histogram = self._queue_waits.get(name)
+            if histogram is None:
+                histogram = self._queue_waits[name] = LatencyHistogram()
+            histogram.observe(wait_seconds * 1000)
+
+    def _query(self, query):
+        key = fingerprint(query)
+        entry = self._queries.get(key)
+        if entry is None:
+            if len(self._queries) >= MAX_FINGERPRINTS:
+                key = '<other>'
+                entry = self._queries.get(key)
+            if entry is None:
+                entry = self._queries[key] = {'latency': LatencyHistogram(), 'retries': 0, 'errors': 0}
+        return entry
+
+    def record_query(self, query, seconds):
+        with self._lock:
+            self._query(query)['latency'].observe(seconds * 1000)
+
+    def record_retry(self, query):
+        with self._lock:
+            self._query(query)['retries'] += 1
+
+    def record_failure(self, query):
+        with self._lock:
+            self._query(query)['errors'] += 1
+
+    def snapshot(self):
+        """
+        Get a point-in-time copy of every metric.
+        Returns:
+            dict: {'uptime_seconds', 'pools': {name: {...}}, 'queue_waits': {name: {...}}, 'queries': {fingerprint: {...}}}
+        """
+        with self._lock:
+            pools = {}
+            for name, entry in self._pools.items():
+                pool = entry['pool']
+                in_use = None
+                if pool is not None:
+                    # Every connection is created up front, so the idle ones are exactly those queued
+                    queue = getattr(pool, '_cnx_queue', None)
+                    in_use = entry['size'] - queue.qsize() if queue is not None else None
+                pools[name] = {
+                    'size': entry['size'],
+                    'in_use': in_use,
+                    'peak_in_use': entry['peak_in_use'],
+                    'checkouts': entry['checkouts'],
+                    'exhausted': entry['exhausted'],
+                    'checkout_wait': entry['checkout_wait'].snapshot()
+                }
+            return {
+                'uptime_seconds': time.time() - self.started,
+                'pools': pools,
+                'queue_waits': {name: histogram.snapshot() for name, histogram in self._queue_waits.items()},
+                'queries': {
+                    key: {'latency': entry['latency'].snapshot(), 'retries': entry['retries'], 'errors': entry['errors']}
+                    for key, entry in self._queries.items()
+                }
+            }
+
+    def format_report(self, top_n=10):
+        """
+        Render the snapshot as plain text for the admin command.
+        Args:
+            top_n (int): Number of query fingerprints to list, by total time (default: 10)
+        Returns:
+            list: Report sections (each fits in a Discord message code block)
+        """
+        snapshot = self.snapshot()
+        lines = [f"Uptime {snapshot['uptime_seconds'] / 3600:.1f}h", ""]
+        lines.append("pool          size in_use peak checkouts exhausted wait_p50 wait_p95 wait_max")
+        for name, pool in sorted(snapshot['pools'].items()):
+            wait = pool['checkout_wait']
+            lines.append(
+                f"{name[:13]:<13} {pool['size']:>4} {pool['in_use'] if pool['in_use'] is not None else '?':>6} "
+                f"{pool['peak_in_use']:>4} {pool['checkouts']:>9} {pool['exhausted']:>9} "
+                f"{wait['p50_ms']:>6.0f}ms {wait['p95_ms']:>6.0f}ms {wait['max_ms']:>6.0f}ms"
+            )
+        if snapshot['queue_waits']:
+            lines.append("")
+            lines.append("async queue   waits  p50     p95     max")
+            for name, wait in sorted(snapshot['queue_waits'].items()):
+                lines.append(f"{name[:13]:<13} {wait['count']:>5} {wait['p50_ms']:>5.0f}ms {wait['p95_ms']:>5.0f}ms {wait['max_ms']:>5.0f}ms")
+        sections = ["\n".join(lines)]
+
+        queries = sorted(
+            snapshot['queries'].items(),
+            key=lambda item: item[1]['latency']['avg_ms'] * item[1]['latency']['count'],
+            reverse=True
+        )[:top_n]
+        for key, entry in queries:
+            latency = entry['latency']
+            sections.append(
+                f"{key[:300]}\n"
+                f"  calls={latency['count']} avg={latency['avg_ms']:.1f}ms p95={latency['p95_ms']:.0f}ms "
+                f"max={latency['max_ms']:.0f}ms retries={entry['retries']} errors={entry['errors']}"
+            )
+        return sections
+
+pool_metrics = PoolMetrics()
+
+# InstrumentedConnectionPool class
+# MySQLConnectionPool that records checkout wait and utilisation for every get_connection().
+class InstrumentedConnectionPool(MySQLConnectionPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_metrics.register_pool(self.pool_name, self)
+
+    def get_connection(self):
+        start = time.perf_counter()
+        try:
+            connection = super().get_connection()
+        except errors.PoolError:
+            pool_metrics.record_exhausted(self.pool_name)
+            raise
+        queue = getattr(self, '_cnx_queue', None)
+        in_use = self.pool_size - queue.qsize() if queue is not None else 0
+        pool_metrics.record_checkout(self.pool_name, time.perf_counter() - start, in_use)
+        return connection
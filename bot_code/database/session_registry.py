@@ -0,0 +1,162 @@
+# Session_registry.py
+import datetime
+import threading
+from datetime import timezone
+
+# Column order used by every game_sessions SELECT that feeds the registry
+SESSION_COLUMNS = (
+    'id', 'admin_role_id', 'guild_id', 'button_channel_id', 'game_chat_channel_id',
+    'start_time', 'end_time', 'timer_duration', 'cooldown_duration', 'sequential_click_requirement'
+)
+
+def session_from_row(game):
+    """
+    Format a game_sessions row (in SESSION_COLUMNS order) into a session dictionary.
+    Args:
+        game (tuple): Row from game_sessions
+    Returns:
+        dict: Formatted game session
+    """
+    return {
+        "game_id": int(game[0]),
+        "admin_role_id": int(game[1]) if game[1] else 0,
+        "guild_id": int(game[2]),
+        "button_channel_id": int(game[3]),
+        "game_chat_channel_id": int(game[4]),
+        "start_time": game[5],
+        "end_time": game[6],
+        "timer_duration": int(game[7]),
+        "cooldown_duration": int(game[8]),
+        "sequential_click_requirement": int(game[9]) if len(game) > 9 and game[9] is not None else 0
+    }
+
+# SessionRegistry class
+# Single authoritative in-memory index of active game sessions.
+# Lookups by game, guild, button channel and chat channel are dictionary hits.
+# The registry is never refreshed on a timer: it is reloaded or updated explicitly
+# whenever a session is created, reopened or ended.
+class SessionRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_game_id = {}
+        self._by_guild_id = {}
+        self._by_button_channel_id = {}
+        self._by_chat_channel_id = {}
+        self.loaded = False
+        self.last_loaded = None
+
+    def load(self, sessions):
+        """
+        Replace the registry contents with the given active sessions.
+        Sessions should be ordered newest first so each guild maps to its latest session.
+        Args:
+            sessions (list): Formatted session dictionaries
+        """
+        by_game_id, by_guild_id, by_button_channel_id, by_chat_channel_id = {}, {}, {}, {}
+        for session in sessions:
+            if session.get('end_time') is not None:
+                continue
+            by_game_id[session['game_id']] = session
+            by_guild_id.setdefault(session['guild_id'], session)
+            by_button_channel_id.setdefault(session['button_channel_id'], session)
+            by_chat_channel_id.setdefault(session['game_chat_channel_id'], session)
+
+        with self._lock:
+            self._by_game_id = by_game_id
+            self._by_guild_id = by_guild_id
+            self._by_button_channel_id = by_button_channel_id
+            self._by_chat_channel_id = by_chat_channel_id
+            self.loaded = True
+            self.last_loaded = datetime.datetime.now(timezone.utc)
+
+    def register(self, session):
+        """
+        Add or replace a single active session.
+        Args:
+            session (dict): Formatted session dictionary
+        """
+        if session.get('end_time') is not None:
+            self.remove(session['game_id'])
+            return
+        with self._lock:
+            previous = self._by_game_id.get(session['game_id'])
+            if previous:
+                self._unindex(previous)
+            self._by_game_id[session['game_id']] = session
+            self._by_guild_id[session['guild_id']] = session
+            self._by_button_channel_id[session['button_channel_id']] = session
+            self._by_chat_channel_id[session['game_chat_channel_id']] = session
+
+    def remove(self, game_id):
+        """
+        Drop an ended session from the registry.
+        Args:
+            game_id: Game session ID
+        Returns:
+            bool: True if the session was registered
+        """
+        with self._lock:
+            session = self._by_game_id.pop(int(game_id), None)
+            if not session:
+                return False
+            self._unindex(session)
+            # Another active session for the same guild or channel takes over its index entry
+            for other in self._by_game_id.values():
+                for index, field in self._indexes():
+                    key = other[field]
+                    if key != session[field]:
+                        continue
+                    current = index.get(key)
+                    if current is None or other['start_time'] > current['start_time']:
+                        index[key] = other
+            return True
+
+    def _indexes(self):
+        return ((self._by_guild_id, 'guild_id'),
+                (self._by_button_channel_id, 'button_channel_id'),
+                (self._by_chat_channel_id, 'game_chat_channel_id'))
+
+    def _unindex(self, session):
+        for index, field in self._indexes():
+            current = index.get(session[field])
+            if current is not None and current['game_id'] == session['game_id']:
+                del index[session[field]]
+
+    def invalidate(self):
+        """Mark the registry stale so the next lookup reloads it from the database."""
+        with self._lock:
+            self.loaded = False
+
+    @staticmethod
+    def _copy(session):
+        return dict(session) if session else None
+
+    def get_by_game_id(self, game_id):
+        return self._copy(self._by_game_id.get(int(game_id)))
+
+    def get_by_guild_id(self, guild_id):
+        return self._copy(self._by_guild_id.get(int(guild_id)))
+
+    def get_by_button_channel_id(self, channel_id):
+        return self._copy(self._by_button_channel_id.get(int(channel_id)))
+
+    def get_by_chat_channel_id(self, channel_id):
+        return self._copy(self._by_chat_channel_id.get(int(channel_id)))
+
+    def all(self):
+        """
+        Get every active session.
+        Returns:
+            list: Copies of the registered session dictionaries
+        """
+        with self._lock:
+            return [dict(session) for session in self._by_game_id.values()]
+
+    def game_ids(self):
+        with self._lock:
+            return list(self._by_game_id.keys())
+
+    def __len__(self):
+        return len(self._by_game_id)
+
+session_registry = SessionRegistry()
@@ -1,6 +1,7 @@
 import nextcord
 import traceback
 from database.database import execute_query
+from database.player_stats import COLORS, COLOR_EMOJIS, COLOR_CLICK_COLUMNS
 from utils.utils import logger, lock, format_time
 import os
 
@@ -11,11 +12,18 @@ def get_end_game_embed(game_session_id, guild):
     try:
         embed = nextcord.Embed(title='The Button Game', description='Game Ended!')
 
-        query = 'SELECT COUNT(*) FROM button_clicks WHERE game_id = %s'
+        # Game totals from the game_player_stats rollup (one row per player)
+        query = f'''
+            SELECT SUM(clicks), COUNT(*), {', '.join(f'SUM({column})' for column in COLOR_CLICK_COLUMNS)}
+            FROM game_player_stats
+            WHERE game_id = %s
+        '''
         params = (game_session_id,)
-        total_clicks = execute_query(query, params)
-        if total_clicks is not None and total_clicks[0]:
-            total_clicks = total_clicks[0][0]
+        totals = execute_query(query, params)
+        totals = totals[0] if totals and totals[0] and totals[0][0] is not None else None
+
+        if totals:
+            total_clicks = int(totals[0])
             embed.add_field(name='Total Button Clicks', value=str(total_clicks), inline=False)
         else:
             logger.warning(f'No clicks found for game {game_session_id}')
@@ -40,32 +48,20 @@ def get_end_game_embed(game_session_id, guild):
             else:
                 embed.add_field(name='Game Duration', value='Unknown', inline=False)
 
-        query = 'SELECT COUNT(DISTINCT user_id) FROM button_clicks WHERE game_id = %s'
-        params = (game_session_id,)
-        num_participants = execute_query(query, params)
-        
-        if num_participants is not None and num_participants[0]:
-            num_participants = num_participants[0][0]
+        if totals:
+            num_participants = int(totals[1])
             embed.add_field(name='Number of Participants', value=str(num_participants), inline=False)
         else:
             logger.warning(f'No participants found for game {game_session_id}')
             embed.add_field(name='Number of Participants', value='0', inline=False)
 
-        # Get timer duration for proper color calculations
-        timer_duration_query = 'SELECT timer_duration FROM game_sessions WHERE id = %s'
-        timer_duration_result = execute_query(timer_duration_query, (game_session_id,))
-        timer_duration = 43200  # Default 12 hours
-        if timer_duration_result and timer_duration_result[0] and timer_duration_result[0][0]:
-            timer_duration = timer_duration_result[0][0]
-
         # Top 5 Most Active Players
         query = '''
-            SELECT users.user_name, COUNT(*) AS click_count
-            FROM button_clicks
-            JOIN users ON button_clicks.user_id = users.user_id
-            WHERE button_clicks.game_id = %s
-            GROUP BY users.user_id
-            ORDER BY click_count DESC
+            SELECT users.user_name, game_player_stats.clicks
+            FROM game_player_stats
+            JOIN users ON game_player_stats.user_id = users.user_id
+            WHERE game_player_stats.game_id = %s
+            ORDER BY game_player_stats.clicks DESC
             LIMIT 5
         '''
         params = (game_session_id,)
@@ -81,12 +77,11 @@ def get_end_game_embed(game_session_id, guild):
 
         # Top 5 Fastest Clicks
         query = '''
-            SELECT users.user_name, MIN(button_clicks.timer_value) AS fastest_click
-            FROM button_clicks
-            JOIN users ON button_clicks.user_id = users.user_id
-            WHERE button_clicks.game_id = %s
-            GROUP BY users.user_id
-            ORDER BY fastest_click ASC
+            SELECT users.user_name, game_player_stats.best_timer
+            FROM game_player_stats
+            JOIN users ON game_player_stats.user_id = users.user_id
+            WHERE game_player_stats.game_id = %s
+            ORDER BY game_player_stats.best_timer ASC
             LIMIT 5
         '''
         params = (game_session_id,)
@@ -102,17 +97,14 @@ def get_end_game_embed(game_session_id, guild):
 
         # Top 5 Time Savers
         query = '''
-            SELECT 
-                users.user_name,
-                SUM(GREATEST(0, %s - button_clicks.timer_value)) AS total_time_claimed
-            FROM button_clicks
-            JOIN users ON button_clicks.user_id = users.user_id
-            WHERE button_clicks.game_id = %s
-            GROUP BY users.user_id
-            ORDER BY total_time_claimed DESC
+            SELECT users.user_name, game_player_stats.time_claimed
+            FROM game_player_stats
+            JOIN users ON game_player_stats.user_id = users.user_id
+            WHERE game_player_stats.game_id = %s
+            ORDER BY game_player_stats.time_claimed DESC
             LIMIT 5
         '''
-        params = (timer_duration, game_session_id)
+        params = (game_session_id,)
         time_savers = execute_query(query, params)
         if time_savers is not None and len(time_savers) > 0:
             savers_text = ""
@@ -123,51 +115,13 @@ def get_end_game_embed(game_session_id, guild):
         else:
             embed.add_field(name='⏰ Time Savers', value='None', inline=False)
 
-        # Color click distribution based on actual timer_duration and 6 color segments
-        query = '''
-            SELECT 
-                CASE
-                    WHEN ROUND((timer_value / %s) * 100, 2) <= 16.67 THEN 'Red'
-                    WHEN ROUND((timer_value / %s) * 100, 2) <= 33.33 THEN 'Orange'
-                    WHEN ROUND((timer_value / %s) * 100, 2) <= 50.00 THEN 'Yellow'
-                    WHEN ROUND((timer_value / %s) * 100, 2) <= 66.67 THEN 'Green'
-                    WHEN ROUND((timer_value / %s) * 100, 2) <= 83.33 THEN 'Blue'
-                    ELSE 'Purple'
-                END as color_name,
-                COUNT(*) as click_count
-            FROM button_clicks
-            WHERE game_id = %s
-            GROUP BY 
-                CASE
-                    WHEN ROUND((timer_value / %s) * 100, 2) <= 16.67 THEN 'Red'
-                    WHEN ROUND((timer_value / %s) * 100, 2) <= 33.33 THEN 'Orange'
-                    WHEN ROUND((timer_value / %s) * 100, 2) <= 50.00 THEN 'Yellow'
-                    WHEN ROUND((timer_value / %s) * 100, 2) <= 66.67 THEN 'Green'
-                    WHEN ROUND((timer_value / %s) * 100, 2) <= 83.33 THEN 'Blue'
-                    ELSE 'Purple'
-                END
-            ORDER BY MIN(ROUND((timer_value / %s) * 100, 2)) ASC
-        '''
-        params = (timer_duration, timer_duration, timer_duration, timer_duration, timer_duration, 
-                 game_session_id, timer_duration, timer_duration, timer_duration, timer_duration, 
-                 timer_duration, timer_duration)
-        color_distribution_result = execute_query(query, params)
-
+        # Color click distribution, summed from the rollup's per-color counts
         color_distribution = []
-        color_emojis = {
-            'Red': '🔴',
-            'Orange': '🟠',
-            'Yellow': '🟡',
-            'Green': '🟢',
-            'Blue': '🔵',
-            'Purple': '🟣'
-        }
-        
-        if color_distribution_result:
-            for color_name, count in color_distribution_result:
-                emoji = color_emojis.get(color_name, '⚪')
-                color_distribution.append(f"{emoji} {color_name}: {count}")
-        else:
+        if totals:
+            for color_name, count in zip(COLORS, totals[2:]):
+                if count:
+                    color_distribution.append(f"{COLOR_EMOJIS[color_name]} {color_name}: {int(count)}")
+        if not color_distribution:
             color_distribution = ["No color data available"]
             
         embed.add_field(name='🎨 Color Click Distribution', value='\n'.join(color_distribution), inline=False)
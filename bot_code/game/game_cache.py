@@ -1,41 +1,6 @@
 #Game Cache
-import datetime
-from datetime import timezone
 from database.database import logger
 
-# GameCache class
-# This class is used to cache game data for the timer button..
-class GameCache:
-    def __init__(self):
-        self.games = {}
-
-    def update_game_cache(self, game_id, latest_click_time, total_clicks, total_players, latest_player_name, last_timer_value):
-        game_id = int(game_id)
-        if game_id in self.games:
-            self.games[game_id]['latest_click_time'] = latest_click_time
-            self.games[game_id]['last_update_time'] = datetime.datetime.now(timezone.utc)
-            self.games[game_id]['latest_player_name'] = latest_player_name
-            self.games[game_id]['last_timer_value'] = last_timer_value
-        else:
-            self.games[game_id] = {
-                'latest_click_time': latest_click_time,
-                'total_clicks': total_clicks,
-                'total_players': total_players,
-                'last_update_time': datetime.datetime.now(timezone.utc),
-                'latest_player_name': latest_player_name,
-                'last_timer_value': last_timer_value
-            }
-        logger.info(f'Game cache updated for game {game_id}, {self.games}')
-
-    def get_game_cache(self, game_id):
-        game_id = int(game_id)
-        return self.games.get(game_id, None)
-    
-    def clear_game_cache(self, game_id):
-        game_id = int(game_id)
-        self.games.pop(game_id, None)
-        logger.info(f'Game cache cleared for game {game_id}, {self.games}')
-
 # ButtonMessageCache class
 # This class is used to cache button messages for the timer button.
 class ButtonMessageCache:
@@ -77,6 +42,6 @@ class ButtonMessageCache:
             self.messages.pop(game_id, None)
             logger.info(f"Removed stale message cache for game {game_id}")
 
-# Create the GameCache and ButtonMessageCache instances
-game_cache = GameCache()
+# Create the ButtonMessageCache instance
+# (game state is cached in-process by redis_lib.near_cache in front of Redis)
 button_message_cache = ButtonMessageCache()
\ No newline at end of file
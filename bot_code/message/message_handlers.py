@@ -17,17 +17,32 @@ from database.database import (
     update_or_create_game_session, 
     get_game_session_by_id, 
     get_all_game_channels, 
-    execute_query, 
-    game_sessions_dict, 
-    update_local_game_sessions, 
+    execute_query_async, 
+    record_clicks_async,
+    stream_query,
+    stream_rows,
+    run_db_call, 
     insert_first_click,
     get_or_create_guild_icon,
     update_guild_icon,
     check_button_clicks
 )
 from utils.utils import config, logger, lock, config, format_time, get_color_emoji, get_color_state, get_color_name, GUILD_EMOJIS, paused_games
+from database.pool_metrics import pool_metrics
+from redis_lib.redis_locks import lock_metrics
+from redis_lib.sync_worker import sync_worker
+from redis_lib.user_update_worker import user_update_worker
+from redis_lib.click_admission import click_admission
+from redis_lib.near_cache import game_state_near_cache
+from redis_lib.click_spool import click_spool
+from redis_lib.leaderboards import leaderboards
+from redis_lib.redis_cache import game_state_cache, synced_keys_query
+from database.player_stats import (
+    COLORS, COLOR_EMOJIS, COLOR_CLICK_COLUMNS, COLOR_CLAIMED_COLUMNS, calculate_click_mmr, build_player_stats_rows
+)
 from utils.chart_generator import ChartGenerator
 from utils.stats_helpers import (
+    aggregate_game_chart_stats,
     get_nearby_ranks,
     format_game_duration,
     calculate_time_to_next_rank,
@@ -35,8 +50,8 @@ from utils.stats_helpers import (
 )
 from text.full_text import LORE_TEXT
 from button.button_functions import setup_roles, create_button_message
-from game.game_cache import game_cache
 import io
+from array import array
 from game.character_handler import CharacterHandler
 from message.voice_generator import generate_audio
 
@@ -241,7 +256,7 @@ async def handle_bot_mention(message, bot):
             ORDER BY click_time DESC
             LIMIT 1
         '''
-        result = execute_query(query, (game_session['game_id'],))
+        result = await execute_query_async(query, (game_session['game_id'],))
         if not result or not result[0]:
             current_timer = game_session['timer_duration']
             current_color = "Purple"  # Default state
@@ -374,17 +389,9 @@ async def handle_message(message, bot, menu_timer):
                         logger.error(f'Error adding role: {e}, {tb}')
                         logger.info('Skipping role addition...')
                     
-                    game_id = create_game_session(admin_role_id, message.guild.id, message.channel.id, chat_channel_id, start_time, timer_duration, cooldown_duration)
-                    
-                    game_session = await get_game_session_by_id(game_id)
-                    game_sessions_as_dict = await game_sessions_dict()
-                    if game_sessions_as_dict:
-                        game_sessions_as_dict[game_id] = game_session
-                    else:
-                        game_sessions_as_dict = {game_id: game_session}
-
-                    update_local_game_sessions()
+                    game_id = await run_db_call(create_game_session, admin_role_id, message.guild.id, message.channel.id, chat_channel_id, start_time, timer_duration, cooldown_duration)
                     
+                    # create_game_session registers the new session in the session registry
                     if game_id in paused_games: 
                         try:
                             paused_games.remove(game_id)
@@ -395,7 +402,6 @@ async def handle_message(message, bot, menu_timer):
                             pass
                     
                     await setup_roles(message.guild.id, bot)
-                    update_local_game_sessions()
                     await create_button_message(game_id, bot)
                 
                 if menu_timer and not menu_timer.update_timer_task.is_running():
@@ -415,7 +421,7 @@ async def handle_message(message, bot, menu_timer):
                 game_session = await get_game_session_by_guild_id(message.guild.id)
                 username = message.author.display_name if message.author.display_name else message.author.name
                 now = 43200
-                result = insert_first_click(game_session['game_id'], user_id, username, now)
+                result = await run_db_call(insert_first_click, game_session['game_id'], user_id, username, now)
                 if result:
                     logger.info(f'First click inserted for {username}')
                     await message.channel.send(f'First click inserted for {username}')
@@ -454,62 +460,69 @@ async def handle_message(message, bot, menu_timer):
                         return
 
             try:
-                # Get user's clicks for current game session
-                query = '''
-                    SELECT 
-                        bc.timer_value,
-                        bc.click_time,
-                        (
-                            SELECT COUNT(DISTINCT u2.user_id)
-                            FROM button_clicks bc2 
-                            JOIN users u2 ON bc2.user_id = u2.user_id 
-                            WHERE bc2.game_id = %s 
-                            AND u2.total_clicks > (
-                                SELECT COUNT(*) 
-                                FROM button_clicks bc3 
-                                WHERE bc3.user_id = %s 
-                                AND bc3.game_id = %s
-                            )
-                        ) + 1 AS user_rank,
-                        (
-                            SELECT COUNT(DISTINCT user_id) 
-                            FROM button_clicks 
-                            WHERE game_id = %s
-                        ) AS total_players
-                    FROM button_clicks bc
-                    WHERE bc.game_id = %s 
-                    AND bc.user_id = %s
-                    ORDER BY bc.click_time
+                # Clicks still in the click queue or the spool are not in MySQL yet; read them first
+                game_id = int(game_session['game_id'])
+                try:
+                    unsynced = await game_state_cache.query_unsynced_clicks()
+                except Exception as e:
+                    logger.warning(f"Could not read unsynced clicks for rank, using the spool only: {e}")
+                    unsynced = click_spool.pending(game_id)
+                unsynced = [click for click in unsynced
+                            if click['game_id'] == game_id and click['user_id'] == target_user_id]
+
+                # Totals come from the game_player_stats rollup, which checks in the same statement
+                # which unsynced clicks it already has; only the click history reads per-click rows
+                synced_query, synced_params = synced_keys_query(2 + len(COLORS), (click['key'] for click in unsynced))
+                stats_query = f'''
+                    SELECT time_claimed, {', '.join(COLOR_CLICK_COLUMNS)}, NULL
+                    FROM game_player_stats
+                    WHERE game_id = %s AND user_id = %s
+                ''' + synced_query
+                history_query = '''
+                    SELECT timer_value, click_key
+                    FROM button_clicks
+                    WHERE game_id = %s AND user_id = %s
+                    ORDER BY click_time
                 '''
-                params = (game_session['game_id'], target_user_id, game_session['game_id'], 
-                        game_session['game_id'], game_session['game_id'], target_user_id)
-                logger.info(f"Executing user rank query with params: {params}")
-                success = execute_query(query, params)
-                if not success: 
+                params = (game_id, target_user_id)
+                logger.info(f"Executing user rank queries with params: {params}")
+                stats, clicks = await asyncio.gather(
+                    execute_query_async(stats_query, params + synced_params),
+                    execute_query_async(history_query, params)
+                )
+                if stats is None or clicks is None: 
                     logger.error('Error retrieving user rank data')
                     await message.channel.send('An error occurred while retrieving rank data!')
                     await message.remove_reaction('⏳', bot.user)
                     await message.add_reaction('❌')
                     return
 
-                clicks = success
-
-                def Counter(emojis):
-                    counts = {}
-                    for emoji in emojis:
-                        if emoji in counts:
-                            counts[emoji] += 1
-                        else:
-                            counts[emoji] = 1
-                    return counts
-
-                if clicks:
-                    color_emojis = [get_color_emoji(timer_value, game_session['timer_duration']) for timer_value, _, _, _ in clicks]
-                    color_counts = Counter(color_emojis)
-                    # Fix: Calculate time claimed as the elapsed time from max timer, not remaining time
-                    total_claimed_time = sum(max(0, game_session['timer_duration'] - timer_value) for timer_value, _, _, _ in clicks)
-                    rank = clicks[0][2]  # Get rank from first row
-                    total_players = clicks[0][3]  # Get total players from first row
+                synced = {row[-1] for row in stats if row[-1] is not None}
+                stats = [list(row[:-1]) for row in stats if row[-1] is None]
+                history_keys = {click_key for _, click_key in clicks}
+                # Unsynced clicks the rollup does not have yet, with the same arithmetic as the rollup
+                folded = [click for click in unsynced if click['key'] not in synced]
+                for row in build_player_stats_rows(
+                    [(game_id, click['user_id'], click['click_time'], click['timer_value']) for click in folded],
+                    {game_id: game_session['timer_duration']}
+                ):
+                    if not stats:
+                        stats = [[0] * (1 + len(COLORS))]
+                    stats[0][0] += row[4]
+                    for index, count in enumerate(row[5:5 + len(COLORS)]):
+                        stats[0][1 + index] += count
+                clicks = [timer_value for timer_value, _ in clicks]
+                clicks += [round(click['timer_value']) for click in unsynced if click['key'] not in history_keys]
+
+                if stats and clicks:
+                    color_emojis = [get_color_emoji(timer_value, game_session['timer_duration']) for timer_value in clicks]
+                    total_claimed_time = stats[0][0]
+                    color_counts = {COLOR_EMOJIS[color]: count for color, count in zip(COLORS, stats[0][1:]) if count}
+                    # Ranks from the leaderboards kept by click admission (None until they are built)
+                    mmr_rank, claimed_rank = await asyncio.gather(
+                        leaderboards.game_rank(game_session['game_id'], 'mmr', target_user_id),
+                        leaderboards.game_rank(game_session['game_id'], 'claimed', target_user_id)
+                    )
 
                     if not is_other_user:
                         user_name = message.author.display_name if message.author.display_name else message.author.name
@@ -528,6 +541,12 @@ async def handle_message(message, bot, menu_timer):
                     color_summary = ', '.join(f'{emoji} x{count}' for emoji, count in color_counts.items())
                     embed.add_field(name='🎨 Color Summary', value=color_summary, inline=False)
                     embed.add_field(name='⏱☘ Total Time Claimed*', value=format_time(total_claimed_time), inline=False)
+                    if mmr_rank and claimed_rank and mmr_rank[0] and claimed_rank[0]:
+                        embed.add_field(
+                            name='🏅 Rank',
+                            value=f'#{mmr_rank[0]} of {mmr_rank[1]} by MMR • #{claimed_rank[0]} by time claimed',
+                            inline=False
+                        )
                     
                     # Split emoji sequence if it's too long
                     max_emojis_per_embed = 200  # Adjust as needed
@@ -602,7 +621,7 @@ async def handle_message(message, bot, menu_timer):
                     LIMIT 10
                 '''
                 params = (game_session['game_id'],)
-                last_10 = execute_query(query, params)
+                last_10 = await execute_query_async(query, params)
         
                 if not last_10:
                     await message.channel.send('No clicks found for this game session!')
@@ -666,7 +685,7 @@ async def handle_message(message, bot, menu_timer):
                     LIMIT 10
                 '''
                 params = (game_session['game_id'],)
-                last_10 = execute_query(query, params)
+                last_10 = await execute_query_async(query, params)
 
                 if not last_10:
                     await message.channel.send('No clicks found for this game session!')
@@ -766,51 +785,61 @@ async def handle_message(message, bot, menu_timer):
                     298320373542420482: "June 2024",  # Honeybee
                 }
                 
-                # Get all game sessions for the guild
-                game_sessions_query = '''
-                    SELECT id 
-                    FROM game_sessions 
-                    WHERE guild_id = %s
-                '''
-                game_sessions = execute_query(game_sessions_query, (message.guild.id,))
+                # Monthly time claimed leaderboard kept by click admission in Redis
+                month_top = await leaderboards.month_top(message.guild.id, target_year, target_month, 20)
+                if month_top is not None:
+                    names = await leaderboards.user_names([user_id for user_id, *_ in month_top])
+                    # Color counts come Red..Purple; the rows below list them Purple..Red
+                    time_claimed_data = [
+                        (names.get(user_id, str(user_id)), user_id, int(time_claimed), total_clicks, *reversed(color_counts))
+                        for user_id, time_claimed, total_clicks, color_counts in month_top
+                    ]
+                else:
+                    # Get all game sessions for the guild
+                    game_sessions_query = '''
+                        SELECT id 
+                        FROM game_sessions 
+                        WHERE guild_id = %s
+                    '''
+                    game_sessions = await execute_query_async(game_sessions_query, (message.guild.id,))
                 
-                if not game_sessions:
-                    await message.channel.send('No game sessions found for this server!')
-                    await message.remove_reaction('⏳', bot.user)
-                    return
+                    if not game_sessions:
+                        await message.channel.send('No game sessions found for this server!')
+                        await message.remove_reaction('⏳', bot.user)
+                        return
                     
-                # Extract game IDs
-                game_ids = [gs[0] for gs in game_sessions]
-                game_ids_placeholders = ', '.join(['%s'] * len(game_ids))
+                    # Extract game IDs
+                    game_ids = [gs[0] for gs in game_sessions]
+                    game_ids_placeholders = ', '.join(['%s'] * len(game_ids))
                 
-                # Query for monthly time claimed data with color distribution (NO EXCLUSIONS)
-                query = f'''
-                    SELECT 
-                        u.user_name,
-                        u.user_id,
-                        SUM(GREATEST(0, gs.timer_duration - bc.timer_value)) AS time_claimed,
-                        COUNT(*) AS total_clicks,
-                        SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) >= 83.33 THEN 1 ELSE 0 END) AS purple_clicks,
-                        SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) >= 66.67 AND ROUND((bc.timer_value / gs.timer_duration) * 100, 2) < 83.33 THEN 1 ELSE 0 END) AS blue_clicks,
-                        SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) >= 50.00 AND ROUND((bc.timer_value / gs.timer_duration) * 100, 2) < 66.67 THEN 1 ELSE 0 END) AS green_clicks,
-                        SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) >= 33.33 AND ROUND((bc.timer_value / gs.timer_duration) * 100, 2) < 50.00 THEN 1 ELSE 0 END) AS yellow_clicks,
-                        SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) >= 16.67 AND ROUND((bc.timer_value / gs.timer_duration) * 100, 2) < 33.33 THEN 1 ELSE 0 END) AS orange_clicks,
-                        SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) < 16.67 THEN 1 ELSE 0 END) AS red_clicks
-                    FROM button_clicks bc
-                    JOIN game_sessions gs ON bc.game_id = gs.id
-                    JOIN users u ON bc.user_id = u.user_id
-                    WHERE bc.game_id IN ({game_ids_placeholders})
-                    AND YEAR(bc.click_time) = %s 
-                    AND MONTH(bc.click_time) = %s
-                    GROUP BY u.user_name, u.user_id
-                    ORDER BY time_claimed DESC
-                    LIMIT 20
-                '''
+                    # Query for monthly time claimed data with color distribution (NO EXCLUSIONS)
+                    query = f'''
+                        SELECT 
+                            u.user_name,
+                            u.user_id,
+                            SUM(GREATEST(0, gs.timer_duration - bc.timer_value)) AS time_claimed,
+                            COUNT(*) AS total_clicks,
+                            SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) >= 83.33 THEN 1 ELSE 0 END) AS purple_clicks,
+                            SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) >= 66.67 AND ROUND((bc.timer_value / gs.timer_duration) * 100, 2) < 83.33 THEN 1 ELSE 0 END) AS blue_clicks,
+                            SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) >= 50.00 AND ROUND((bc.timer_value / gs.timer_duration) * 100, 2) < 66.67 THEN 1 ELSE 0 END) AS green_clicks,
+                            SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) >= 33.33 AND ROUND((bc.timer_value / gs.timer_duration) * 100, 2) < 50.00 THEN 1 ELSE 0 END) AS yellow_clicks,
+                            SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) >= 16.67 AND ROUND((bc.timer_value / gs.timer_duration) * 100, 2) < 33.33 THEN 1 ELSE 0 END) AS orange_clicks,
+                            SUM(CASE WHEN ROUND((bc.timer_value / gs.timer_duration) * 100, 2) < 16.67 THEN 1 ELSE 0 END) AS red_clicks
+                        FROM button_clicks bc
+                        JOIN game_sessions gs ON bc.game_id = gs.id
+                        JOIN users u ON bc.user_id = u.user_id
+                        WHERE bc.game_id IN ({game_ids_placeholders})
+                        AND YEAR(bc.click_time) = %s 
+                        AND MONTH(bc.click_time) = %s
+                        GROUP BY u.user_name, u.user_id
+                        ORDER BY time_claimed DESC
+                        LIMIT 20
+                    '''
                 
-                # Create parameters list with game IDs, year, month (no excluded users)
-                params = game_ids + [target_year, target_month]
+                    # Create parameters list with game IDs, year, month (no excluded users)
+                    params = game_ids + [target_year, target_month]
                 
-                time_claimed_data = execute_query(query, params)
+                    time_claimed_data = await execute_query_async(query, params)
                 
                 if not time_claimed_data:
                     month_name = datetime.date(target_year, target_month, 1).strftime('%B %Y')
@@ -954,7 +983,8 @@ async def handle_message(message, bot, menu_timer):
                     await message.channel.send('No active game session found in this server!')
                     return
 
-                # Get all clicks for the current game session ordered by click time (oldest first)
+                # Stream all clicks for the current game session ordered by click time (oldest first),
+                # building the emoji rows and counts as the rows arrive
                 query = '''
                     SELECT timer_value 
                     FROM button_clicks 
@@ -962,46 +992,33 @@ async def handle_message(message, bot, menu_timer):
                     ORDER BY click_time ASC
                 '''
                 params = (game_session['game_id'],)
-                success = execute_query(query, params)
-                
-                if not success:
-                    logger.error('Failed to retrieve click data')
-                    await message.channel.send('An error occurred while retrieving click data!')
-                    await message.remove_reaction('🔄', bot.user)
-                    return
-
-                clicks = success
-                if not clicks:
+                emoji_counts = {'🟣': 0, '🔵': 0, '🟢': 0, '🟡': 0, '🟠': 0, '🔴': 0}
+                rows = []
+                current_row = []
+                async for (timer_value,) in stream_rows(query, params):
+                    emoji = get_color_emoji(timer_value, game_session['timer_duration'])
+                    emoji_counts[emoji] = emoji_counts.get(emoji, 0) + 1
+                    current_row.append(emoji)
+                    if len(current_row) == 10:
+                        rows.append(''.join(current_row))
+                        current_row = []
+                if current_row:
+                    rows.append(''.join(current_row))
+
+                total_clicks = sum(emoji_counts.values())
+                if not total_clicks:
                     await message.channel.send('No clicks found for this game session!')
                     await message.remove_reaction('🔄', bot.user)
                     return
 
-                # Convert timer values to emojis
-                click_emojis = [get_color_emoji(click[0], game_session['timer_duration']) for click in clicks]
-                
-                # Count occurrences of each emoji for the summary
-                emoji_counts = {
-                    '🟣': click_emojis.count('🟣'),  # Purple
-                    '🔵': click_emojis.count('🔵'),  # Blue
-                    '🟢': click_emojis.count('🟢'),  # Green
-                    '🟡': click_emojis.count('🟡'),  # Yellow
-                    '🟠': click_emojis.count('🟠'),  # Orange
-                    '🔴': click_emojis.count('🔴')   # Red
-                }
-
                 # Send summary first
                 summary_embed = nextcord.Embed(
                     title=f'Click Summary for Game #{game_session["game_id"]}',
                     description='\n'.join([f'{emoji}: {count}' for emoji, count in emoji_counts.items() if count > 0]) +
-                              f'\n\nTotal Clicks: {len(click_emojis)}'
+                              f'\n\nTotal Clicks: {total_clicks}'
                 )
                 await message.channel.send(embed=summary_embed)
 
-                # Create rows of 10 emojis each
-                rows = []
-                for i in range(0, len(click_emojis), 10):
-                    rows.append(''.join(click_emojis[i:i+10]))
-
                 # Send rows in chunks of 15 rows per embed
                 MAX_ROWS_PER_EMBED = 15
                 current_page = 1
@@ -1105,7 +1122,7 @@ async def handle_message(message, bot, menu_timer):
                 )
                 
                 logger.info(f"Executing edge stats query with boundary threshold of {boundary_threshold_seconds} seconds ({boundary_threshold_percent}%)")
-                results = execute_query(query, params)
+                results = await execute_query_async(query, params)
                 
                 # Fix: Check if results is a valid iterable before assigning to edge_stats
                 if results is not None and not isinstance(results, bool):
@@ -1180,62 +1197,37 @@ async def handle_message(message, bot, menu_timer):
                 await message.channel.send('No active game session found in this server!')
                 return
             
-            click_count = check_button_clicks(game_session['game_id'])
-            if click_count == 0:
-                logger.warning(f"No button clicks found for game {game_session['game_id']} - this may explain empty leaderboard")
-            
             try:
-                # Query to get collective time claimed for each color tier
-                query = '''
-                    SELECT 
-                        CASE
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 16.67 THEN 'Red'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 33.33 THEN 'Orange'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 50.00 THEN 'Yellow'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 66.67 THEN 'Green'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 83.33 THEN 'Blue'
-                            ELSE 'Purple'
-                        END as tier_name,
-                        COUNT(*) as click_count,
-                        SUM(GREATEST(0, %s - bc.timer_value)) as total_time_claimed,
-                        COUNT(DISTINCT bc.user_id) as unique_clickers,
-                        SUM(GREATEST(0, %s - bc.timer_value)) / COUNT(*) as avg_claimed_per_click,
-                        SUM(GREATEST(0, %s - bc.timer_value)) / COUNT(DISTINCT bc.user_id) as avg_claimed_per_user
-                    FROM button_clicks bc
-                    WHERE bc.game_id = %s
-                    GROUP BY 
-                        CASE
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 16.67 THEN 'Red'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 33.33 THEN 'Orange'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 50.00 THEN 'Yellow'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 66.67 THEN 'Green'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 83.33 THEN 'Blue'
-                            ELSE 'Purple'
-                        END
-                    ORDER BY MIN(ROUND((bc.timer_value / %s) * 100, 2)) ASC
-                '''
-                params = (
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],  # For total_time_claimed
-                    game_session['timer_duration'],  # For avg_claimed_per_click
-                    game_session['timer_duration'],  # For avg_claimed_per_user
-                    game_session['game_id'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration']
-                )
-                
-                logger.info(f"Executing tier stats query: {query}")
-                logger.info(f"With params: {params}")
-                results = execute_query(query, params)
-                tier_stats = results if results else []
+                # Collective time claimed per color tier, kept by click admission in Redis
+                tier_totals = await leaderboards.game_tiers(game_session['game_id'])
+                if tier_totals is None:
+                    # Leaderboard not built yet: sum the game_player_stats rollup instead
+                    click_count = await run_db_call(check_button_clicks, game_session['game_id'])
+                    if click_count == 0:
+                        logger.warning(f"No button clicks found for game {game_session['game_id']} - this may explain empty leaderboard")
+                    tier_columns = ', '.join(
+                        f'SUM({clicks_column}), SUM({claimed_column}), SUM({clicks_column} > 0)'
+                        for clicks_column, claimed_column in zip(COLOR_CLICK_COLUMNS, COLOR_CLAIMED_COLUMNS)
+                    )
+                    query = f'''
+                        SELECT {tier_columns}
+                        FROM game_player_stats
+                        WHERE game_id = %s
+                    '''
+                    results = await execute_query_async(query, (game_session['game_id'],))
+                    totals = results[0] if results and results[0] else [0] * (len(COLORS) * 3)
+                    tier_totals = [
+                        tuple(int(value or 0) for value in totals[index * 3:index * 3 + 3])
+                        for index in range(len(COLORS))
+                    ]
+                tier_stats = []
+                for tier_name, (clicks, time_claimed, unique_clickers) in zip(COLORS, tier_totals):
+                    if not clicks:
+                        continue
+                    tier_stats.append((
+                        tier_name, clicks, time_claimed, unique_clickers,
+                        time_claimed / clicks, time_claimed / unique_clickers
+                    ))
 
                 # Add emoji mapping
                 emoji_map = {
@@ -1326,84 +1318,81 @@ async def handle_message(message, bot, menu_timer):
                     pass
 
             try:
-                # Get most clicks (MMR-based ranking)
-                query = '''
-                    SELECT 
-                        u.user_name,
-                        COUNT(*) AS total_clicks,
-                        GROUP_CONCAT(
-                            CASE
-                                WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 83.33 THEN '🟣'
-                                WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 66.67 THEN '🔵'
-                                WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 50.00 THEN '🟢'
-                                WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 33.33 THEN '🟡'
-                                WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 16.67 THEN '🟠'
-                                ELSE '🔴'
-                            END
-                            ORDER BY bc.timer_value
-                            SEPARATOR ''
-                        ) AS color_sequence,
-                        SUM(
-                            POWER(2, 5 - FLOOR((bc.timer_value / %s) * 100 / 16.66667)) * 
-                            (1 + 
-                                CASE 
-                                    WHEN (bc.timer_value / %s) * 100 < 33.33 
-                                    THEN 1 - (MOD((bc.timer_value / %s) * 100, 16.66667) / 16.66667)
-                                    ELSE 1 - ABS(0.5 - (MOD((bc.timer_value / %s) * 100, 16.66667) / 16.66667))
-                                END
-                            ) * (%s / 43200)
-                        ) AS mmr_score
-                    FROM button_clicks bc
-                    JOIN users u ON bc.user_id = u.user_id
-                    WHERE bc.game_id = %s
-                    GROUP BY u.user_id
-                    ORDER BY mmr_score DESC, total_clicks DESC
-                    LIMIT %s
-                '''
-                params = tuple([game_session['timer_duration']] * 10 + [game_session['game_id'], num_entries])
-                most_clicks = execute_query(query, params)
+                game_id = game_session['game_id']
+                most_clicks = lowest_individual_clicks = most_time_claimed = None
+
+                # Top players from the leaderboards kept by click admission in Redis
+                top_mmr = await leaderboards.game_top(game_id, 'mmr', num_entries)
+                if top_mmr is not None:
+                    top_ids = [user_id for user_id, _ in top_mmr]
+                    clicks_by_user = await leaderboards.game_scores(game_id, 'clicks', top_ids)
+                    color_counts = await leaderboards.game_color_counts(game_id, top_ids)
+                    # Swiftest is each player's best click, so one entry per player
+                    best_timers = await leaderboards.game_top(game_id, 'best_timer', num_entries)
+                    top_claimed = await leaderboards.game_top(game_id, 'claimed', num_entries)
+                    if None not in (clicks_by_user, color_counts, best_timers, top_claimed):
+                        names = await leaderboards.user_names(list(
+                            {user_id for user_id, _ in top_mmr + best_timers + top_claimed}
+                        ))
+                        most_clicks = [
+                            (names.get(user_id, str(user_id)), int(clicks_by_user[user_id]), *color_counts[user_id], mmr)
+                            for user_id, mmr in top_mmr
+                        ]
+                        lowest_individual_clicks = [
+                            (names.get(user_id, str(user_id)), int(timer_value),
+                             get_color_emoji(timer_value, game_session['timer_duration']))
+                            for user_id, timer_value in best_timers
+                        ]
+                        most_time_claimed = [
+                            (names.get(user_id, str(user_id)), int(time_claimed))
+                            for user_id, time_claimed in top_claimed
+                        ]
+
+                if most_clicks is None:
+                    # Get most clicks (MMR-based ranking) from the game_player_stats rollup
+                    query = f'''
+                        SELECT 
+                            u.user_name,
+                            gps.clicks,
+                            {', '.join('gps.' + column for column in COLOR_CLICK_COLUMNS)},
+                            gps.mmr
+                        FROM game_player_stats gps
+                        JOIN users u ON gps.user_id = u.user_id
+                        WHERE gps.game_id = %s
+                        ORDER BY gps.mmr DESC, gps.clicks DESC
+                        LIMIT %s
+                    '''
+                    params = (game_session['game_id'], num_entries)
+                    most_clicks = await execute_query_async(query, params)
 
-                # Get lowest individual clicks
-                query = '''
-                    SELECT 
-                        u.user_name, 
-                        bc.timer_value,
-                        CASE
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 83.33 THEN '🟣'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 66.67 THEN '🔵'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 50.00 THEN '🟢'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 33.33 THEN '🟡'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 16.67 THEN '🟠'
-                            ELSE '🔴'
-                        END as color_emoji
-                    FROM button_clicks bc
-                    JOIN users u ON bc.user_id = u.user_id
-                    WHERE bc.game_id = %s
-                    ORDER BY bc.timer_value
-                    LIMIT %s
-                '''
-                params = tuple([game_session['timer_duration']] * 5 + [game_session['game_id'], num_entries])
-                lowest_individual_clicks = execute_query(query, params)
+                    # Get lowest individual clicks: each player's best click, as on the Redis path
+                    query = '''
+                        SELECT u.user_name, gps.best_timer
+                        FROM game_player_stats gps
+                        JOIN users u ON gps.user_id = u.user_id
+                        WHERE gps.game_id = %s AND gps.best_timer IS NOT NULL
+                        ORDER BY gps.best_timer
+                        LIMIT %s
+                    '''
+                    params = (game_session['game_id'], num_entries)
+                    lowest_individual_clicks = [
+                        (user_name, int(timer_value), get_color_emoji(timer_value, game_session['timer_duration']))
+                        for user_name, timer_value in await execute_query_async(query, params)
+                    ]
 
-                # Get most time claimed
-                query = '''
-                    SELECT
-                        u.user_name,
-                        SUM(
-                            CASE 
-                                WHEN bc.timer_value <= %s THEN %s - bc.timer_value
-                                ELSE 0
-                            END
-                        ) AS total_time_claimed
-                    FROM button_clicks bc
-                    JOIN users u ON bc.user_id = u.user_id
-                    WHERE bc.game_id = %s
-                    GROUP BY u.user_id
-                    ORDER BY total_time_claimed DESC
-                    LIMIT %s
-                '''
-                params = (game_session['timer_duration'], game_session['timer_duration'], game_session['game_id'], num_entries)
-                most_time_claimed = execute_query(query, params)
+                    # Get most time claimed
+                    query = '''
+                        SELECT
+                            u.user_name,
+                            gps.time_claimed
+                        FROM game_player_stats gps
+                        JOIN users u ON gps.user_id = u.user_id
+                        WHERE gps.game_id = %s
+                        ORDER BY gps.time_claimed DESC
+                        LIMIT %s
+                    '''
+                    params = (game_session['game_id'], num_entries)
+                    most_time_claimed = await execute_query_async(query, params)
 
                 # Helper function to get display name
                 def get_display_name(username):
@@ -1431,7 +1420,7 @@ async def handle_message(message, bot, menu_timer):
                 if most_clicks:
                     clickers_text = ""
                     shown_count = 0
-                    for user, clicks, seq, mmr_score in most_clicks:
+                    for user, clicks, *counts, mmr_score in most_clicks:
                         if shown_count >= num_entries or len(clickers_text) > 800:  # Character limit check
                             remaining = len(most_clicks) - shown_count
                             if remaining > 0:
@@ -1439,12 +1428,11 @@ async def handle_message(message, bot, menu_timer):
                             break
                         
                         display_name = get_display_name(user)
-                        # Compress color sequence to counts
+                        # Color counts from purple down to red
                         color_counts = []
-                        for emoji in ["🟣", "🔵", "🟢", "🟡", "🟠", "🔴"]:
-                            count = seq.count(emoji)
+                        for color, count in reversed(list(zip(COLORS, counts))):
                             if count > 0:
-                                color_counts.append(f"{emoji}×{count}")
+                                color_counts.append(f"{COLOR_EMOJIS[color]}×{count}")
                         
                         color_summary = " ".join(color_counts) if color_counts else "No colors"
                         clickers_text += f"**{display_name}**: {clicks} clicks (MMR: {mmr_score:.1f})\n{color_summary}\n\n"
@@ -1516,7 +1504,7 @@ async def handle_message(message, bot, menu_timer):
                     return
 
                 # Get guild icon first
-                guild_icon = get_or_create_guild_icon(message.guild.id)
+                guild_icon = await run_db_call(get_or_create_guild_icon, message.guild.id)
                 
                 # Get all game stats - Split the query into smaller parts for better reliability
                 # First get basic game stats
@@ -1537,8 +1525,33 @@ async def handle_message(message, bot, menu_timer):
                 ORDER BY duration_seconds DESC
                 '''
                 
-                # Execute the first part of the query
-                results = execute_query(basic_query)
+                # Click and player totals (and the click ranking) are kept by click admission in
+                # Redis, so only the session durations need MySQL when they are available
+                sessions_query = '''
+                SELECT 
+                    gs.id as game_id,
+                    gs.guild_id,
+                    gs.start_time,
+                    COALESCE(gs.end_time, UTC_TIMESTAMP()) as end_time,
+                    TIMESTAMPDIFF(SECOND, gs.start_time, 
+                        COALESCE(gs.end_time, UTC_TIMESTAMP())) as duration_seconds,
+                    CASE WHEN gs.end_time IS NULL THEN 1 ELSE 0 END as is_active
+                FROM game_sessions gs
+                ORDER BY duration_seconds DESC
+                '''
+                sessions = await execute_query_async(sessions_query)
+                game_totals = await leaderboards.game_totals([row[0] for row in sessions]) if sessions else None
+                clicks_ranks = {}
+                if game_totals is not None:
+                    results = []
+                    for game_id, guild_id, start_time, end_time, duration_seconds, is_active in sessions:
+                        total_clicks, total_players, clicks_rank = game_totals[game_id]
+                        results.append((game_id, guild_id, start_time, end_time, total_players, total_clicks,
+                                        duration_seconds, is_active))
+                        clicks_ranks[game_id] = clicks_rank
+                else:
+                    # Execute the first part of the query
+                    results = await execute_query_async(basic_query)
                 
                 # Check if the query results are valid
                 if not results or isinstance(results, bool):
@@ -1557,7 +1570,7 @@ async def handle_message(message, bot, menu_timer):
                     WHERE gs.id = %s
                     '''
                     
-                    fallback_results = execute_query(fallback_query, (game_session['game_id'],))
+                    fallback_results = await execute_query_async(fallback_query, (game_session['game_id'],))
                     
                     if fallback_results and not isinstance(fallback_results, bool):
                         # Create a simplified structure for just the current game with default values
@@ -1592,7 +1605,7 @@ async def handle_message(message, bot, menu_timer):
                             'duration_seconds': row[6],
                             'is_active': row[7],
                             'duration_rank': rank,
-                            'clicks_rank': 1  # We'll calculate this separately if needed
+                            'clicks_rank': clicks_ranks.get(row[0]) or 1
                         })
                         rank += 1
                         
@@ -1674,7 +1687,7 @@ async def handle_message(message, bot, menu_timer):
                         
                         # Handle potential errors with guild icon retrieval
                         try:
-                            game_guild_icon = get_or_create_guild_icon(game['guild_id'])
+                            game_guild_icon = await run_db_call(get_or_create_guild_icon, game['guild_id'])
                         except Exception as e:
                             logger.warning(f"Error getting guild icon for {game['guild_id']}: {e}")
                             game_guild_icon = "🏆"  # Fallback icon
@@ -1729,7 +1742,7 @@ async def handle_message(message, bot, menu_timer):
                 return
                 
             new_icon = message.content[9:].strip()
-            if update_guild_icon(message.guild.id, new_icon):
+            if await run_db_call(update_guild_icon, message.guild.id, new_icon):
                 await message.channel.send(f"Your realm's icon has been updated to {new_icon}!")
             else:
                 available_icons = " ".join(GUILD_EMOJIS)
@@ -1788,13 +1801,6 @@ async def handle_message(message, bot, menu_timer):
                     '''
                     params = (game_session['game_id'], limit)
 
-                results = execute_query(query, params)
-                
-                if not results:
-                    await message.channel.send('No clicks found!')
-                    await message.remove_reaction('⏳', bot.user)
-                    return
-
                 # Create embed
                 title = f"🎯 The Button - {'Global ' if is_global else ''}Lowest {limit} Clicks"
                 embed = nextcord.Embed(title=title)
@@ -1803,7 +1809,8 @@ async def handle_message(message, bot, menu_timer):
                 current_field = ""
                 field_count = 1
                 
-                for timer_value, click_time, user_name, guild_id, game_session_id in results:
+                # The global ordering scans every click, so read it on the stream pool
+                async for timer_value, click_time, user_name, guild_id, game_session_id in stream_rows(query, params):
                     # Get color emoji based on timer value
                     color_emoji = get_color_emoji(timer_value)
                     
@@ -1830,6 +1837,10 @@ async def handle_message(message, bot, menu_timer):
                     else:
                         current_field += entry
 
+                if not current_field and field_count == 1:
+                    await message.channel.send('No clicks found!')
+                    return
+
                 # Add the last field if there's any content
                 if current_field:
                     embed.add_field(
@@ -1894,7 +1905,8 @@ async def handle_message(message, bot, menu_timer):
                     '`force_update_button` — Force recreate the button message (admin only)\n'
                     '`!seticon <emoji>` — Change your server\'s button rank icon (admin only)\n'
                     '`i would like a new button pretty please!` — Create a new button game (admin only)\n'
-                    '`insert_first_click` — Insert a first click for the current game (debug/admin)'
+                    '`insert_first_click` — Insert a first click for the current game (debug/admin)\n'
+                    '`dbstats [reset]` — Database pool, query, lock and click queue metrics (bot owner only)'
                 ),
                 inline=False
             )
@@ -1932,7 +1944,7 @@ async def handle_message(message, bot, menu_timer):
                     WHERE user_id = %s AND game_id = %s
                 '''
                 params = (user_check_id, game_session['game_id'])
-                last_click_result = execute_query(query, params)
+                last_click_result = await execute_query_async(query, params)
             
                 now_utc = datetime.datetime.now(datetime.timezone.utc)
         
@@ -1978,6 +1990,40 @@ async def handle_message(message, bot, menu_timer):
 
         
 
+        elif message.content.lower().startswith('dbstats'):
+            # Pool and query metrics cover every server, so this is restricted to the bot owner
+            if message.author.id != 692926265405079632:
+                await message.channel.send('Only the bot owner can view database metrics.')
+                return
+            try:
+                if message.content.lower().split()[-1] == 'reset':
+                    pool_metrics.reset()
+                    lock_metrics.reset()
+                    click_admission.reset_stats()
+                    game_state_near_cache.reset_stats()
+                    await message.channel.send('Database metrics have been reset.')
+                    return
+                
+                # Pack report sections into code blocks under Discord's 2000 character limit
+                chunks, current = [], ''
+                sections = (pool_metrics.format_report() + lock_metrics.format_report()
+                            + click_admission.format_report() + game_state_near_cache.format_report()
+                            + await sync_worker.format_report() + await user_update_worker.format_report()
+                            + click_spool.format_report())
+                for section in sections:
+                    if current and len(current) + len(section) + 2 > 1900:
+                        chunks.append(current)
+                        current = ''
+                    current += section + '\n\n'
+                if current:
+                    chunks.append(current)
+                for chunk in chunks:
+                    await message.channel.send(f'```\n{chunk[:1900]}```')
+            except Exception as e:
+                tb = traceback.format_exc()
+                logger.error(f'Error dumping database metrics: {e}\n{tb}')
+                await message.channel.send('An error occurred while collecting database metrics!')
+
         elif message.content.lower() == 'force_update_button':
             if message.author.id != 692926265405079632:
                 if not message.author.guild_permissions.administrator:
@@ -2012,31 +2058,33 @@ async def handle_message(message, bot, menu_timer):
 
         elif message.content.lower() == 'ended':
             try:
-                query = '''
+                # The current game, or the guild's most recent one if it has already ended
+                game_session = await get_game_session_by_guild_id(message.guild.id)
+                if game_session:
+                    game_id, timer_duration = game_session['game_id'], game_session['timer_duration']
+                else:
+                    latest = await execute_query_async(
+                        'SELECT id, timer_duration FROM game_sessions WHERE guild_id = %s ORDER BY id DESC LIMIT 1',
+                        (message.guild.id,)
+                    )
+                    if not latest:
+                        await message.channel.send('No game found for this server!')
+                        return
+                    game_id, timer_duration = latest[0]
+
+                # Per-player totals come from the game_player_stats rollup, streamed one player at a time
+                query = f'''
                     SELECT 
                         u.user_name,
-                        COUNT(*) AS total_clicks,
-                        MIN(bc.timer_value) AS lowest_click_time,
-                        GROUP_CONCAT(
-                            CASE
-                                WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 83.33 THEN '🟣'
-                                WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 66.67 THEN '🔵'
-                                WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 50.00 THEN '🟢'
-                                WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 33.33 THEN '🟡'
-                                WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 16.67 THEN '🟠'
-                                ELSE '🔴'
-                            END
-                            ORDER BY bc.timer_value
-                            SEPARATOR ''
-                        ) AS color_sequence
-                    FROM button_clicks bc
-                    JOIN users u ON bc.user_id = u.user_id
-                    GROUP BY u.user_id
-                    ORDER BY lowest_click_time
+                        gps.clicks,
+                        gps.best_timer,
+                        {', '.join(f'gps.{column}' for column in COLOR_CLICK_COLUMNS)}
+                    FROM game_player_stats gps
+                    JOIN users u ON gps.user_id = u.user_id
+                    WHERE gps.game_id = %s
+                    ORDER BY gps.best_timer
                 '''
-                params = (game_session['timer_duration'],) * 5  # For each CASE condition
-                success = execute_query(query, params)
-                all_users_data = success
+                params = (game_id,)
                 
                 embed = nextcord.Embed(
                     title='🎉 The Button Game Has Ended! 🎉',
@@ -2047,8 +2095,14 @@ async def handle_message(message, bot, menu_timer):
                 field_count = 1
                 all_users_value = ""
                 
-                for user, clicks, lowest_time, seq in all_users_data:
-                    user_data = f'{user.replace(".", "")}: {clicks} clicks, Lowest: {format_time(lowest_time)} {" ".join(emoji + "x" + str(seq.count(emoji)) for emoji in ["🟣", "🔵", "🟢", "🟡", "🟠", "🔴"] if emoji in seq)}\n'
+                lowest_overall = None
+                
+                async for user, clicks, lowest_time, *color_counts in stream_rows(query, params):
+                    if lowest_overall is None:
+                        lowest_overall = lowest_time
+                    counts = dict(zip(COLORS, color_counts))
+                    color_summary = " ".join(f"{COLOR_EMOJIS[color]}x{counts[color]}" for color in reversed(COLORS) if counts[color])
+                    user_data = f'{user.replace(".", "")}: {clicks} clicks, Lowest: {format_time(lowest_time)} {color_summary}\n'
                     
                     if len(all_users_value) + len(user_data) > max_field_length:
                         embed.add_field(name=f'🏅 Adventurers of the Button (Part {field_count}) 🏅', value=all_users_value, inline=False)
@@ -2059,9 +2113,9 @@ async def handle_message(message, bot, menu_timer):
                 
                 if all_users_value: embed.add_field(name=f'🏅 Adventurers of the Button (Part {field_count}) 🏅', value=all_users_value, inline=False)
                 
-                if not all_users_data: embed.add_field(name='🏅 Adventurers of the Button 🏅', value='No data available', inline=False)
+                if lowest_overall is None: embed.add_field(name='🏅 Adventurers of the Button 🏅', value='No data available', inline=False)
                 
-                if all_users_data: color = get_color_state(all_users_data[0][2]); embed.color = nextcord.Color.from_rgb(*color)
+                if lowest_overall is not None: color = get_color_state(lowest_overall, timer_duration); embed.color = nextcord.Color.from_rgb(*color)
                 else: embed.color = nextcord.Color.from_rgb(106, 76, 147)  # Default color if no data available
 
                 await message.channel.send(embed=embed)
@@ -2127,7 +2181,7 @@ async def handle_message(message, bot, menu_timer):
                     
                     # Create game session with force_create=True
                     logger.info(f"Creating new game session for guild {message.guild.id}, channel {message.channel.id}, chat {chat_channel_id}")
-                    game_id = create_game_session(admin_role_id, message.guild.id, message.channel.id, 
+                    game_id = await run_db_call(create_game_session, admin_role_id, message.guild.id, message.channel.id, 
                                                 chat_channel_id, start_time, timer_duration, cooldown_duration)
                     
                     if not game_id:
@@ -2138,10 +2192,7 @@ async def handle_message(message, bot, menu_timer):
                         
                     logger.info(f"Game session created with ID: {game_id}")
                     
-                    # Update local game sessions
-                    update_local_game_sessions()
-                    
-                    # Get the newly created game session
+                    # Get the newly created game session (registered by create_game_session)
                     game_session = await get_game_session_by_id(game_id)
                     if not game_session:
                         #await message.channel.send('❌ Game session created but could not be retrieved. Please try again.')
@@ -2195,13 +2246,7 @@ async def handle_message(message, bot, menu_timer):
                     
                     # Insert first click using properly retrieved game_id
                     try:
-                        query = """
-                            INSERT INTO button_clicks 
-                            (game_id, user_id, click_time, timer_value) 
-                            VALUES (%s, %s, UTC_TIMESTAMP(), %s)
-                        """
-                        params = (game_id, message.author.id, timer_duration)
-                        success = execute_query(query, params, commit=True)
+                        success = await record_clicks_async([(game_id, message.author.id, datetime.datetime.now(timezone.utc), timer_duration)])
                         if not success:
                             logger.error(f'Failed to insert first click for game {game_id}')
                             # await message.channel.send('❌ Game created but first click could not be inserted. Try using "insert_first_click" command.')
@@ -2293,78 +2338,48 @@ async def handle_message(message, bot, menu_timer):
                         return
                     user_name = target_user.display_name if hasattr(target_user, 'display_name') else target_user.name
 
-                # Get user's clicks for current game session
-                query = '''
+                # Totals and rank come from the game_player_stats rollup; only the history reads per-click rows
+                stats_query = f'''
                     SELECT 
-                        bc.timer_value,
-                        bc.click_time,
+                        gps.clicks,
+                        gps.time_claimed,
+                        gps.best_timer,
+                        {', '.join('gps.' + column for column in COLOR_CLICK_COLUMNS)},
                         (
-                            SELECT COUNT(DISTINCT u2.user_id)
-                            FROM button_clicks bc2 
-                            JOIN users u2 ON bc2.user_id = u2.user_id 
-                            WHERE bc2.game_id = %s 
-                            AND u2.total_clicks > (
-                                SELECT COUNT(*) 
-                                FROM button_clicks bc3 
-                                WHERE bc3.user_id = %s 
-                                AND bc3.game_id = %s
-                            )
+                            SELECT COUNT(*) FROM game_player_stats ranked
+                            WHERE ranked.game_id = gps.game_id AND ranked.clicks > gps.clicks
                         ) + 1 AS user_rank,
                         (
-                            SELECT COUNT(DISTINCT user_id) 
-                            FROM button_clicks 
-                            WHERE game_id = %s
+                            SELECT COUNT(*) FROM game_player_stats players
+                            WHERE players.game_id = gps.game_id
                         ) AS total_players
-                    FROM button_clicks bc
-                    WHERE bc.game_id = %s 
-                    AND bc.user_id = %s
-                    ORDER BY bc.click_time
+                    FROM game_player_stats gps
+                    WHERE gps.game_id = %s AND gps.user_id = %s
+                '''
+                history_query = '''
+                    SELECT timer_value, click_time
+                    FROM button_clicks
+                    WHERE game_id = %s AND user_id = %s
+                    ORDER BY click_time
                 '''
-                params = (game_session['game_id'], target_user_id, game_session['game_id'], 
-                        game_session['game_id'], game_session['game_id'], target_user_id)
-                logger.info(f"Executing user stats query for player charts with params: {params}")
+                params = (game_session['game_id'], target_user_id)
+                logger.info(f"Executing user stats queries for player charts with params: {params}")
                 
-                success = execute_query(query, params)
-                if not success or len(success) == 0: 
+                stats, clicks = await asyncio.gather(
+                    execute_query_async(stats_query, params),
+                    execute_query_async(history_query, params)
+                )
+                if not stats or not clicks: 
                     await message.channel.send('No click data found for this user!')
                     await message.remove_reaction('⏳', bot.user)
                     return
                     
-                clicks = success
-                
-                # Process click data
-                color_emojis = [get_color_emoji(timer_value, game_session['timer_duration']) for timer_value, _, _, _ in clicks]
-                
-                # Count colors
-                color_counts = {}
-                for emoji in color_emojis:
-                    color_name = None
-                    if emoji == '🟣': color_name = 'Purple'
-                    elif emoji == '🔵': color_name = 'Blue'
-                    elif emoji == '🟢': color_name = 'Green'
-                    elif emoji == '🟡': color_name = 'Yellow'
-                    elif emoji == '🟠': color_name = 'Orange'
-                    elif emoji == '🔴': color_name = 'Red'
-                    
-                    if color_name:
-                        if color_name in color_counts:
-                            color_counts[color_name] += 1
-                        else:
-                            color_counts[color_name] = 1
-                
-                # Calculate stats
-                total_clicks = len(clicks)
-                total_claimed_time = sum(game_session['timer_duration'] - timer_value for timer_value, _, _, _ in clicks)
-                rank = clicks[0][2]  # Get rank from first row
-                total_players = clicks[0][3]  # Get total players from first row
-                
-                # Get lowest click time
-                lowest_click = min(clicks, key=lambda x: x[0])
-                lowest_click_time = lowest_click[0]
+                total_clicks, total_claimed_time, lowest_click_time, *counts, rank, total_players = stats[0]
+                color_counts = {color: count for color, count in zip(COLORS, counts) if count}
                 
                 # Format click history
                 click_history = [(timer_value, click_time, get_color_emoji(timer_value, game_session['timer_duration'])) 
-                                for timer_value, click_time, _, _ in clicks]
+                                for timer_value, click_time in clicks]
                 
                 # Generate the chart
                 chart_generator = ChartGenerator()
@@ -2423,7 +2438,7 @@ async def handle_message(message, bot, menu_timer):
                         WHERE id = %s AND guild_id = %s
                     '''
                     verify_params = (specified_game_id, message.guild.id)
-                    verify_result = execute_query(verify_query, verify_params)
+                    verify_result = await execute_query_async(verify_query, verify_params)
                     
                     if not verify_result:
                         await message.channel.send('Game not found or does not belong to this server!')
@@ -2453,157 +2468,27 @@ async def handle_message(message, bot, menu_timer):
                     current_time = datetime.datetime.now(timezone.utc)
                     time_elapsed = (current_time - game_start_time.replace(tzinfo=timezone.utc)).total_seconds()
                 
-                # Query for tier stats
-                tier_query = '''
-                    SELECT 
-                        CASE
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 16.67 THEN 'Red'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 33.33 THEN 'Orange'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 50.00 THEN 'Yellow'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 66.67 THEN 'Green'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 83.33 THEN 'Blue'
-                            ELSE 'Purple'
-                        END as tier_name,
-                        COUNT(*) as click_count,
-                        SUM(GREATEST(0, %s - bc.timer_value)) as total_time_claimed,
-                        COUNT(DISTINCT bc.user_id) as unique_clickers,
-                        SUM(GREATEST(0, %s - bc.timer_value)) / COUNT(*) as avg_claimed_per_click,
-                        SUM(GREATEST(0, %s - bc.timer_value)) / COUNT(DISTINCT bc.user_id) as avg_claimed_per_user
+                # Stream the game's clicks once and aggregate tiers, activity and top players as they arrive
+                clicks_query = '''
+                    SELECT bc.user_id, u.user_name, bc.timer_value, bc.click_time
                     FROM button_clicks bc
                     JOIN users u ON bc.user_id = u.user_id
                     WHERE bc.game_id = %s
                     AND bc.timer_value <= %s  -- Filter out clicks greater than timer_duration
                     AND u.user_name != 'HOTFIX'  -- Filter out HOTFIX user
                     AND u.user_name IS NOT NULL  -- Ensure username is not null
-                    GROUP BY 
-                        CASE
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 16.67 THEN 'Red'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 33.33 THEN 'Orange'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 50.00 THEN 'Yellow'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 66.67 THEN 'Green'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) <= 83.33 THEN 'Blue'
-                            ELSE 'Purple'
-                        END
-                    ORDER BY MIN(ROUND((bc.timer_value / %s) * 100, 2)) ASC
-                '''
-                
-                tier_params = (
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['game_id'],
-                    game_session['timer_duration'],  # New parameter for filtering timer_value
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration']
-                )
-                
-                logger.info(f"Executing tier stats query for game charts")
-                tier_stats = execute_query(tier_query, tier_params)
-                
-                # Query for player activity by hour and day
-                activity_query = '''
-                    SELECT 
-                        HOUR(bc.click_time) as hour_of_day,
-                        WEEKDAY(bc.click_time) as day_of_week,
-                        COUNT(*) as click_count
-                    FROM button_clicks bc
-                    JOIN users u ON bc.user_id = u.user_id
-                    WHERE bc.game_id = %s
-                    AND bc.timer_value <= %s
-                    AND u.user_name != 'HOTFIX'
-                    AND u.user_name IS NOT NULL
-                    GROUP BY HOUR(bc.click_time), WEEKDAY(bc.click_time)
                 '''
-
-                activity_params = (game_session['game_id'], game_session['timer_duration'])
-                logger.info(f"Executing activity query for game charts")
-                player_activity = execute_query(activity_query, activity_params)
+                clicks_params = (game_session['game_id'], game_session['timer_duration'])
                 
-                # Query for top players
-                top_players_query = '''
-                    SELECT
-                        u.user_name,
-                        SUM(GREATEST(0, %s - bc.timer_value)) AS total_time_claimed,
-                        MIN(bc.timer_value) as lowest_click,
-                        CASE
-                            WHEN ROUND((MIN(bc.timer_value) / %s) * 100, 2) <= 16.67 THEN '🔴'
-                            WHEN ROUND((MIN(bc.timer_value) / %s) * 100, 2) <= 33.33 THEN '🟠'
-                            WHEN ROUND((MIN(bc.timer_value) / %s) * 100, 2) <= 50.00 THEN '🟡'
-                            WHEN ROUND((MIN(bc.timer_value) / %s) * 100, 2) <= 66.67 THEN '🟢'
-                            WHEN ROUND((MIN(bc.timer_value) / %s) * 100, 2) <= 83.33 THEN '🔵'
-                            ELSE '🟣'
-                        END as lowest_color
-                    FROM button_clicks bc
-                    JOIN users u ON bc.user_id = u.user_id
-                    WHERE bc.game_id = %s
-                    AND bc.timer_value <= %s
-                    AND u.user_name != 'HOTFIX'
-                    AND u.user_name IS NOT NULL
-                    GROUP BY u.user_id, u.user_name
-                    ORDER BY total_time_claimed DESC
-                    LIMIT 10
-                '''
-
-                top_players_params = (
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['game_id'],
-                    game_session['timer_duration']  # New parameter for filtering timer_value
+                logger.info(f"Streaming clicks for game charts")
+                chart_stats = await aggregate_game_chart_stats(
+                    stream_query(clicks_query, clicks_params), game_session['timer_duration']
                 )
-                
-                logger.info(f"Executing top players query for game charts")
-                top_players = execute_query(top_players_query, top_players_params)
-                
-                # Count total clicks and players
-                query = '''
-                    SELECT 
-                        COUNT(*) as total_clicks,
-                        COUNT(DISTINCT bc.user_id) as total_players
-                    FROM button_clicks bc
-                    JOIN users u ON bc.user_id = u.user_id
-                    WHERE bc.game_id = %s
-                    AND bc.timer_value <= %s
-                    AND u.user_name != 'HOTFIX'
-                    AND u.user_name IS NOT NULL
-                '''
-                params = (game_session['game_id'], game_session['timer_duration'])
-                totals_result = execute_query(query, params)
-                
-                if totals_result and len(totals_result) > 0:
-                    total_clicks = totals_result[0][0]
-                    total_players = totals_result[0][1]
-                else:
-                    total_clicks = 0
-                    total_players = 0
-                
-                # Convert any Decimal values to float in top_players data 
-                if top_players:
-                    top_players = [
-                        (username, float(time_claimed), float(lowest_click), color) 
-                        for username, time_claimed, lowest_click, color in top_players
-                    ]
-
-                # Similarly for tier_stats data
-                if tier_stats:
-                    tier_stats = [
-                        (tier_name, click_count, float(time_claimed), unique_clickers, 
-                        float(avg_per_click) if avg_per_click else 0, 
-                        float(avg_per_user) if avg_per_user else 0)
-                        for tier_name, click_count, time_claimed, unique_clickers, avg_per_click, avg_per_user in tier_stats
-                    ]
+                total_clicks = chart_stats['total_clicks']
+                total_players = chart_stats['total_players']
+                tier_stats = chart_stats['tier_stats']
+                player_activity = chart_stats['player_activity']
+                top_players = chart_stats['top_players']
 
                 # Generate the chart
                 chart_generator = ChartGenerator()
@@ -2665,7 +2550,7 @@ async def handle_message(message, bot, menu_timer):
                         WHERE id = %s AND guild_id = %s
                     '''
                     verify_params = (specified_game_id, message.guild.id)
-                    verify_result = execute_query(verify_query, verify_params)
+                    verify_result = await execute_query_async(verify_query, verify_params)
                     
                     if not verify_result:
                         await message.channel.send('Game not found or does not belong to this server!')
@@ -2682,20 +2567,12 @@ async def handle_message(message, bot, menu_timer):
                     # Use current game
                     game_session = current_game_session
 
-                # Query all clicks for the game, sorted by time
+                # Stream all clicks for the game, sorted by time, keeping only what the plot needs
                 query = '''
                     SELECT 
                         bc.timer_value,
                         bc.click_time,
-                        u.user_name,
-                        CASE
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 83.33 THEN '🟣'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 66.67 THEN '🔵'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 50.00 THEN '🟢'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 33.33 THEN '🟡'
-                            WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 16.67 THEN '🟠'
-                            ELSE '🔴'
-                        END as color_emoji
+                        u.user_name
                     FROM button_clicks bc
                     JOIN users u ON bc.user_id = u.user_id
                     WHERE bc.game_id = %s
@@ -2705,29 +2582,26 @@ async def handle_message(message, bot, menu_timer):
                     ORDER BY bc.click_time
                 '''
 
-                params = (
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['timer_duration'],
-                    game_session['game_id'],
-                    game_session['timer_duration']
-                )
+                params = (game_session['game_id'], game_session['timer_duration'])
                 
-                logger.info(f"Executing click timeline query for game #{game_session['game_id']}")
-                clicks = execute_query(query, params)
+                logger.info(f"Streaming click timeline for game #{game_session['game_id']}")
+                times = []
+                values = array('d')
+                colors = []
+                color_lowest = {}  # Lowest click per color, labelled on the chart
+                async for timer_value, click_time, username in stream_rows(query, params):
+                    timer_value = float(timer_value)
+                    color_name = get_color_name(timer_value, game_session['timer_duration'])
+                    times.append(click_time)
+                    values.append(timer_value)
+                    colors.append(COLOR_MAP[color_name])
+                    if color_name not in color_lowest or timer_value < color_lowest[color_name][0]:
+                        color_lowest[color_name] = (timer_value, click_time, username)
                 
-                if not clicks or len(clicks) == 0:
+                if not times:
                     await message.channel.send(f'No click data found for game #{game_session["game_id"]}!')
                     await message.remove_reaction('⏳', bot.user)
                     return
-                    
-                # Convert decimal values to float
-                clicks = [
-                    (float(timer_value), click_time, username, color_emoji)
-                    for timer_value, click_time, username, color_emoji in clicks
-                ]
                 
                 # Create a specialized timeline chart
                 fig, ax = plt.subplots(figsize=(12, 8), dpi=100)
@@ -2735,12 +2609,6 @@ async def handle_message(message, bot, menu_timer):
                 # Set dark background style
                 plt.style.use('dark_background')
                 
-                # Extract data for plotting
-                times = [click_time for _, click_time, _, _ in clicks]
-                values = [timer_value for timer_value, _, _, _ in clicks]
-                usernames = [username for _, _, username, _ in clicks]
-                colors = [ChartGenerator()._emoji_to_color(emoji) for _, _, _, emoji in clicks]
-                
                 # Create the scatter plot
                 scatter = ax.scatter(times, values, c=colors, s=60, alpha=0.8, edgecolors='white')
                 
@@ -2798,13 +2666,7 @@ async def handle_message(message, bot, menu_timer):
                 annot.set_visible(False)
                 
                 # Add text labels for lowest click points in each color
-                color_lowest = {}
-                for i, (timer_value, click_time, username, emoji) in enumerate(clicks):
-                    color_name = EMOJI_COLOR_MAP.get(emoji, 'Unknown')
-                    if color_name not in color_lowest or timer_value < color_lowest[color_name][0]:
-                        color_lowest[color_name] = (timer_value, click_time, username, i)
-                
-                for color_name, (timer_value, click_time, username, idx) in color_lowest.items():
+                for color_name, (timer_value, click_time, username) in color_lowest.items():
                     ax.annotate(f"{username}: {format_time(timer_value)}",
                                 (click_time, timer_value),
                                 xytext=(10, 10),
@@ -2817,7 +2679,7 @@ async def handle_message(message, bot, menu_timer):
                 game_end = max(times)
                 duration = (game_end - game_start).total_seconds()
                 
-                info_text = (f"Total Clicks: {len(clicks)}\n"
+                info_text = (f"Total Clicks: {len(times)}\n"
                             f"Time Span: {format_time(duration)}\n"
                             f"First Click: {game_start.strftime('%Y-%m-%d %H:%M')}\n"
                             f"Latest Click: {game_end.strftime('%Y-%m-%d %H:%M')}")
@@ -2869,7 +2731,7 @@ async def handle_message(message, bot, menu_timer):
                     ORDER BY gs.start_time DESC
                 '''
                 params = (message.guild.id,)
-                results = execute_query(query, params)
+                results = await execute_query_async(query, params)
                 
                 if not results:
                     await message.channel.send('No games found for this server!')
@@ -3048,16 +2910,8 @@ async def start_boot_game(bot, button_guild_id, message_button_channel, menu_tim
     global lock, logger
     logger.info(f"Starting boot game for guild {button_guild_id}")
     
-    # Rest of the function implementation remains the same
-    # Get game session directly from the global cache instead of querying again
-    sessions_dict = await game_sessions_dict()
-    
-    # Find the game session for this guild
-    game_session = None
-    for session_id, session_data in sessions_dict.items():
-        if isinstance(session_data, dict) and session_data.get('guild_id') == button_guild_id:
-            game_session = session_data
-            break
+    # Find the game session for this guild in the session registry
+    game_session = await get_game_session_by_guild_id(button_guild_id)
             
     # If no session found, create one
     if not game_session:
@@ -3081,13 +2935,10 @@ async def start_boot_game(bot, button_guild_id, message_button_channel, menu_tim
             logger.info('Skipping role addition...')
             
         # Create game session
-        game_id = update_or_create_game_session(admin_role_id, guild.id, message_button_channel, 
+        game_id = await run_db_call(update_or_create_game_session, admin_role_id, guild.id, message_button_channel, 
                                               chat_channel_id, start_time, timer_duration, cooldown_duration)
                                               
-        # Update local cache with new session
-        update_local_game_sessions()
-        
-        # Get updated game session
+        # Get updated game session (update_or_create_game_session keeps the registry current)
         game_session = await get_game_session_by_id(game_id)
         
         # Remove from paused games if needed
@@ -3112,44 +2963,5 @@ async def start_boot_game(bot, button_guild_id, message_button_channel, menu_tim
         logger.info('Starting update timer task...')
         menu_timer.update_timer_task.start()
 
-def calculate_mmr(timer_value, timer_duration):
-    """
-    Calculate MMR for a click based on:
-    1. Color bracket (16.66% intervals)
-    2. Precise timing within bracket
-    3. Scaled against timer_duration
-    
-    Args:
-        timer_value (int): Time remaining when button was clicked
-        timer_duration (int): Total duration of timer (cooldown)
-    
-    Returns:
-        float: Calculated MMR value
-    """
-    percentage = (timer_value / timer_duration) * 100
-    bracket_size = 16.66667  # Each color represents 16.66667% of the timer
-    
-    # Determine which bracket (0-5, where 0 is red and 5 is purple)
-    bracket = min(5, int(percentage / bracket_size))
-    
-    # Calculate position within bracket (0.0 to 1.0)
-    bracket_position = (percentage % bracket_size) / bracket_size
-    
-    # Base points exponentially increase as brackets get rarer
-    # Red (0) = 32, Orange (1) = 16, Yellow (2) = 8, Green (3) = 4, Blue (4) = 2, Purple (5) = 1
-    base_points = 2 ** (5 - bracket)
-    
-    # Position multiplier: rewards riskier timing within each bracket
-    # For red/orange (rarest), rewards getting closer to zero
-    # For other colors, rewards consistency in hitting the bracket
-    if bracket <= 1:  # Red or Orange
-        position_multiplier = 1 - bracket_position
-    else:
-        position_multiplier = 1 - abs(0.5 - bracket_position)
-    
-    # Scale final score by timer_duration to account for game difficulty
-    time_scale = timer_duration / 43200  # Normalize to 12-hour standard
-    
-    mmr = base_points * (1 + position_multiplier) * time_scale
-    
-    return mmr
\ No newline at end of file
+# Per-click MMR formula, shared with the game_player_stats rollup
+calculate_mmr = calculate_click_mmr
@@ -0,0 +1,91 @@
+# Rebuild_leaderboards.py
+# Rebuilds the Redis leaderboards from MySQL, e.g. after Redis lost its data:
+#   python bot_code/rebuild_leaderboards.py                            active games, their guilds' current month, cross-game totals
+#   python bot_code/rebuild_leaderboards.py --game ID                  one game
+#   python bot_code/rebuild_leaderboards.py --guild ID --month YYYY-MM one guild's month
+#   python bot_code/rebuild_leaderboards.py --games                    cross-game totals only
+# Clicks still in the click queue are counted too; clicks in a bot's local spool are counted once it replays them.
+print("Starting leaderboard rebuild file...")
+import argparse
+import asyncio
+import datetime
+from datetime import timezone
+import sys
+import traceback
+
+try:
+    from utils.utils import logger
+    from database.database import init as init_database, close_disconnect_database, execute_query_async
+    from redis_lib.redis_client import redis_client
+    from redis_lib.leaderboards import leaderboards
+except Exception as e:
+    print(f"Error importing local modules: {e}")
+    print(traceback.format_exc())
+    sys.exit(1)
+
+async def rebuild(game_id=None, guild_id=None, month=None, games=False):
+    """
+    Rebuild the requested leaderboards (everything currently in use if none are requested).
+    Args:
+        game_id (int): Game whose leaderboards to rebuild
+        guild_id (int): Guild whose monthly leaderboard to rebuild (with month)
+        month (tuple): (year, month) of the monthly leaderboard
+        games (bool): Rebuild the cross-game totals
+    Returns:
+        int: Process exit code
+    """
+    if not await init_database(background_repairs=False):
+        logger.critical("Leaderboard rebuild could not initialise the database")
+        return 1
+    try:
+        if not await redis_client.initialize():
+            logger.critical("Leaderboard rebuild could not reach Redis")
+            return 1
+
+        jobs = []
+        if game_id is not None:
+            jobs.append(leaderboards.rebuild_game(game_id))
+        if guild_id is not None:
+            jobs.append(leaderboards.rebuild_month(guild_id, *month))
+        if games:
+            jobs.append(leaderboards.rebuild_games())
+        if not jobs:
+            active = await execute_query_async('SELECT id, guild_id FROM game_sessions WHERE end_time IS NULL')
+            now = datetime.datetime.now(timezone.utc)
+            jobs.extend(leaderboards.rebuild_game(active_game_id) for active_game_id, _ in active)
+            jobs.extend(leaderboards.rebuild_month(active_guild_id, now.year, now.month)
+                        for active_guild_id in {active_guild_id for _, active_guild_id in active})
+            jobs.append(leaderboards.rebuild_games())
+
+        results = await asyncio.gather(*jobs)
+        failed = results.count(False)
+        if failed:
+            logger.error(f"{failed} of {len(results)} leaderboard rebuilds failed")
+            return 1
+        logger.info(f"Rebuilt {len(results)} leaderboards")
+        return 0
+    finally:
+        await redis_client.close()
+        close_disconnect_database()
+
+def parse_month(value):
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        datetime.date(year, month, 1)
+        return year, month
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid month '{value}', expected YYYY-MM")
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild The Button leaderboards in Redis from MySQL")
+    parser.add_argument('--game', type=int, help="Game ID whose leaderboards to rebuild")
+    parser.add_argument('--guild', type=int, help="Guild ID whose monthly leaderboard to rebuild (needs --month)")
+    parser.add_argument('--month', type=parse_month, help="Month of the guild leaderboard, YYYY-MM")
+    parser.add_argument('--games', action='store_true', help="Rebuild the cross-game click and player totals")
+    args = parser.parse_args()
+    if (args.guild is None) != (args.month is None):
+        parser.error("--guild and --month go together")
+    sys.exit(asyncio.run(rebuild(args.game, args.guild, args.month, args.games)))
+
+if __name__ == '__main__':
+    main()
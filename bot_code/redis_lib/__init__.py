@@ -4,19 +4,28 @@ Redis caching and queue implementation for The Button Game
 
 This module provides:
 - Redis connection management
-- Game state caching
+- Game state caching, with an in-process near-cache kept coherent over pub/sub
 - Distributed locking (Phase 2)
-- Queue processing (Phase 3)
+- Atomic click admission
+- Sorted-set leaderboards maintained at click admission
+- Queue processing (Phase 3), including write-behind user updates
+- A durable local click spool for while Redis is unavailable
 """
 
 from .redis_client import RedisClient, redis_client
-from .redis_cache import GameStateCache, game_state_cache
-from .redis_locks import RedisLock
-from .redis_queues import push_click_to_queue, push_user_update
+from .near_cache import GameStateNearCache, game_state_near_cache
+from .redis_cache import GameStateCache, GameStateBatch, game_state_cache
+from .redis_locks import RedisLock, lock_metrics
+from .redis_queues import push_user_update, push_user_click, build_click_payload
+from .leaderboards import Leaderboards, leaderboards
+from .click_admission import ClickAdmission, click_admission
 from .sync_worker import SyncWorker, sync_worker
+from .user_update_worker import UserUpdateWorker, user_update_worker
+from .click_spool import ClickSpool, click_spool
 
 __all__ = [
-    'RedisClient', 'GameStateCache', 'RedisLock', 'SyncWorker',
-    'redis_client', 'game_state_cache', 'sync_worker',
-    'push_click_to_queue', 'push_user_update'
+    'RedisClient', 'GameStateCache', 'GameStateBatch', 'GameStateNearCache', 'RedisLock', 'SyncWorker', 'UserUpdateWorker',
+    'ClickAdmission', 'Leaderboards', 'ClickSpool', 'redis_client', 'game_state_cache', 'game_state_near_cache', 'sync_worker',
+    'user_update_worker', 'click_admission', 'leaderboards', 'click_spool', 'lock_metrics',
+    'push_user_update', 'push_user_click', 'build_click_payload'
 ]
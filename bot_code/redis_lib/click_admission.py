@@ -0,0 +1,342 @@
+# Redis Click Admission
+"""
+Atomic server-side click admission for The Button Game
+
+One Lua script call decides whether a click is accepted and, if so, applies it:
+- refuses keys of a retired cache generation (see redis_cache.CacheNamespace)
+- checks the timer has not expired (last_click_ts + timer_duration in the game state hash);
+  last_click_ts only moves forward, so a caller with a lagging clock cannot re-open the timer
+- enforces the user's cooldown (user:{user_id}:game:{game_id}:cooldown, written with a TTL of the
+  game's cooldown on every accepted click and preloaded per game, so a missing key means no cooldown)
+- enforces the sequential-click rule (game:{game_id}:recent_clickers, the most recent
+  distinct clickers, newest first, trimmed to the game's requirement, valid for recent_window clickers)
+- updates the game state hash, cooldown key and recent-clickers window
+- counts the click in total_clicks, and the player in total_players the first time they
+  click in the game (game:{game_id}:players set)
+- updates the game, guild-month and cross-game leaderboards (see leaderboards.py)
+- appends the click to the click_queue stream
+- publishes the game ID on the near-cache invalidation channel
+
+Because check and write happen in one atomic step, the click callback needs no distributed lock.
+Keys the script cannot decide on (state, cooldown or window not cached yet) are seeded from
+MySQL by the caller and the call is retried.
+"""
+
+import datetime
+from datetime import timezone
+from typing import Any, Dict, Optional
+from database.database import execute_query_async
+from utils.utils import logger
+from .redis_client import redis_client, HEALTH_ERRORS
+from .redis_cache import (
+    game_state_cache, cache_namespace, get_game_state_ttl, get_game_players_key, get_cooldown_key, get_recent_clickers_key
+)
+from .redis_queues import CLICK_QUEUE_KEY, build_click_payload
+from .near_cache import game_state_near_cache, GAME_STATE_CHANNEL
+from .leaderboards import click_leaderboard_keys, get_month_ttl
+
+
+# KEYS: state hash, cooldown key, recent clickers list, click stream, player set, cache generation counter,
+#       then the leaderboard keys from leaderboards.click_leaderboard_keys (7-18) and their version counters (19-21)
+# ARGV: now (epoch seconds), user_id, cooldown_seconds, sequential requirement,
+#       cooldown_checked (1 once the caller has looked the cooldown up in MySQL), seeded last click (epoch or ""),
+#       click_time (ISO), latest_player_name, state TTL, invalidation channel and message,
+#       cache generation the keys belong to, game_id, monthly leaderboard TTL, then the stream entry as field/value pairs (the script adds the computed timer_value)
+ADMIT_CLICK_SCRIPT = """
+local now = tonumber(ARGV[1])
+local user_id = ARGV[2]
+local cooldown_seconds = tonumber(ARGV[3])
+local requirement = tonumber(ARGV[4])
+
+-- Keys of a retired generation must not be touched; the caller re-reads the generation
+if (redis.call('GET', KEYS[6]) or '0') ~= ARGV[12] then
+    return {'STALE_GENERATION'}
+end
+
+local state = redis.call('HMGET', KEYS[1], 'last_click_ts', 'timer_duration', 'recent_window', 'is_active',
+    'players_seeded', 'total_players', 'cooldowns_seeded')
+-- The player set must be present whenever the state says it was seeded, or SADD would recount players
+if not state[1] or not state[2] or state[5] ~= '1'
+    or (redis.call('EXISTS', KEYS[5]) == 0 and tonumber(state[6] or '0') > 0) then
+    return {'NO_STATE'}
+end
+if state[4] == 'False' then
+    return {'EXPIRED', '0'}
+end
+
+-- Clocks of different processes may be skewed: a click stamped before the stored last click
+-- counts as made at that instant, so last_click_ts never moves backwards
+local last_ts = tonumber(state[1])
+local timer_value = tonumber(state[2]) - math.max(0, now - last_ts)
+local timer_str = string.format('%.6f', timer_value)
+if timer_value <= 0 then
+    return {'EXPIRED', timer_str}
+end
+
+-- Once a game's cooldowns are seeded every active cooldown has a key, so a missing key means none
+local last_click = redis.call('GET', KEYS[2])
+if not last_click then
+    if ARGV[5] ~= '1' and state[7] ~= '1' then
+        return {'COOLDOWN_UNKNOWN', timer_str}
+    end
+    if ARGV[6] ~= '' then
+        last_click = ARGV[6]
+    end
+end
+if last_click then
+    local remaining = tonumber(last_click) + cooldown_seconds - now
+    if remaining > 0 then
+        if ARGV[5] == '1' then
+            -- Fill the cache from the caller's MySQL lookup so repeat attempts hit
+            redis.call('SET', KEYS[2], last_click, 'PX', math.max(1, math.floor(remaining * 1000)), 'NX')
+        end
+        return {'COOLDOWN', timer_str, string.format('%.3f', remaining)}
+    end
+end
+
+-- The window is only trusted for as many clickers as it was seeded/maintained for
+if requirement > 0 then
+    if tonumber(state[3] or '0') < requirement then
+        return {'RECENT_UNKNOWN', timer_str}
+    end
+    local recent = redis.call('LRANGE', KEYS[3], 0, requirement - 1)
+    for _, clicker in ipairs(recent) do
+        if clicker == user_id then
+            return {'SEQUENTIAL', timer_str}
+        end
+    end
+end
+
+local ttl = tonumber(ARGV[9])
+local window = math.max(requirement, 1)
+redis.call('HSET', KEYS[1],
+    'timer_value', timer_str, 'latest_player_name', ARGV[8], 'is_active', 'True',
+    'recent_window', window)
+if now > last_ts then
+    redis.call('HSET', KEYS[1], 'last_click_time', ARGV[7], 'last_click_ts', ARGV[1])
+end
+redis.call('HINCRBY', KEYS[1], 'total_clicks', 1)
+if redis.call('SADD', KEYS[5], user_id) == 1 then
+    redis.call('HINCRBY', KEYS[1], 'total_players', 1)
+    redis.call('ZINCRBY', KEYS[18], 1, ARGV[13])
+end
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('EXPIRE', KEYS[5], ttl)
+
+redis.call('SET', KEYS[2], ARGV[1], 'PX', math.max(1, math.floor(cooldown_seconds * 1000)))
+
+redis.call('LREM', KEYS[3], 0, user_id)
+redis.call('LPUSH', KEYS[3], user_id)
+redis.call('LTRIM', KEYS[3], 0, window - 1)
+redis.call('EXPIRE', KEYS[3], ttl)
+
+-- Leaderboards, with the same arithmetic as database.player_stats (the stored timer is an INT)
+local duration = math.max(1, math.floor(tonumber(state[2])))
+local stored = math.floor(timer_value + 0.5)
+local claimed = math.max(0, duration - stored)
+local pct = math.max(0, math.min(stored, duration)) / duration * 100
+local color = 0
+if pct >= 83.33 then color = 5
+elseif pct >= 66.67 then color = 4
+elseif pct >= 50 then color = 3
+elseif pct >= 33.33 then color = 2
+elseif pct >= 16.67 then color = 1
+end
+local mmr_pct = stored / duration * 100
+local bracket = math.min(5, math.floor(mmr_pct / 16.66667))
+local position = (mmr_pct % 16.66667) / 16.66667
+local multiplier = 1 - math.abs(0.5 - position)
+if bracket <= 1 then
+    multiplier = 1 - position
+end
+local mmr = 2 ^ (5 - bracket) * (1 + multiplier) * (duration / 43200)
+
+local game_clicks = redis.call('ZINCRBY', KEYS[7], 1, user_id)
+redis.call('ZINCRBY', KEYS[8], claimed, user_id)
+redis.call('ZINCRBY', KEYS[9], mmr, user_id)
+redis.call('ZADD', KEYS[10], 'LT', stored, user_id)
+if redis.call('HINCRBY', KEYS[11], user_id .. ':c' .. color, 1) == 1 then
+    redis.call('HINCRBY', KEYS[12], 'players:' .. color, 1)
+end
+redis.call('HINCRBY', KEYS[12], 'clicks:' .. color, 1)
+redis.call('HINCRBY', KEYS[12], 'claimed:' .. color, claimed)
+for i = 7, 13 do
+    redis.call('EXPIRE', KEYS[i], ttl)
+end
+redis.call('ZINCRBY', KEYS[14], claimed, user_id)
+redis.call('HINCRBY', KEYS[15], user_id .. ':clicks', 1)
+redis.call('HINCRBY', KEYS[15], user_id .. ':c' .. color, 1)
+for i = 14, 16 do
+    redis.call('EXPIRE', KEYS[i], tonumber(ARGV[14]))
+end
+redis.call('ZINCRBY', KEYS[17], 1, ARGV[13])
+-- Version counters of the game, month and cross-game leaderboards: a rebuild WATCHes them
+redis.call('INCR', KEYS[19])
+redis.call('EXPIRE', KEYS[19], ttl)
+redis.call('INCR', KEYS[20])
+redis.call('EXPIRE', KEYS[20], tonumber(ARGV[14]))
+redis.call('INCR', KEYS[21])
+-- The user's clicks in the game are only known once the game's leaderboards are built
+if redis.call('EXISTS', KEYS[13]) == 0 then
+    game_clicks = ''
+end
+
+local entry = {'timer_value', timer_str}
+for i = 15, #ARGV do
+    entry[#entry + 1] = ARGV[i]
+end
+local message_id = redis.call('XADD', KEYS[4], '*', unpack(entry))
+redis.call('PUBLISH', ARGV[10], ARGV[11])
+
+return {'OK', timer_str, message_id, game_clicks}
+"""
+
+MAX_ADMISSION_ATTEMPTS = 4
+
+# Reply of admit() when Redis cannot be reached: the click was not admitted and the caller
+# should take the Redis-less path (MySQL checks, local spool)
+UNAVAILABLE = {'accepted': False, 'reason': 'UNAVAILABLE', 'timer_value': 0.0, 'cooldown_remaining': 0.0,
+               'message_id': None, 'game_clicks': None}
+
+
+class ClickAdmission:
+    """Registers and runs the admit-click script"""
+
+    def __init__(self):
+        self._script = None
+        self._script_client = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        # Decided admissions, and how many needed a MySQL lookup first because a key was not cached
+        self.stats = {'admissions': 0, 'accepted': 0, 'state_misses': 0, 'cooldown_misses': 0, 'recent_misses': 0}
+
+    def format_report(self) -> list:
+        """Render admission cache hit rates as plain text for the admin 'dbstats' command"""
+        stats = dict(self.stats)
+        admissions = stats['admissions']
+        if not admissions:
+            return []
+        rates = " ".join(
+            f"{name}={stats[name]} ({stats[name] / admissions:.1%})"
+            for name in ('state_misses', 'cooldown_misses', 'recent_misses')
+        )
+        return [f"click admission   admissions={admissions} accepted={stats['accepted']}\n{rates}"]
+
+    def _get_script(self, client):
+        # register_script handles EVALSHA with a transparent SCRIPT LOAD on NOSCRIPT
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(ADMIT_CLICK_SCRIPT)
+            self._script_client = client
+        return self._script
+
+    async def _get_last_click_epoch(self, game_id: int, user_id: int) -> str:
+        """The user's last recorded click in MySQL as epoch seconds, or "" if none"""
+        result = await execute_query_async(
+            'SELECT MAX(click_time) FROM button_clicks WHERE user_id = %s AND game_id = %s',
+            (user_id, game_id)
+        )
+        if result and result[0][0] is not None:
+            return repr(result[0][0].replace(tzinfo=timezone.utc).timestamp())
+        return ""
+
+    async def admit(self, game_id: int, user_id: int, user_name: str, click_time: datetime.datetime,
+                    cooldown_seconds: float, requirement: int, guild_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Atomically admit (or reject) a click.
+
+        Args:
+            game_id: Game session ID
+            user_id: Discord user ID
+            user_name: Display name recorded with the click
+            click_time: Time of the click (the interaction timestamp)
+            cooldown_seconds: Cooldown between a user's clicks
+            requirement: Distinct other users required between a user's clicks (0 disables)
+            guild_id: Guild the game runs in (monthly leaderboard)
+
+        Returns:
+            dict: {'accepted', 'reason', 'timer_value', 'cooldown_remaining', 'message_id',
+                   'game_clicks' (the user's clicks in the game including this one, None if not known)},
+                  reason 'UNAVAILABLE' if Redis could not be reached (the click was not admitted: take
+                  the Redis-less path), or None if the click could not be decided (report an error)
+        """
+        client = await redis_client.get_client()
+        if not client:
+            return dict(UNAVAILABLE)
+
+        if click_time.tzinfo is None:
+            click_time = click_time.replace(tzinfo=timezone.utc)
+        now = click_time.timestamp()
+        cooldown_checked, seeded_last_click = '0', ''
+
+        try:
+            script = self._get_script(client)
+            for attempt in range(MAX_ADMISSION_ATTEMPTS):
+                if not await game_state_cache.prepare(client):
+                    return dict(UNAVAILABLE)
+                keys = [
+                    game_state_cache._get_game_state_key(game_id),
+                    get_cooldown_key(user_id, game_id),
+                    get_recent_clickers_key(game_id),
+                    CLICK_QUEUE_KEY,
+                    get_game_players_key(game_id),
+                    cache_namespace.generation_key
+                ] + click_leaderboard_keys(game_id, guild_id, click_time)
+                # The timer value is only known inside the script, which adds it to the stream entry
+                payload = build_click_payload(game_id, user_id, click_time.isoformat(), 0, user_name)
+                payload.pop('timer_value')
+                args = [repr(now), str(user_id), repr(float(cooldown_seconds)), str(int(requirement or 0)),
+                        cooldown_checked, seeded_last_click, click_time.isoformat(), user_name, str(get_game_state_ttl()),
+                        GAME_STATE_CHANNEL, game_state_near_cache.message(game_id), str(cache_namespace.generation),
+                        str(game_id), str(get_month_ttl())]
+                for field, value in payload.items():
+                    args.extend([field, value])
+
+                reply = await script(keys=keys, args=args, client=client)
+                reason = reply[0]
+
+                if reason == 'STALE_GENERATION':
+                    cache_namespace.mark_stale()
+                    continue
+                if reason == 'NO_STATE':
+                    # Loads the state, player set and active cooldowns from MySQL and caches them
+                    self.stats['state_misses'] += 1
+                    if not await game_state_cache._load_from_database(game_id):
+                        return None
+                    continue
+                if reason == 'COOLDOWN_UNKNOWN':
+                    self.stats['cooldown_misses'] += 1
+                    seeded_last_click = await self._get_last_click_epoch(game_id, user_id)
+                    cooldown_checked = '1'
+                    continue
+                if reason == 'RECENT_UNKNOWN':
+                    self.stats['recent_misses'] += 1
+                    await game_state_cache.seed_recent_clickers(game_id, requirement)
+                    continue
+
+                self.stats['admissions'] += 1
+                if reason == 'OK':
+                    self.stats['accepted'] += 1
+                    game_state_near_cache.invalidate(game_id)
+                return {
+                    'accepted': reason == 'OK',
+                    'reason': reason,
+                    'timer_value': float(reply[1]) if len(reply) > 1 else 0.0,
+                    'cooldown_remaining': float(reply[2]) if reason == 'COOLDOWN' else 0.0,
+                    'message_id': reply[2] if reason == 'OK' else None,
+                    'game_clicks': int(float(reply[3])) if reason == 'OK' and reply[3] else None
+                }
+
+            logger.error(f"Click admission for user {user_id} in game {game_id} could not be resolved after {MAX_ADMISSION_ATTEMPTS} attempts")
+            return None
+
+        except HEALTH_ERRORS as e:
+            logger.error(f"Redis unreachable admitting the click of user {user_id} in game {game_id}: {e}")
+            return dict(UNAVAILABLE)
+        except Exception as e:
+            logger.error(f"Click admission script failed for user {user_id} in game {game_id}: {e}")
+            return None
+
+
+# Global click admission instance
+click_admission = ClickAdmission()
@@ -0,0 +1,325 @@
+# Local Click Spool
+"""
+Durable local spool for accepted clicks while Redis is unavailable
+
+Without Redis there is no click queue to append to, so instead of writing MySQL synchronously
+inside the click lock, the click path appends the click to a local spool:
+- one JSON record per line, prefixed with its CRC32, appended to the active segment file and
+  fsync'd before the click is acknowledged; a torn or corrupt line is skipped on load
+- segments rotate at cache.spool_segment_bytes, and a segment file is deleted once every click
+  in it has been replayed
+- every click gets a unique click_key ("spool-..."), kept through replay, so replaying a click
+  that already reached MySQL (crash before its segment was deleted) is skipped, not duplicated
+- a background replayer drains the spool into MySQL, or into the click_queue stream (and the
+  user update stream) while MySQL is down but Redis is back
+
+Clicks waiting in the spool are also kept in memory, so the MySQL fallbacks (game state,
+cooldown and sequential-click checks, cache loads) count them until they are replayed. Spooled
+clicks never go through click admission, so after a replay the on_replayed callbacks drop the
+cached state of their games and rebuild their leaderboards. The spool is per process: each bot
+process only sees its own.
+"""
+
+import asyncio
+import datetime
+import inspect
+import json
+import os
+import uuid
+import zlib
+from datetime import timezone
+from typing import Any, Dict, List, Optional, Union
+from database.database import record_queued_clicks_async, record_user_updates_async
+from utils.utils import logger, config, BASE_DIR
+from .redis_client import redis_client
+from .redis_queues import (
+    CLICK_QUEUE_KEY, USER_UPDATE_QUEUE_KEY, build_click_payload, build_user_update_payload, build_user_click_data
+)
+from .user_update_worker import coalesce_user_clicks
+
+
+SEGMENT_PREFIX = "clicks-"
+SEGMENT_SUFFIX = ".spool"
+
+
+def _as_datetime(value: Union[str, datetime.datetime]) -> datetime.datetime:
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    body = json.dumps(record, separators=(',', ':')).encode()
+    return b"%08x %s\n" % (zlib.crc32(body), body)
+
+
+def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+    """Record of a spool line, or None if the line is torn or corrupt"""
+    if not line.endswith(b"\n"):
+        return None
+    checksum, _, body = line.rstrip(b"\n").partition(b" ")
+    try:
+        if int(checksum, 16) != zlib.crc32(body):
+            return None
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+class ClickSpool:
+    """Append-only, segment-rotated local click spool with a background replayer"""
+
+    def __init__(self):
+        cache_config = config.get('cache', {})
+        self.directory = cache_config.get('spool_dir') or os.path.join(BASE_DIR, 'spool')
+        self.segment_bytes = int(cache_config.get('spool_segment_bytes', 1 << 20))
+        self.replay_interval = float(cache_config.get('spool_replay_interval', 1))
+        self.replay_batch_size = int(cache_config.get('spool_replay_batch_size', 500))
+        # Clicks not replayed yet, per segment index, oldest first
+        self._segments: Dict[int, List[Dict[str, Any]]] = {}
+        self._next_segment = 0
+        self._active: Optional[int] = None
+        self._file = None
+        self._size = 0
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._replayed_callbacks = []
+        self.stats = {'spooled': 0, 'replayed_mysql': 0, 'replayed_stream': 0, 'duplicates': 0, 'failed_replays': 0}
+
+    def _segment_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{index:010d}{SEGMENT_SUFFIX}")
+
+    # ---- Files (run in a worker thread) ---------------------------------------------------
+
+    def _load(self):
+        """Read the clicks left in the spool directory by a previous run"""
+        os.makedirs(self.directory, exist_ok=True)
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)):
+                continue
+            index = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            records, skipped = [], 0
+            with open(self._segment_path(index), 'rb') as segment:
+                for line in segment:
+                    record = _decode(line)
+                    if record is None:
+                        skipped += 1
+                    else:
+                        records.append(record)
+            if skipped:
+                logger.warning(f"Skipped {skipped} torn or corrupt lines in spool segment {name}")
+            self._segments[index] = records
+            self._next_segment = max(self._next_segment, index + 1)
+        self._loaded = True
+
+    def _write(self, line: bytes):
+        if self._file is None or self._size >= self.segment_bytes:
+            self._close()
+            self._active, self._next_segment = self._next_segment, self._next_segment + 1
+            self._segments[self._active] = []
+            self._file = open(self._segment_path(self._active), 'ab')
+            self._size = 0
+        self._file.write(line)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._size += len(line)
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+        self._file, self._active = None, None
+
+    # ---- Click path -----------------------------------------------------------------------
+
+    async def append(self, game_id: int, user_id: int, user_name: str, click_time: Union[str, datetime.datetime],
+                     timer_value: float, cooldown_expiration: Optional[datetime.datetime] = None,
+                     color_rank: Optional[str] = None) -> Optional[str]:
+        """
+        Durably spool an accepted click (fsync'd before returning).
+
+        Args:
+            cooldown_expiration, color_rank: The user's row update, replayed with the click if given
+
+        Returns:
+            str: The click's spool key (its click_key), or None if it could not be written
+        """
+        record = {
+            'key': f"spool-{uuid.uuid4().hex}",
+            'game_id': int(game_id),
+            'user_id': int(user_id),
+            'user_name': str(user_name),
+            'click_time': _as_datetime(click_time).isoformat(),
+            'timer_value': float(timer_value),
+        }
+        if cooldown_expiration is not None and color_rank is not None:
+            record['cooldown_expiration'] = _as_datetime(cooldown_expiration).isoformat()
+            record['color_rank'] = str(color_rank)
+        try:
+            async with self._lock:
+                if not self._loaded:
+                    await asyncio.to_thread(self._load)
+                await asyncio.to_thread(self._write, _encode(record))
+                self._segments[self._active].append(record)
+        except OSError as e:
+            logger.error(f"Failed to spool click from user {user_id} in game {game_id}: {e}")
+            return None
+        self.stats['spooled'] += 1
+        logger.info(f"Spooled click {record['key']} from user {user_id} in game {game_id}")
+        return record['key']
+
+    def pending(self, game_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Spooled clicks of a game (of every game if game_id is None) not replayed yet, oldest first"""
+        return [record for index in sorted(self._segments) for record in self._segments[index]
+                if (game_id is None or record['game_id'] == int(game_id)) and not record.get('replayed')]
+
+    def last_click_time(self, game_id: int, user_id: int) -> Optional[datetime.datetime]:
+        """A user's latest spooled click in a game not replayed yet, or None"""
+        times = [record['click_time'] for record in self.pending(game_id) if record['user_id'] == int(user_id)]
+        return _as_datetime(max(times)) if times else None
+
+    # ---- Replay ---------------------------------------------------------------------------
+
+    def on_replayed(self, callback):
+        """Register a callback run with the records of every replayed batch (awaited if it is a coroutine)"""
+        self._replayed_callbacks.append(callback)
+
+    async def _notify_replayed(self, records: List[Dict[str, Any]]):
+        for callback in self._replayed_callbacks:
+            try:
+                result = callback(records)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Click spool replay callback failed for {len(records)} clicks: {e}")
+
+    async def start(self):
+        """Load clicks left by a previous run and start the replayer"""
+        if self._task is not None:
+            return
+        async with self._lock:
+            if not self._loaded:
+                await asyncio.to_thread(self._load)
+        pending = sum(len(records) for records in self._segments.values())
+        if pending:
+            logger.warning(f"Click spool holds {pending} clicks from a previous run, replaying them")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the replayer; clicks not replayed yet stay on disk for the next start"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        async with self._lock:
+            await asyncio.to_thread(self._close)
+
+    async def _run(self):
+        while True:
+            try:
+                if any(self._segments.values()) or len(self._segments) > 1:
+                    await self.replay()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Click spool replay error: {e}")
+            await asyncio.sleep(self.replay_interval)
+
+    async def replay(self) -> int:
+        """
+        Replay every spooled click into MySQL (or the click queue while MySQL is down),
+        deleting each segment once all its clicks are replayed.
+
+        Returns:
+            int: Clicks replayed
+        """
+        # New clicks go to a fresh segment, so the sealed ones can be deleted once replayed
+        async with self._lock:
+            await asyncio.to_thread(self._close)
+            sealed = sorted(self._segments)
+
+        replayed = 0
+        for index in sealed:
+            records = self._segments[index]
+            for start in range(0, len(records), self.replay_batch_size):
+                batch = [record for record in records[start:start + self.replay_batch_size] if not record.get('replayed')]
+                if not batch:
+                    continue
+                if not await self._replay_batch(batch):
+                    self.stats['failed_replays'] += 1
+                    return replayed
+                # Out of pending() at once; replayed again (as duplicates) only after a crash
+                for record in batch:
+                    record['replayed'] = True
+                await self._notify_replayed(batch)
+            try:
+                await asyncio.to_thread(os.remove, self._segment_path(index))
+            except FileNotFoundError:
+                pass
+            del self._segments[index]
+            replayed += len(records)
+        if replayed:
+            logger.info(f"Replayed {replayed} spooled clicks")
+        return replayed
+
+    async def _replay_batch(self, records: List[Dict[str, Any]]) -> bool:
+        clicks = [
+            (record['game_id'], record['user_id'], _as_datetime(record['click_time']), record['timer_value'], record['key'])
+            for record in records
+        ]
+        result = await record_queued_clicks_async(clicks)
+        if result is not None:
+            self.stats['replayed_mysql'] += result['rows']
+            self.stats['duplicates'] += result['duplicates']
+            # User rows only for clicks inserted now: a duplicate's update was applied with it
+            inserted = set(result['inserted'])
+            by_user = {}
+            for record in records:
+                if record['key'] in inserted and 'color_rank' in record:
+                    by_user.setdefault(record['user_id'], []).append((
+                        _as_datetime(record['click_time']), record['timer_value'],
+                        _as_datetime(record['cooldown_expiration']), record['color_rank'],
+                        record['user_name'], record['game_id']
+                    ))
+            rows = [coalesce_user_clicks(user_id, user_clicks) for user_id, user_clicks in by_user.items()]
+            if rows and not await record_user_updates_async(rows):
+                logger.error(f"Failed to upsert {len(rows)} users for replayed spooled clicks")
+            return True
+
+        # MySQL is down: hand the clicks to the sync worker through the click queue
+        client = await redis_client.get_client()
+        if not client:
+            return False
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                for record in records:
+                    payload = build_click_payload(record['game_id'], record['user_id'], record['click_time'],
+                                                  record['timer_value'], record['user_name'])
+                    payload['click_key'] = record['key']
+                    pipe.xadd(CLICK_QUEUE_KEY, payload)
+                    if 'color_rank' in record:
+                        pipe.xadd(USER_UPDATE_QUEUE_KEY, build_user_update_payload(record['user_id'], 'click', build_user_click_data(
+                            record['user_name'], record['game_id'], _as_datetime(record['click_time']), record['timer_value'],
+                            _as_datetime(record['cooldown_expiration']), record['color_rank']
+                        )))
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to replay {len(records)} spooled clicks into {CLICK_QUEUE_KEY}: {e}")
+            return False
+        self.stats['replayed_stream'] += len(records)
+        return True
+
+    def format_report(self) -> List[str]:
+        """Render spool counters as plain text for the admin 'dbstats' command"""
+        pending = sum(not record.get('replayed') for records in self._segments.values() for record in records)
+        if not pending and not self.stats['spooled']:
+            return []
+        counters = " ".join(f"{name}={value}" for name, value in self.stats.items())
+        return [f"click spool   pending={pending} segments={len(self._segments)} {counters}"]
+
+
+# Global click spool instance
+click_spool = ClickSpool()
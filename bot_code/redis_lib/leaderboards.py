@@ -0,0 +1,630 @@
+# Redis Leaderboards
+"""
+Sorted-set leaderboards for The Button Game
+
+Updated atomically by the click admission script on every accepted click, so the leaderboard
+commands read top-N with ZREVRANGE and a player's rank with ZREVRANK instead of aggregating
+clicks in MySQL:
+- per game: clicks, time claimed, MMR and best (lowest) timer per player, per-player color
+  counts and per-color tier totals (l1, l2, myrank)
+- per guild and month: time claimed per player and their click/color counts (goonboard)
+- across games: total clicks and players per game (buttonrank)
+
+A leaderboard is only trusted once it has been built from MySQL (its `built` marker exists);
+until then readers fall back to MySQL and a rebuild is scheduled in the background. A rebuild
+also counts the clicks not synced to MySQL yet (click queue and local spool), and writes its
+result only if no click was admitted to that leaderboard meanwhile (its version counter, bumped
+by the admission script, is WATCHed; it retries otherwise), so it loses no clicks.
+"""
+
+import asyncio
+import datetime
+from datetime import timezone
+from typing import Any, Dict, List, Optional, Tuple
+from redis.exceptions import WatchError
+from database.database import execute_query_async, QUERY_FAILED
+from database.player_stats import COLORS, COLOR_CLICK_COLUMNS, COLOR_CLAIMED_COLUMNS, build_player_stats_rows
+from database.session_registry import session_registry
+from utils.utils import logger, config
+from .redis_client import redis_client
+from .redis_cache import game_state_cache, cache_namespace, get_game_state_ttl, synced_keys_query, click_datetime
+from .click_spool import click_spool
+
+
+GAME_METRICS = ('clicks', 'claimed', 'mmr', 'best_timer')
+
+
+def get_game_leaderboard_key(game_id: int, metric: str) -> str:
+    """Sorted set of players by metric (clicks, claimed, mmr or best_timer) in a game"""
+    return cache_namespace.key(f"lb:game:{game_id}:{metric}")
+
+
+def get_game_color_counts_key(game_id: int) -> str:
+    """Hash of per-player color counts in a game ({user_id}:c{color index})"""
+    return cache_namespace.key(f"lb:game:{game_id}:colors")
+
+
+def get_game_tiers_key(game_id: int) -> str:
+    """Hash of per-color totals in a game (clicks:{i}, claimed:{i}, players:{i})"""
+    return cache_namespace.key(f"lb:game:{game_id}:tiers")
+
+
+def get_game_built_key(game_id: int) -> str:
+    return cache_namespace.key(f"lb:game:{game_id}:built")
+
+
+def get_game_version_key(game_id: int) -> str:
+    """Counter bumped by every click admitted to a game's leaderboards"""
+    return cache_namespace.key(f"lb:game:{game_id}:version")
+
+
+def month_label(when: datetime.datetime) -> str:
+    """YYYY-MM of a click time (UTC)"""
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc)
+    return f"{when.year:04d}-{when.month:02d}"
+
+
+def get_month_leaderboard_key(guild_id: int, month: str) -> str:
+    """Sorted set of players by time claimed in a guild's games during a month (YYYY-MM)"""
+    return cache_namespace.key(f"lb:guild:{guild_id}:{month}:claimed")
+
+
+def get_month_counts_key(guild_id: int, month: str) -> str:
+    """Hash of per-player click and color counts for a guild's month ({user_id}:clicks, {user_id}:c{i})"""
+    return cache_namespace.key(f"lb:guild:{guild_id}:{month}:counts")
+
+
+def get_month_built_key(guild_id: int, month: str) -> str:
+    return cache_namespace.key(f"lb:guild:{guild_id}:{month}:built")
+
+
+def get_month_version_key(guild_id: int, month: str) -> str:
+    """Counter bumped by every click admitted to a guild's monthly leaderboard"""
+    return cache_namespace.key(f"lb:guild:{guild_id}:{month}:version")
+
+
+def get_games_leaderboard_key(metric: str) -> str:
+    """Sorted set of games by total clicks or players"""
+    return cache_namespace.key(f"lb:games:{metric}")
+
+
+def get_games_built_key() -> str:
+    return cache_namespace.key("lb:games:built")
+
+
+def get_games_version_key() -> str:
+    """Counter bumped by every admitted click (cross-game leaderboards)"""
+    return cache_namespace.key("lb:games:version")
+
+
+def get_month_ttl() -> int:
+    """TTL in seconds for monthly leaderboards (refreshed by every click in the month)"""
+    return config.get('cache', {}).get('leaderboard_month_ttl', 62 * 86400)
+
+
+def click_leaderboard_keys(game_id: int, guild_id: int, click_time: datetime.datetime) -> List[str]:
+    """Keys the admission script updates for an accepted click, then their version counters, in the order it expects them"""
+    month = month_label(click_time)
+    return [get_game_leaderboard_key(game_id, metric) for metric in GAME_METRICS] + [
+        get_game_color_counts_key(game_id),
+        get_game_tiers_key(game_id),
+        get_game_built_key(game_id),
+        get_month_leaderboard_key(guild_id, month),
+        get_month_counts_key(guild_id, month),
+        get_month_built_key(guild_id, month),
+        get_games_leaderboard_key('clicks'),
+        get_games_leaderboard_key('players'),
+        get_game_version_key(game_id),
+        get_month_version_key(guild_id, month),
+        get_games_version_key(),
+    ]
+
+
+# Color bucket of a click (same thresholds as utils.get_color_name), expressed in SQL
+COLOR_INDEX_SQL = '''
+    CASE
+        WHEN LEAST(GREATEST(bc.timer_value, 0), gs.timer_duration) / gs.timer_duration * 100 >= 83.33 THEN 5
+        WHEN LEAST(GREATEST(bc.timer_value, 0), gs.timer_duration) / gs.timer_duration * 100 >= 66.67 THEN 4
+        WHEN LEAST(GREATEST(bc.timer_value, 0), gs.timer_duration) / gs.timer_duration * 100 >= 50 THEN 3
+        WHEN LEAST(GREATEST(bc.timer_value, 0), gs.timer_duration) / gs.timer_duration * 100 >= 33.33 THEN 2
+        WHEN LEAST(GREATEST(bc.timer_value, 0), gs.timer_duration) / gs.timer_duration * 100 >= 16.67 THEN 1
+        ELSE 0
+    END
+'''
+
+
+class Leaderboards:
+    """Reads, and rebuilds from MySQL, the click-maintained leaderboards"""
+
+    def __init__(self):
+        self._rebuilding = set()
+
+    async def _client(self):
+        client = await redis_client.get_client()
+        if client and await game_state_cache.prepare(client):
+            return client
+        return None
+
+    def _schedule_rebuild(self, name: str, coroutine_factory):
+        """Rebuild a leaderboard in the background (once at a time per leaderboard)"""
+        if name in self._rebuilding:
+            return
+        self._rebuilding.add(name)
+
+        async def run():
+            try:
+                await coroutine_factory()
+            except Exception as e:
+                logger.error(f"Leaderboard rebuild of {name} failed: {e}")
+            finally:
+                self._rebuilding.discard(name)
+
+        asyncio.create_task(run())
+
+    async def _ready_game(self, game_id: int):
+        """Client if the game's leaderboards are built, else None (and a rebuild is scheduled)"""
+        client = await self._client()
+        if not client:
+            return None
+        if await client.exists(get_game_built_key(game_id)):
+            return client
+        self._schedule_rebuild(f"game {game_id}", lambda: self.rebuild_game(game_id))
+        return None
+
+    # ---- Reads --------------------------------------------------------------------------
+
+    async def game_top(self, game_id: int, metric: str, count: int) -> Optional[List[Tuple[int, float]]]:
+        """
+        Top players of a game by metric (best_timer ascending, the rest descending).
+
+        Returns:
+            list: (user_id, score) tuples, or None if the leaderboard is unavailable (use MySQL)
+        """
+        client = await self._ready_game(game_id)
+        if not client:
+            return None
+        key = get_game_leaderboard_key(game_id, metric)
+        if metric == 'best_timer':
+            entries = await client.zrange(key, 0, count - 1, withscores=True)
+        else:
+            entries = await client.zrevrange(key, 0, count - 1, withscores=True)
+        return [(int(user_id), score) for user_id, score in entries]
+
+    async def game_rank(self, game_id: int, metric: str, user_id: int) -> Optional[Tuple[Optional[int], int]]:
+        """
+        A player's 1-based rank in a game by metric.
+
+        Returns:
+            tuple: (rank or None if the player has no clicks, number of ranked players), or None if unavailable
+        """
+        client = await self._ready_game(game_id)
+        if not client:
+            return None
+        key = get_game_leaderboard_key(game_id, metric)
+        async with client.pipeline(transaction=False) as pipe:
+            if metric == 'best_timer':
+                pipe.zrank(key, str(user_id))
+            else:
+                pipe.zrevrank(key, str(user_id))
+            pipe.zcard(key)
+            rank, total = await pipe.execute()
+        return (rank + 1 if rank is not None else None), int(total)
+
+    async def game_scores(self, game_id: int, metric: str, user_ids: List[int]) -> Optional[Dict[int, float]]:
+        """Scores of the given players in a game by metric (absent players score 0), or None if unavailable"""
+        client = await self._ready_game(game_id)
+        if not client:
+            return None
+        if not user_ids:
+            return {}
+        scores = await client.zmscore(get_game_leaderboard_key(game_id, metric), [str(user_id) for user_id in user_ids])
+        return {user_id: score or 0 for user_id, score in zip(user_ids, scores)}
+
+    async def game_color_counts(self, game_id: int, user_ids: List[int]) -> Optional[Dict[int, List[int]]]:
+        """Per-player click counts by color index (Red..Purple), or None if unavailable"""
+        client = await self._ready_game(game_id)
+        if not client:
+            return None
+        if not user_ids:
+            return {}
+        fields = [f"{user_id}:c{index}" for user_id in user_ids for index in range(len(COLORS))]
+        values = await client.hmget(get_game_color_counts_key(game_id), fields)
+        return {
+            user_id: [int(value or 0) for value in values[position * len(COLORS):(position + 1) * len(COLORS)]]
+            for position, user_id in enumerate(user_ids)
+        }
+
+    async def game_tiers(self, game_id: int) -> Optional[List[Tuple[int, int, int]]]:
+        """(clicks, time claimed, players) per color index (Red..Purple), or None if unavailable"""
+        client = await self._ready_game(game_id)
+        if not client:
+            return None
+        tiers = await client.hgetall(get_game_tiers_key(game_id))
+        return [
+            tuple(int(float(tiers.get(f"{field}:{index}", 0))) for field in ('clicks', 'claimed', 'players'))
+            for index in range(len(COLORS))
+        ]
+
+    async def month_top(self, guild_id: int, year: int, month: int,
+                        count: int) -> Optional[List[Tuple[int, float, int, List[int]]]]:
+        """
+        Top players of a guild's month by time claimed.
+
+        Returns:
+            list: (user_id, time claimed, clicks, color counts Red..Purple) tuples, or None if unavailable
+        """
+        label = f"{year:04d}-{month:02d}"
+        client = await self._client()
+        if not client:
+            return None
+        if not await client.exists(get_month_built_key(guild_id, label)):
+            self._schedule_rebuild(f"guild {guild_id} {label}", lambda: self.rebuild_month(guild_id, year, month))
+            return None
+        entries = await client.zrevrange(get_month_leaderboard_key(guild_id, label), 0, count - 1, withscores=True)
+        if not entries:
+            return []
+        fields = []
+        for user_id, _ in entries:
+            fields.append(f"{user_id}:clicks")
+            fields.extend(f"{user_id}:c{index}" for index in range(len(COLORS)))
+        values = [int(value or 0) for value in await client.hmget(get_month_counts_key(guild_id, label), fields)]
+        width = len(COLORS) + 1
+        return [
+            (int(user_id), claimed, values[position * width], values[position * width + 1:(position + 1) * width])
+            for position, (user_id, claimed) in enumerate(entries)
+        ]
+
+    async def game_totals(self, game_ids: List[int]) -> Optional[Dict[int, Tuple[int, int, Optional[int]]]]:
+        """
+        Total clicks and players of each game, with its rank by clicks among all games.
+
+        Returns:
+            dict: {game_id: (total clicks, total players, clicks rank)}, or None if unavailable
+        """
+        client = await self._client()
+        if not client:
+            return None
+        if not await client.exists(get_games_built_key()):
+            self._schedule_rebuild("games", self.rebuild_games)
+            return None
+        if not game_ids:
+            return {}
+        members = [str(game_id) for game_id in game_ids]
+        clicks_key, players_key = get_games_leaderboard_key('clicks'), get_games_leaderboard_key('players')
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.zmscore(clicks_key, members)
+            pipe.zmscore(players_key, members)
+            for member in members:
+                pipe.zrevrank(clicks_key, member)
+            clicks, players, *ranks = await pipe.execute()
+        return {
+            game_id: (int(clicks[i] or 0), int(players[i] or 0), ranks[i] + 1 if ranks[i] is not None else None)
+            for i, game_id in enumerate(game_ids)
+        }
+
+    async def user_names(self, user_ids: List[int]) -> Dict[int, str]:
+        """Stored user names for a handful of users (primary key lookups)"""
+        if not user_ids:
+            return {}
+        result = await execute_query_async(
+            f"SELECT user_id, user_name FROM users WHERE user_id IN ({', '.join(['%s'] * len(user_ids))})",
+            tuple(user_ids)
+        )
+        return {int(user_id): str(user_name) for user_id, user_name in result or []}
+
+    # ---- Rebuilds from MySQL ------------------------------------------------------------
+
+    async def _rebuild(self, client, name: str, version_key: str, read) -> Optional[int]:
+        """
+        Run a rebuild as an optimistic transaction on the leaderboard's version counter. The
+        admission script bumps it with every click it adds to the leaderboard, so with it WATCHed
+        the rebuild's writes fail, and are redone, if such a click was admitted meanwhile.
+        Every click admitted before is then either in MySQL or still unsynced.
+
+        Args:
+            version_key: The leaderboard's version counter (see click_leaderboard_keys)
+            read: Coroutine function taking the unsynced clicks (read after the WATCH); reads MySQL,
+                folds in the unsynced clicks it does not have yet, and returns (function queueing
+                the writes on a transaction, players rebuilt), or None if MySQL could not be read
+
+        Returns:
+            int: Players rebuilt, or None if the rebuild failed
+        """
+        for attempt in range(REBUILD_ATTEMPTS):
+            async with client.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(version_key)
+                    built = await read(await game_state_cache.query_unsynced_clicks())
+                    if built is None:
+                        return None
+                    write, players = built
+                    pipe.multi()
+                    write(pipe)
+                    await pipe.execute()
+                    return players
+                except WatchError:
+                    logger.debug(f"Clicks admitted during the {name} leaderboard rebuild, retrying "
+                                 f"({attempt + 1}/{REBUILD_ATTEMPTS})")
+        logger.warning(f"Gave up the {name} leaderboard rebuild: clicks kept being admitted during "
+                       f"{REBUILD_ATTEMPTS} attempts")
+        return None
+
+    async def _click_games(self, clicks: List[Dict[str, Any]]) -> Optional[Dict[int, Tuple[int, int]]]:
+        """
+        (guild_id, timer_duration) of the games of the given clicks, from the session registry where possible.
+
+        Returns:
+            dict: {game_id: (guild_id, timer_duration)}, or None if MySQL could not be read
+        """
+        games, missing = {}, []
+        for game_id in {click['game_id'] for click in clicks}:
+            session = session_registry.get_by_game_id(game_id)
+            if session:
+                games[game_id] = (int(session['guild_id']), int(session['timer_duration']))
+            else:
+                missing.append(game_id)
+        if missing:
+            rows = await execute_query_async(
+                f"SELECT id, guild_id, timer_duration FROM game_sessions WHERE id IN ({', '.join(['%s'] * len(missing))})",
+                tuple(missing), failure_result=QUERY_FAILED
+            )
+            if rows is QUERY_FAILED:
+                return None
+            for game_id, guild_id, timer_duration in rows:
+                games[int(game_id)] = (int(guild_id), int(timer_duration))
+        return games
+
+    async def rebuild_game(self, game_id: int) -> bool:
+        """Rebuild a game's leaderboards from the game_player_stats rollup and the clicks not synced to it yet"""
+        client = await self._client()
+        if not client:
+            return False
+        game_id = int(game_id)
+
+        async def read(unsynced):
+            unsynced = [click for click in unsynced if click['game_id'] == game_id]
+            synced_query, synced_params = synced_keys_query(6 + 2 * len(COLORS), (click['key'] for click in unsynced))
+            rows = await execute_query_async(f'''
+                SELECT user_id, clicks, time_claimed, mmr, best_timer,
+                    {', '.join(COLOR_CLICK_COLUMNS)}, {', '.join(COLOR_CLAIMED_COLUMNS)}, NULL
+                FROM game_player_stats
+                WHERE game_id = %s
+            ''' + synced_query, (game_id,) + synced_params, failure_result=QUERY_FAILED)
+            if rows is QUERY_FAILED:
+                return None
+            synced = {row[-1] for row in rows if row[-1] is not None}
+            rows = [row[:-1] for row in rows if row[-1] is None]
+            folded = [click for click in unsynced if click['key'] not in synced]
+            games = await self._click_games(folded)
+            if games is None:
+                return None
+            # Rollup rows of the folded clicks, in the column order of the query above
+            rows += [(row[1], row[2], row[4], row[-2], row[3]) + row[5:5 + 2 * len(COLORS)]
+                     for row in _stats_rows(folded, games)]
+
+            metrics = {metric: {} for metric in GAME_METRICS}
+            colors, tiers = {}, {}
+            for row in rows:
+                user_id, clicks, claimed, mmr, best_timer = row[:5]
+                color_clicks = row[5:5 + len(COLORS)]
+                color_claimed = row[5 + len(COLORS):5 + 2 * len(COLORS)]
+                metrics['clicks'][user_id] = metrics['clicks'].get(user_id, 0) + int(clicks or 0)
+                metrics['claimed'][user_id] = metrics['claimed'].get(user_id, 0) + int(claimed or 0)
+                metrics['mmr'][user_id] = metrics['mmr'].get(user_id, 0) + float(mmr or 0)
+                if best_timer is not None:
+                    metrics['best_timer'][user_id] = min(metrics['best_timer'].get(user_id, int(best_timer)), int(best_timer))
+                for index, (count, seconds) in enumerate(zip(color_clicks, color_claimed)):
+                    if not count:
+                        continue
+                    field = f"{user_id}:c{index}"
+                    if field not in colors:
+                        tiers[f"players:{index}"] = tiers.get(f"players:{index}", 0) + 1
+                    colors[field] = colors.get(field, 0) + int(count)
+                    tiers[f"clicks:{index}"] = tiers.get(f"clicks:{index}", 0) + int(count)
+                    tiers[f"claimed:{index}"] = tiers.get(f"claimed:{index}", 0) + int(seconds or 0)
+
+            def write(pipe):
+                ttl = get_game_state_ttl()
+                keys = [get_game_leaderboard_key(game_id, metric) for metric in GAME_METRICS]
+                keys += [get_game_color_counts_key(game_id), get_game_tiers_key(game_id)]
+                pipe.delete(*keys)
+                for metric, scores in metrics.items():
+                    _zadd_chunked(pipe, get_game_leaderboard_key(game_id, metric), scores)
+                _hset_chunked(pipe, get_game_color_counts_key(game_id), colors)
+                _hset_chunked(pipe, get_game_tiers_key(game_id), tiers)
+                for key in keys:
+                    pipe.expire(key, ttl)
+                pipe.set(get_game_built_key(game_id), '1', ex=ttl)
+
+            return write, len(metrics['clicks'])
+
+        players = await self._rebuild(client, f"game {game_id}", get_game_version_key(game_id), read)
+        if players is None:
+            return False
+        logger.info(f"Rebuilt leaderboards for game {game_id} ({players} players)")
+        return True
+
+    async def rebuild_month(self, guild_id: int, year: int, month: int) -> bool:
+        """Rebuild a guild's monthly time claimed leaderboard from button_clicks and the clicks not synced to it yet"""
+        client = await self._client()
+        if not client:
+            return False
+        start = datetime.datetime(year, month, 1)
+        end = datetime.datetime(year + (month == 12), month % 12 + 1, 1)
+        label = f"{year:04d}-{month:02d}"
+
+        async def read(unsynced):
+            unsynced = [click for click in unsynced if month_label(click_datetime(click)) == label]
+            games = await self._click_games(unsynced)
+            if games is None:
+                return None
+            unsynced = [click for click in unsynced if games.get(click['game_id'], (None,))[0] == int(guild_id)]
+            synced_query, synced_params = synced_keys_query(5, (click['key'] for click in unsynced))
+            rows = await execute_query_async(f'''
+                SELECT bc.user_id, {COLOR_INDEX_SQL} AS color_index,
+                    COUNT(*), SUM(GREATEST(0, gs.timer_duration - bc.timer_value)), NULL
+                FROM button_clicks bc
+                JOIN game_sessions gs ON bc.game_id = gs.id
+                WHERE gs.guild_id = %s AND bc.click_time >= %s AND bc.click_time < %s
+                GROUP BY bc.user_id, color_index
+            ''' + synced_query, (guild_id, start, end) + synced_params, failure_result=QUERY_FAILED)
+            if rows is QUERY_FAILED:
+                return None
+
+            claimed, counts, synced = {}, {}, set()
+            for user_id, color_index, clicks, seconds, click_key in rows:
+                if click_key is not None:
+                    synced.add(click_key)
+                    continue
+                claimed[user_id] = claimed.get(user_id, 0) + int(seconds or 0)
+                counts[f"{user_id}:clicks"] = counts.get(f"{user_id}:clicks", 0) + int(clicks)
+                counts[f"{user_id}:c{int(color_index)}"] = counts.get(f"{user_id}:c{int(color_index)}", 0) + int(clicks)
+            for row in _stats_rows([click for click in unsynced if click['key'] not in synced], games):
+                user_id, clicks, seconds = row[1], row[2], row[4]
+                claimed[user_id] = claimed.get(user_id, 0) + seconds
+                counts[f"{user_id}:clicks"] = counts.get(f"{user_id}:clicks", 0) + clicks
+                for index, count in enumerate(row[5:5 + len(COLORS)]):
+                    if count:
+                        counts[f"{user_id}:c{index}"] = counts.get(f"{user_id}:c{index}", 0) + count
+
+            def write(pipe):
+                ttl = get_month_ttl()
+                zset_key, counts_key = get_month_leaderboard_key(guild_id, label), get_month_counts_key(guild_id, label)
+                pipe.delete(zset_key, counts_key)
+                _zadd_chunked(pipe, zset_key, claimed)
+                _hset_chunked(pipe, counts_key, counts)
+                pipe.expire(zset_key, ttl)
+                pipe.expire(counts_key, ttl)
+                pipe.set(get_month_built_key(guild_id, label), '1', ex=ttl)
+
+            return write, len(claimed)
+
+        players = await self._rebuild(client, f"guild {guild_id} {label}", get_month_version_key(guild_id, label), read)
+        if players is None:
+            return False
+        logger.info(f"Rebuilt {label} leaderboard for guild {guild_id} ({players} players)")
+        return True
+
+    async def rebuild_games(self) -> bool:
+        """Rebuild the cross-game click and player totals from the game_player_stats rollup and the clicks not synced to it yet"""
+        client = await self._client()
+        if not client:
+            return False
+
+        async def read(unsynced):
+            # Rollup rows of the unsynced clicks' players tell whether they are new to their game
+            pairs_query, pairs_params = '', ()
+            if unsynced:
+                game_ids = sorted({click['game_id'] for click in unsynced})
+                user_ids = sorted({click['user_id'] for click in unsynced})
+                pairs_query = f'''
+                    UNION ALL SELECT game_id, user_id, NULL, NULL, NULL
+                    FROM game_player_stats
+                    WHERE game_id IN ({', '.join(['%s'] * len(game_ids))}) AND user_id IN ({', '.join(['%s'] * len(user_ids))})
+                '''
+                pairs_params = tuple(game_ids) + tuple(user_ids)
+            synced_query, synced_params = synced_keys_query(5, (click['key'] for click in unsynced))
+            rows = await execute_query_async('''
+                SELECT game_id, NULL, SUM(clicks), COUNT(*), NULL
+                FROM game_player_stats
+                GROUP BY game_id
+            ''' + pairs_query + synced_query, pairs_params + synced_params, failure_result=QUERY_FAILED)
+            if rows is QUERY_FAILED:
+                return None
+
+            clicks, players, known, synced = {}, {}, set(), set()
+            for game_id, user_id, game_clicks, game_players, click_key in rows:
+                if click_key is not None:
+                    synced.add(click_key)
+                elif user_id is not None:
+                    known.add((int(game_id), int(user_id)))
+                else:
+                    clicks[int(game_id)] = int(game_clicks or 0)
+                    players[int(game_id)] = int(game_players)
+            for click in unsynced:
+                if click['key'] in synced:
+                    continue
+                game_id, user_id = click['game_id'], click['user_id']
+                clicks[game_id] = clicks.get(game_id, 0) + 1
+                if (game_id, user_id) not in known:
+                    known.add((game_id, user_id))
+                    players[game_id] = players.get(game_id, 0) + 1
+
+            def write(pipe):
+                clicks_key, players_key = get_games_leaderboard_key('clicks'), get_games_leaderboard_key('players')
+                pipe.delete(clicks_key, players_key)
+                _zadd_chunked(pipe, clicks_key, clicks)
+                _zadd_chunked(pipe, players_key, players)
+                pipe.set(get_games_built_key(), '1')
+
+            return write, len(clicks)
+
+        games = await self._rebuild(client, "cross-game", get_games_version_key(), read)
+        if games is None:
+            return False
+        logger.info(f"Rebuilt cross-game leaderboards ({games} games)")
+        return True
+
+    async def rebuild_replayed(self, records: List[Dict[str, Any]]):
+        """
+        Rebuild the leaderboards counting replayed spooled clicks, which click admission never saw.
+        A leaderboard that cannot be rebuilt loses its built marker, so readers use MySQL until
+        the next lazy rebuild.
+        """
+        games = await self._click_games(records) or {}
+        months = set()
+        for record in records:
+            if record['game_id'] in games:
+                clicked = click_datetime(record)
+                months.add((games[record['game_id']][0], clicked.year, clicked.month))
+            else:
+                logger.error(f"Unknown guild of game {record['game_id']}: its monthly leaderboard misses replayed clicks")
+        rebuilds = [(get_game_built_key(game_id), self.rebuild_game(game_id))
+                    for game_id in {record['game_id'] for record in records}]
+        rebuilds += [(get_month_built_key(guild_id, f"{year:04d}-{month:02d}"), self.rebuild_month(guild_id, year, month))
+                     for guild_id, year, month in months]
+        rebuilds.append((get_games_built_key(), self.rebuild_games()))
+
+        results = await asyncio.gather(*(rebuild for _, rebuild in rebuilds), return_exceptions=True)
+        failed = [key for (key, _), result in zip(rebuilds, results) if result is not True]
+        if not failed:
+            return
+        client = await self._client()
+        if client:
+            await client.delete(*failed)
+            logger.warning(f"Dropped {len(failed)} leaderboards that could not be rebuilt after a spool replay")
+        else:
+            logger.error(f"{len(failed)} leaderboards miss replayed clicks: Redis is unavailable")
+
+
+# Attempts of a rebuild racing admitted clicks before it gives up
+REBUILD_ATTEMPTS = 5
+
+# Members per ZADD/HSET when rebuilding
+REBUILD_CHUNK = 1000
+
+
+def _zadd_chunked(pipe, key: str, scores: Dict[Any, float]):
+    items = [(str(member), score) for member, score in scores.items()]
+    for start in range(0, len(items), REBUILD_CHUNK):
+        pipe.zadd(key, dict(items[start:start + REBUILD_CHUNK]))
+
+
+def _hset_chunked(pipe, key: str, fields: Dict[str, Any]):
+    items = list(fields.items())
+    for start in range(0, len(items), REBUILD_CHUNK):
+        pipe.hset(key, mapping=dict(items[start:start + REBUILD_CHUNK]))
+
+
+def _stats_rows(clicks: List[Dict[str, Any]], games: Dict[int, Tuple[int, int]]) -> List[tuple]:
+    """game_player_stats rows (see database.player_stats.build_player_stats_rows) of unsynced click dicts"""
+    return build_player_stats_rows(
+        [(click['game_id'], click['user_id'], click['click_time'], click['timer_value']) for click in clicks],
+        {game_id: timer_duration for game_id, (_, timer_duration) in games.items()}
+    )
+
+
+# Global leaderboards instance
+leaderboards = Leaderboards()
+click_spool.on_replayed(leaderboards.rebuild_replayed)
@@ -0,0 +1,173 @@
+# Redis Game State Near-Cache
+"""
+In-process read-through tier in front of GameStateCache
+
+Game state is read far more often than it changes (every MenuTimer tick for every game, plus
+every click), so each process keeps the deserialized state hash in memory and only goes to
+Redis when its copy has been invalidated:
+- every write to a game's state (GameStateBatch, the click admission script, cache
+  invalidation) drops the writer's own copy and publishes "{game_id}:{origin}" on the
+  game_state_invalidate channel
+- one subscription per process drops the local copy when another process's message arrives,
+  so readers in every bot process stay coherent; a "*" game ID (cache generation bump) drops
+  everything
+- while the subscription is down (or Redis is) nothing guarantees coherence, so the cache is
+  cleared and entries only live for a short degraded TTL
+"""
+
+import time
+import uuid
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+from utils.utils import logger, config
+
+
+GAME_STATE_CHANNEL = "game_state_invalidate"
+
+
+class GameStateNearCache:
+    """Per-process game state copies, dropped on pub/sub invalidation"""
+
+    def __init__(self):
+        self._entries: Dict[int, Tuple[Dict[str, Any], float]] = {}
+        # Bumped by every invalidation so a read that raced with a write is not cached
+        self._generations: Dict[int, int] = {}
+        self._epoch = 0
+        # Identifies this process's own messages, already applied locally when they were sent
+        self.origin = uuid.uuid4().hex
+        self._client = None
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        # Called whenever everything is dropped (e.g. to re-read the cache generation)
+        self._clear_callbacks = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    @property
+    def listening(self) -> bool:
+        """Whether invalidations are being received (entries may then be kept for the full TTL)"""
+        return self._task is not None and not self._task.done()
+
+    def _ttl(self) -> float:
+        cache_config = config.get('cache', {})
+        if self.listening:
+            return float(cache_config.get('near_cache_ttl', 300))
+        return float(cache_config.get('near_cache_degraded_ttl', 5))
+
+    async def ensure_started(self, client) -> bool:
+        """Subscribe to invalidations if not already listening on this client"""
+        if self.listening and self._client is client:
+            return True
+        async with self._start_lock:
+            if self.listening and self._client is client:
+                return True
+            return await self._start(client)
+
+    async def _start(self, client) -> bool:
+        await self.stop()
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(GAME_STATE_CHANNEL)
+        except Exception as e:
+            logger.warning(f"Game state invalidation subscription failed, near-cache degraded: {e}")
+            return False
+        # Anything cached before the subscription existed may have missed an invalidation
+        self.clear()
+        self._client, self._pubsub = client, pubsub
+        self._task = asyncio.create_task(self._listen(pubsub))
+        logger.info("Game state near-cache listening for invalidations")
+        return True
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get('type') == 'message':
+                    game_id, _, origin = str(message['data']).partition(':')
+                    if origin == self.origin:
+                        continue
+                    try:
+                        self.invalidate(int(game_id))
+                    except (TypeError, ValueError):
+                        # "*" or anything unexpected
+                        self.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Game state invalidation listener stopped: {e}")
+        finally:
+            # Invalidations may be lost from here on
+            self.clear()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+        self._task = self._pubsub = self._client = None
+
+    def message(self, game_id) -> str:
+        """Invalidation message for a game written by this process ("*" for every game)"""
+        return f"{game_id if game_id == '*' else int(game_id)}:{self.origin}"
+
+    def on_clear(self, callback):
+        """Register a callback run whenever every local copy is dropped"""
+        self._clear_callbacks.append(callback)
+
+    def get(self, game_id: int) -> Optional[Dict[str, Any]]:
+        """Local copy of a game's state, or None if absent or expired"""
+        entry = self._entries.get(int(game_id))
+        if entry is not None and entry[1] > time.monotonic():
+            self.stats['hits'] += 1
+            return dict(entry[0])
+        self.stats['misses'] += 1
+        return None
+
+    def token(self, game_id: int) -> Tuple[int, int]:
+        """Snapshot taken before reading from Redis/MySQL; pass it to put()"""
+        return self._epoch, self._generations.get(int(game_id), 0)
+
+    def put(self, game_id: int, state: Dict[str, Any], token: Tuple[int, int]):
+        """Cache a state read, unless the game was invalidated since the token was taken"""
+        game_id = int(game_id)
+        if token != self.token(game_id):
+            return
+        self._entries[game_id] = (dict(state), time.monotonic() + self._ttl())
+
+    def invalidate(self, game_id: int):
+        """Drop a game's local copy (and any read of it still in flight)"""
+        game_id = int(game_id)
+        self._generations[game_id] = self._generations.get(game_id, 0) + 1
+        self._entries.pop(game_id, None)
+        self.stats['invalidations'] += 1
+
+    def clear(self):
+        """Drop every local copy"""
+        self._epoch += 1
+        self._entries.clear()
+        for callback in self._clear_callbacks:
+            callback()
+
+    def format_report(self) -> list:
+        """Render near-cache hit rate as plain text for the admin 'dbstats' command"""
+        stats = dict(self.stats)
+        reads = stats['hits'] + stats['misses']
+        if not reads:
+            return []
+        mode = "listening" if self.listening else "degraded"
+        return [f"state near-cache  {mode} entries={len(self._entries)} hits={stats['hits']} "
+                f"({stats['hits'] / reads:.1%}) misses={stats['misses']} invalidations={stats['invalidations']}"]
+
+
+# Global near-cache instance
+game_state_near_cache = GameStateNearCache()
@@ -4,17 +4,294 @@ Game state caching operations for The Button Game
 
 Provides fast access to:
 - Game state (timer, clicks, players)
+- Live total_clicks / total_players counters (kept current by the click admission script)
+- Per-user cooldown keys, preloaded from MySQL so the admission script rarely misses
+- Per-game recent-clickers windows for double-click prevention, seeded from MySQL
 - Timer calculations
-- Cache warming and invalidation
+- Cache warming and invalidation (every state write is published to the per-process near-cache)
+
+Cache keys live under a versioned namespace, tb:v{schema}:g{generation}:..., so bumping the
+generation counter invalidates every cached key in O(1); old generations simply expire (or are
+purged incrementally with SCAN). Durable keys - the click queue stream, its DLQ and locks - are
+not namespaced and survive a bump.
 """
 
 import json
+import time
+import asyncio
 import datetime
+from contextlib import asynccontextmanager
 from datetime import timezone
-from typing import Dict, Optional, Tuple, Any
-from database.database import execute_query, get_game_session_by_id
+from typing import Dict, List, Optional, Tuple, Any
+from database.database import execute_query_async, get_game_session_by_id, run_db_call, update_local_game_sessions
+from database.session_registry import session_registry
 from utils.utils import logger, config
 from .redis_client import redis_client
+from .near_cache import game_state_near_cache, GAME_STATE_CHANNEL
+from .click_spool import click_spool
+from .sync_worker import sync_worker, click_from_entry
+
+
+def get_game_state_ttl() -> int:
+    """TTL in seconds for game state hashes"""
+    return config.get('cache', {}).get('game_state_ttl', 86400)
+
+
+# Bump when the layout of cached keys changes, so old and new code never share keys
+CACHE_SCHEMA_VERSION = 1
+CACHE_KEY_PREFIX = "tb"
+# Keys per SCAN/UNLINK round when purging stale generations
+PURGE_SCAN_COUNT = 500
+# Cache keys written before namespacing was introduced
+LEGACY_KEY_PATTERNS = ("game:*:state", "game:*:players", "game:*:recent_clickers", "user:*:game:*:cooldown")
+
+
+class CacheNamespace:
+    """
+    Current cache generation, shared by every process through a Redis counter.
+    
+    Read once per process and again whenever the near-cache drops everything (a bump was
+    published, or invalidations may have been missed); the admission script re-checks it
+    atomically, so clicks are never applied to a retired generation.
+    """
+    
+    def __init__(self):
+        self.generation = 0
+        self.loaded = False
+    
+    @property
+    def generation_key(self) -> str:
+        return f"{CACHE_KEY_PREFIX}:v{CACHE_SCHEMA_VERSION}:generation"
+    
+    def prefix(self, generation: Optional[int] = None) -> str:
+        return f"{CACHE_KEY_PREFIX}:v{CACHE_SCHEMA_VERSION}:g{self.generation if generation is None else generation}:"
+    
+    def key(self, suffix: str) -> str:
+        """Namespaced cache key for the current generation"""
+        return self.prefix() + suffix
+    
+    async def refresh(self, client) -> int:
+        """Read the current generation from Redis"""
+        self.generation = int(await client.get(self.generation_key) or 0)
+        self.loaded = True
+        return self.generation
+    
+    def mark_stale(self):
+        self.loaded = False
+
+
+cache_namespace = CacheNamespace()
+game_state_near_cache.on_clear(cache_namespace.mark_stale)
+
+
+def get_game_players_key(game_id: int) -> str:
+    """Get Redis key of the set of user IDs that have clicked in a game (backs total_players)"""
+    return cache_namespace.key(f"game:{game_id}:players")
+
+
+def get_cooldown_key(user_id: int, game_id: int) -> str:
+    """Get Redis key holding the epoch time of a user's last accepted click in a game"""
+    return cache_namespace.key(f"user:{user_id}:game:{game_id}:cooldown")
+
+
+def get_recent_clickers_key(game_id: int) -> str:
+    """Get Redis key of a game's recent distinct clickers window (newest first)"""
+    return cache_namespace.key(f"game:{game_id}:recent_clickers")
+
+
+# SADD arguments per command when seeding a game's player set
+PLAYER_SEED_CHUNK = 1000
+
+
+def click_datetime(click: Dict[str, Any]) -> datetime.datetime:
+    """Aware click_time of a click dict (see query_unsynced_clicks)"""
+    click_time = datetime.datetime.fromisoformat(click['click_time'])
+    return click_time if click_time.tzinfo else click_time.replace(tzinfo=timezone.utc)
+
+
+def synced_keys_query(columns: int, keys) -> Tuple[str, tuple]:
+    """
+    UNION ALL branch (and its params) selecting which of the given click keys are in
+    button_clicks, in the last of `columns` columns with the others NULL. Appended to a
+    MySQL read, it checks the keys in the same snapshot, so a click synced while the read
+    runs is counted once: by MySQL or by the caller, never by both or neither.
+    """
+    keys = tuple(keys)
+    if not keys:
+        return '', ()
+    return (f" UNION ALL SELECT {'NULL, ' * (columns - 1)}click_key FROM button_clicks"
+            f" WHERE click_key IN ({', '.join(['%s'] * len(keys))})", keys)
+
+
+class GameStateBatch:
+    """
+    Queues game state writes into one pipeline that is sent when GameStateCache.batch() exits.
+    
+    Hash writes, TTL refreshes, counter increments and stream appends for any number of games
+    cost a single network round trip. Each queueing method returns the index of its reply in
+    `results`, which is filled in after the batch has been executed. Every game whose state
+    hash was written is published on the near-cache invalidation channel in the same batch.
+    When Redis is unavailable the batch is inactive and every method is a no-op.
+    """
+    
+    def __init__(self, cache: 'GameStateCache', pipeline):
+        self._cache = cache
+        self.pipeline = pipeline
+        self.results: Optional[List[Any]] = None
+        self.succeeded = False
+        self._commands = 0
+        self._ttl_keys: Dict[str, int] = {}
+        self._dirty_games = set()
+    
+    @property
+    def active(self) -> bool:
+        """Whether writes are actually being queued (Redis was available)"""
+        return self.pipeline is not None
+    
+    def _queued(self) -> int:
+        self._commands += 1
+        return self._commands - 1
+    
+    def set_state(self, game_id: int, state: Optional[Dict[str, Any]] = None, ttl: Optional[int] = None, **fields) -> Optional[int]:
+        """
+        Queue an HSET of game state fields, given as a dict (which may itself contain game_id)
+        and/or keywords; the hash TTL is refreshed once at the end of the batch
+        """
+        fields = {**(state or {}), **fields}
+        if not self.active or not fields:
+            return None
+        key = self._cache._get_game_state_key(game_id)
+        self.pipeline.hset(key, mapping=self._cache._serialize_game_state(fields))
+        self._dirty_games.add(int(game_id))
+        self._touch(game_id, ttl or get_game_state_ttl())
+        return self._queued()
+    
+    def _touch(self, game_id: int, ttl: int, keep_existing: bool = False):
+        """Give the state hash and its player set the same TTL, refreshed once at the end of the batch"""
+        for key in (self._cache._get_game_state_key(game_id), get_game_players_key(game_id)):
+            if keep_existing:
+                self._ttl_keys.setdefault(key, ttl)
+            else:
+                self._ttl_keys[key] = ttl
+    
+    def set_players(self, game_id: int, user_ids) -> Optional[int]:
+        """
+        Queue a rebuild of a game's player set and mark it seeded, so the admission script
+        can maintain total_players with SADD from then on.
+        """
+        if not self.active:
+            return None
+        key = get_game_players_key(game_id)
+        user_ids = [str(user_id) for user_id in user_ids]
+        self.pipeline.delete(key)
+        for start in range(0, len(user_ids), PLAYER_SEED_CHUNK):
+            self.pipeline.sadd(key, *user_ids[start:start + PLAYER_SEED_CHUNK])
+        self.pipeline.hset(self._cache._get_game_state_key(game_id), mapping={
+            'total_players': str(len(user_ids)), 'players_seeded': '1'
+        })
+        self._dirty_games.add(int(game_id))
+        self._touch(game_id, get_game_state_ttl())
+        return self._queued()
+    
+    def set_cooldowns(self, game_id: int, last_clicks: Dict[int, float], cooldown_seconds: float, now: float) -> Optional[int]:
+        """
+        Queue cooldown keys for the users of a game still on cooldown and mark the game's cooldowns
+        as seeded: from then on a missing key means "not on cooldown" to the admission script.
+        Keys are only written if absent, so a newer click recorded by the script is never overwritten.
+        
+        Args:
+            game_id: Game session ID
+            last_clicks: {user_id: epoch seconds of their last click}
+            cooldown_seconds: The game's cooldown
+            now: Current epoch seconds
+        """
+        if not self.active:
+            return None
+        for user_id, last_click in last_clicks.items():
+            remaining_ms = int((last_click + cooldown_seconds - now) * 1000)
+            if remaining_ms > 0:
+                self.pipeline.set(get_cooldown_key(user_id, game_id), repr(float(last_click)), px=remaining_ms, nx=True)
+        self.pipeline.hset(self._cache._get_game_state_key(game_id), 'cooldowns_seeded', '1')
+        self._dirty_games.add(int(game_id))
+        self._touch(game_id, get_game_state_ttl(), keep_existing=True)
+        return self._queued()
+    
+    def set_recent_clickers(self, game_id: int, user_ids: List[int], window: int) -> Optional[int]:
+        """
+        Queue a rebuild of a game's recent-clickers window (newest first) and record the window size
+        it is valid for in recent_window, which the admission script checks against the requirement.
+        """
+        if not self.active:
+            return None
+        key = get_recent_clickers_key(game_id)
+        self.pipeline.delete(key)
+        if user_ids:
+            self.pipeline.rpush(key, *[str(user_id) for user_id in user_ids])
+            self._ttl_keys[key] = get_game_state_ttl()
+        self.pipeline.hset(self._cache._get_game_state_key(game_id), 'recent_window', str(max(1, int(window))))
+        self._dirty_games.add(int(game_id))
+        self._touch(game_id, get_game_state_ttl(), keep_existing=True)
+        return self._queued()
+    
+    def clear_fields(self, game_id: int, *fields: str) -> Optional[int]:
+        """Queue an HDEL of state fields (a missing total_clicks or players_seeded forces a reload from MySQL)"""
+        if not self.active or not fields:
+            return None
+        self.pipeline.hdel(self._cache._get_game_state_key(game_id), *fields)
+        self._dirty_games.add(int(game_id))
+        return self._queued()
+    
+    def refresh_ttl(self, game_id: int, ttl: Optional[int] = None):
+        """Refresh the game state TTL without writing fields"""
+        if self.active:
+            self._touch(game_id, ttl or get_game_state_ttl())
+    
+    def increment(self, game_id: int, field: str, amount: int = 1) -> Optional[int]:
+        """Queue an HINCRBY on a game state counter"""
+        if not self.active:
+            return None
+        key = self._cache._get_game_state_key(game_id)
+        self.pipeline.hincrby(key, field, amount)
+        self._dirty_games.add(int(game_id))
+        self._touch(game_id, get_game_state_ttl(), keep_existing=True)
+        return self._queued()
+    
+    def xadd(self, stream: str, fields: Dict[str, str], maxlen: Optional[int] = None) -> Optional[int]:
+        """Queue a stream append (e.g. the click queue)"""
+        if not self.active:
+            return None
+        self.pipeline.xadd(stream, fields, maxlen=maxlen, approximate=maxlen is not None)
+        return self._queued()
+    
+    def command(self, *args) -> Optional[int]:
+        """Queue any other Redis command"""
+        if not self.active:
+            return None
+        self.pipeline.execute_command(*args)
+        return self._queued()
+    
+    async def execute(self) -> bool:
+        """Send everything queued in one round trip. Returns True if the batch was applied"""
+        if not self.active:
+            return False
+        if not self._commands and not self._ttl_keys:
+            self.succeeded = True
+            return True
+        for key, ttl in self._ttl_keys.items():
+            self.pipeline.expire(key, ttl)
+        for game_id in self._dirty_games:
+            self.pipeline.publish(GAME_STATE_CHANNEL, game_state_near_cache.message(game_id))
+        try:
+            self.results = await self.pipeline.execute()
+            self.succeeded = True
+        except Exception as e:
+            logger.error(f"Redis batch of {self._commands} commands failed: {e}")
+            self.succeeded = False
+        finally:
+            # A failed batch may still have been partly applied
+            for game_id in self._dirty_games:
+                game_state_near_cache.invalidate(game_id)
+        return self.succeeded
 
 
 class GameStateCache:
@@ -22,10 +299,129 @@ class GameStateCache:
     
     def __init__(self):
         self.redis = redis_client
+        # Games that took clicks straight to MySQL while Redis was unavailable
+        self._stale_games = set()
     
     def _get_game_state_key(self, game_id: int) -> str:
         """Get Redis key for game state"""
-        return f"game:{game_id}:state"
+        return cache_namespace.key(f"game:{game_id}:state")
+    
+    async def prepare(self, client) -> bool:
+        """
+        Make sure this process is listening for invalidations, knows the current cache generation,
+        and has dropped the cached state of games that were clicked while Redis was unavailable.
+        Cheap when nothing changed (no I/O).
+        
+        Returns:
+            bool: False if Redis could not be prepared (callers fall back to MySQL)
+        """
+        try:
+            await game_state_near_cache.ensure_started(client)
+            if not cache_namespace.loaded:
+                await cache_namespace.refresh(client)
+            if self._stale_games:
+                stale = set(self._stale_games)
+                await client.delete(*[self._get_game_state_key(game_id) for game_id in stale])
+                for game_id in stale:
+                    await client.publish(GAME_STATE_CHANNEL, game_state_near_cache.message(game_id))
+                    game_state_near_cache.invalidate(game_id)
+                self._stale_games -= stale
+                logger.info(f"Dropped cached state of {len(stale)} games clicked while Redis was unavailable")
+            return True
+        except Exception as e:
+            logger.error(f"Error preparing Redis game state cache: {e}")
+            return False
+    
+    def mark_stale(self, game_id: int):
+        """
+        Record that a game's state changed in MySQL only (click committed while Redis was unavailable).
+        Its cached state is dropped from Redis on the next prepare(), so it is reloaded from MySQL.
+        """
+        self._stale_games.add(int(game_id))
+        game_state_near_cache.invalidate(game_id)
+    
+    def mark_replayed(self, records: List[Dict[str, Any]]):
+        """Mark the games of replayed spooled clicks stale: click admission never counted those clicks"""
+        for game_id in {record['game_id'] for record in records}:
+            self.mark_stale(game_id)
+    
+    async def bump_generation(self) -> Optional[int]:
+        """
+        Invalidate every cached key in O(1) by moving all processes to a new cache generation.
+        Old keys are left to expire (see purge_stale_keys).
+        
+        Returns:
+            int: The new generation, or None if Redis is unavailable
+        """
+        try:
+            client = await self.redis.get_client()
+            if not client:
+                return None
+            generation = int(await client.incr(cache_namespace.generation_key))
+            await client.publish(GAME_STATE_CHANNEL, game_state_near_cache.message('*'))
+            game_state_near_cache.clear()
+            cache_namespace.generation, cache_namespace.loaded = generation, True
+            logger.info(f"Cache generation bumped to {generation}")
+            return generation
+        except Exception as e:
+            logger.error(f"Error bumping cache generation: {e}")
+            return None
+    
+    async def purge_stale_keys(self, include_legacy: bool = True) -> int:
+        """
+        Incrementally delete cache keys of retired generations (and, optionally, pre-namespace keys)
+        with SCAN and UNLINK, never blocking Redis the way KEYS does.
+        
+        Returns:
+            int: Number of keys removed
+        """
+        client = await self.redis.get_client()
+        if not client:
+            return 0
+        await cache_namespace.refresh(client)
+        current = cache_namespace.prefix()
+        patterns = [f"{CACHE_KEY_PREFIX}:v*:g*:*"] + (list(LEGACY_KEY_PATTERNS) if include_legacy else [])
+        removed = 0
+        for pattern in patterns:
+            batch = []
+            async for key in client.scan_iter(match=pattern, count=PURGE_SCAN_COUNT):
+                if key.startswith(current):
+                    continue
+                batch.append(key)
+                if len(batch) >= PURGE_SCAN_COUNT:
+                    removed += await client.unlink(*batch)
+                    batch = []
+            if batch:
+                removed += await client.unlink(*batch)
+        logger.info(f"Purged {removed} stale cache keys")
+        return removed
+    
+    @asynccontextmanager
+    async def batch(self, transaction: bool = False):
+        """
+        Collect game state writes into one pipeline, sent on exit.
+        
+        Args:
+            transaction: Wrap the batch in MULTI/EXEC so it is applied atomically
+        
+        Usage:
+            async with game_state_cache.batch() as batch:
+                batch.set_state(game_id, timer_value=...)
+                batch.xadd(CLICK_QUEUE_KEY, payload)
+            if batch.succeeded: ...
+        """
+        client = await self.redis.get_client()
+        # Keys are resolved as commands are queued, so the generation must be known first
+        if client and not await self.prepare(client):
+            client = None
+        batch = GameStateBatch(self, client.pipeline(transaction=transaction) if client else None)
+        try:
+            yield batch
+        except BaseException:
+            if batch.active:
+                await batch.pipeline.reset()
+            raise
+        await batch.execute()
     
     def _serialize_game_state(self, state: Dict[str, Any]) -> Dict[str, str]:
         """Serialize game state for Redis storage"""
@@ -41,6 +437,12 @@ class GameStateCache:
                     serialized[key] = ""
             else:
                 serialized[key] = str(value)
+        # Epoch copy of the last click time for server-side scripts (see click_admission)
+        last_click_time = state.get('last_click_time')
+        if isinstance(last_click_time, datetime.datetime):
+            if last_click_time.tzinfo is None:
+                last_click_time = last_click_time.replace(tzinfo=timezone.utc)
+            serialized['last_click_ts'] = repr(last_click_time.timestamp())
         return serialized
     
     def _deserialize_game_state(self, state: Dict[str, str]) -> Dict[str, Any]:
@@ -59,12 +461,12 @@ class GameStateCache:
                     deserialized[key] = datetime.datetime.fromisoformat(value)
                 except (ValueError, TypeError):
                     deserialized[key] = None
-            elif key in ['timer_value', 'timer_duration', 'cooldown_duration']:
+            elif key in ['timer_value', 'timer_duration', 'cooldown_duration', 'last_click_ts']:
                 try:
                     deserialized[key] = float(value)
                 except (ValueError, TypeError):
                     deserialized[key] = 0.0
-            elif key in ['total_clicks', 'total_players', 'game_id']:
+            elif key in ['total_clicks', 'total_players', 'game_id', 'sequential_click_requirement', 'recent_window']:
                 try:
                     parsed_value = int(value)
                     deserialized[key] = parsed_value
@@ -80,10 +482,16 @@ class GameStateCache:
         return deserialized
     
     async def get_game_state(self, game_id: int) -> Optional[Dict[str, Any]]:
-        """Get complete game state from cache with MySQL fallback"""
+        """Get complete game state from the in-process near-cache, then Redis, with MySQL fallback"""
+        near = game_state_near_cache.get(game_id)
+        if near is not None:
+            return near
+        token = game_state_near_cache.token(game_id)
+        
         try:
             client = await self.redis.get_client()
-            if client:
+            if client and await self.prepare(client):
+                token = game_state_near_cache.token(game_id)
                 key = self._get_game_state_key(game_id)
                 state = await client.hgetall(key)
                 if state:
@@ -95,17 +503,70 @@ class GameStateCache:
                         logger.info(f"Cache contains invalid data for game {game_id} (total_clicks is None), falling back to database")
                         return await self._load_from_database(game_id)
                     
+                    game_state_near_cache.put(game_id, deserialized, token)
                     return deserialized
                 else:
                     logger.debug(f"Cache miss for game {game_id}")
         except Exception as e:
             logger.error(f"Redis error getting game state for {game_id}: {e}")
         
-        # Fallback to database
-        return await self._load_from_database(game_id)
+        # Fallback to database. Caching it in Redis publishes an invalidation, so only keep
+        # the result locally when Redis is not there to serve the next read
+        state = await self._load_from_database(game_id)
+        if state and not game_state_near_cache.listening:
+            game_state_near_cache.put(game_id, state, game_state_near_cache.token(game_id))
+        return state
+    
+    async def query_unsynced_clicks(self) -> List[Dict[str, Any]]:
+        """
+        Accepted clicks that may not be in MySQL yet, oldest first: the click queue entries the
+        sync worker has not acknowledged and the clicks waiting in the local spool, as click
+        dicts (see sync_worker.click_from_entry). Read it before MySQL, and dedupe against it
+        with synced_keys_query. Redis errors propagate, so a load fails instead of missing clicks.
+        """
+        # The spool first: a click replayed from it reaches the click queue (or MySQL) before it
+        # leaves pending(), so it is seen in one place or the other. It keeps its key there
+        clicks = {record['key']: record for record in click_spool.pending()}
+        client = await redis_client.get_client()
+        if client:
+            for msg_id, fields in await sync_worker.unacknowledged(client):
+                try:
+                    click = click_from_entry(msg_id, fields)
+                except (KeyError, ValueError):
+                    # Dead-lettered by the sync worker, so it never reaches MySQL either
+                    continue
+                clicks[click['key']] = click
+        return sorted(clicks.values(), key=click_datetime)
+    
+    async def _load_from_database(self, game_id: int, cache: bool = True) -> Optional[Dict[str, Any]]:
+        """Load game state from MySQL database, caching it in Redis unless cache is False"""
+        try:
+            unsynced = await self.query_unsynced_clicks()
+        except Exception as e:
+            logger.error(f"Could not read unsynced clicks to load game {game_id}: {e}")
+            return None
+        loaded = await self._query_game_state(game_id, unsynced)
+        if not loaded:
+            return None
+        state, players = loaded
+        
+        # Cache the state, player set, active cooldowns and recent-clickers window in Redis for future use
+        if cache:
+            cooldowns = await self._query_cooldowns([game_id], unsynced)
+            recent = await self._query_recent_clickers(game_id, state['sequential_click_requirement'], unsynced)
+            await self._cache_game_state(game_id, state, players, cooldowns.get(game_id, {}), recent)
+        
+        logger.info(f"Loaded game state from database for game {game_id}")
+        return state
     
-    async def _load_from_database(self, game_id: int) -> Optional[Dict[str, Any]]:
-        """Load game state from MySQL database"""
+    async def _query_game_state(self, game_id: int, unsynced: Optional[List[Dict[str, Any]]] = None
+                                ) -> Optional[Tuple[Dict[str, Any], List[int]]]:
+        """
+        Read a game's state and player list from MySQL (see _query_game_states).
+        
+        Returns:
+            tuple: (state dict, user IDs that have clicked) or None if the game is unknown or the query failed
+        """
         try:
             # Get game session data
             game_session = await get_game_session_by_id(game_id)
@@ -113,402 +574,213 @@ class GameStateCache:
                 logger.warning(f"No game session found for game {game_id}")
                 return None
             
-            # First, check if there are ANY clicks for this game
-            click_count_query = 'SELECT COUNT(*) FROM button_clicks WHERE game_id = %s'
-            count_result = execute_query(click_count_query, (game_id,))
-            total_clicks = int(count_result[0][0]) if count_result and count_result[0] else 0
-            
-            logger.info(f"DEBUG CACHE LOAD: Game {game_id} - Found {total_clicks} total clicks in database")
-            
-            if total_clicks > 0:
-                # Get latest click data and player count
-                click_query = '''
-                    SELECT users.user_name, button_clicks.click_time, button_clicks.timer_value,
-                        (SELECT COUNT(DISTINCT user_id) FROM button_clicks WHERE game_id = %s) AS total_players
-                    FROM button_clicks
-                    INNER JOIN users ON button_clicks.user_id = users.user_id
-                    WHERE button_clicks.game_id = %s
-                    ORDER BY button_clicks.id DESC
-                    LIMIT 1
-                '''
-                click_result = execute_query(click_query, (game_id, game_id))
-                
-                if click_result and click_result[0]:
-                    # Game has clicks
-                    result = click_result[0]
-                    state = {
-                        'game_id': game_id,
-                        'last_click_time': result[1].replace(tzinfo=timezone.utc) if result[1] else None,
-                        'timer_value': float(result[2]) if result[2] is not None else float(game_session['timer_duration']),
-                        'total_clicks': total_clicks,  # Use the count we already got
-                        'total_players': int(result[3]) if result[3] is not None else 0,
-                        'latest_player_name': str(result[0]) if result[0] else "Unknown",
-                        'timer_duration': float(game_session['timer_duration']),
-                        'cooldown_duration': float(game_session['cooldown_duration']),
-                        'is_active': game_session.get('end_time') is None
-                    }
-                else:
-                    # Fallback if the JOIN fails but we know there are clicks
-                    logger.warning(f"DEBUG CACHE LOAD: Game {game_id} - Click count is {total_clicks} but JOIN query failed, using fallback")
-                    state = {
-                        'game_id': game_id,
-                        'last_click_time': game_session['start_time'].replace(tzinfo=timezone.utc),
-                        'timer_value': float(game_session['timer_duration']),
-                        'total_clicks': total_clicks,
-                        'total_players': 1,  # Estimate
-                        'latest_player_name': "Unknown Player",
-                        'timer_duration': float(game_session['timer_duration']),
-                        'cooldown_duration': float(game_session['cooldown_duration']),
-                        'is_active': game_session.get('end_time') is None
-                    }
-            else:
-                # No clicks yet - initial state
-                logger.info(f"DEBUG CACHE LOAD: Game {game_id} - NO CLICKS FOUND in database query")
-                state = {
-                    'game_id': game_id,
-                    'last_click_time': game_session['start_time'].replace(tzinfo=timezone.utc),
-                    'timer_value': float(game_session['timer_duration']),
-                    'total_clicks': 0,
-                    'total_players': 0,
-                    'latest_player_name': "Game Initialized",
-                    'timer_duration': float(game_session['timer_duration']),
-                    'cooldown_duration': float(game_session['cooldown_duration']),
-                    'is_active': game_session.get('end_time') is None
-                }
-            
-            # Cache the state in Redis for future use
-            await self._cache_game_state(game_id, state)
-            
-            logger.info(f"Loaded game state from database for game {game_id}")
-            return state
+            return (await self._query_game_states([game_session], unsynced)).get(int(game_id))
             
         except Exception as e:
             logger.error(f"Error loading game state from database for game {game_id}: {e}")
             return None
     
-    async def _cache_game_state(self, game_id: int, state: Dict[str, Any]):
-        """Cache game state in Redis"""
-        try:
-            client = await self.redis.get_client()
-            if not client:
-                return
-                
-            key = self._get_game_state_key(game_id)
-            serialized = self._serialize_game_state(state)
-            
-            # Set with TTL (24 hours instead of 1 hour)
-            ttl = config.get('cache', {}).get('game_state_ttl', 86400)
-            await client.hset(key, mapping=serialized)
-            await client.expire(key, ttl)
-            
-            logger.debug(f"Cached game state for game {game_id}")
-            
-        except Exception as e:
-            logger.error(f"Error caching game state for game {game_id}: {e}")
-    
-    async def update_game_state(self, game_id: int, **updates):
-        """Update specific fields in game state cache"""
-        try:
-            client = await self.redis.get_client()
-            if not client:
-                return
-                
-            key = self._get_game_state_key(game_id)
-            serialized = self._serialize_game_state(updates)
-            
-            await client.hset(key, mapping=serialized)
-            
-            # Reset TTL
-            ttl = config.get('cache', {}).get('game_state_ttl', 3600)
-            await client.expire(key, ttl)
-            
-            logger.debug(f"Updated game state cache for game {game_id}: {list(updates.keys())}")
-            
-        except Exception as e:
-            logger.error(f"Error updating game state cache for game {game_id}: {e}")
-    
-    async def calculate_current_timer(self, game_id: int) -> Tuple[bool, float]:
+    async def _query_game_states(self, sessions: List[Dict[str, Any]], unsynced: Optional[List[Dict[str, Any]]] = None
+                                 ) -> Dict[int, Tuple[Dict[str, Any], List[int]]]:
         """
-        Calculate current timer value from cached data with MySQL fallback
+        Read the state and player list of several games from MySQL in two set-based queries,
+        run concurrently: the per-game rollup (players and click counts) and each game's latest click.
+        Accepted clicks not synced to MySQL yet are folded in.
+        
+        Args:
+            sessions: Game session dicts (see database.session_registry)
+            unsynced: Clicks from query_unsynced_clicks, read before calling (read here if None)
         
         Returns:
-            tuple: (is_expired: bool, current_timer_value: float)
+            dict: {game_id: (state dict, user IDs that have clicked)}
         """
-        try:
-            state = await self.get_game_state(game_id)
-            if not state:
-                logger.warning(f"No game state found for game {game_id}")
-                return True, 0.0
-            
-            last_click_time = state.get('last_click_time')
-            timer_duration = state.get('timer_duration', 43200)  # Default 12 hours
-            
-            if not last_click_time:
-                # No clicks yet, use full timer
-                return False, float(timer_duration)
-            
-            # Calculate elapsed time since last click
-            current_time = datetime.datetime.now(timezone.utc)
-            if isinstance(last_click_time, str):
-                last_click_time = datetime.datetime.fromisoformat(last_click_time)
-            if last_click_time.tzinfo is None:
-                last_click_time = last_click_time.replace(tzinfo=timezone.utc)
-                
-            elapsed_seconds = (current_time - last_click_time).total_seconds()
-            current_timer = max(0.0, float(timer_duration) - elapsed_seconds)
-            
-            is_expired = current_timer <= 0.0
-            
-            logger.debug(f"Timer calculation for game {game_id}: elapsed={elapsed_seconds:.1f}s, "
-                        f"current={current_timer:.1f}s, expired={is_expired}")
-            
-            return is_expired, current_timer
-            
-        except Exception as e:
-            logger.error(f"Error calculating timer for game {game_id}: {e}")
-            # Fallback to original database method
-            return await self._fallback_timer_calculation(game_id)
-    
-    async def _fallback_timer_calculation(self, game_id: int) -> Tuple[bool, float]:
-        """Fallback timer calculation using direct database query"""
-        try:
-            from utils.timer_button import is_timer_expired
-            logger.warning(f"Using fallback timer calculation for game {game_id}")
-            return await is_timer_expired(game_id)
-        except Exception as e:
-            logger.error(f"Fallback timer calculation failed for game {game_id}: {e}")
-            return True, 0.0
-    
-    async def invalidate_game_cache(self, game_id: int):
-        """Invalidate game state cache"""
-        try:
-            client = await self.redis.get_client()
-            if not client:
-                return
-                
-            key = self._get_game_state_key(game_id)
-            await client.delete(key)
-            
-            logger.info(f"Invalidated cache for game {game_id}")
-            
-        except Exception as e:
-            logger.error(f"Error invalidating cache for game {game_id}: {e}")
-    
-    async def warm_cache_for_active_games(self):
-        """Warm Redis cache for all active games"""
-        try:
-            # Get all active games
-            query = "SELECT id FROM game_sessions WHERE end_time IS NULL"
-            result = execute_query(query, ())
-            
-            if not result:
-                logger.info("No active games found for cache warming")
-                return
-                
-            for row in result:
-                game_id = row[0]
-                try:
-                    await self.get_game_state(game_id)  # This will cache it
-                    logger.debug(f"Warmed cache for game {game_id}")
-                except Exception as e:
-                    logger.error(f"Error warming cache for game {game_id}: {e}")
-            
-            logger.info(f"Cache warming completed for {len(result)} active games")
-            
-        except Exception as e:
-            logger.error(f"Error during cache warming: {e}")
-
-
-# Global game state cache instance
-game_state_cache = GameStateCache()
-
-# Redis Game State Cache
-"""
-Game state caching operations for The Button Game
-
-Provides fast access to:
-- Game state (timer, clicks, players)
-- Timer calculations
-- Cache warming and invalidation
-"""
-
-import json
-import datetime
-from datetime import timezone
-from typing import Dict, Optional, Tuple, Any
-from database.database import execute_query, get_game_session_by_id
-from utils.utils import logger, config
-from .redis_client import redis_client
-
-
-class GameStateCache:
-    """Redis-based game state cache with MySQL fallback"""
-    
-    def __init__(self):
-        self.redis = redis_client
-    
-    def _get_game_state_key(self, game_id: int) -> str:
-        """Get Redis key for game state"""
-        return f"game:{game_id}:state"
-    
-    def _serialize_game_state(self, state: Dict[str, Any]) -> Dict[str, str]:
-        """Serialize game state for Redis storage"""
-        serialized = {}
-        for key, value in state.items():
-            if isinstance(value, datetime.datetime):
-                serialized[key] = value.isoformat()
-            elif value is None:
-                serialized[key] = ""
-            else:
-                serialized[key] = str(value)
-        return serialized
-    
-    def _deserialize_game_state(self, state: Dict[str, str]) -> Dict[str, Any]:
-        """Deserialize game state from Redis"""
-        if not state:
+        sessions = {int(session['game_id']): session for session in sessions}
+        if not sessions:
             return {}
-            
-        deserialized = {}
-        for key, value in state.items():
-            if not value:  # Empty string means None
-                deserialized[key] = None
-            elif key.endswith('_time'):
-                try:
-                    deserialized[key] = datetime.datetime.fromisoformat(value)
-                except (ValueError, TypeError):
-                    deserialized[key] = None
-            elif key in ['timer_value', 'timer_duration', 'cooldown_duration']:
-                try:
-                    deserialized[key] = float(value)
-                except (ValueError, TypeError):
-                    deserialized[key] = 0.0
-            elif key in ['total_clicks', 'total_players', 'game_id']:
-                try:
-                    deserialized[key] = int(value)
-                except (ValueError, TypeError):
-                    deserialized[key] = 0
-            elif key == 'is_active':
-                deserialized[key] = value.lower() == 'true'
-            else:
-                deserialized[key] = value
-                
-        return deserialized
+        placeholders = ', '.join(['%s'] * len(sessions))
+        if unsynced is None:
+            unsynced = await self.query_unsynced_clicks()
+        unsynced = [click for click in unsynced if click['game_id'] in sessions]
+        
+        # The rollup has one row per player and game, so players and click totals come without
+        # a COUNT/DISTINCT scan of the click log. Which unsynced clicks reached MySQL meanwhile
+        # is read in the same statement
+        synced_query, synced_params = synced_keys_query(4, (click['key'] for click in unsynced))
+        rollup_query = f'''
+            SELECT game_id, user_id, clicks, NULL
+            FROM game_player_stats
+            WHERE game_id IN ({placeholders})
+        ''' + synced_query
+        latest_query = f'''
+            SELECT bc.game_id, users.user_name, bc.click_time, bc.timer_value
+            FROM button_clicks bc
+            JOIN (
+                SELECT game_id, MAX(id) AS id
+                FROM button_clicks
+                WHERE game_id IN ({placeholders})
+                GROUP BY game_id
+            ) latest ON latest.id = bc.id
+            LEFT JOIN users ON users.user_id = bc.user_id
+        '''
+        rollup_rows, latest_rows = await asyncio.gather(
+            execute_query_async(rollup_query, tuple(sessions) + synced_params),
+            execute_query_async(latest_query, tuple(sessions))
+        )
+        
+        players = {game_id: [] for game_id in sessions}
+        total_clicks = dict.fromkeys(sessions, 0)
+        synced = set()
+        for game_id, user_id, clicks, click_key in rollup_rows or []:
+            if click_key is not None:
+                synced.add(click_key)
+                continue
+            players[int(game_id)].append(int(user_id))
+            total_clicks[int(game_id)] += int(clicks or 0)
+        latest = {int(row[0]): row[1:] for row in latest_rows or []}
+        
+        # Clicks still in the click queue or the local spool are not in MySQL yet
+        known = {game_id: set(users) for game_id, users in players.items()}
+        for click in unsynced:
+            if click['key'] in synced:
+                continue
+            game_id, click_time = click['game_id'], click_datetime(click)
+            total_clicks[game_id] += 1
+            if click['user_id'] not in known[game_id]:
+                known[game_id].add(click['user_id'])
+                players[game_id].append(click['user_id'])
+            last = latest.get(game_id)
+            if not last or last[1] is None or click_time >= last[1].replace(tzinfo=timezone.utc):
+                latest[game_id] = (click['user_name'], click_time, click['timer_value'])
+        
+        return {
+            game_id: (self._build_state(game_id, session, total_clicks[game_id], len(players[game_id]), latest.get(game_id)),
+                      players[game_id])
+            for game_id, session in sessions.items()
+        }
     
-    async def get_game_state(self, game_id: int) -> Optional[Dict[str, Any]]:
-        """Get complete game state from cache with MySQL fallback"""
-        try:
-            client = await self.redis.get_client()
-            if client:
-                key = self._get_game_state_key(game_id)
-                state = await client.hgetall(key)
-                if state:
-                    logger.debug(f"Cache hit for game {game_id}")
-                    return self._deserialize_game_state(state)
-                else:
-                    logger.debug(f"Cache miss for game {game_id}")
-        except Exception as e:
-            logger.error(f"Redis error getting game state for {game_id}: {e}")
+    def _build_state(self, game_id: int, game_session: Dict[str, Any], total_clicks: int, total_players: int,
+                     latest: Optional[Tuple]) -> Dict[str, Any]:
+        """Assemble a game state dict from its session and (user_name, click_time, timer_value) of the latest click"""
+        if latest:
+            user_name, click_time, timer_value = latest
+            last_click_time = click_time.replace(tzinfo=timezone.utc) if click_time else None
+            timer_value = float(timer_value) if timer_value is not None else float(game_session['timer_duration'])
+            latest_player_name = str(user_name) if user_name else "Unknown Player"
+        else:
+            # No clicks yet - initial state
+            last_click_time = game_session['start_time'].replace(tzinfo=timezone.utc)
+            timer_value = float(game_session['timer_duration'])
+            latest_player_name = "Game Initialized" if not total_clicks else "Unknown Player"
+        return {
+            'game_id': game_id,
+            'last_click_time': last_click_time,
+            'timer_value': timer_value,
+            'total_clicks': total_clicks,
+            'total_players': total_players,
+            'latest_player_name': latest_player_name,
+            'timer_duration': float(game_session['timer_duration']),
+            'cooldown_duration': float(game_session['cooldown_duration']),
+            'sequential_click_requirement': int(game_session.get('sequential_click_requirement') or 0),
+            'is_active': game_session.get('end_time') is None
+        }
+    
+    async def _query_cooldowns(self, game_ids: List[int], unsynced: Optional[List[Dict[str, Any]]] = None
+                               ) -> Dict[int, Dict[int, float]]:
+        """
+        Last click of every user still on cooldown in the given active games, in one grouped query,
+        with the clicks not synced to MySQL yet (unsynced, read here if None) folded in.
         
-        # Fallback to database
-        return await self._load_from_database(game_id)
+        Returns:
+            dict: {game_id: {user_id: epoch seconds of the last click}}; games without active cooldowns are present but empty
+        """
+        cooldowns = {int(game_id): {} for game_id in game_ids}
+        if not cooldowns:
+            return cooldowns
+        if unsynced is None:
+            unsynced = await self.query_unsynced_clicks()
+        result = await execute_query_async(f'''
+            SELECT bc.game_id, bc.user_id, MAX(bc.click_time)
+            FROM button_clicks bc
+            JOIN game_sessions gs ON gs.id = bc.game_id
+            WHERE bc.game_id IN ({', '.join(['%s'] * len(cooldowns))})
+            AND bc.click_time >= UTC_TIMESTAMP() - INTERVAL gs.cooldown_duration * 3600 SECOND
+            GROUP BY bc.game_id, bc.user_id
+        ''', tuple(cooldowns))
+        for game_id, user_id, last_click in result or []:
+            if last_click is not None:
+                cooldowns[int(game_id)][int(user_id)] = last_click.replace(tzinfo=timezone.utc).timestamp()
+        for click in unsynced:
+            users = cooldowns.get(click['game_id'])
+            if users is not None:
+                clicked = click_datetime(click).timestamp()
+                users[click['user_id']] = max(users.get(click['user_id'], 0), clicked)
+        return cooldowns
     
-    async def _load_from_database(self, game_id: int) -> Optional[Dict[str, Any]]:
-        """Load game state from MySQL database"""
-        try:
-            # Get game session data
-            game_session = await get_game_session_by_id(game_id)
-            if not game_session:
-                logger.warning(f"No game session found for game {game_id}")
-                return None
-            
-            # Get latest click data
-            click_query = '''
-                SELECT users.user_name, button_clicks.click_time, button_clicks.timer_value,
-                    (SELECT COUNT(*) FROM button_clicks WHERE game_id = %s) AS total_clicks,
-                    (SELECT COUNT(DISTINCT user_id) FROM button_clicks WHERE game_id = %s) AS total_players
-                FROM button_clicks
-                INNER JOIN users ON button_clicks.user_id = users.user_id
-                WHERE button_clicks.game_id = %s
-                ORDER BY button_clicks.id DESC
-                LIMIT 1
-            '''
-            click_result = execute_query(click_query, (game_id, game_id, game_id))
-            
-            if click_result and click_result[0]:
-                # Game has clicks
-                result = click_result[0]
-                state = {
-                    'game_id': game_id,
-                    'last_click_time': result[1].replace(tzinfo=timezone.utc) if result[1] else None,
-                    'timer_value': float(result[2]) if result[2] is not None else float(game_session['timer_duration']),
-                    'total_clicks': int(result[3]) if result[3] is not None else 0,
-                    'total_players': int(result[4]) if result[4] is not None else 0,
-                    'latest_player_name': str(result[0]) if result[0] else "Unknown",
-                    'timer_duration': float(game_session['timer_duration']),
-                    'cooldown_duration': float(game_session['cooldown_duration']),
-                    'is_active': game_session.get('end_time') is None
-                }
-            else:
-                # No clicks yet - initial state
-                state = {
-                    'game_id': game_id,
-                    'last_click_time': game_session['start_time'].replace(tzinfo=timezone.utc),
-                    'timer_value': float(game_session['timer_duration']),
-                    'total_clicks': 0,
-                    'total_players': 0,
-                    'latest_player_name': "Game Initialized",
-                    'timer_duration': float(game_session['timer_duration']),
-                    'cooldown_duration': float(game_session['cooldown_duration']),
-                    'is_active': game_session.get('end_time') is None
-                }
-            
-            # Cache the state in Redis for future use
-            await self._cache_game_state(game_id, state)
-            
-            logger.info(f"Loaded game state from database for game {game_id}")
-            return state
-            
-        except Exception as e:
-            logger.error(f"Error loading game state from database for game {game_id}: {e}")
+    async def _query_recent_clickers(self, game_id: int, requirement: int,
+                                     unsynced: Optional[List[Dict[str, Any]]] = None) -> Optional[List[int]]:
+        """
+        The game's most recent distinct clickers, newest first, enough to check the requirement,
+        with the clicks not synced to MySQL yet (unsynced, read here if None) folded in.
+        
+        Returns:
+            list: User IDs (at most max(requirement, 1)), or None if the game does not enforce sequential clicks
+        """
+        if requirement <= 0:
             return None
+        if unsynced is None:
+            unsynced = await self.query_unsynced_clicks()
+        result = await execute_query_async('''
+            SELECT user_id
+            FROM button_clicks
+            WHERE game_id = %s
+            GROUP BY user_id
+            ORDER BY MAX(id) DESC
+            LIMIT %s
+        ''', (game_id, requirement))
+        recent = [int(row[0]) for row in result or []]
+        # Unsynced clicks (oldest first) are newer than every click in MySQL
+        for click in unsynced:
+            if click['game_id'] != int(game_id):
+                continue
+            if click['user_id'] in recent:
+                recent.remove(click['user_id'])
+            recent.insert(0, click['user_id'])
+        return recent[:requirement]
+    
+    async def seed_recent_clickers(self, game_id: int, requirement: int):
+        """Seed a game's recent-clickers window from MySQL (when the cached window is missing or too small)"""
+        recent = await self._query_recent_clickers(game_id, max(1, requirement))
+        async with self.batch() as batch:
+            batch.set_recent_clickers(game_id, recent, requirement)
+        logger.info(f"Seeded recent clickers for game {game_id} with {len(recent)} users")
     
-    async def _cache_game_state(self, game_id: int, state: Dict[str, Any]):
-        """Cache game state in Redis"""
+    async def _cache_game_state(self, game_id: int, state: Dict[str, Any], players: List[int],
+                                cooldowns: Optional[Dict[int, float]] = None, recent: Optional[List[int]] = None):
+        """Cache game state, its player set and (if given) its active cooldowns and recent clickers in Redis (one round trip)"""
         try:
-            client = await self.redis.get_client()
-            if not client:
-                return
-                
-            key = self._get_game_state_key(game_id)
-            serialized = self._serialize_game_state(state)
-            
-            # Set with TTL
-            ttl = config.get('cache', {}).get('game_state_ttl', 3600)
-            await client.hset(key, mapping=serialized)
-            await client.expire(key, ttl)
-            
-            logger.debug(f"Cached game state for game {game_id}")
+            async with self.batch() as batch:
+                batch.set_state(game_id, state)
+                batch.set_players(game_id, players)
+                if cooldowns is not None:
+                    batch.set_cooldowns(game_id, cooldowns, state['cooldown_duration'] * 3600,
+                                        datetime.datetime.now(timezone.utc).timestamp())
+                if recent is not None:
+                    batch.set_recent_clickers(game_id, recent, state['sequential_click_requirement'])
+            
+            if batch.succeeded:
+                logger.debug(f"Cached game state for game {game_id}")
             
         except Exception as e:
             logger.error(f"Error caching game state for game {game_id}: {e}")
     
     async def update_game_state(self, game_id: int, **updates):
-        """Update specific fields in game state cache"""
+        """Update specific fields in game state cache (HSET and TTL reset in one round trip)"""
         try:
-            client = await self.redis.get_client()
-            if not client:
-                return
-                
-            key = self._get_game_state_key(game_id)
-            serialized = self._serialize_game_state(updates)
-            
-            await client.hset(key, mapping=serialized)
+            async with self.batch() as batch:
+                batch.set_state(game_id, **updates)
             
-            # Reset TTL
-            ttl = config.get('cache', {}).get('game_state_ttl', 3600)
-            await client.expire(key, ttl)
-            
-            logger.debug(f"Updated game state cache for game {game_id}: {list(updates.keys())}")
+            if batch.succeeded:
+                logger.debug(f"Updated game state cache for game {game_id}: {list(updates.keys())}")
             
         except Exception as e:
             logger.error(f"Error updating game state cache for game {game_id}: {e}")
@@ -568,42 +840,76 @@ class GameStateCache:
     async def invalidate_game_cache(self, game_id: int):
         """Invalidate game state cache"""
         try:
+            game_state_near_cache.invalidate(game_id)
             client = await self.redis.get_client()
             if not client:
                 return
                 
             key = self._get_game_state_key(game_id)
             await client.delete(key)
+            await client.publish(GAME_STATE_CHANNEL, game_state_near_cache.message(game_id))
             
             logger.info(f"Invalidated cache for game {game_id}")
             
         except Exception as e:
             logger.error(f"Error invalidating cache for game {game_id}: {e}")
     
-    async def warm_cache_for_active_games(self):
-        """Warm Redis cache for all active games"""
+    async def warm_cache_for_active_games(self) -> Optional[Dict[str, Any]]:
+        """
+        Warm Redis cache for all active games: session settings come from the session registry,
+        states, cooldowns and recent-clickers windows from a handful of concurrent set-based
+        queries, and everything is written in a single pipeline.
+        
+        Returns:
+            dict: {'games', 'cooldowns', 'seconds'} summary, or None if warming failed
+        """
+        started = time.perf_counter()
         try:
-            # Get all active games
-            query = "SELECT id FROM game_sessions WHERE end_time IS NULL"
-            result = execute_query(query, ())
+            # Active session settings are already indexed in memory
+            if not session_registry.loaded:
+                await run_db_call(update_local_game_sessions)
+            sessions = session_registry.all()
             
-            if not result:
+            if not sessions:
                 logger.info("No active games found for cache warming")
-                return
-                
-            for row in result:
-                game_id = row[0]
-                try:
-                    await self.get_game_state(game_id)  # This will cache it
-                    logger.debug(f"Warmed cache for game {game_id}")
-                except Exception as e:
-                    logger.error(f"Error warming cache for game {game_id}: {e}")
-            
-            logger.info(f"Cache warming completed for {len(result)} active games")
+                return {'games': 0, 'cooldowns': 0, 'seconds': time.perf_counter() - started}
+            
+            game_ids = [session['game_id'] for session in sessions]
+            # States, everyone still on cooldown, and recent-clickers windows for the games that
+            # enforce sequential clicks, all with the clicks not synced to MySQL yet
+            unsynced = await self.query_unsynced_clicks()
+            states, cooldowns, *recent = await asyncio.gather(
+                self._query_game_states(sessions, unsynced),
+                self._query_cooldowns(game_ids, unsynced),
+                *(self._query_recent_clickers(session['game_id'], int(session.get('sequential_click_requirement') or 0), unsynced)
+                  for session in sessions)
+            )
+            recent_windows = dict(zip(game_ids, recent))
+            now = datetime.datetime.now(timezone.utc).timestamp()
+            
+            # Write every game's state in a single pipeline
+            async with self.batch() as batch:
+                for game_id, (state, players) in states.items():
+                    batch.set_state(game_id, state)
+                    batch.set_players(game_id, players)
+                    batch.set_cooldowns(game_id, cooldowns.get(game_id, {}), state['cooldown_duration'] * 3600, now)
+                    if recent_windows[game_id] is not None:
+                        batch.set_recent_clickers(game_id, recent_windows[game_id], state['sequential_click_requirement'])
+            
+            preloaded = sum(len(users) for users in cooldowns.values())
+            elapsed = time.perf_counter() - started
+            if not batch.succeeded:
+                logger.error(f"Cache warming for {len(states)} games could not be written to Redis")
+                return None
+            logger.info(f"Cache warming completed for {len(states)} active games "
+                        f"({preloaded} active cooldowns) in {elapsed:.2f}s")
+            return {'games': len(states), 'cooldowns': preloaded, 'seconds': elapsed}
             
         except Exception as e:
-            logger.error(f"Error during cache warming: {e}")
+            logger.error(f"Error during cache warming after {time.perf_counter() - started:.2f}s: {e}")
+            return None
 
 
 # Global game state cache instance
 game_state_cache = GameStateCache()
+click_spool.on_replayed(game_state_cache.mark_replayed)
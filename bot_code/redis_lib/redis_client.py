@@ -8,6 +8,8 @@ import time
 import os
 from typing import Optional, Any
 import redis.asyncio
+import redis.asyncio.client
+import redis.exceptions
 from utils.utils import config, logger
 
 
@@ -20,32 +22,96 @@ class CircuitBreaker:
         self.failure_count = 0
         self.last_failure_time: Optional[float] = None
         self.state = "CLOSED"  # CLOSED, OPEN, HALF_OPEN
-        
-    async def call(self, func, *args, **kwargs):
-        """Execute function with circuit breaker protection"""
+    
+    def allows_requests(self) -> bool:
+        """Zero-I/O check: False only while OPEN (HALF_OPEN lets traffic through as the probe)"""
+        return self.state != "OPEN"
+    
+    def probe_due(self) -> bool:
+        """Move OPEN to HALF_OPEN once the timeout has elapsed; True if a probe should be sent"""
         if self.state == "OPEN":
             if self.last_failure_time and time.time() - self.last_failure_time > self.timeout:
                 self.state = "HALF_OPEN"
                 logger.info("Circuit breaker transitioning from OPEN to HALF_OPEN")
-            else:
-                raise CircuitBreakerOpenError("Circuit breaker is OPEN")
+                return True
+            return False
+        return True
+    
+    def record_success(self):
+        if self.state == "HALF_OPEN":
+            logger.info("Circuit breaker transitioning from HALF_OPEN to CLOSED")
+        self.state = "CLOSED"
+        self.failure_count = 0
+    
+    def record_failure(self, trip: bool = False):
+        """
+        Count a failed command. Opens the breaker at the threshold, on any failure while
+        HALF_OPEN, or immediately when trip is set (e.g. a failed health check)
+        """
+        self.failure_count += 1
+        self.last_failure_time = time.time()
+        if self.state != "OPEN" and (trip or self.state == "HALF_OPEN" or self.failure_count >= self.failure_threshold):
+            self.state = "OPEN"
+            logger.error(f"Circuit breaker transitioning to OPEN after {self.failure_count} failures")
+        
+    async def call(self, func, *args, **kwargs):
+        """Execute function with circuit breaker protection"""
+        if not self.probe_due():
+            raise CircuitBreakerOpenError("Circuit breaker is OPEN")
                 
         try:
             result = await func(*args, **kwargs)
-            if self.state == "HALF_OPEN":
-                self.state = "CLOSED"
-                self.failure_count = 0
-                logger.info("Circuit breaker transitioning from HALF_OPEN to CLOSED")
+            self.record_success()
             return result
         except Exception as e:
-            self.failure_count += 1
-            self.last_failure_time = time.time()
-            if self.failure_count >= self.failure_threshold:
-                self.state = "OPEN"
-                logger.error(f"Circuit breaker transitioning to OPEN after {self.failure_count} failures")
+            self.record_failure()
             raise
 
 
+# Only transport failures say anything about Redis health; command errors (WRONGTYPE, NOSCRIPT...) do not
+HEALTH_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, OSError)
+
+
+class MonitoredPipeline(redis.asyncio.client.Pipeline):
+    """Pipeline whose execute() outcome feeds the client's circuit breaker"""
+    
+    def __init__(self, *args, circuit_breaker: CircuitBreaker, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._circuit_breaker = circuit_breaker
+    
+    async def execute(self, raise_on_error: bool = True):
+        try:
+            result = await super().execute(raise_on_error)
+        except HEALTH_ERRORS:
+            self._circuit_breaker.record_failure()
+            raise
+        self._circuit_breaker.record_success()
+        return result
+
+
+class MonitoredRedis(redis.asyncio.Redis):
+    """Redis client that reports real command successes and transport failures to a circuit breaker"""
+    
+    def __init__(self, *args, circuit_breaker: CircuitBreaker, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._circuit_breaker = circuit_breaker
+    
+    async def execute_command(self, *args, **options):
+        try:
+            result = await super().execute_command(*args, **options)
+        except HEALTH_ERRORS:
+            self._circuit_breaker.record_failure()
+            raise
+        self._circuit_breaker.record_success()
+        return result
+    
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> MonitoredPipeline:
+        return MonitoredPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint,
+            circuit_breaker=self._circuit_breaker
+        )
+
+
 class CircuitBreakerOpenError(Exception):
     """Exception raised when circuit breaker is open"""
     pass
@@ -59,6 +125,9 @@ class RedisClient:
         self.client: Optional[redis.asyncio.Redis] = None
         self._circuit_breaker = CircuitBreaker()
         self._initialized = False
+        self._health_task: Optional[asyncio.Task] = None
+        self.health_check_interval = 5.0
+        self.last_health_check: Optional[float] = None
         
     async def initialize(self) -> bool:
         """Initialize Redis connection pool"""
@@ -66,6 +135,7 @@ class RedisClient:
             logger.info("Initializing Redis connection...")
             
             redis_config = config.get('redis', {})
+            self.health_check_interval = float(redis_config.get('health_check_interval', 5))
             
             # Create connection pool
             self.pool = redis.asyncio.ConnectionPool(
@@ -82,13 +152,17 @@ class RedisClient:
                 decode_responses=True
             )
             
-            # Create Redis client
-            self.client = redis.asyncio.Redis(connection_pool=self.pool)
+            # Create Redis client; its commands drive the circuit breaker
+            self.client = MonitoredRedis(connection_pool=self.pool, circuit_breaker=self._circuit_breaker)
             
             # Test connection
-            await self.health_check()
+            healthy = await self.health_check()
             
             self._initialized = True
+            self._start_health_monitor()
+            if not healthy:
+                logger.warning("Redis unreachable at startup - health monitor will keep probing")
+                return False
             logger.info("Redis connection initialized successfully")
             return True
             
@@ -98,32 +172,52 @@ class RedisClient:
             return False
     
     async def health_check(self) -> bool:
-        """Check Redis connectivity"""
+        """Check Redis connectivity with a PING, updating the circuit breaker"""
         try:
             if not self.client:
                 return False
-                
-            await self._circuit_breaker.call(self.client.ping)
+            
+            self.last_health_check = time.time()
+            # Bypass MonitoredRedis accounting so a failed probe can trip the breaker at once
+            await redis.asyncio.Redis.execute_command(self.client, 'PING')
+            self._circuit_breaker.record_success()
             return True
             
-        except CircuitBreakerOpenError:
-            logger.warning("Redis health check failed: Circuit breaker is open")
-            return False
         except Exception as e:
+            self._circuit_breaker.record_failure(trip=True)
             logger.error(f"Redis health check failed: {e}")
             return False
     
+    def _start_health_monitor(self):
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_monitor())
+    
+    async def _health_monitor(self):
+        """
+        Background task keeping the circuit breaker current, so get_client() never does I/O.
+        While OPEN it waits out the breaker timeout, then probes once (HALF_OPEN).
+        """
+        logger.info(f"Redis health monitor started (every {self.health_check_interval}s)")
+        while True:
+            try:
+                await asyncio.sleep(self.health_check_interval)
+                if self._circuit_breaker.probe_due():
+                    await self.health_check()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Redis health monitor error: {e}")
+    
     async def get_client(self) -> Optional[redis.asyncio.Redis]:
-        """Get Redis client if available and healthy"""
+        """
+        Get Redis client if available and healthy.
+        Zero I/O: health comes from the background monitor and real command results.
+        """
         if not self._initialized or not self.client:
             return None
-            
-        # Quick health check
-        try:
-            await self._circuit_breaker.call(self.client.ping)
-            return self.client
-        except Exception:
+        if not self._circuit_breaker.allows_requests():
             return None
+        return self.client
     
     async def execute_with_fallback(self, operation, *args, fallback_value=None, **kwargs):
         """
@@ -146,6 +240,10 @@ class RedisClient:
     
     async def close(self):
         """Close Redis connection"""
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        
         if self.client:
             try:
                 await self.client.close()
@@ -166,7 +264,7 @@ class RedisClient:
         """Check if Redis is available (circuit breaker not open)"""
         return (self._initialized and 
                 self.client is not None and 
-                self._circuit_breaker.state != "OPEN")
+                self._circuit_breaker.allows_requests())
 
 
 # Global Redis client instance
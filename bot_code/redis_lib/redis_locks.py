@@ -1,31 +1,308 @@
-import os
 import time
+import uuid
 import asyncio
+import threading
 from typing import Optional
 from .redis_client import redis_client
+from database.pool_metrics import LatencyHistogram
 from utils.utils import logger
 
+# Fair distributed lock.
+# Waiters queue in a per-lock sorted set ordered by ticket, so the lock is handed over FIFO.
+# Instead of polling SET NX, a waiter sleeps until the holder's release is published on a
+# pub/sub channel (one pattern subscription per process, shared by every waiter). The sleep
+# is bounded by the lock's remaining TTL so a crashed holder only delays waiters until expiry.
+
+LOCK_CHANNEL_PREFIX = "lock_released:"
+# Upper bound on a single sleep when no TTL hint applies (lock free but another waiter is head)
+LOCK_RECHECK_MS = 100
+MAX_LOCK_KEYS = 200
+
+# KEYS: lock, queue (ticket-ordered waiters), waiter deadlines, ticket counter
+# ARGV: identifier, ttl_ms, wait_ms (this waiter's remaining acquire budget), channel, recheck_ms
+# Returns {1} when acquired, otherwise {0, ms to wait before retrying}
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local id = ARGV[1]
+local ttl = tonumber(ARGV[2])
+local wait = tonumber(ARGV[3])
+
+-- Drop waiters that gave up without dequeuing (e.g. their process died)
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)
+for _, waiter in ipairs(stale) do
+    redis.call('ZREM', KEYS[2], waiter)
+    redis.call('ZREM', KEYS[3], waiter)
+end
+
+local holder = redis.call('GET', KEYS[1])
+local head = redis.call('ZRANGE', KEYS[2], 0, 0)[1]
+if not holder and (not head or head == id) then
+    redis.call('SET', KEYS[1], id, 'PX', ttl)
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('ZREM', KEYS[3], id)
+    return {1}
+end
+
+if not redis.call('ZSCORE', KEYS[2], id) then
+    redis.call('ZADD', KEYS[2], redis.call('INCR', KEYS[4]), id)
+end
+redis.call('ZADD', KEYS[3], now + wait, id)
+-- Queue bookkeeping lives as long as the longest-waiting entry (never shortened)
+local keep = wait + ttl
+for i = 2, 4 do
+    if redis.call('PTTL', KEYS[i]) < keep then
+        redis.call('PEXPIRE', KEYS[i], keep)
+    end
+end
+
+if holder then
+    return {0, math.max(redis.call('PTTL', KEYS[1]), 1)}
+end
+-- Lock is free but another waiter is first in line: make sure it knows
+redis.call('PUBLISH', ARGV[4], head)
+return {0, tonumber(ARGV[5])}
+"""
+
+# KEYS: lock, queue   ARGV: identifier, channel
+# Releases only if still held by identifier, then wakes the next waiter in line
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+local head = redis.call('ZRANGE', KEYS[2], 0, 0)[1]
+if head then
+    redis.call('PUBLISH', ARGV[2], head)
+end
+return 1
+"""
+
+# KEYS: lock, queue, waiter deadlines   ARGV: identifier, channel
+# Leaves the queue after a timeout or cancellation, passing the turn on if the lock is free
+ABANDON_SCRIPT = """
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('ZREM', KEYS[3], ARGV[1])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    local head = redis.call('ZRANGE', KEYS[2], 0, 0)[1]
+    if head then
+        redis.call('PUBLISH', ARGV[2], head)
+    end
+end
+return 1
+"""
+
+
+class LockMetrics:
+    """Per-key acquire-wait and hold-time histograms, dumped by the admin 'dbstats' command"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._keys = {}
+
+    def _entry(self, key: str) -> dict:
+        entry = self._keys.get(key)
+        if entry is None:
+            if len(self._keys) >= MAX_LOCK_KEYS:
+                key = '<other>'
+                entry = self._keys.get(key)
+            if entry is None:
+                entry = self._keys[key] = {
+                    'wait': LatencyHistogram(), 'hold': LatencyHistogram(), 'timeouts': 0, 'contended': 0
+                }
+        return entry
+
+    def record_acquire(self, key: str, wait_seconds: float, contended: bool):
+        with self._lock:
+            entry = self._entry(key)
+            entry['wait'].observe(wait_seconds * 1000)
+            if contended:
+                entry['contended'] += 1
+
+    def record_release(self, key: str, hold_seconds: float):
+        with self._lock:
+            self._entry(key)['hold'].observe(hold_seconds * 1000)
+
+    def record_timeout(self, key: str, wait_seconds: float):
+        with self._lock:
+            entry = self._entry(key)
+            entry['timeouts'] += 1
+            entry['wait'].observe(wait_seconds * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                key: {
+                    'wait': entry['wait'].snapshot(),
+                    'hold': entry['hold'].snapshot(),
+                    'timeouts': entry['timeouts'],
+                    'contended': entry['contended']
+                }
+                for key, entry in self._keys.items()
+            }
+
+    def format_report(self, top_n: int = 10) -> list:
+        """
+        Render lock metrics as plain text for the admin command.
+        Args:
+            top_n (int): Number of lock keys to list, by total wait time (default: 10)
+        Returns:
+            list: Report sections
+        """
+        snapshot = self.snapshot()
+        if not snapshot:
+            return []
+        keys = sorted(
+            snapshot.items(),
+            key=lambda item: item[1]['wait']['avg_ms'] * item[1]['wait']['count'],
+            reverse=True
+        )[:top_n]
+        lines = ["lock                      acquires contended timeouts wait_p50 wait_p95 hold_p50 hold_p95"]
+        for key, entry in keys:
+            wait, hold = entry['wait'], entry['hold']
+            lines.append(
+                f"{key[:25]:<25} {wait['count']:>8} {entry['contended']:>9} {entry['timeouts']:>8} "
+                f"{wait['p50_ms']:>6.0f}ms {wait['p95_ms']:>6.0f}ms {hold['p50_ms']:>6.0f}ms {hold['p95_ms']:>6.0f}ms"
+            )
+        return ["\n".join(lines)]
+
+
+lock_metrics = LockMetrics()
+
+
+class LockReleaseNotifier:
+    """Single pattern subscription per process that wakes local lock waiters by identifier"""
+
+    def __init__(self):
+        self._waiters = {}
+        self._client = None
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+
+    async def ensure_started(self, client) -> bool:
+        """Subscribe to release notifications if not already listening on this client"""
+        if self._task is not None and not self._task.done() and self._client is client:
+            return True
+        async with self._start_lock:
+            if self._task is not None and not self._task.done() and self._client is client:
+                return True
+            return await self._start(client)
+
+    async def _start(self, client) -> bool:
+        await self.stop()
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            await pubsub.psubscribe(f"{LOCK_CHANNEL_PREFIX}*")
+        except Exception as e:
+            logger.warning(f"Lock release subscription failed, waiters will wake on TTL: {e}")
+            return False
+        self._client, self._pubsub = client, pubsub
+        self._task = asyncio.create_task(self._listen(pubsub))
+        return True
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get('type') == 'pmessage':
+                    self._wake(message['data'])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Lock release listener stopped: {e}")
+        finally:
+            # Waiters retry immediately rather than sleeping out their TTL bound
+            for identifier in list(self._waiters):
+                self._wake(identifier)
+
+    def register(self, identifier: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[identifier] = future
+        return future
+
+    def unregister(self, identifier: str):
+        self._waiters.pop(identifier, None)
+
+    def _wake(self, identifier: str):
+        future = self._waiters.pop(identifier, None)
+        if future is not None and not future.done():
+            future.set_result(True)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+        self._task = self._pubsub = self._client = None
+
+
+lock_release_notifier = LockReleaseNotifier()
+
+
+class LockScripts:
+    """The lock scripts registered once per client, so each call is an EVALSHA"""
+
+    def __init__(self):
+        self._client = None
+        self.acquire = self.abandon = self.release = None
+
+    def get(self, client) -> 'LockScripts':
+        # register_script handles EVALSHA with a transparent SCRIPT LOAD on NOSCRIPT
+        if self._client is not client:
+            self.acquire = client.register_script(ACQUIRE_SCRIPT)
+            self.abandon = client.register_script(ABANDON_SCRIPT)
+            self.release = client.register_script(RELEASE_SCRIPT)
+            self._client = client
+        return self
+
+
+lock_scripts = LockScripts()
+
 
 class RedisLock:
-    """Async context manager for a simple Redis-based distributed lock.
+    """Async context manager for a fair (FIFO) Redis-based distributed lock.
 
     Usage:
-        async with RedisLock(key=f"game:{game_id}:click_lock", timeout=5.0) as lock:
+        async with RedisLock(key=f"game:{game_id}:image_lock", timeout=1.0) as lock:
             if lock is None:
                 # Redis down - fallback behavior
                 pass
             else:
                 # critical section
+
+    Args:
+        key: Lock key (defaults to game:{game_id}:click_lock)
+        game_id: Game session ID used to build the default key
+        timeout: Seconds to wait for the lock before raising TimeoutError
+        ttl: Lease in seconds (millisecond precision) after which an unreleased lock expires;
+             defaults to timeout
     """
 
-    def __init__(self, key: str = None, game_id: Optional[int] = None, timeout: float = 5.0, retry_delay: float = 0.001):
+    def __init__(self, key: str = None, game_id: Optional[int] = None, timeout: float = 5.0, ttl: Optional[float] = None):
         if key is None and game_id is None:
             raise ValueError("Either key or game_id must be provided")
         self.key = key or f"game:{game_id}:click_lock"
         self.timeout = float(timeout)
-        self.retry_delay = float(retry_delay)
-        self.identifier = f"{os.getpid()}:{time.time()}"
+        self.ttl_ms = max(1, int(round((ttl if ttl is not None else timeout) * 1000)))
+        self.identifier = uuid.uuid4().hex
+        self.channel = f"{LOCK_CHANNEL_PREFIX}{self.key}"
         self._client = None
+        self._acquired_at = None
+
+    def _keys(self) -> list:
+        return [self.key, f"{self.key}:queue", f"{self.key}:deadlines", f"{self.key}:ticket"]
 
     async def __aenter__(self):
         self._client = await redis_client.get_client()
@@ -34,34 +311,72 @@ class RedisLock:
             logger.debug(f"Redis unavailable, lock fallback for {self.key}")
             return None
 
-        end_time = time.time() + self.timeout
-        while time.time() < end_time:
-            try:
-                # NX = set if not exists, ex = seconds
-                result = await self._client.set(self.key, self.identifier, nx=True, ex=int(self.timeout))
-                if result:
+        await lock_release_notifier.ensure_started(self._client)
+        start = time.monotonic()
+        deadline = start + self.timeout
+        contended = False
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                # Registered before the attempt so a release published right after it is not missed
+                woken = lock_release_notifier.register(self.identifier)
+                try:
+                    reply = await lock_scripts.get(self._client).acquire(
+                        keys=self._keys(),
+                        args=[self.identifier, self.ttl_ms, int(remaining * 1000) + 1, self.channel, LOCK_RECHECK_MS],
+                        client=self._client
+                    )
+                except Exception as e:
+                    logger.debug(f"RedisLock acquire error for {self.key}: {e}")
+                    lock_release_notifier.unregister(self.identifier)
+                    self._client = None
+                    return None
+
+                if int(reply[0]) == 1:
+                    lock_release_notifier.unregister(self.identifier)
+                    self._acquired_at = time.monotonic()
+                    lock_metrics.record_acquire(self.key, self._acquired_at - start, contended)
                     return self
-            except Exception as e:
-                logger.debug(f"RedisLock set error for {self.key}: {e}")
-                return None
 
-            await asyncio.sleep(self.retry_delay)
+                contended = True
+                sleep = min(int(reply[1]) / 1000, deadline - time.monotonic())
+                if sleep > 0:
+                    try:
+                        await asyncio.wait_for(woken, timeout=sleep)
+                    except asyncio.TimeoutError:
+                        pass
+                lock_release_notifier.unregister(self.identifier)
+        except asyncio.CancelledError:
+            lock_release_notifier.unregister(self.identifier)
+            await self._abandon()
+            raise
 
+        lock_release_notifier.unregister(self.identifier)
+        await self._abandon()
+        lock_metrics.record_timeout(self.key, time.monotonic() - start)
         raise TimeoutError(f"Could not acquire Redis lock for {self.key}")
 
+    async def _abandon(self):
+        """Leave the wait queue, handing the turn to the next waiter"""
+        try:
+            await lock_scripts.get(self._client).abandon(
+                keys=self._keys()[:3], args=[self.identifier, self.channel], client=self._client
+            )
+        except Exception as e:
+            logger.debug(f"RedisLock abandon error for {self.key}: {e}")
+
     async def __aexit__(self, exc_type, exc, tb):
-        if not self._client:
+        if not self._client or self._acquired_at is None:
             return
 
-        # Release lock only if identifier matches (atomic check+del via Lua)
-        lua = """
-        if redis.call('get', KEYS[1]) == ARGV[1] then
-            return redis.call('del', KEYS[1])
-        else
-            return 0
-        end
-        """
+        lock_metrics.record_release(self.key, time.monotonic() - self._acquired_at)
+        self._acquired_at = None
         try:
-            await self._client.eval(lua, 1, self.key, self.identifier)
+            # Release lock only if identifier matches, then notify the next waiter
+            await lock_scripts.get(self._client).release(
+                keys=[self.key, f"{self.key}:queue"], args=[self.identifier, self.channel], client=self._client
+            )
         except Exception as e:
             logger.debug(f"RedisLock release error for {self.key}: {e}")
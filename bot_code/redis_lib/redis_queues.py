@@ -1,19 +1,19 @@
 import json
-import asyncio
-from typing import Any, Dict, List
+import datetime
+from typing import Any, Dict
 from .redis_client import redis_client
-from utils.utils import logger, config
+from utils.utils import logger
 
 CLICK_QUEUE_KEY = 'click_queue'
+CLICK_QUEUE_GROUP = 'click_sync'
+CLICK_DLQ_KEY = 'click_queue:dlq'
 USER_UPDATE_QUEUE_KEY = 'user_update_queue'
+USER_UPDATE_GROUP = 'user_sync'
+USER_UPDATE_DLQ_KEY = 'user_update_queue:dlq'
 
 
-async def push_click_to_queue(game_id: int, user_id: int, click_time: str, timer_value: float, user_name: str, old_timer: float = None):
-    client = await redis_client.get_client()
-    if not client:
-        logger.debug("Redis unavailable - push_click_to_queue fallback (no-op)")
-        return None
-
+def build_click_payload(game_id: int, user_id: int, click_time: str, timer_value: float, user_name: str, old_timer: float = None) -> Dict[str, str]:
+    """Build the click_queue stream entry for a click"""
     payload = {
         'game_id': str(game_id),
         'user_id': str(user_id),
@@ -23,14 +23,29 @@ async def push_click_to_queue(game_id: int, user_id: int, click_time: str, timer
     }
     if old_timer is not None:
         payload['old_timer'] = str(old_timer)
+    return payload
 
-    try:
-        msg_id = await client.xadd(CLICK_QUEUE_KEY, payload)
-        logger.debug(f"Pushed click to queue {msg_id} for game {game_id}")
-        return msg_id
-    except Exception as e:
-        logger.error(f"Failed to push click to queue: {e}")
-        return None
+
+def build_user_update_payload(user_id: int, action: str, data: Dict[str, Any]) -> Dict[str, str]:
+    """Build the user_update_queue stream entry for a user update"""
+    return {
+        'user_id': str(user_id),
+        'action': action,
+        'data': json.dumps(data)
+    }
+
+
+def build_user_click_data(user_name: str, game_id: int, click_time: datetime.datetime, timer_value: float,
+                          cooldown_expiration: datetime.datetime, color_rank: str) -> Dict[str, Any]:
+    """Data of the 'click' user update queued for an accepted click"""
+    return {
+        'user_name': user_name,
+        'game_id': int(game_id),
+        'click_time': click_time.isoformat(),
+        'timer_value': float(timer_value),
+        'cooldown_expiration': cooldown_expiration.isoformat(),
+        'color_rank': color_rank
+    }
 
 
 async def push_user_update(user_id: int, action: str, data: Dict[str, Any]):
@@ -39,11 +54,7 @@ async def push_user_update(user_id: int, action: str, data: Dict[str, Any]):
         logger.debug("Redis unavailable - push_user_update fallback (no-op)")
         return None
 
-    payload = {
-        'user_id': str(user_id),
-        'action': action,
-        'data': json.dumps(data)
-    }
+    payload = build_user_update_payload(user_id, action, data)
     try:
         msg_id = await client.xadd(USER_UPDATE_QUEUE_KEY, payload)
         logger.debug(f"Pushed user update to queue {msg_id} for user {user_id}")
@@ -51,3 +62,11 @@ async def push_user_update(user_id: int, action: str, data: Dict[str, Any]):
     except Exception as e:
         logger.error(f"Failed to push user update to queue: {e}")
         return None
+
+
+async def push_user_click(user_id: int, user_name: str, game_id: int, click_time: datetime.datetime, timer_value: float,
+                          cooldown_expiration: datetime.datetime, color_rank: str):
+    """Queue the users row update for an accepted click (applied by the user update worker)"""
+    return await push_user_update(user_id, 'click', build_user_click_data(
+        user_name, game_id, click_time, timer_value, cooldown_expiration, color_rank
+    ))
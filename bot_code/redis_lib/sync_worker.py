@@ -1,26 +1,89 @@
 import asyncio
-import json
-from typing import List
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
 from .redis_client import redis_client
 from utils.utils import logger, config
-from .redis_queues import CLICK_QUEUE_KEY
-from database.database import execute_query
+from .redis_queues import CLICK_QUEUE_KEY, CLICK_DLQ_KEY, CLICK_QUEUE_GROUP
+from database.database import record_queued_clicks_async, execute_query_async
+
+# Click stream consumer.
+# Reads click_queue through a consumer group, writes each batch (clicks plus the player stats
+# rollup) in one MySQL transaction and XACKs it. Entries are never deleted one by one: the stream
+# is trimmed up to the oldest entry the group still needs. Rows that keep failing on their own
+# are moved to a dead-letter stream instead of blocking the queue.
+# Any number of workers (in the bot or in sync_worker_main.py processes) can share the group:
+# entries left pending by a dead consumer are reclaimed with XAUTOCLAIM, and inserts are keyed
+# by stream entry ID so a reclaimed entry that was already written is skipped, not duplicated.
+# The group, reclaim, trim and lag handling is shared with other stream consumers
+# (user_update_worker.py), which override the class attributes below and _flush().
+
+
+def _stream_id_ms(stream_id: str) -> int:
+    return int(stream_id.split('-', 1)[0])
+
+
+def _stream_id_tuple(stream_id: str) -> Tuple[int, int]:
+    ms, seq = stream_id.split('-', 1)
+    return int(ms), int(seq)
+
+
+def click_from_entry(msg_id: str, fields: dict) -> Dict[str, Any]:
+    """
+    A click_queue entry as a click dict (key, game_id, user_id, user_name, click_time as ISO
+    text, timer_value), the shape of a click_spool record; raises KeyError/ValueError if malformed
+    """
+    return {
+        # Spooled clicks keep the key they were given when first accepted
+        'key': fields.get('click_key') or msg_id,
+        'game_id': int(fields['game_id']),
+        'user_id': int(fields['user_id']),
+        'user_name': fields.get('user_name', ''),
+        'click_time': fields['click_time'],
+        'timer_value': float(fields['timer_value']),
+    }
 
 
 class SyncWorker:
-    def __init__(self):
+    # Stream consumed, its dead-letter stream, and what an entry is called in logs and reports
+    stream = CLICK_QUEUE_KEY
+    dlq = CLICK_DLQ_KEY
+    entry_name = 'click'
+    report_labels = ('click queue', 'sync worker')
+
+    def __init__(self, consumer: Optional[str] = None):
         self.redis = redis_client
         self.running = False
         self._task = None
-        self.batch_size = config.get('cache', {}).get('click_queue_batch_size', 25)
-        self.block_ms = int(config.get('cache', {}).get('sync_worker_block_ms', 500))
+        cache_config = config.get('cache', {})
+        self.batch_size = cache_config.get('click_queue_batch_size', 25)
+        self.block_ms = int(cache_config.get('sync_worker_block_ms', 500))
+        self.group = cache_config.get('click_queue_group', CLICK_QUEUE_GROUP)
+        self.consumer = consumer or cache_config.get('click_queue_consumer') or f"{socket.gethostname()}-{os.getpid()}"
+        # Failed attempts on a row inserted alone before it is dead-lettered
+        self.max_row_failures = int(cache_config.get('click_queue_max_failures', 3))
+        self.trim_interval = float(cache_config.get('click_queue_trim_interval', 30))
+        self.dlq_maxlen = int(cache_config.get('click_dlq_maxlen', 10000))
+        # Entries pending this long on another consumer are assumed orphaned and reclaimed
+        self.claim_idle_ms = int(cache_config.get('click_queue_claim_idle_ms', 60000))
+        self.claim_interval = float(cache_config.get('click_queue_claim_interval', 15))
+        # Consumers with nothing pending and idle this long are removed from the group
+        self.consumer_idle_ms = int(cache_config.get('click_queue_consumer_idle_ms', 3600000))
+        self._group_ready = False
+        self._read_backlog = True
+        self._row_failures: Dict[str, int] = {}
+        self._last_trim = 0.0
+        self._last_claim = 0.0
+        self.stats = {'processed': 0, 'duplicates': 0, 'batches': 0, 'failed_batches': 0, 'dead_lettered': 0,
+                      'reclaimed': 0, 'trimmed': 0}
 
     async def start(self):
         if self.running:
             return
         self.running = True
         self._task = asyncio.create_task(self._process_click_queue())
-        logger.info("SyncWorker started")
+        logger.info(f"{type(self).__name__} started as consumer {self.consumer} in group {self.group}")
 
     async def stop(self):
         self.running = False
@@ -30,52 +93,264 @@ class SyncWorker:
                 await self._task
             except asyncio.CancelledError:
                 pass
-        logger.info("SyncWorker stopped")
+        logger.info(f"{type(self).__name__} stopped")
+
+    async def _ensure_group(self, client):
+        """Create the consumer group (and stream) if missing, starting from the oldest entry"""
+        if self._group_ready:
+            return
+        try:
+            await client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+            logger.info(f"Created consumer group {self.group} on {self.stream}")
+        except Exception as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+        self._read_backlog = True
+
+    async def _read_batch(self, client) -> List[Tuple[str, dict]]:
+        """Own pending entries first (after a restart or failed flush), then new ones"""
+        if self._read_backlog:
+            entries = await client.xreadgroup(self.group, self.consumer, {self.stream: '0'}, count=self.batch_size)
+            messages = entries[0][1] if entries else []
+            if messages:
+                return messages
+            self._read_backlog = False
+        entries = await client.xreadgroup(self.group, self.consumer, {self.stream: '>'}, count=self.batch_size, block=self.block_ms)
+        return entries[0][1] if entries else []
 
     async def _process_click_queue(self):
         while self.running:
             client = await self.redis.get_client()
             if not client:
-                logger.debug("Redis not available - SyncWorker sleeping")
+                logger.debug(f"Redis not available - {type(self).__name__} sleeping")
+                self._group_ready = False
                 await asyncio.sleep(1)
                 continue
 
             try:
-                # Read up to batch_size messages from the stream using XREAD
-                # Using block in ms
-                entries = await client.xread({CLICK_QUEUE_KEY: '0-0'}, count=self.batch_size, block=self.block_ms)
-                if not entries:
-                    await asyncio.sleep(0.05)
-                    continue
-
-                # entries structure: [(key, [(id, {field: value}), ...])]
-                for stream_key, messages in entries:
-                    # Collect click rows
-                    for msg_id, fields in messages:
-                        try:
-                            game_id = int(fields.get('game_id'))
-                            user_id = int(fields.get('user_id'))
-                            click_time = fields.get('click_time')
-                            timer_value = float(fields.get('timer_value'))
-                            # Insert into DB (simple insert per message to keep logic safe)
-                            query = "INSERT INTO button_clicks (game_id, user_id, click_time, timer_value) VALUES (%s, %s, %s, %s)"
-                            execute_query(query, (game_id, user_id, click_time, timer_value), commit=True)
-
-                            # After inserting, delete stream message
-                            try:
-                                await client.xdel(CLICK_QUEUE_KEY, msg_id)
-                            except Exception as e:
-                                logger.debug(f"Failed to xdel message {msg_id}: {e}")
-
-                        except Exception as e:
-                            logger.error(f"Error processing click message {msg_id}: {e}")
-                            # Move on to next message
-                            continue
-
+                await self._ensure_group(client)
+                messages = await self._read_batch(client)
+                if messages:
+                    await self._flush(client, messages)
+                if time.monotonic() - self._last_claim >= self.claim_interval:
+                    await self._reclaim(client)
+                if time.monotonic() - self._last_trim >= self.trim_interval:
+                    await self._trim(client)
             except Exception as e:
-                logger.error(f"SyncWorker loop error: {e}")
+                if 'NOGROUP' in str(e):
+                    # Stream or group was deleted (e.g. cache wipe); recreate on the next pass
+                    self._group_ready = False
+                logger.error(f"{type(self).__name__} loop error: {e}")
                 await asyncio.sleep(1)
 
+    async def _flush(self, client, messages: List[Tuple[str, dict]]):
+        """Insert one batch, acknowledging what was written or dead-lettered"""
+        rows, msg_ids, dead = [], [], []
+        for msg_id, fields in messages:
+            if fields is None:
+                # Entry was trimmed while pending; nothing left to insert
+                dead.append((msg_id, {}, 'entry no longer in stream'))
+                continue
+            try:
+                click = click_from_entry(msg_id, fields)
+                rows.append((click['game_id'], click['user_id'], click['click_time'], click['timer_value'], click['key']))
+                msg_ids.append(msg_id)
+            except Exception as e:
+                dead.append((msg_id, fields, f"malformed: {e}"))
+
+        done = []
+        if rows:
+            # Insert the whole batch and its player stats rollup in one transaction
+            result = await record_queued_clicks_async(rows)
+            if result:
+                done = msg_ids
+                self.stats['duplicates'] += result['duplicates']
+            else:
+                self.stats['failed_batches'] += 1
+                done, dead_rows = await self._isolate_failures(rows, msg_ids, messages)
+                dead.extend(dead_rows)
+                if len(done) + len(dead_rows) < len(msg_ids):
+                    # Rows still unwritten stay pending and are re-read from the backlog
+                    self._read_backlog = True
+                    await asyncio.sleep(1)
+
+        await self._acknowledge(client, done, dead)
+
+    async def _acknowledge(self, client, done: List[str], dead: List[Tuple[str, dict, str]]):
+        """Dead-letter what could not be written, then XACK it along with what was"""
+        if dead:
+            await self._dead_letter(client, dead)
+            done = done + [msg_id for msg_id, _, _ in dead]
+        if done:
+            await client.xack(self.stream, self.group, *done)
+            for msg_id in done:
+                self._row_failures.pop(msg_id, None)
+            self.stats['processed'] += len(done)
+            self.stats['batches'] += 1
+
+    async def _isolate_failures(self, rows, msg_ids, messages):
+        """
+        After a failed batch, insert rows one at a time so a single bad row cannot hold
+        back the rest. Nothing is counted against the rows while MySQL itself is unreachable.
+        Returns:
+            tuple: (written message IDs, [(message ID, fields, reason)] to dead-letter)
+        """
+        if not await execute_query_async('SELECT 1', retry_attempts=1):
+            logger.error(f"Failed to insert batch of {len(rows)} clicks and MySQL is unreachable, will retry")
+            return [], []
+
+        fields_by_id = dict(messages)
+        written, dead = [], []
+        for row, msg_id in zip(rows, msg_ids):
+            if await record_queued_clicks_async([row], 1):
+                written.append(msg_id)
+                continue
+            failures = self._row_failures.get(msg_id, 0) + 1
+            self._row_failures[msg_id] = failures
+            if failures >= self.max_row_failures:
+                dead.append((msg_id, fields_by_id[msg_id], f"insert failed {failures} times"))
+            else:
+                logger.warning(f"Click {msg_id} failed to insert ({failures}/{self.max_row_failures})")
+        return written, dead
+
+    async def _reclaim(self, client, max_batches: int = 10):
+        """
+        Take over entries that have sat unacknowledged on any consumer for claim_idle_ms
+        (a crashed or stuck worker) and process them, then drop long-idle empty consumers.
+        """
+        self._last_claim = time.monotonic()
+        cursor = '0-0'
+        for _ in range(max_batches):
+            reply = await client.xautoclaim(
+                self.stream, self.group, self.consumer, self.claim_idle_ms, start_id=cursor, count=self.batch_size
+            )
+            cursor, messages = reply[0], reply[1]
+            if messages:
+                logger.warning(f"Consumer {self.consumer} reclaimed {len(messages)} idle {self.entry_name} entries")
+                self.stats['reclaimed'] += len(messages)
+                await self._flush(client, messages)
+            if cursor == '0-0':
+                break
+
+        for consumer in await client.xinfo_consumers(self.stream, self.group):
+            if consumer['name'] != self.consumer and not consumer['pending'] and consumer['idle'] >= self.consumer_idle_ms:
+                await client.xgroup_delconsumer(self.stream, self.group, consumer['name'])
+                logger.info(f"Removed idle {self.stream} consumer {consumer['name']}")
+
+    async def _dead_letter(self, client, dead: List[Tuple[str, dict, str]]):
+        async with client.pipeline(transaction=False) as pipe:
+            for msg_id, fields, reason in dead:
+                entry = dict(fields)
+                entry.update({'source_id': msg_id, 'error': reason, 'failed_at': str(time.time())})
+                pipe.xadd(self.dlq, entry, maxlen=self.dlq_maxlen, approximate=True)
+            await pipe.execute()
+        self.stats['dead_lettered'] += len(dead)
+        for msg_id, _, reason in dead:
+            logger.error(f"Moved {self.entry_name} {msg_id} to {self.dlq}: {reason}")
+
+    async def _watermark(self, client) -> Optional[str]:
+        """
+        Oldest stream ID any consumer group may still need: the lowest of each group's
+        oldest pending entry and next undelivered entry. Everything below it is acknowledged.
+        """
+        watermark = None
+        for group in await client.xinfo_groups(self.stream):
+            name = group['name']
+            pending = await client.xpending(self.stream, name)
+            if pending and pending.get('pending'):
+                candidate = pending['min']
+            else:
+                # Nothing pending: entries up to last-delivered-id are done
+                last = group['last-delivered-id']
+                ms, seq = last.split('-', 1)
+                candidate = f"{ms}-{int(seq) + 1}"
+            if watermark is None or tuple(map(int, candidate.split('-'))) < tuple(map(int, watermark.split('-'))):
+                watermark = candidate
+        return watermark
+
+    async def _trim(self, client):
+        self._last_trim = time.monotonic()
+        watermark = await self._watermark(client)
+        if watermark is None:
+            return
+        trimmed = await client.xtrim(self.stream, minid=watermark, approximate=True)
+        if trimmed:
+            self.stats['trimmed'] += trimmed
+            logger.debug(f"Trimmed {trimmed} acknowledged entries from {self.stream} below {watermark}")
+
+    async def unacknowledged(self, client) -> List[Tuple[str, dict]]:
+        """
+        Entries the group has not acknowledged yet (pending on a consumer or not delivered),
+        oldest first: for the click queue, the clicks that may not be in MySQL yet.
+        """
+        try:
+            groups = {group['name']: group for group in await client.xinfo_groups(self.stream)}
+        except Exception as e:
+            if 'no such key' in str(e).lower():
+                return []
+            raise
+        group = groups.get(self.group)
+        if group is None:
+            # No worker has consumed the stream yet
+            return await client.xrange(self.stream)
+        last_delivered = group['last-delivered-id']
+        pending = await client.xpending(self.stream, self.group)
+        pending_ids = set()
+        start = last_delivered
+        if pending and pending.get('pending'):
+            start = pending['min']
+            pending_ids = {entry['message_id'] for entry in await client.xpending_range(
+                self.stream, self.group, min='-', max='+', count=pending['pending']
+            )}
+        last = _stream_id_tuple(last_delivered)
+        return [(msg_id, fields) for msg_id, fields in await client.xrange(self.stream, min=start)
+                if msg_id in pending_ids or _stream_id_tuple(msg_id) > last]
+
+    async def get_lag(self) -> Optional[dict]:
+        """
+        Get consumer group lag for monitoring.
+        Returns:
+            dict: {'pending', 'oldest_pending_age_seconds', 'undelivered', 'stream_length',
+                   'dlq_length', 'consumers', plus the worker's counters}, or None if Redis is unavailable
+        """
+        client = await self.redis.get_client()
+        if not client:
+            return None
+        try:
+            pending = await client.xpending(self.stream, self.group)
+            groups = {group['name']: group for group in await client.xinfo_groups(self.stream)}
+            group = groups.get(self.group, {})
+            oldest_age = None
+            if pending and pending.get('pending'):
+                oldest_age = max(0.0, time.time() - _stream_id_ms(pending['min']) / 1000)
+            return {
+                'pending': pending.get('pending', 0) if pending else 0,
+                'oldest_pending_age_seconds': oldest_age,
+                'undelivered': group.get('lag'),
+                'stream_length': await client.xlen(self.stream),
+                'dlq_length': await client.xlen(self.dlq),
+                'consumers': {consumer['name']: consumer['pending'] for consumer in (pending or {}).get('consumers', [])},
+                **self.stats
+            }
+        except Exception as e:
+            logger.error(f"Error reading {self.stream} lag: {e}")
+            return None
+
+    async def format_report(self) -> List[str]:
+        """Render queue lag as plain text for the admin 'dbstats' command"""
+        lag = await self.get_lag()
+        if lag is None:
+            return []
+        oldest = lag['oldest_pending_age_seconds']
+        queue_label, worker_label = self.report_labels
+        lines = [
+            f"{queue_label:<14}length={lag['stream_length']} pending={lag['pending']} "
+            f"oldest_pending={f'{oldest:.1f}s' if oldest is not None else '-'} undelivered={lag['undelivered']} dlq={lag['dlq_length']}",
+            f"{worker_label:<14}" + " ".join(f"{name}={lag[name]}" for name in self.stats)
+        ]
+        return ["\n".join(lines)]
+
 
 # Single global worker instance
 sync_worker = SyncWorker()
@@ -0,0 +1,147 @@
+import asyncio
+import datetime
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+from utils.utils import logger, config
+from .redis_queues import USER_UPDATE_QUEUE_KEY, USER_UPDATE_DLQ_KEY, USER_UPDATE_GROUP
+from .sync_worker import SyncWorker
+from database.database import record_user_updates_async, execute_query_async
+
+# User update stream consumer.
+# The click path only queues the clicking user's row update on user_update_queue; this worker
+# applies them write-behind. The first update of a batch waits up to a coalescing window for
+# more, every user's updates in the batch are folded into one row (click count, lowest timer,
+# latest cooldown/color/click time) and all rows are upserted in one transaction before the
+# batch is XACKed. Consumer group, reclaim, trim and lag reporting are the SyncWorker ones.
+# Delivery is at least once, so a batch may be redelivered after a crash between its commit
+# and XACK: the upsert recomputes users.total_clicks from the game_player_stats rollup rather
+# than adding the batch's clicks to it, and the other columns only ever move to the newest click.
+
+# (click_time, timer_value, cooldown_expiration, color_rank, user_name, game_id) of one queued click
+UserClick = Tuple[datetime.datetime, float, datetime.datetime, str, str, int]
+
+
+def _parse_update(fields: dict) -> Tuple[int, UserClick]:
+    """User ID and click of a user_update_queue entry; raises ValueError/KeyError if malformed"""
+    if fields['action'] != 'click':
+        raise ValueError(f"unknown action {fields['action']!r}")
+    data = json.loads(fields['data'])
+    return int(fields['user_id']), (
+        datetime.datetime.fromisoformat(data['click_time']),
+        float(data['timer_value']),
+        datetime.datetime.fromisoformat(data['cooldown_expiration']),
+        str(data['color_rank']),
+        str(data['user_name']),
+        int(data['game_id'])
+    )
+
+
+def coalesce_user_clicks(user_id: int, clicks: List[UserClick]) -> tuple:
+    """
+    Fold one user's queued clicks into a single users row.
+
+    Returns:
+        tuple: Row in database.USER_UPDATE_COLUMNS order
+    """
+    click_time, _, cooldown_expiration, color_rank, user_name, game_id = max(clicks, key=lambda click: click[0])
+    lowest_timer = min(click[1] for click in clicks)
+    return (user_id, cooldown_expiration, color_rank, len(clicks), lowest_timer, click_time, user_name, game_id)
+
+
+class UserUpdateWorker(SyncWorker):
+    stream = USER_UPDATE_QUEUE_KEY
+    dlq = USER_UPDATE_DLQ_KEY
+    entry_name = 'user update'
+    report_labels = ('user updates', 'user worker')
+
+    def __init__(self, consumer: Optional[str] = None):
+        super().__init__(consumer)
+        cache_config = config.get('cache', {})
+        self.batch_size = cache_config.get('user_update_batch_size', 200)
+        self.group = cache_config.get('user_update_group', USER_UPDATE_GROUP)
+        # How long the first update of a batch waits for more to coalesce with
+        self.coalesce_seconds = float(cache_config.get('user_update_coalesce_seconds', 2))
+        # coalesced: updates folded into another update of the same user
+        self.stats = {'processed': 0, 'coalesced': 0, 'batches': 0, 'failed_batches': 0, 'dead_lettered': 0,
+                      'reclaimed': 0, 'trimmed': 0}
+
+    async def _read_batch(self, client) -> List[Tuple[str, dict]]:
+        messages = await super()._read_batch(client)
+        if not messages or self._read_backlog:
+            return messages
+        # New updates: keep reading for the coalescing window, so repeat clicks become one upsert
+        deadline = time.monotonic() + self.coalesce_seconds
+        while len(messages) < self.batch_size:
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            if remaining_ms <= 0:
+                break
+            entries = await client.xreadgroup(self.group, self.consumer, {self.stream: '>'},
+                                              count=self.batch_size - len(messages), block=remaining_ms)
+            if entries:
+                messages.extend(entries[0][1])
+        return messages
+
+    async def _flush(self, client, messages: List[Tuple[str, dict]]):
+        """Upsert one batch, one row per user, acknowledging what was written or dead-lettered"""
+        clicks: Dict[int, List[UserClick]] = {}
+        msg_ids: Dict[int, List[str]] = {}
+        dead = []
+        for msg_id, fields in messages:
+            if fields is None:
+                dead.append((msg_id, {}, 'entry no longer in stream'))
+                continue
+            try:
+                user_id, click = _parse_update(fields)
+            except Exception as e:
+                dead.append((msg_id, fields, f"malformed: {e}"))
+                continue
+            clicks.setdefault(user_id, []).append(click)
+            msg_ids.setdefault(user_id, []).append(msg_id)
+
+        done = []
+        if clicks:
+            rows = {user_id: coalesce_user_clicks(user_id, user_clicks) for user_id, user_clicks in clicks.items()}
+            if await record_user_updates_async(list(rows.values())):
+                done = [msg_id for user_ids in msg_ids.values() for msg_id in user_ids]
+                self.stats['coalesced'] += len(done) - len(rows)
+            else:
+                self.stats['failed_batches'] += 1
+                done, dead_rows = await self._isolate_user_failures(rows, msg_ids, dict(messages))
+                dead.extend(dead_rows)
+                if len(done) + len(dead_rows) < sum(len(user_ids) for user_ids in msg_ids.values()):
+                    # Users still unwritten stay pending and are re-read from the backlog
+                    self._read_backlog = True
+                    await asyncio.sleep(1)
+
+        await self._acknowledge(client, done, dead)
+
+    async def _isolate_user_failures(self, rows: Dict[int, tuple], msg_ids: Dict[int, List[str]], fields_by_id: dict):
+        """
+        After a failed batch, upsert users one at a time so a single bad row cannot hold
+        back the rest. Nothing is counted against the rows while MySQL itself is unreachable.
+        Returns:
+            tuple: (written message IDs, [(message ID, fields, reason)] to dead-letter)
+        """
+        if not await execute_query_async('SELECT 1', retry_attempts=1):
+            logger.error(f"Failed to upsert {len(rows)} users and MySQL is unreachable, will retry")
+            return [], []
+
+        written, dead = [], []
+        for user_id, row in rows.items():
+            user_msg_ids = msg_ids[user_id]
+            if await record_user_updates_async([row], 1):
+                written.extend(user_msg_ids)
+                continue
+            # Counted against the user's oldest update, which every retry of the user includes
+            failures = self._row_failures.get(user_msg_ids[0], 0) + 1
+            self._row_failures[user_msg_ids[0]] = failures
+            if failures >= self.max_row_failures:
+                dead.extend((msg_id, fields_by_id[msg_id], f"upsert failed {failures} times") for msg_id in user_msg_ids)
+            else:
+                logger.warning(f"User {user_id} update failed to upsert ({failures}/{self.max_row_failures})")
+        return written, dead
+
+
+# Single global worker instance
+user_update_worker = UserUpdateWorker()
@@ -0,0 +1,84 @@
+# Sync_worker_main.py
+# Standalone click queue sync workers, run outside the bot process:
+#   python bot_code/sync_worker_main.py [--consumers N]
+# Every worker joins the same click_queue consumer group as the bot's embedded worker, so
+# processes can be added or restarted freely (docker compose up --scale sync-worker=N runs N of
+# them); --consumers only adds consumers sharing this process's event loop. Each process also runs one user update worker
+# (write-behind users upserts from user_update_queue). Set cache.embedded_sync_worker to false in the
+# config to leave click persistence entirely to these processes.
+print("Starting sync worker file...")
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import sys
+import traceback
+
+try:
+    from utils.utils import logger, config
+    from database.database import init as init_database, close_disconnect_database
+    from redis_lib.redis_client import redis_client
+    from redis_lib.sync_worker import SyncWorker
+    from redis_lib.user_update_worker import UserUpdateWorker
+except Exception as e:
+    print(f"Error importing local modules: {e}")
+    print(traceback.format_exc())
+    sys.exit(1)
+
+async def run_workers(consumer_count):
+    """
+    Run consumer_count sync workers in this process until SIGINT/SIGTERM.
+    Args:
+        consumer_count (int): Number of consumers to run, each with its own name in the group
+    Returns:
+        int: Process exit code
+    """
+    if not await init_database(background_repairs=False):
+        logger.critical("Sync worker could not initialise the database")
+        return 1
+    if not await redis_client.initialize():
+        # The health monitor keeps probing; workers idle until Redis is reachable
+        logger.warning("Redis unreachable at startup - sync workers will wait for it")
+
+    base_name = f"{socket.gethostname()}-{os.getpid()}"
+    workers = [SyncWorker(consumer=f"{base_name}-{index}") for index in range(consumer_count)]
+    workers.append(UserUpdateWorker(consumer=base_name))
+    for worker in workers:
+        await worker.start()
+    logger.info(f"Running {consumer_count} click queue sync workers and a user update worker as {base_name}-*")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows: fall back to KeyboardInterrupt
+            pass
+
+    try:
+        await stop_event.wait()
+    finally:
+        logger.info("Stopping sync workers...")
+        # Unacknowledged entries stay pending and are reclaimed by the remaining consumers
+        await asyncio.gather(*(worker.stop() for worker in workers), return_exceptions=True)
+        await redis_client.close()
+        close_disconnect_database()
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="The Button click queue sync workers")
+    parser.add_argument(
+        '--consumers', type=int,
+        default=int(config.get('cache', {}).get('sync_worker_consumers', 1)),
+        help="Consumers to run in this process (default: cache.sync_worker_consumers or 1)"
+    )
+    args = parser.parse_args()
+    try:
+        sys.exit(asyncio.run(run_workers(max(1, args.consumers))))
+    except KeyboardInterrupt:
+        logger.info("Sync workers interrupted")
+
+if __name__ == '__main__':
+    main()
@@ -15,7 +15,8 @@ print("Nextcord imported...")
 # Local imports
 try:
     from utils.utils import logger, config, paused_games
-    from database.database import setup_pool, close_disconnect_database, fix_missing_users, get_game_session_by_guild_id, execute_query, update_local_game_sessions, game_sessions_dict
+    from database.database import init as init_database, close_disconnect_database, fix_missing_users, get_game_session_by_guild_id, execute_batch_write_async, run_db_call, update_local_game_sessions, game_sessions_dict
+    from database.session_registry import session_from_row
     from message.message_handlers import handle_message, start_boot_game
     from button.button_functions import setup_roles, MenuTimer, create_button_message  
     from button.button_view import ButtonView
@@ -80,7 +81,7 @@ async def restore_button_views():
         logger.info("Starting to restore button views...")
         
         # Get all game sessions at once
-        sessions = update_local_game_sessions()
+        sessions = await run_db_call(update_local_game_sessions)
         
         # Dictionary to track processed message IDs to avoid duplicates
         processed_messages = set()
@@ -98,17 +99,7 @@ async def restore_button_views():
                 sessions_by_channel[channel_id] = []
                 
             # Convert to dictionary for easier access
-            session_dict = {
-                "game_id": int(session[0]),
-                "admin_role_id": int(session[1]) if session[1] else 0,
-                "guild_id": int(session[2]),
-                "button_channel_id": int(session[3]),
-                "game_chat_channel_id": int(session[4]),
-                "start_time": session[5],
-                "end_time": session[6],
-                "timer_duration": int(session[7]),
-                "cooldown_duration": int(session[8])
-            }
+            session_dict = session_from_row(session)
             
             sessions_by_channel[channel_id].append((game_id, session_dict))
             
@@ -178,9 +169,16 @@ async def on_ready():
     for guild in bot.guilds:
         logger.info(f'Connected to guild: {guild.name}')
     
-    # Initialize Redis client
-    logger.info("Initializing Redis...")
-    redis_success = await redis_client.initialize()
+    # Initialize Redis and the database concurrently
+    logger.info("Initializing Redis and database...")
+    redis_success, database_success = await asyncio.gather(
+        redis_client.initialize(),
+        init_database()
+    )
+    if not database_success:
+        logger.error(f"Failed to initialize database.")
+        return
+
     if redis_success:
         logger.info("Redis initialized successfully")
         # Warm cache for active games
@@ -188,22 +186,32 @@ async def on_ready():
             await game_state_cache.warm_cache_for_active_games()
         except Exception as e:
             logger.error(f"Error warming Redis cache: {e}")
-        # Start the background sync worker
+    else:
+        logger.warning("Redis initialization failed - falling back to MySQL only")
+
+    # Start the background sync workers (click queue and write-behind user updates); they idle
+    # until Redis is reachable, so updates queued after a late Redis recovery are still persisted.
+    # Disabled when standalone workers (sync_worker_main.py) handle the queues.
+    if config.get('cache', {}).get('embedded_sync_worker', True):
         try:
             from redis_lib.sync_worker import sync_worker
+            from redis_lib.user_update_worker import user_update_worker
             await sync_worker.start()
+            await user_update_worker.start()
         except Exception as e:
             logger.error(f"Failed to start sync worker: {e}")
     else:
-        logger.warning("Redis initialization failed - falling back to MySQL only")
-    
-    # Initialize database pool if needed
-    if not setup_pool(): 
-        logger.error(f"Failed to initialize database pools.")
-        return
+        logger.info("Embedded sync worker disabled - relying on standalone sync workers")
+
+    # Replay clicks spooled to local disk while Redis was unavailable (including by a previous run)
+    try:
+        from redis_lib.click_spool import click_spool
+        await click_spool.start()
+    except Exception as e:
+        logger.error(f"Failed to start click spool: {e}")
         
     # Load all game sessions and guild data at once to reduce DB queries
-    all_sessions = update_local_game_sessions()
+    all_sessions = await run_db_call(update_local_game_sessions)
     sessions_by_guild = {}
     
     # Group sessions by guild
@@ -213,17 +221,17 @@ async def on_ready():
             sessions_by_guild[guild_id] = []
         sessions_by_guild[guild_id].append(session)
     
-    # Update guild names individually (can't do batch with current driver)
-    for guild in bot.guilds:
-        logger.info(f"Updating guild name: {guild.name}")
-        query = """
-            INSERT IGNORE INTO guild_names (guild_id, guild_name, last_updated)
-            VALUES (%s, %s, UTC_TIMESTAMP())
-        """
-        try:
-            execute_query(query, (guild.id, guild.name), commit=True)
-        except Exception as e:
-            logger.error(f"Failed to update guild name for {guild.id}: {e}")
+    # Update guild names in one batched insert
+    logger.info(f"Updating {len(bot.guilds)} guild names")
+    try:
+        await execute_batch_write_async(
+            'guild_names',
+            ['guild_id', 'guild_name', 'last_updated'],
+            [(guild.id, guild.name, datetime.datetime.now(timezone.utc)) for guild in bot.guilds],
+            ignore=True
+        )
+    except Exception as e:
+        logger.error(f"Failed to update guild names: {e}")
     
     # Initialize menu timer
     if menu_timer is None:
@@ -327,7 +335,14 @@ async def close_bot():
         try:
             try:
                 from redis_lib.sync_worker import sync_worker
+                from redis_lib.user_update_worker import user_update_worker
                 await sync_worker.stop()
+                await user_update_worker.stop()
+            except Exception:
+                pass
+            try:
+                from redis_lib.click_spool import click_spool
+                await click_spool.stop()
             except Exception:
                 pass
             await redis_client.close()
@@ -353,39 +368,6 @@ def terminate_handler(signal, frame):
     asyncio.create_task(close_bot())
 
 
-async def clear_game_cache():
-    """Clear Redis cache for all games"""
-    try:
-        client = await redis_client.get_client()
-        if not client:
-            print("❌ Redis client not available")
-            return
-        
-        # Get all game state keys
-        keys = await client.keys("game:*:state")
-        if keys:
-            print(f"🗑️  Found {len(keys)} game cache keys to delete")
-            deleted = await client.delete(*keys)
-            print(f"✅ Deleted {deleted} cache keys")
-        else:
-            print("ℹ️  No game cache keys found")
-            
-        # Also clear any other game-related keys
-        other_keys = await client.keys("game:*")
-        if other_keys:
-            print(f"🗑️  Found {len(other_keys)} other game keys to delete")
-            deleted = await client.delete(*other_keys)
-            print(f"✅ Deleted {deleted} other keys")
-            
-        print("🎯 Redis cache cleared! The bot will reload fresh data from the database.")
-        
-    except Exception as e:
-        print(f"❌ Error clearing cache: {e}")
-
-
-asyncio.run(clear_game_cache())
-
-
 print("Starting bot...")
 try:
     logger.info(f"""
@@ -5,7 +5,8 @@ import traceback
 
 # Local imports
 from utils.utils import logger, lock
-from database.database import execute_query
+from database.database import execute_query, commit_click, run_db_call, USER_CLICK_UPSERT
+from redis_lib.redis_queues import push_user_click
 
 # User Manager class
 # This class is responsible for managing user data, such as cooldowns, color ranks, and total clicks.
@@ -18,16 +19,7 @@ class UserManager:
     def add_or_update_user(self, user_id, cooldown_expiration, color_rank, timer_value, user_name, game_id, latest_click_var=None):
         global lock
         try:
-            query = '''
-                INSERT INTO users (user_id, cooldown_expiration, color_rank, total_clicks, lowest_click_time, last_click_time, user_name, game_session)
-                VALUES (%s, %s, %s, 1, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE
-                    cooldown_expiration = VALUES(cooldown_expiration),
-                    color_rank = VALUES(color_rank),
-                    total_clicks = total_clicks + 1,
-                    lowest_click_time = LEAST(lowest_click_time, VALUES(lowest_click_time)),
-                    last_click_time = VALUES(last_click_time)
-            '''
+            query = USER_CLICK_UPSERT
             latest_click_time = latest_click_var if latest_click_var else datetime.datetime.now(timezone.utc)
             params = (user_id, cooldown_expiration, color_rank, timer_value, latest_click_time, user_name, game_id)
             success = execute_query(query, params, commit=True)
@@ -48,6 +40,61 @@ class UserManager:
             logger.error(f'Error adding or updating user: {e}, {tb}')
             return False
 
+    def commit_click(self, user_id, cooldown_expiration, color_rank, timer_value, user_name, game_id, click_time, record_click=True):
+        """
+        Commit an accepted click (user upsert, and the click row unless record_click is False)
+        in one transaction and cache the user's new state.
+        Returns:
+            dict: The user's updated aggregates (see database.commit_click), None if failed
+        """
+        try:
+            aggregates = commit_click(game_id, user_id, user_name, click_time, timer_value,
+                                      cooldown_expiration, color_rank, record_click)
+            if aggregates is None: return None
+            
+            self.user_cache[user_id] = {
+                'cooldown_expiration': cooldown_expiration,
+                'color_rank': color_rank,
+                'timer_value': timer_value,
+                'user_name': user_name,
+                'game_id': game_id,
+                'latest_click_time': click_time
+            }
+            
+            return aggregates
+        except Exception as e:
+            tb = traceback.format_exc()
+            logger.error(f'Error committing click: {e}, {tb}')
+            return None
+
+    async def queue_click(self, user_id, cooldown_expiration, color_rank, timer_value, user_name, game_id, click_time):
+        """
+        Queue the user upsert for an accepted click; the user update worker applies it write-behind.
+        Upserts directly if the update cannot be queued.
+        Returns:
+            bool: True if queued or written, False if failed
+        """
+        try:
+            if await push_user_click(user_id, user_name, game_id, click_time, timer_value, cooldown_expiration, color_rank) is None:
+                logger.warning(f'Could not queue user update for {user_id}, upserting directly')
+                return await run_db_call(self.add_or_update_user, user_id, cooldown_expiration, color_rank,
+                                         timer_value, user_name, game_id, click_time)
+
+            self.user_cache[user_id] = {
+                'cooldown_expiration': cooldown_expiration,
+                'color_rank': color_rank,
+                'timer_value': timer_value,
+                'user_name': user_name,
+                'game_id': game_id,
+                'latest_click_time': click_time
+            }
+
+            return True
+        except Exception as e:
+            tb = traceback.format_exc()
+            logger.error(f'Error queueing user update: {e}, {tb}')
+            return False
+
     def remove_expired_cooldowns(self):
         global lock
         try:
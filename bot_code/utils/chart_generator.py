@@ -485,18 +485,20 @@ class ChartGenerator:
     def _create_activity_heatmap(self, ax, player_activity_data):
         """Create player activity heatmap by hour of day."""
         # If no data, show a message
-        if not player_activity_data:
+        if not (player_activity_data.any() if isinstance(player_activity_data, np.ndarray) else player_activity_data):
             ax.text(0.5, 0.5, "No activity data available",
                   ha='center', va='center', fontsize=12)
             ax.axis('off')
             return
         
-        # Extract data - assuming activity_data is a list of (hour, day_of_week, count) tuples
-        # Reshape data into a 7x24 matrix (7 days, 24 hours)
-        activity_matrix = np.zeros((7, 24))
-        
-        for hour, day, count in player_activity_data:
-            activity_matrix[day, hour] = count
+        # Accepts a ready 7x24 matrix (stats_helpers.get_activity_matrix) or a list of
+        # (hour, day_of_week, count) tuples, which is reshaped into a 7x24 matrix (7 days, 24 hours)
+        if isinstance(player_activity_data, np.ndarray):
+            activity_matrix = player_activity_data
+        else:
+            activity_matrix = np.zeros((7, 24))
+            hours, days, counts = np.array(player_activity_data, dtype=np.int64).T
+            activity_matrix[days, hours] = counts
         
         # Create heatmap
         im = ax.imshow(activity_matrix, cmap='viridis')
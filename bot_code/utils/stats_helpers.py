@@ -1,98 +1,124 @@
-from typing import Dict, List, Tuple
-import datetime
+from typing import AsyncIterator, Dict, List
+import numpy as np
+from utils.utils import get_color_name, get_color_emoji
 
-def get_color_distribution(clicks: List[Tuple[int, int]], timer_duration: int) -> Dict[str, int]:
+TIER_ORDER = ('Red', 'Orange', 'Yellow', 'Green', 'Blue', 'Purple')
+
+# Lower bounds (percent of the timer remaining) of Orange..Purple; below the first is Red
+COLOR_THRESHOLDS = np.array([16.67, 33.33, 50.0, 66.67, 83.33])
+COLOR_DISTRIBUTION_EMOJIS = ('🔴', '🟠', '🟡', '🟢', '🔵', '🟣')
+
+def get_color_indices(timer_values: np.ndarray, timer_duration: int) -> np.ndarray:
+    """
+    Vectorized get_color_name(): map timer values to indices into TIER_ORDER (0 = Red ... 5 = Purple).
+    
+    Args:
+        timer_values: Array of timer values
+        timer_duration: Total duration of timer
+        
+    Returns:
+        int array of color indices, same length as timer_values
+    """
+    timer_duration = max(1, timer_duration)
+    percentages = np.clip(np.asarray(timer_values, dtype=np.float64), 0, timer_duration) / timer_duration * 100
+    return np.searchsorted(COLOR_THRESHOLDS, percentages, side='right')
+
+def get_click_mmr(timer_values: np.ndarray, timer_duration: int) -> np.ndarray:
+    """
+    Vectorized calculate_click_mmr(): MMR earned by each click, same formula as the leaderboard.
+    
+    Args:
+        timer_values: Array of timer values
+        timer_duration: Total duration of timer
+        
+    Returns:
+        float64 array of per-click MMR
+    """
+    percentage = np.asarray(timer_values, dtype=np.float64) / timer_duration * 100
+    bracket = np.minimum(5, (percentage / 16.66667).astype(np.int64))
+    bracket_position = np.mod(percentage, 16.66667) / 16.66667
+    
+    base_points = np.power(2.0, 5 - bracket)
+    position_multiplier = np.where(bracket <= 1, 1 - bracket_position, 1 - np.abs(0.5 - bracket_position))
+    
+    return base_points * (1 + position_multiplier) * (timer_duration / 43200)
+
+def get_color_distribution(clicks: Dict[str, np.ndarray], timer_duration: int) -> Dict[str, int]:
     """
     Calculate distribution of colors for all clicks
     
     Args:
-        clicks: List of (timer_value, timestamp) tuples
+        clicks: Columnar query result with a 'timer_value' array
         timer_duration: Total duration of timer
         
     Returns:
         Dict mapping color emoji to count
     """
-    colors = {
-        '🟣': 0, '🔵': 0, '🟢': 0, 
-        '🟡': 0, '🟠': 0, '🔴': 0
-    }
-    
-    for timer_value, _ in clicks:
-        percentage = (timer_value / timer_duration) * 100
-        if percentage >= 83.33:
-            colors['🟣'] += 1
-        elif percentage >= 66.67:
-            colors['🔵'] += 1
-        elif percentage >= 50:
-            colors['🟢'] += 1
-        elif percentage >= 33.33:
-            colors['🟡'] += 1
-        elif percentage >= 16.67:
-            colors['🟠'] += 1
-        else:
-            colors['🔴'] += 1
-            
-    return colors
+    counts = np.bincount(get_color_indices(clicks['timer_value'], timer_duration), minlength=len(COLOR_DISTRIBUTION_EMOJIS))
+    # Purple first, as before
+    return {emoji: int(counts[index]) for index, emoji in reversed(list(enumerate(COLOR_DISTRIBUTION_EMOJIS)))}
 
-def get_hourly_activity(clicks: List[Tuple[int, int]]) -> Dict[int, int]:
+def get_hourly_activity(clicks: Dict[str, np.ndarray]) -> Dict[int, int]:
     """
     Calculate click distribution by hour
     
     Args:
-        clicks: List of (timer_value, timestamp) tuples
+        clicks: Columnar query result with a 'click_time' array of epoch seconds (UTC)
         
     Returns:
         Dict mapping hour (0-23) to click count
     """
-    hours = {i: 0 for i in range(24)}
+    hours = (np.asarray(clicks['click_time'], dtype=np.int64) // 3600) % 24
+    counts = np.bincount(hours, minlength=24)
+    return {hour: int(counts[hour]) for hour in range(24)}
+
+def get_activity_matrix(clicks: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Calculate click counts by weekday and hour, the input ChartGenerator's activity heatmap plots
     
-    for _, timestamp in clicks:
-        hour = datetime.datetime.fromtimestamp(timestamp).hour
-        hours[hour] += 1
+    Args:
+        clicks: Columnar query result with a 'click_time' array of epoch seconds (UTC)
         
-    return hours
+    Returns:
+        7x24 int array indexed [weekday (Monday = 0), hour]
+    """
+    click_times = np.asarray(clicks['click_time'], dtype=np.int64)
+    hours = (click_times // 3600) % 24
+    weekdays = (click_times // 86400 + 3) % 7  # 1970-01-01 was a Thursday
+    return np.bincount(weekdays * 24 + hours, minlength=7 * 24).reshape(7, 24)
 
-def get_mmr_over_time(clicks: List[Tuple[int, int, int, str]], timer_duration: int) -> List[Dict]:
+def get_mmr_over_time(clicks: Dict[str, np.ndarray], timer_duration: int) -> Dict[str, np.ndarray]:
     """
     Calculate cumulative MMR progression
     
     Args:
-        clicks: List of (timer_value, timestamp, user_id, username) tuples
+        clicks: Columnar query result with 'timer_value', 'click_time', 'user_id' and 'user_name' arrays
         timer_duration: Total duration of timer
         
     Returns:
-        List of dicts with timestamp and MMR values per user
+        Dict of arrays in click-time order: timestamp, user_id, username and each user's running mmr
     """
-    user_mmr = {}
-    progression = []
+    order = np.argsort(clicks['click_time'], kind='stable')
+    timestamps = np.asarray(clicks['click_time'])[order]
+    user_ids = np.asarray(clicks['user_id'])[order]
+    mmr = get_click_mmr(np.asarray(clicks['timer_value'])[order], timer_duration)
     
-    for timer_value, timestamp, user_id, username in sorted(clicks, key=lambda x: x[1]):
-        # Calculate MMR for this click using same formula as leaderboard
-        percentage = (timer_value / timer_duration) * 100
-        bracket = min(5, int(percentage / 16.66667))
-        bracket_position = (percentage % 16.66667) / 16.66667
-        
-        base_points = 2 ** (5 - bracket)
-        
-        if bracket <= 1:
-            position_multiplier = 1 - bracket_position
-        else:
-            position_multiplier = 1 - abs(0.5 - bracket_position)
-            
-        mmr = base_points * (1 + position_multiplier) * (timer_duration / 43200)
-        
-        if user_id not in user_mmr:
-            user_mmr[user_id] = {'mmr': 0, 'username': username}
-            
-        user_mmr[user_id]['mmr'] += mmr
-        
-        progression.append({
-            'timestamp': timestamp,
-            'username': username,
-            'mmr': user_mmr[user_id]['mmr']
-        })
-        
-    return progression
+    # Running total per user: group clicks by user (keeping time order inside each group),
+    # take one global cumsum, then subtract the total reached before each group started
+    # (MMR is never negative, so a running max carries each group's offset forward)
+    by_user = np.lexsort((np.arange(len(user_ids)), user_ids))
+    grouped = np.cumsum(mmr[by_user])
+    group_starts = np.r_[True, user_ids[by_user][1:] != user_ids[by_user][:-1]] if len(user_ids) else np.empty(0, dtype=bool)
+    offsets = np.where(group_starts, grouped - mmr[by_user], 0)
+    running = np.empty_like(mmr)
+    running[by_user] = grouped - np.maximum.accumulate(offsets) if len(offsets) else grouped
+    
+    return {
+        'timestamp': timestamps,
+        'user_id': user_ids,
+        'username': np.asarray(clicks['user_name'], dtype=object)[order],
+        'mmr': running
+    }
 
 def get_duration_emoji(days: float) -> str:
     """Get appropriate emoji for game duration."""
@@ -170,4 +196,62 @@ def calculate_time_to_next_rank(current_duration: int, next_duration: int) -> st
     remaining %= 3600
     minutes = remaining // 60
     
-    return f"{days}d {hours}h {minutes}m"
\ No newline at end of file
+    return f"{days}d {hours}h {minutes}m"
+
+async def aggregate_game_chart_stats(click_chunks: AsyncIterator[List[tuple]], timer_duration: int, top_n: int = 10) -> Dict:
+    """
+    Aggregate a stream of clicks into everything generate_game_charts() needs, in one pass.
+    Memory is bounded by the number of players, not the number of clicks.
+    
+    Args:
+        click_chunks: Async iterator of row lists, each row (user_id, user_name, timer_value, click_time)
+        timer_duration: Total duration of timer
+        top_n: Number of top players by time claimed to return (default: 10)
+        
+    Returns:
+        Dict with total_clicks, total_players, tier_stats, player_activity and top_players
+    """
+    total_clicks = 0
+    tiers = {}  # tier name -> [clicks, time claimed, set of user ids]
+    activity = {}  # (hour, weekday) -> clicks
+    players = {}  # user id -> [user name, time claimed, lowest click]
+    
+    async for chunk in click_chunks:
+        for user_id, user_name, timer_value, click_time in chunk:
+            timer_value = float(timer_value)
+            claimed = max(0.0, timer_duration - timer_value)
+            total_clicks += 1
+            
+            tier = tiers.setdefault(get_color_name(timer_value, timer_duration), [0, 0.0, set()])
+            tier[0] += 1
+            tier[1] += claimed
+            tier[2].add(user_id)
+            
+            key = (click_time.hour, click_time.weekday())
+            activity[key] = activity.get(key, 0) + 1
+            
+            player = players.get(user_id)
+            if player is None:
+                players[user_id] = [user_name, claimed, timer_value]
+            else:
+                player[1] += claimed
+                player[2] = min(player[2], timer_value)
+    
+    tier_stats = []
+    for tier_name in TIER_ORDER:
+        if tier_name not in tiers:
+            continue
+        clicks, time_claimed, user_ids = tiers[tier_name]
+        tier_stats.append((tier_name, clicks, time_claimed, len(user_ids),
+                           time_claimed / clicks, time_claimed / len(user_ids)))
+    
+    top_players = sorted(players.values(), key=lambda player: player[1], reverse=True)[:top_n]
+    
+    return {
+        'total_clicks': total_clicks,
+        'total_players': len(players),
+        'tier_stats': tier_stats,
+        'player_activity': [(hour, weekday, count) for (hour, weekday), count in activity.items()],
+        'top_players': [(user_name, time_claimed, lowest, get_color_emoji(lowest, timer_duration))
+                        for user_name, time_claimed, lowest in top_players]
+    }
@@ -2,6 +2,7 @@
 import nextcord
 import datetime
 import asyncio
+import contextlib
 import traceback
 import random
 import json
@@ -16,12 +17,12 @@ from giphy_client.rest import ApiException
 from utils.utils import logger, lock, get_color_state, get_color_name, get_color_emoji, config
 from user.user_manager import user_manager
 from button.button_utils import get_button_message, Failed_Interactions
-from game.game_cache import game_cache
-from database.database import execute_query, get_game_session_by_guild_id, get_game_session_by_id
+from database.database import execute_query_async, run_db_call, get_game_session_by_guild_id, get_game_session_by_id
 from game.character_handler import CharacterHandler
+from redis_lib.redis_client import redis_client
 from redis_lib.redis_cache import game_state_cache
-from redis_lib.redis_locks import RedisLock
-from redis_lib.redis_queues import push_click_to_queue, push_user_update
+from redis_lib.click_admission import click_admission
+from redis_lib.click_spool import click_spool
 
 try:
     giphy_api = giphy_client.DefaultApi()
@@ -132,33 +133,26 @@ async def gather_comprehensive_context(game_id: int, user_id: int, current_timer
             "chat_context": []
         }
         
-        # Get player stats
+        # Get player stats from the game_player_stats rollup
         player_query = '''
             SELECT 
-                COUNT(*) as total_clicks,
-                MIN(bc.timer_value) as best_click,
-                SUM(CASE WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 83.33 THEN 1 ELSE 0 END) AS purple_clicks,
-                SUM(CASE WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 66.67 AND ROUND((bc.timer_value / %s) * 100, 2) < 83.33 THEN 1 ELSE 0 END) AS blue_clicks,
-                SUM(CASE WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 50.00 AND ROUND((bc.timer_value / %s) * 100, 2) < 66.67 THEN 1 ELSE 0 END) AS green_clicks,
-                SUM(CASE WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 33.33 AND ROUND((bc.timer_value / %s) * 100, 2) < 50.00 THEN 1 ELSE 0 END) AS yellow_clicks,
-                SUM(CASE WHEN ROUND((bc.timer_value / %s) * 100, 2) >= 16.67 AND ROUND((bc.timer_value / %s) * 100, 2) < 33.33 THEN 1 ELSE 0 END) AS orange_clicks,
-                SUM(CASE WHEN ROUND((bc.timer_value / %s) * 100, 2) < 16.67 THEN 1 ELSE 0 END) AS red_clicks,
+                gps.clicks,
+                gps.best_timer,
+                gps.purple_clicks,
+                gps.blue_clicks,
+                gps.green_clicks,
+                gps.yellow_clicks,
+                gps.orange_clicks,
+                gps.red_clicks,
                 (
-                    SELECT COUNT(DISTINCT u2.user_id) + 1
-                    FROM button_clicks bc2 
-                    JOIN users u2 ON bc2.user_id = u2.user_id 
-                    WHERE bc2.game_id = %s 
-                    AND (
-                        SELECT COUNT(*) FROM button_clicks bc3 WHERE bc3.user_id = u2.user_id AND bc3.game_id = %s
-                    ) > (
-                        SELECT COUNT(*) FROM button_clicks bc4 WHERE bc4.user_id = %s AND bc4.game_id = %s
-                    )
+                    SELECT COUNT(*) + 1 FROM game_player_stats ranked
+                    WHERE ranked.game_id = gps.game_id AND ranked.clicks > gps.clicks
                 ) as rank_position
-            FROM button_clicks bc
-            WHERE bc.game_id = %s AND bc.user_id = %s
+            FROM game_player_stats gps
+            WHERE gps.game_id = %s AND gps.user_id = %s
         '''
-        player_params = (timer_duration,) * 10 + (game_id, game_id, user_id, game_id, game_id, user_id)
-        player_result = execute_query(player_query, player_params)
+        player_params = (game_id, user_id)
+        player_result = await execute_query_async(player_query, player_params)
         
         if player_result and player_result[0]:
             stats = player_result[0]
@@ -189,10 +183,9 @@ async def gather_comprehensive_context(game_id: int, user_id: int, current_timer
             }
         
         # Get game context
-        game_start_query = 'SELECT start_time FROM game_sessions WHERE id = %s'
-        game_start_result = execute_query(game_start_query, (game_id,))
-        if game_start_result and game_start_result[0]:
-            start_time = game_start_result[0][0].replace(tzinfo=timezone.utc)
+        game_session = await get_game_session_by_id(game_id)
+        if game_session and game_session['start_time']:
+            start_time = game_session['start_time'].replace(tzinfo=timezone.utc)
             current_time = datetime.datetime.now(timezone.utc)
             duration_seconds = (current_time - start_time).total_seconds()
             
@@ -234,7 +227,7 @@ async def gather_comprehensive_context(game_id: int, user_id: int, current_timer
             LIMIT 200
         '''
         recent_params = (timer_duration,) * 5 + (game_id,)
-        recent_result = execute_query(recent_clicks_query, recent_params)
+        recent_result = await execute_query_async(recent_clicks_query, recent_params)
         
         if recent_result:
             context["recent_clicks"] = []
@@ -351,162 +344,132 @@ class TimerButton(nextcord.ui.Button):
                 return message
         return None
 
-    @classmethod
-    async def _check_double_click_prevention_redis(cls, guild_id, user_id):
+    async def _send_cooldown_message(self, interaction, cooldown_remaining):
         """
-        Check double-click prevention using Redis for real-time validation
+        Tell a user their click was rejected because they are on cooldown
+        Args:
+            interaction: The button interaction
+            cooldown_remaining: Seconds until the user may click again
         """
-        try:
-            # Get the sequential click requirement for this guild
-            sequential_requirement = await cls._get_sequential_click_requirement(guild_id)
-            
-            if sequential_requirement <= 0:
-                logger.info(f"Double-click prevention disabled for guild {guild_id} (requirement: {sequential_requirement})")
-                return True
+        cooldown_remaining = int(cooldown_remaining)
+        formatted_cooldown = f"{format(int(cooldown_remaining//3600), '02d')}:{format(int(cooldown_remaining%3600//60), '02d')}:{format(int(cooldown_remaining%60), '02d')}"
+        display_name = interaction.user.display_name or interaction.user.name
+        
+        # Check for cached message
+        cached_message = self._get_cached_cooldown_message(interaction.user.id)
+        if cached_message:
+            cooldown_message = cached_message
+        else:
+            handler = CharacterHandler.get_instance()
+            cooldown_response_tuple = await handler.generate_cooldown_message(
+                time_remaining=formatted_cooldown,
+                player_name=display_name
+            )
+            cooldown_message = cooldown_response_tuple[0] if isinstance(cooldown_response_tuple, tuple) else cooldown_response_tuple
+            self._cooldown_messages[interaction.user.id] = (cooldown_message, time.time())
+        
+        await interaction.followup.send(cooldown_message, ephemeral=True)
+        logger.info(f'Button click rejected. User {interaction.user} is on cooldown for {formatted_cooldown}')
 
-            redis_client_instance = await redis_client.get_client()
-            if not redis_client_instance:
-                # Fallback to database method if Redis unavailable
-                return await cls._check_double_click_prevention(guild_id, user_id)
+    async def _send_sequential_message(self, interaction, sequential_requirement):
+        """
+        Tell a user their click was rejected by double-click prevention
+        Args:
+            interaction: The button interaction
+            sequential_requirement: Different users required to click first
+        """
+        logger.info(f'Double-click prevention: User {interaction.user} blocked, needs {sequential_requirement} different users to click first')
+        await interaction.followup.send(
+            f"Hold your horses, brave warrior! You must wait for {sequential_requirement} different adventurer{'s' if sequential_requirement != 1 else ''} to click before you can click again. "
+            f"The button demands variety in its champions!", 
+            ephemeral=True
+        )
 
-            # Check Redis list of recent clickers for this guild
-            recent_clickers_key = f"guild:{guild_id}:recent_clickers"
-            try:
-                # Get the list of recent clickers (most recent first)
-                recent_clickers = await redis_client_instance.lrange(recent_clickers_key, 0, -1)
-                
-                if not recent_clickers:
-                    # No recent clicks, user can click
-                    logger.info(f"Double-click prevention (Redis): No recent clickers for guild {guild_id}, allowing user {user_id}")
-                    return True
-                
-                # Check if the last clicker was this user
-                if recent_clickers and recent_clickers[0] == str(user_id):
-                    # Count how many different users have clicked since this user's last click
-                    different_users = set()
-                    for clicker_id in recent_clickers[1:]:  # Skip the first (most recent) which is this user
-                        if clicker_id != str(user_id):
-                            different_users.add(clicker_id)
-                        else:
-                            # Found another click by this user, stop counting
-                            break
-                    
-                    different_users_count = len(different_users)
-                    can_click = different_users_count >= sequential_requirement
-                    
-                    logger.info(f"Double-click prevention (Redis) for user {user_id} in guild {guild_id}: "
-                               f"Need {sequential_requirement} different users, found {different_users_count}, "
-                               f"can_click={can_click}")
-                    
-                    return can_click
-                else:
-                    # User is not the last clicker, they can click
-                    logger.info(f"Double-click prevention (Redis): User {user_id} was not the last clicker, allowing")
-                    return True
-                    
-            except Exception as redis_e:
-                logger.warning(f"Redis double-click check failed: {redis_e}, falling back to database")
-                return await cls._check_double_click_prevention(guild_id, user_id)
-            
-        except Exception as e:
-            logger.error(f"Error in Redis double-click prevention check for user {user_id}, guild {guild_id}: {e}")
-            # Fallback to database method
-            return await cls._check_double_click_prevention(guild_id, user_id)
+    @classmethod
+    async def _get_game_click_count(cls, game_id, user_id):
+        """
+        A user's clicks in a game from the game_player_stats rollup plus their clicks still in the
+        local spool (only used until the game's leaderboards are built in Redis, or while Redis is
+        unavailable; clicks still on the Redis queue are not counted)
+        Args:
+            game_id: Game session ID
+            user_id: Discord user ID
+        Returns:
+            int: Click count
+        """
+        result = await execute_query_async(
+            'SELECT clicks FROM game_player_stats WHERE game_id = %s AND user_id = %s',
+            (game_id, user_id)
+        )
+        spooled = sum(record['user_id'] == user_id for record in click_spool.pending(game_id))
+        return (int(result[0][0] or 0) if result else 0) + spooled
 
     @classmethod
-    async def _check_double_click_prevention(cls, guild_id, user_id):
+    async def _check_double_click_prevention(cls, game_id, user_id, sequential_requirement):
         """
-        Check if user can click based on double-click prevention rules using database
+        Check if user can click based on double-click prevention rules using database and the clicks
+        still in the local spool (only used while Redis is unavailable; the admission script checks
+        the Redis window otherwise)
         Args:
-            guild_id: Discord guild ID
+            game_id: Game session ID
             user_id: Discord user ID attempting to click
+            sequential_requirement: Different users required before a repeat click
         Returns:
             bool: True if user can click, False if prevented
         """
         try:
-            # Get the sequential click requirement for this guild
-            sequential_requirement = await cls._get_sequential_click_requirement(guild_id)
-            
             if sequential_requirement <= 0:
-                logger.info(f"Double-click prevention disabled for guild {guild_id} (requirement: {sequential_requirement})")
+                logger.info(f"Double-click prevention disabled for game {game_id} (requirement: {sequential_requirement})")
                 return True
 
-            # Get this user's most recent click time for this guild's game
-            user_last_click_query = '''
-                SELECT MAX(bc.click_time)
-                FROM button_clicks bc
-                INNER JOIN game_sessions gs ON bc.game_id = gs.id
-                WHERE bc.user_id = %s 
-                AND gs.guild_id = %s 
-                AND gs.end_time IS NULL
-            '''
-            user_result = execute_query(user_last_click_query, (user_id, guild_id))
+            # Spooled clicks are newer than every click in MySQL
+            spooled = [record['user_id'] for record in click_spool.pending(game_id)]
+            if user_id in spooled:
+                later_clickers = set(spooled[len(spooled) - spooled[::-1].index(user_id):])
+                different_users_count = len(later_clickers)
+                can_click = different_users_count >= sequential_requirement
+                logger.info(f"Double-click prevention check for user {user_id} in game {game_id} (spooled clicks): "
+                           f"Need {sequential_requirement} different users, found {different_users_count}, "
+                           f"can_click={can_click}")
+                return can_click
+
+            # This user's most recent click in the game (idx_bc_user_game_time)
+            user_result = await execute_query_async(
+                'SELECT MAX(id) FROM button_clicks WHERE user_id = %s AND game_id = %s',
+                (user_id, game_id)
+            )
             
             # If user has never clicked, allow the click
             if not user_result or not user_result[0] or user_result[0][0] is None:
                 logger.info(f"Double-click prevention: User {user_id} has no previous clicks, allowing")
                 return True
-                
-            user_last_click_time = user_result[0][0]
             
-            # Count distinct users who clicked after this user's last click
+            # Distinct users who clicked since, read only up to the requirement (idx_bc_game_id)
             distinct_users_query = '''
-                SELECT COUNT(DISTINCT bc.user_id)
-                FROM button_clicks bc
-                INNER JOIN game_sessions gs ON bc.game_id = gs.id
-                WHERE gs.guild_id = %s 
-                AND gs.end_time IS NULL
-                AND bc.click_time > %s
-                AND bc.user_id != %s
+                SELECT DISTINCT user_id
+                FROM button_clicks
+                WHERE game_id = %s
+                AND id > %s
+                LIMIT %s
             '''
-            distinct_result = execute_query(distinct_users_query, (guild_id, user_last_click_time, user_id))
-            
-            if not distinct_result or not distinct_result[0]:
-                different_users_count = 0
-            else:
-                different_users_count = distinct_result[0][0] or 0
+            distinct_result = await execute_query_async(distinct_users_query, (game_id, user_result[0][0], sequential_requirement))
+            later_clickers = {int(row[0]) for row in distinct_result or []} | set(spooled)
+            different_users_count = len(later_clickers)
             
             can_click = different_users_count >= sequential_requirement
             
-            logger.info(f"Double-click prevention check for user {user_id} in guild {guild_id}: "
+            logger.info(f"Double-click prevention check for user {user_id} in game {game_id}: "
                        f"Need {sequential_requirement} different users, found {different_users_count}, "
                        f"can_click={can_click}")
             
             return can_click
             
         except Exception as e:
-            logger.error(f"Error in double-click prevention check for user {user_id}, guild {guild_id}: {e}")
+            logger.error(f"Error in double-click prevention check for user {user_id}, game {game_id}: {e}")
             logger.error(traceback.format_exc())
             # On error, allow the click to avoid blocking legitimate users
             return True
 
-    @classmethod
-    async def _get_sequential_click_requirement(cls, guild_id):
-        """
-        Get the sequential click requirement for a guild from database
-        Args:
-            guild_id: Discord guild ID
-        Returns:
-            int: Number of different users required before repeat clicks (default: 1)
-        """
-        try:
-            query = '''
-                SELECT sequential_click_requirement 
-                FROM game_sessions 
-                WHERE guild_id = %s AND end_time IS NULL
-                ORDER BY start_time DESC 
-                LIMIT 1
-            '''
-            result = execute_query(query, (guild_id,))
-            if result and result[0] and result[0][0] is not None:
-                requirement = int(result[0][0])
-                logger.info(f"Sequential click requirement for guild {guild_id}: {requirement}")
-                return requirement
-            return 0  # Default requirement
-        except Exception as e:
-            logger.error(f"Error getting sequential click requirement for guild {guild_id}: {e}")
-            return 0  # Safe default
-
     def __init__(self, bot, style=nextcord.ButtonStyle.primary, label="Click me!", timer_value=0, game_id=None):
         # Initialize with a custom_id based on game_id for persistence
         custom_id = f"button_game_{game_id}" if game_id else None
@@ -529,7 +492,7 @@ class TimerButton(nextcord.ui.Button):
 
     # Callback method for the button, called when the button is clicked
     async def callback(self, interaction: nextcord.Interaction):
-        global game_cache, lock
+        global lock
         handler = None
         
         # Capture the most accurate timestamp and start time immediately.
@@ -550,30 +513,15 @@ class TimerButton(nextcord.ui.Button):
                 logger.warning(f"EARLY RETURN: User {interaction.user.id} - deferral failed")
                 return
             
-            # Acquire a per-game Redis lock (falls back to local lock if Redis unavailable)
-            game_id = None
-            try:
-                game_session_tmp = await get_game_session_by_guild_id(interaction.guild.id)
-                if game_session_tmp:
-                    game_id = game_session_tmp['game_id']
-            except Exception:
-                game_id = None
-
-            lock_ctx = None
-            if game_id is not None:
-                try:
-                    lock_ctx = RedisLock(game_id=game_id, timeout=5.0)
-                except Exception:
-                    lock_ctx = None
-
-            # If Redis lock not available, use local asyncio lock
-            if lock_ctx is None:
-                lock_ctx = self._interaction_lock
-
-            async with lock_ctx:
-                # Logging for which lock was used
-                if isinstance(lock_ctx, RedisLock):
-                    logger.info(f"Redis lock acquired for game {game_id} by {interaction.user.id}")
+            # While Redis is up, clicks are checked and applied atomically by the admission script, so no
+            # lock is needed. Without Redis the MySQL checks below run under the local lock.
+            admission_enabled = await redis_client.get_client() is not None
+
+            async with contextlib.AsyncExitStack() as lock_stack:
+                if not admission_enabled:
+                    await lock_stack.enter_async_context(self._interaction_lock)
+                if admission_enabled:
+                    logger.info(f"Admitting click from {interaction.user.id} through Redis")
                 else:
                     logger.info(f"Local lock acquired for {interaction.user.id}")
                 
@@ -594,49 +542,63 @@ class TimerButton(nextcord.ui.Button):
                     
                     # Debug log the current state
                     logger.info(f"Processing click for game {game_id} at {click_time}")
-                    cached_game = game_cache.get_game_cache(game_id)
-                    if cached_game:
-                        logger.info(f"Cache state - Last click: {cached_game['latest_click_time']}, Timer value: {cached_game['last_timer_value']}")
                     
                     button_message = await get_button_message(game_id, self.bot)
                     embed = button_message.embeds[0]
                     user_id = interaction.user.id
                     
-                    is_expired, current_timer_value = await is_timer_expired(game_id)
-                    
-                    if is_expired:
-                        logger.error(f"Game {game_id} timer expired: {current_timer_value}")
-                        logger.warning(f"EARLY RETURN: User {user_id} - timer expired")
-                        await interaction.followup.send("The timer has expired! Game over!", ephemeral=True)
-                        return
+                    if admission_enabled:
+                        # One atomic Redis call: expiry, cooldown and sequential-click checks, then the
+                        # state update, cooldown write and click_queue append
+                        display_name = interaction.user.display_name or interaction.user.name
+                        admission = await click_admission.admit(
+                            game_id, user_id, display_name, click_time,
+                            cooldown_duration * 3600, game_session.get('sequential_click_requirement', 0),
+                            game_session['guild_id']
+                        )
+                        if admission is not None and admission['reason'] == 'UNAVAILABLE':
+                            # Redis failed since the health check and the click was not admitted: take the
+                            # Redis-less path (MySQL checks under the local lock, click spooled to disk)
+                            logger.warning(f"Redis unreachable admitting the click of {user_id}, falling back to MySQL")
+                            admission_enabled = False
+                            await lock_stack.enter_async_context(self._interaction_lock)
+
+                    if admission_enabled:
+                        if admission is None:
+                            logger.warning(f"EARLY RETURN: User {user_id} - click admission failed")
+                            await interaction.followup.send("Error processing your click. Please try again.", ephemeral=True)
+                            return
                         
-                    logger.info(f"Processing click with timer value: {current_timer_value}")
-
-                    # Check cooldown using Redis cache for real-time validation
-                    logger.info(f"Starting cooldown check for user {user_id}, game {game_id}")
-                    try:
-                        # Get user's last click from Redis cache or database
-                        user_cooldown_key = f"user:{user_id}:game:{game_id}:cooldown"
-                        redis_client_instance = await redis_client.get_client()
+                        current_timer_value = admission['timer_value']
+                        if admission['reason'] == 'EXPIRED':
+                            logger.error(f"Game {game_id} timer expired: {current_timer_value}")
+                            logger.warning(f"EARLY RETURN: User {user_id} - timer expired")
+                            await interaction.followup.send("The timer has expired! Game over!", ephemeral=True)
+                            return
+                        if admission['reason'] == 'COOLDOWN':
+                            await self._send_cooldown_message(interaction, admission['cooldown_remaining'])
+                            return
+                        if admission['reason'] == 'SEQUENTIAL':
+                            await self._send_sequential_message(interaction, game_session.get('sequential_click_requirement', 0))
+                            return
                         
-                        latest_click_time_user = None
-                        if redis_client_instance:
-                            logger.info(f"Redis client available - checking cooldown cache")
-                            try:
-                                # Try Redis first for real-time data
-                                cached_last_click = await redis_client_instance.get(user_cooldown_key)
-                                if cached_last_click:
-                                    latest_click_time_user = datetime.datetime.fromisoformat(cached_last_click)
-                                    logger.debug(f"Found user cooldown in Redis: {latest_click_time_user}")
-                                else:
-                                    logger.info(f"No cooldown data in Redis for user {user_id}")
-                            except Exception as redis_e:
-                                logger.warning(f"Redis cooldown check failed: {redis_e}")
-                        else:
-                            logger.warning(f"Redis client not available - cache not initialized!")
+                        logger.info(f"Click admitted with timer value: {current_timer_value}")
+                    else:
+                        is_expired, current_timer_value = await is_timer_expired(game_id)
+                    
+                        if is_expired:
+                            logger.error(f"Game {game_id} timer expired: {current_timer_value}")
+                            logger.warning(f"EARLY RETURN: User {user_id} - timer expired")
+                            await interaction.followup.send("The timer has expired! Game over!", ephemeral=True)
+                            return
                         
-                        # Fallback to database if Redis not available or no cached data
-                        if latest_click_time_user is None:
+                        logger.info(f"Processing click with timer value: {current_timer_value}")
+
+                        # Check cooldown
+                        logger.info(f"Starting cooldown check for user {user_id}, game {game_id}")
+                        try:
+                            # Get user's last click from the database (Redis is unavailable on this path)
+                            latest_click_time_user = None
                             query = '''
                                 SELECT MAX(click_time)
                                 FROM button_clicks
@@ -644,101 +606,85 @@ class TimerButton(nextcord.ui.Button):
                                 AND game_id = %s
                             '''
                             params = (interaction.user.id, game_id)
-                            result = execute_query(query, params)
-                            
+                            result = await execute_query_async(query, params)
+                        
                             if result and result[0][0] is not None:
                                 latest_click_time_user = result[0][0].replace(tzinfo=timezone.utc)
                                 logger.debug(f"Found user cooldown in database: {latest_click_time_user}")
+                            # A click still in the local spool is newer than any in the database
+                            spooled_click_time = click_spool.last_click_time(game_id, interaction.user.id)
+                            if spooled_click_time is not None:
+                                latest_click_time_user = spooled_click_time
                         
-                        # Check cooldown
-                        if latest_click_time_user is not None:
-                            cooldown_expiry = latest_click_time_user + datetime.timedelta(hours=cooldown_duration)
-                            cooldown_remaining = int((cooldown_expiry - click_time).total_seconds())
-                            if cooldown_remaining > 0:
-                                formatted_cooldown = f"{format(int(cooldown_remaining//3600), '02d')}:{format(int(cooldown_remaining%3600//60), '02d')}:{format(int(cooldown_remaining%60), '02d')}"
-                                display_name = interaction.user.display_name or interaction.user.name
+                            # Check cooldown
+                            if latest_click_time_user is not None:
+                                cooldown_expiry = latest_click_time_user + datetime.timedelta(hours=cooldown_duration)
+                                cooldown_remaining = int((cooldown_expiry - click_time).total_seconds())
+                                if cooldown_remaining > 0:
+                                    await self._send_cooldown_message(interaction, cooldown_remaining)
+                                    return
                                 
-                                # Check for cached message
-                                cached_message = self._get_cached_cooldown_message(interaction.user.id)
-                                if cached_message:
-                                    cooldown_message = cached_message
-                                else:
-                                    handler = CharacterHandler.get_instance()
-                                    cooldown_response_tuple = await handler.generate_cooldown_message(
-                                        time_remaining=formatted_cooldown,
-                                        player_name=display_name
-                                    )
-                                    cooldown_message = cooldown_response_tuple[0] if isinstance(cooldown_response_tuple, tuple) else cooldown_response_tuple
-                                    self._cooldown_messages[interaction.user.id] = (cooldown_message, time.time())
-                                
-                                await interaction.followup.send(cooldown_message, ephemeral=True)
-                                logger.info(f'Button click rejected. User {interaction.user} is on cooldown for {formatted_cooldown}')
-                                return
-                                
-                    except Exception as e:
-                        tb = traceback.format_exc()
-                        logger.error(f'Error processing cooldown check: {e}, {tb}')
-                        return
-
-                    # Check double-click prevention using Redis for real-time validation
-                    if not await self._check_double_click_prevention_redis(interaction.guild.id, user_id):
-                        sequential_requirement = await self._get_sequential_click_requirement(interaction.guild.id)
-                        logger.info(f'Double-click prevention: User {interaction.user} blocked, needs {sequential_requirement} different users to click first')
-                        await interaction.followup.send(
-                            f"Hold your horses, brave warrior! You must wait for {sequential_requirement} different adventurer{'s' if sequential_requirement != 1 else ''} to click before you can click again. "
-                            f"The button demands variety in its champions!", 
-                            ephemeral=True
-                        )
-                        return
+                        except Exception as e:
+                            tb = traceback.format_exc()
+                            logger.error(f'Error processing cooldown check: {e}, {tb}')
+                            return
+
+                        # Check double-click prevention
+                        sequential_requirement = game_session.get('sequential_click_requirement', 0)
+                        if not await self._check_double_click_prevention(game_id, user_id, sequential_requirement):
+                            await self._send_sequential_message(interaction, sequential_requirement)
+                            return
+
 
                     await interaction.message.add_reaction("⏳")
 
-                    # Update user first
+                    # Commit the click
                     display_name = interaction.user.display_name or interaction.user.name
                     timer_color_name = get_color_name(current_timer_value, timer_duration)
                     cooldown_expiration = click_time + datetime.timedelta(hours=cooldown_duration)
                     
-                    success = user_manager.add_or_update_user(
-                        user_id=interaction.user.id,
-                        cooldown_expiration=cooldown_expiration,
-                        color_rank=timer_color_name,
-                        timer_value=current_timer_value,
-                        user_name=display_name,
-                        game_id=game_id,
-                        latest_click_var=click_time
-                    )
-                    
-                    if not success:
-                        logger.error(f'Failed to update user data for {interaction.user}')
-                        await interaction.followup.send("Error processing your click. Please try again.", ephemeral=True)
-                        return
-
-                    # Enqueue the button click for background DB sync via Redis stream
-                    try:
-                        click_time_str = click_time.isoformat() if hasattr(click_time, 'isoformat') else str(click_time)
-                        await push_click_to_queue(
-                            game_id=game_id,
-                            user_id=interaction.user.id,
-                            click_time=click_time_str,
-                            timer_value=current_timer_value,
-                            user_name=display_name,
-                            old_timer=None
-                        )
+                    if admission_enabled:
+                        # Admitted clicks are already on the Redis click queue, and the user's row is
+                        # upserted write-behind by the user update worker: the click path only enqueues
+                        if not await user_manager.queue_click(
+                            interaction.user.id, cooldown_expiration, timer_color_name, current_timer_value,
+                            display_name, game_id, click_time
+                        ):
+                            # The click itself is admitted and on the click queue, so it still counts: the sync
+                            # worker refreshes the user's total_clicks from the rollup, Redis enforces the cooldown
+                            # and a users row that was never created is repaired by fix_missing_users()
+                            logger.error(f'Failed to queue user update for {interaction.user}, the click is still recorded')
+                        game_clicks = admission['game_clicks']
+                        if game_clicks is None:
+                            game_clicks = await self._get_game_click_count(game_id, interaction.user.id) + 1
+                        # The user's color rank is the color of their latest click
+                        click_aggregates = {'game_clicks': game_clicks, 'color_rank': timer_color_name}
                         logger.info(f'Click enqueued for user {interaction.user.id} in game {game_id}')
-                    except Exception as e:
-                        # If enqueue fails (Redis unavailable or other), fallback to direct DB insert
-                        logger.error(f'Failed to enqueue click, falling back to direct DB insert: {e}')
-                        try:
-                            query = 'INSERT INTO button_clicks (user_id, click_time, timer_value, game_id) VALUES (%s, %s, %s, %s)'
-                            params = (interaction.user.id, click_time, current_timer_value, game_id)
-                            success = execute_query(query, params, commit=True)
-                            if not success:
-                                logger.error(f'Failed to insert button click data (fallback). User: {interaction.user}, Timer Value: {current_timer_value}, Game ID: {game_session["game_id"]}')
-                                return
-                            logger.info(f'Data inserted for {interaction.user} (fallback)!')
-                        except Exception as db_e:
-                            logger.error(f'Fallback DB insert failed: {db_e}')
+                    elif await click_spool.append(
+                        game_id, interaction.user.id, display_name, click_time, current_timer_value,
+                        cooldown_expiration, timer_color_name
+                    ):
+                        # Without Redis the click and the user's row update are spooled to local disk and
+                        # replayed into MySQL (or the click queue) in the background
+                        game_clicks = await self._get_game_click_count(game_id, interaction.user.id)
+                        click_aggregates = {'game_clicks': game_clicks, 'color_rank': timer_color_name}
+                        logger.info(f'Click spooled for {interaction.user} (Redis unavailable)')
+                        # Redis missed this click; its cached state is dropped once Redis is back
+                        game_state_cache.mark_stale(game_id)
+                    else:
+                        # Spool not writable: the click row is written in the same transaction as the user
+                        # upsert, which returns the user's updated aggregates for the announcement below
+                        click_aggregates = await run_db_call(user_manager.commit_click,
+                            interaction.user.id, cooldown_expiration, timer_color_name, current_timer_value,
+                            display_name, game_id, click_time
+                        )
+                        if not click_aggregates:
+                            logger.error(f'Failed to commit click for {interaction.user}')
+                            await interaction.followup.send("Error processing your click. Please try again.", ephemeral=True)
                             return
+                        logger.info(f'Data inserted for {interaction.user} (direct, Redis unavailable)!')
+                        # Redis missed this click; its cached state is dropped once Redis is back
+                        game_state_cache.mark_stale(game_id)
 
                     # Update the user's color rank and add the role to the user
                     guild = interaction.guild
@@ -770,29 +716,9 @@ class TimerButton(nextcord.ui.Button):
                     if not display_name: display_name = interaction.user.name
                     embed.description = f"{color_emoji}! {display_name} ({interaction.user.mention}), the {timer_color_name} rank warrior, has valiantly reset the timer with a mere {formatted_remaining_time} remaining!\nLet their bravery be celebrated throughout the realm!"
 
-                    # Get user's total clicks and best color
-                    query = '''
-                        SELECT 
-                            COUNT(*) as total_clicks,
-                            MIN(timer_value) as lowest_timer,
-                            (
-                                SELECT color_rank 
-                                FROM users 
-                                WHERE user_id = %s
-                            ) as best_color
-                        FROM button_clicks 
-                        WHERE user_id = %s 
-                        AND game_id = %s
-                    '''
-                    params = (interaction.user.id, interaction.user.id, game_id)
-                    user_stats = execute_query(query, params)
-
-                    if not user_stats or not user_stats[0]:
-                        user_clicks_count = 1  # First click
-                        user_best_color = timer_color_name  # Current color will be their best
-                    else:
-                        user_clicks_count = user_stats[0][0] + 1  # Add 1 for current click
-                        user_best_color = user_stats[0][2] or timer_color_name
+                    # User's clicks this game (including this one) and best color, returned by the click commit
+                    user_clicks_count = click_aggregates['game_clicks']
+                    user_best_color = click_aggregates['color_rank'] or timer_color_name
 
                     # Gather comprehensive context for LLM
                     comprehensive_context = await gather_comprehensive_context(
@@ -873,23 +799,6 @@ class TimerButton(nextcord.ui.Button):
                         
                         await send_gif_enhanced(chat_channel, gif_keywords, timer_color_name, timing_context)
                     
-                    game_cache.update_game_cache(game_id, click_time, None, None, display_name, current_timer_value)
-                    
-                    # Update Redis cache with the new click data
-                    try:
-                        await game_state_cache.update_game_state(
-                            game_id=game_id,
-                            last_click_time=click_time,
-                            timer_value=current_timer_value,
-                            latest_player_name=display_name,
-                            total_clicks=None,  # Will be incremented in background
-                            is_active=True
-                        )
-                        logger.debug(f"Updated Redis cache for game {game_id} after click")
-                    except Exception as cache_error:
-                        logger.error(f"Failed to update Redis cache for game {game_id}: {cache_error}")
-                        # Don't fail the click operation if cache update fails
-
                 except Exception as e:
                     tb = traceback.format_exc()
                     logger.error(f'Error 1 processing button click: {e}, {tb}')
@@ -936,7 +845,7 @@ async def is_timer_expired(game_id):
                 ORDER BY click_time DESC
                 LIMIT 1
             '''
-            result = execute_query(query, (game_id,))
+            result = await execute_query_async(query, (game_id,))
             
             if not result or not result[0]:
                 game_session = await get_game_session_by_id(game_id)
@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
 """
-Script to clear Redis cache and force data reload for The Button games
+Script to invalidate the Redis cache and force data reload for The Button games
+
+Bumps the cache generation (O(1), every bot process moves to fresh keys and reloads from the
+database on demand), then incrementally purges keys of retired generations with SCAN.
+Queued clicks and locks are not cache keys and are left untouched.
+
+Usage: python clear_redis_cache.py [--no-purge]
 """
 
 import asyncio
@@ -11,35 +17,31 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'bot_code'))
 
 from redis_lib.redis_client import redis_client
+from redis_lib.redis_cache import game_state_cache
 
-async def clear_game_cache():
-    """Clear Redis cache for all games"""
+async def clear_game_cache(purge=True):
+    """Invalidate the Redis cache for all games"""
     try:
-        client = await redis_client.get_client()
-        if not client:
+        if not await redis_client.initialize():
             print("❌ Redis client not available")
             return
         
-        # Get all game state keys
-        keys = await client.keys("game:*:state")
-        if keys:
-            print(f"🗑️  Found {len(keys)} game cache keys to delete")
-            deleted = await client.delete(*keys)
-            print(f"✅ Deleted {deleted} cache keys")
-        else:
-            print("ℹ️  No game cache keys found")
-            
-        # Also clear any other game-related keys
-        other_keys = await client.keys("game:*")
-        if other_keys:
-            print(f"🗑️  Found {len(other_keys)} other game keys to delete")
-            deleted = await client.delete(*other_keys)
-            print(f"✅ Deleted {deleted} other keys")
+        generation = await game_state_cache.bump_generation()
+        if generation is None:
+            print("❌ Could not bump the cache generation")
+            return
+        print(f"✅ Cache generation bumped to {generation}")
+        
+        if purge:
+            removed = await game_state_cache.purge_stale_keys()
+            print(f"🗑️  Purged {removed} keys of retired generations")
             
-        print("🎯 Redis cache cleared! The bot will reload fresh data from the database.")
+        print("🎯 Redis cache invalidated! The bot will reload fresh data from the database.")
         
     except Exception as e:
         print(f"❌ Error clearing cache: {e}")
+    finally:
+        await redis_client.close()
 
 if __name__ == "__main__":
-    asyncio.run(clear_game_cache())
+    asyncio.run(clear_game_cache(purge='--no-purge' not in sys.argv[1:]))
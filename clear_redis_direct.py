@@ -1,12 +1,38 @@
 #!/usr/bin/env python3
 """
 Direct Redis cache clearing script
+
+Works without the bot's config or database: bumps the cache generation counter used by
+bot_code/redis_lib/redis_cache.py, tells running bots to drop their in-process copies, then
+incrementally purges keys of retired generations with SCAN (never KEYS, which blocks Redis).
 """
 
 import asyncio
 import redis.asyncio as redis
 import os
 
+# Must match CACHE_KEY_PREFIX / CACHE_SCHEMA_VERSION in redis_lib/redis_cache.py and
+# GAME_STATE_CHANNEL in redis_lib/near_cache.py
+CACHE_KEY_PREFIX = "tb"
+CACHE_SCHEMA_VERSION = 1
+GAME_STATE_CHANNEL = "game_state_invalidate"
+SCAN_COUNT = 500
+LEGACY_KEY_PATTERNS = ("game:*:state", "game:*:players", "game:*:recent_clickers", "user:*:game:*:cooldown")
+
+async def purge(client, pattern, keep_prefix):
+    """Unlink keys matching pattern (except the current generation's), SCAN_COUNT at a time"""
+    removed, batch = 0, []
+    async for key in client.scan_iter(match=pattern, count=SCAN_COUNT):
+        if key.startswith(keep_prefix):
+            continue
+        batch.append(key)
+        if len(batch) >= SCAN_COUNT:
+            removed += await client.unlink(*batch)
+            batch = []
+    if batch:
+        removed += await client.unlink(*batch)
+    return removed
+
 async def clear_cache_direct():
     """Clear Redis cache directly"""
     try:
@@ -23,21 +49,16 @@ async def clear_cache_direct():
         await client.ping()
         print("✅ Redis connection successful")
         
-        # Get all game state keys
-        keys = await client.keys("game:*:state")
-        if keys:
-            print(f"🗑️  Found {len(keys)} game cache keys to delete")
-            deleted = await client.delete(*keys)
-            print(f"✅ Deleted {deleted} cache keys")
-            
-            # Also clear any other game-related cache
-            other_keys = await client.keys("game:*")
-            if other_keys:
-                print(f"🗑️  Found {len(other_keys)} additional game keys")
-                deleted_other = await client.delete(*other_keys)
-                print(f"✅ Deleted {deleted_other} additional keys")
-        else:
-            print("ℹ️  No game cache keys found")
+        # Every bot moves to fresh keys at once
+        generation = await client.incr(f"{CACHE_KEY_PREFIX}:v{CACHE_SCHEMA_VERSION}:generation")
+        await client.publish(GAME_STATE_CHANNEL, "*")
+        print(f"✅ Cache generation bumped to {generation}")
+        
+        keep_prefix = f"{CACHE_KEY_PREFIX}:v{CACHE_SCHEMA_VERSION}:g{generation}:"
+        removed = 0
+        for pattern in (f"{CACHE_KEY_PREFIX}:v*:g*:*",) + LEGACY_KEY_PATTERNS:
+            removed += await purge(client, pattern, keep_prefix)
+        print(f"🗑️  Purged {removed} keys of retired generations")
             
         await client.aclose()
         print("🔄 Cache cleared! Bot should reload data from database.")